@@ -0,0 +1,65 @@
+﻿using System;
+using System.Collections.Generic;
+using System.IO;
+
+namespace JiraExport
+{
+    public class AttachmentContentStore
+    {
+        public const string IndexFileName = "attachment-hashes.txt";
+
+        private readonly string _attachmentsDir;
+        private readonly string _indexPath;
+        private readonly Dictionary<string, string> _pathsByContent = new Dictionary<string, string>();
+        private readonly object _syncRoot = new object();
+
+        public AttachmentContentStore(string attachmentsDir)
+        {
+            _attachmentsDir = attachmentsDir;
+            _indexPath = Path.Combine(attachmentsDir, IndexFileName);
+
+            Directory.CreateDirectory(attachmentsDir);
+            if (File.Exists(_indexPath))
+            {
+                foreach (var line in File.ReadLines(_indexPath))
+                {
+                    var separator = line.IndexOf('\t');
+                    if (separator <= 0)
+                        continue;
+
+                    var path = Path.Combine(attachmentsDir, line.Substring(separator + 1));
+                    if (File.Exists(path))
+                        _pathsByContent[GetContentKey(line.Substring(0, separator), Path.GetFileName(path))] = path;
+                }
+            }
+        }
+
+        // Files are only shared when both content and file name match, since the importer
+        // uses the file name of the local path as the attachment name.
+        public bool TryGetExisting(string contentHash, string fileName, out string path)
+        {
+            lock (_syncRoot)
+            {
+                return _pathsByContent.TryGetValue(GetContentKey(contentHash, fileName), out path) && File.Exists(path);
+            }
+        }
+
+        public void Add(string contentHash, string path)
+        {
+            lock (_syncRoot)
+            {
+                var key = GetContentKey(contentHash, Path.GetFileName(path));
+                if (_pathsByContent.ContainsKey(key))
+                    return;
+
+                _pathsByContent.Add(key, path);
+                File.AppendAllText(_indexPath, $"{contentHash}\t{Path.GetRelativePath(_attachmentsDir, path)}{Environment.NewLine}");
+            }
+        }
+
+        private static string GetContentKey(string contentHash, string fileName)
+        {
+            return $"{contentHash}/{fileName}";
+        }
+    }
+}
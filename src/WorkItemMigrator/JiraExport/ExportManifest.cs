@@ -0,0 +1,111 @@
+﻿using Migration.WIContract;
+using Newtonsoft.Json;
+using System;
+using System.Collections.Generic;
+using System.Globalization;
+using System.IO;
+using System.Linq;
+using System.Security.Cryptography;
+using System.Text;
+
+namespace JiraExport
+{
+    public class ExportManifest
+    {
+        // Not a .json file, the workspace json files are all expected to be exported items
+        public const string FileName = "export-manifest.txt";
+
+        private const string LastExportTimeKey = "#last-export";
+
+        private readonly string _path;
+        private readonly Dictionary<string, ExportManifestEntry> _entries = new Dictionary<string, ExportManifestEntry>();
+
+        private ExportManifest(string path)
+        {
+            _path = path;
+        }
+
+        public int Count { get { return _entries.Count; } }
+
+        // Jira time at which the last complete export started, every issue updated later must be exported again
+        public DateTime? LastExportTime { get; private set; }
+
+        public static ExportManifest Load(string workspace)
+        {
+            var manifest = new ExportManifest(Path.Combine(workspace, FileName));
+            if (!File.Exists(manifest._path))
+                return manifest;
+
+            foreach (var line in File.ReadLines(manifest._path))
+            {
+                var parts = line.Split('\t');
+                if (parts.Length == 2 && parts[0] == LastExportTimeKey)
+                {
+                    if (DateTime.TryParse(parts[1], CultureInfo.InvariantCulture, DateTimeStyles.RoundtripKind, out DateTime lastExportTime))
+                        manifest.LastExportTime = lastExportTime;
+                    continue;
+                }
+                if (parts.Length != 3 || string.IsNullOrEmpty(parts[0]))
+                    continue;
+
+                DateTime? updated = null;
+                if (DateTime.TryParse(parts[1], CultureInfo.InvariantCulture, DateTimeStyles.RoundtripKind, out DateTime parsed))
+                    updated = parsed;
+
+                manifest._entries[parts[0]] = new ExportManifestEntry(updated, parts[2]);
+            }
+            return manifest;
+        }
+
+        public void Save()
+        {
+            var lines = _entries
+                .OrderBy(e => e.Key, StringComparer.Ordinal)
+                .Select(e => $"{e.Key}\t{e.Value.Updated?.ToString("o", CultureInfo.InvariantCulture)}\t{e.Value.Hash}");
+            if (LastExportTime.HasValue)
+                lines = lines.Prepend($"{LastExportTimeKey}\t{LastExportTime.Value.ToString("o", CultureInfo.InvariantCulture)}");
+
+            var tempPath = _path + ".tmp";
+            File.WriteAllLines(tempPath, lines);
+            File.Move(tempPath, _path, true);
+        }
+
+        public bool IsUnchanged(string key, string contentHash)
+        {
+            return _entries.TryGetValue(key, out var entry) && entry.Hash == contentHash;
+        }
+
+        public void Update(string key, DateTime? updated, string contentHash)
+        {
+            _entries[key] = new ExportManifestEntry(updated, contentHash);
+        }
+
+        // Only called after every selected issue is exported, the start time is taken from Jira's own
+        // clock so it does not depend on the clock of the machine running the export
+        public void CompleteExport(DateTime exportStartTime)
+        {
+            LastExportTime = exportStartTime;
+        }
+
+        public static string GetContentHash(WiItem wiItem)
+        {
+            var serialized = JsonConvert.SerializeObject(wiItem, Formatting.None);
+            using (var sha256 = SHA256.Create())
+            {
+                return BitConverter.ToString(sha256.ComputeHash(Encoding.UTF8.GetBytes(serialized))).Replace("-", "");
+            }
+        }
+    }
+
+    public class ExportManifestEntry
+    {
+        public ExportManifestEntry(DateTime? updated, string hash)
+        {
+            Updated = updated;
+            Hash = hash;
+        }
+
+        public DateTime? Updated { get; private set; }
+        public string Hash { get; private set; }
+    }
+}
@@ -0,0 +1,177 @@
+﻿using Newtonsoft.Json;
+using Newtonsoft.Json.Linq;
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.IO;
+using System.Linq;
+using System.Threading;
+
+namespace JiraExport
+{
+    // Request latencies per Jira endpoint and time spent per export stage, written as a
+    // metrics report at the end of the export. Safe to use from parallel export workers.
+    public static class ExportMetrics
+    {
+        private static ConcurrentDictionary<string, MetricSeries> _requests = new ConcurrentDictionary<string, MetricSeries>();
+        private static ConcurrentDictionary<string, MetricSeries> _stages = new ConcurrentDictionary<string, MetricSeries>();
+        private static DateTime _started = DateTime.Now;
+
+        // The size of the responses to the current request, counted by the Jira REST client
+        private static readonly AsyncLocal<ResponseSize> _currentResponseSize = new AsyncLocal<ResponseSize>();
+
+        public class ResponseSize
+        {
+            private long _bytes;
+
+            public long Bytes { get { return Interlocked.Read(ref _bytes); } }
+
+            internal void Add(long bytes)
+            {
+                Interlocked.Add(ref _bytes, bytes);
+            }
+        }
+
+        public static void Reset()
+        {
+            _requests = new ConcurrentDictionary<string, MetricSeries>();
+            _stages = new ConcurrentDictionary<string, MetricSeries>();
+            _started = DateTime.Now;
+        }
+
+        public static void RecordRequest(string endpoint, TimeSpan elapsed, long bytes = 0, bool failed = false, bool throttled = false)
+        {
+            _requests.GetOrAdd(endpoint, _ => new MetricSeries()).Add(elapsed, bytes, failed, throttled);
+        }
+
+        // The responses received by the request started after this call, in the same async flow, are added to the result
+        public static ResponseSize CountResponseSize()
+        {
+            var responseSize = new ResponseSize();
+            _currentResponseSize.Value = responseSize;
+            return responseSize;
+        }
+
+        public static void AddResponseSize(long bytes)
+        {
+            _currentResponseSize.Value?.Add(bytes);
+        }
+
+        public static void RecordStage(string stage, TimeSpan elapsed)
+        {
+            _stages.GetOrAdd(stage, _ => new MetricSeries()).Add(elapsed, 0, false, false);
+        }
+
+        public static T MeasureStage<T>(string stage, Func<T> action)
+        {
+            var stopwatch = Stopwatch.StartNew();
+            try
+            {
+                return action();
+            }
+            finally
+            {
+                RecordStage(stage, stopwatch.Elapsed);
+            }
+        }
+
+        public static void MeasureStage(string stage, Action action)
+        {
+            MeasureStage(stage, () => { action(); return true; });
+        }
+
+        public static JObject GetReport(int exportedItemsCount, JiraRateLimiter rateLimiter = null)
+        {
+            var report = new JObject
+            {
+                { "started", _started },
+                { "elapsed-seconds", Math.Round((DateTime.Now - _started).TotalSeconds, 3) },
+                { "item-count", exportedItemsCount },
+                { "requests", ToJson(_requests, includeThrottled: true) },
+                { "stages", ToJson(_stages, includeThrottled: false) }
+            };
+            if (rateLimiter != null)
+            {
+                report.Add("rate-limiter", new JObject
+                {
+                    { "request-count", rateLimiter.RequestCount },
+                    { "throttled-count", rateLimiter.ThrottledCount },
+                    { "current-rate", double.IsPositiveInfinity(rateLimiter.CurrentRate) ? null : (JToken)Math.Round(rateLimiter.CurrentRate, 2) }
+                });
+            }
+            return report;
+        }
+
+        public static void Save(string path, int exportedItemsCount, JiraRateLimiter rateLimiter = null)
+        {
+            Directory.CreateDirectory(Path.GetDirectoryName(path));
+            File.WriteAllText(path, GetReport(exportedItemsCount, rateLimiter).ToString(Formatting.Indented));
+        }
+
+        private static JObject ToJson(ConcurrentDictionary<string, MetricSeries> series, bool includeThrottled)
+        {
+            var result = new JObject();
+            foreach (var entry in series.OrderBy(s => s.Key, StringComparer.Ordinal))
+            {
+                result.Add(entry.Key, entry.Value.ToJson(includeThrottled));
+            }
+            return result;
+        }
+
+        private class MetricSeries
+        {
+            private readonly List<double> _durations = new List<double>();
+            private long _bytes;
+            private int _failed;
+            private int _throttled;
+
+            public void Add(TimeSpan elapsed, long bytes, bool failed, bool throttled)
+            {
+                lock (_durations)
+                {
+                    _durations.Add(elapsed.TotalMilliseconds);
+                    _bytes += bytes;
+                    if (failed)
+                        _failed++;
+                    if (throttled)
+                        _throttled++;
+                }
+            }
+
+            public JObject ToJson(bool includeThrottled)
+            {
+                lock (_durations)
+                {
+                    var sorted = _durations.OrderBy(d => d).ToList();
+                    var json = new JObject
+                    {
+                        { "count", sorted.Count },
+                        { "failed", _failed },
+                        { "total-ms", Math.Round(sorted.Sum(), 1) },
+                        { "mean-ms", Math.Round(sorted.Count > 0 ? sorted.Average() : 0, 1) },
+                        { "p50-ms", Percentile(sorted, 50) },
+                        { "p95-ms", Percentile(sorted, 95) },
+                        { "p99-ms", Percentile(sorted, 99) },
+                        { "max-ms", Math.Round(sorted.LastOrDefault(), 1) }
+                    };
+                    if (includeThrottled)
+                        json.Add("throttled", _throttled);
+                    if (_bytes > 0)
+                        json.Add("bytes", _bytes);
+                    return json;
+                }
+            }
+
+            // Nearest-rank percentile
+            private static double Percentile(List<double> sorted, int percentile)
+            {
+                if (sorted.Count == 0)
+                    return 0;
+
+                var rank = (int)Math.Ceiling(percentile / 100d * sorted.Count);
+                return Math.Round(sorted[Math.Max(0, rank - 1)], 1);
+            }
+        }
+    }
+}
@@ -6,6 +6,7 @@ using Migration.WIContract;
 using System;
 using System.Collections.Generic;
 using System.Diagnostics;
+using System.Globalization;
 using System.IO;
 using System.Linq;
 using static JiraExport.JiraProvider;
@@ -41,16 +42,18 @@ namespace JiraExport
             CommandOption urlOption = commandLineApplication.Option("--url <accounturl>", "Url for the account", CommandOptionType.SingleValue);
             CommandOption configOption = commandLineApplication.Option("--config <configurationfilename>", "Export the work items based on this configuration file", CommandOptionType.SingleValue);
             CommandOption forceOption = commandLineApplication.Option("--force", "Forces execution from start (instead of continuing from previous run)", CommandOptionType.NoValue);
+            CommandOption incrementalOption = commandLineApplication.Option("--incremental", "Only export issues updated since the previous run", CommandOptionType.NoValue);
             CommandOption continueOnCriticalOption = commandLineApplication.Option("--continue", "Continue execution upon a critical error", CommandOptionType.SingleValue);
 
             commandLineApplication.OnExecute(() =>
             {
                 bool forceFresh = forceOption.HasValue();
+                bool incremental = incrementalOption.HasValue();
                 bool succeeded = true;
 
                 if (configOption.HasValue())
                 {
-                    succeeded = ExecuteMigration(userOption, passwordOption, tokenOption, urlOption, configOption, forceFresh, continueOnCriticalOption);
+                    succeeded = ExecuteMigration(userOption, passwordOption, tokenOption, urlOption, configOption, forceFresh, incremental, continueOnCriticalOption);
                 }
                 else
                 {
@@ -61,10 +64,13 @@ namespace JiraExport
             });
         }
 
-        private bool ExecuteMigration(CommandOption user, CommandOption password, CommandOption token, CommandOption url, CommandOption configFile, bool forceFresh, CommandOption continueOnCritical)
+        private bool ExecuteMigration(CommandOption user, CommandOption password, CommandOption token, CommandOption url, CommandOption configFile, bool forceFresh, bool incremental, CommandOption continueOnCritical)
         {
             var itemsCount = 0;
             var exportedItemsCount = 0;
+            var unchangedItemsCount = 0;
+            ExportManifest manifest = null;
+            JiraRateLimiter rateLimiter = null;
             var sw = new Stopwatch();
             bool succeeded = true;
             sw.Start();
@@ -77,6 +83,7 @@ namespace JiraExport
                 var config = configReaderJson.Deserialize();
 
                 InitSession(config, continueOnCritical.Value());
+                ExportMetrics.Reset();
 
                 // Migration session level settings
                 // where the logs and journal will be saved, logs aid debugging, journal is for recovery of interupted process
@@ -87,8 +94,16 @@ namespace JiraExport
                 var jiraSettings = new JiraSettings(user.Value(), password.Value(), token.Value(), url.Value(), config.SourceProject)
                 {
                     BatchSize = config.BatchSize,
+                    ExportParallelism = config.ExportParallelism,
+                    BatchedDownload = config.BatchedDownload,
+                    RateLimit = config.RateLimit,
+                    MaxThrottlingRetries = config.MaxThrottlingRetries,
                     UserMappingFile = config.UserMappingFile != null ? Path.Combine(migrationWorkspace, config.UserMappingFile) : string.Empty,
+                    UserCacheFile = Path.Combine(migrationWorkspace, UserEmailCache.FileName),
+                    UserCacheTtlHours = config.UserCacheTtlHours,
                     AttachmentsDir = Path.Combine(migrationWorkspace, config.AttachmentsFolder),
+                    AttachmentDownloadParallelism = config.AttachmentDownloadParallelism,
+                    DeduplicateAttachments = config.DeduplicateAttachments,
                     JQL = config.Query,
                     UsingJiraCloud = config.UsingJiraCloud,
                     IncludeDevelopmentLinks = config.IncludeDevelopmentLinks,
@@ -96,9 +111,18 @@ namespace JiraExport
                     JiraApiVersion = config.JiraApiVersion
                 };
 
+                manifest = ExportManifest.Load(migrationWorkspace);
+                var updatedSince = incremental && !forceFresh ? GetIncrementalStartTime(manifest) : null;
+                if (updatedSince.HasValue)
+                    jiraSettings.JQL = GetIncrementalQuery(jiraSettings.JQL, updatedSince.Value);
+
                 var jiraServiceWrapper = new JiraServiceWrapper(jiraSettings);
                 JiraProvider jiraProvider = new JiraProvider(jiraServiceWrapper);
                 jiraProvider.Initialize(jiraSettings, exportIssuesSummary);
+                rateLimiter = jiraProvider.RateLimiter;
+
+                // Taken before the query runs, issues updated during the export are selected again next time
+                var exportStartTime = jiraProvider.GetServerTime();
 
                 itemsCount = jiraProvider.GetItemCount(jiraSettings.JQL);
 
@@ -115,35 +139,54 @@ namespace JiraExport
                     Logger.Log(LogLevel.Warning, $"Sprint link field missing for config field '{config.SprintField}'.");
                 }
 
+                jiraProvider.PrefillUserCache();
+
                 var mapper = new JiraMapper(jiraProvider, config, exportIssuesSummary);
-                var localProvider = new WiItemProvider(migrationWorkspace);
-                var exportedKeys = new HashSet<string>(Directory.EnumerateFiles(migrationWorkspace, "*.json").Select(f => Path.GetFileNameWithoutExtension(f)));
-                var skips = forceFresh ? new HashSet<string>(Enumerable.Empty<string>()) : exportedKeys;
+                var localProvider = new WiItemProvider(migrationWorkspace, config.IndentItemFiles, config.CompressItemFiles, config.PackItemFiles);
+                var exportedKeys = new HashSet<string>(localProvider.EnumerateOriginIds());
+                // In incremental mode the query only selects updated issues, which must be exported again
+                var skips = forceFresh || updatedSince.HasValue ? new HashSet<string>(Enumerable.Empty<string>()) : exportedKeys;
 
+                var errorsBefore = Logger.Errors;
                 var issues = jiraProvider.EnumerateIssues(jiraSettings.JQL, skips, downloadOptions);
 
-                var createdWorkItems = new List<WiItem>();
+                // Items are written as soon as they are mapped, only the revisions with link changes
+                // are kept in memory for fixing up the revision dates afterwards
+                var revisionsWithLinkChanges = new List<WiRevision>();
 
                 foreach (var issue in issues)
                 {
                     if (issue == null)
                         continue;
 
-                    WiItem wiItem = mapper.Map(issue);
+                    WiItem wiItem = ExportMetrics.MeasureStage("map", () => mapper.Map(issue));
                     if (wiItem != null)
                     {
-                        createdWorkItems.Add(wiItem);
+                        var contentHash = ExportManifest.GetContentHash(wiItem);
+                        if (!forceFresh && manifest.IsUnchanged(wiItem.OriginId, contentHash) && exportedKeys.Contains(wiItem.OriginId))
+                        {
+                            unchangedItemsCount++;
+                            Logger.Log(LogLevel.Debug, $"Unchanged since the previous export, skipped writing.");
+                        }
+                        else
+                        {
+                            ExportMetrics.MeasureStage("save", () => localProvider.Save(wiItem));
+                            exportedItemsCount++;
+                            Logger.Log(LogLevel.Debug, $"Exported as type '{wiItem.Type}'.");
+                        }
+                        manifest.Update(wiItem.OriginId, issue.Updated, contentHash);
+
+                        revisionsWithLinkChanges.AddRange(GetRevisionsWithLinkChanges(wiItem));
                     }
                 }
 
-                FixRevisionDates(createdWorkItems);
+                ExportMetrics.MeasureStage("fix-revision-dates", () => FixRevisionDates(revisionsWithLinkChanges, localProvider));
 
-                foreach (var wiItem in createdWorkItems)
-                {
-                    localProvider.Save(wiItem);
-                    exportedItemsCount++;
-                    Logger.Log(LogLevel.Debug, $"Exported as type '{wiItem.Type}'.");
-                }
+                // Items saved again are appended to the pack, only their last version is kept
+                if (localProvider.IsPacked && localProvider.Pack.SupersededLength > 0)
+                    ExportMetrics.MeasureStage("compact", () => localProvider.Pack.Compact());
+
+                CompleteExport(manifest, exportStartTime, Logger.Errors - errorsBefore);
             }
             catch (CommandParsingException e)
             {
@@ -157,18 +200,141 @@ namespace JiraExport
             }
             finally
             {
+                // The entries of the exported items are kept after a failure too, only the last export time waits for a complete export
+                SaveManifest(manifest);
+                if (unchangedItemsCount > 0)
+                    Logger.Log(LogLevel.Info, $"Skipped {unchangedItemsCount} items unchanged since the previous export.");
+                LogRateLimiter(rateLimiter);
+                SaveMetrics(exportedItemsCount, rateLimiter);
                 EndSession(exportedItemsCount, sw, exportIssuesSummary);
             }
             return succeeded;
         }
 
-        private static void FixRevisionDates(List<WiItem> createdWorkItems)
+        private static DateTime? GetIncrementalStartTime(ExportManifest manifest)
+        {
+            var lastExportTime = manifest.LastExportTime;
+            if (!lastExportTime.HasValue)
+            {
+                Logger.Log(LogLevel.Warning, $"No previous complete export found in '{ExportManifest.FileName}', running a full export.");
+                return null;
+            }
+
+            // Jira evaluates the date in the time zone of the user profile, the margin covers
+            // any time zone difference and items that did not change are not rewritten anyway
+            var updatedSince = lastExportTime.Value.Subtract(IncrementalExportMargin);
+            Logger.Log(LogLevel.Info, $"Incremental export of issues updated since {updatedSince}.");
+            return updatedSince;
+        }
+
+        private static readonly TimeSpan IncrementalExportMargin = TimeSpan.FromDays(1);
+
+        internal static void CompleteExport(ExportManifest manifest, DateTime? exportStartTime, int errorsCount)
+        {
+            if (!exportStartTime.HasValue)
+            {
+                Logger.Log(LogLevel.Warning, $"The Jira server time is unknown, the next incremental export starts from the previous complete export.");
+                return;
+            }
+            if (errorsCount > 0)
+            {
+                Logger.Log(LogLevel.Warning, $"{errorsCount} errors occurred during the export, the next incremental export starts from the previous complete export.");
+                return;
+            }
+
+            manifest.CompleteExport(exportStartTime.Value);
+        }
+
+        internal static string GetIncrementalQuery(string jql, DateTime updatedSince)
+        {
+            var condition = $"updated >= \"{updatedSince.ToString("yyyy-MM-dd HH:mm", CultureInfo.InvariantCulture)}\"";
+
+            var orderByIndex = jql.LastIndexOf("ORDER BY", StringComparison.OrdinalIgnoreCase);
+            var filter = orderByIndex < 0 ? jql.Trim() : jql.Substring(0, orderByIndex).Trim();
+            var orderBy = orderByIndex < 0 ? "" : " " + jql.Substring(orderByIndex).Trim();
+
+            return string.IsNullOrEmpty(filter) ? $"{condition}{orderBy}" : $"({filter}) AND {condition}{orderBy}";
+        }
+
+        // The metrics are kept next to the log, in a separate folder since every json file in the
+        // workspace is taken for an exported item
+        internal static string GetMetricsFilePath(string logFilePath)
+        {
+            var logFileName = Path.GetFileNameWithoutExtension(logFilePath);
+            var metricsFileName = logFileName.Replace("-log-", "-metrics-") + ".json";
+            return Path.Combine(Path.GetDirectoryName(logFilePath), "metrics", metricsFileName);
+        }
+
+        private static void LogRateLimiter(JiraRateLimiter rateLimiter)
         {
-            var revisionsWithLinkChanges = new List<WiRevision>();
-            foreach (var wiItem in createdWorkItems)
+            if (rateLimiter == null || rateLimiter.ThrottledCount == 0)
+                return;
+
+            Logger.Log(LogLevel.Info, $"Jira throttled {rateLimiter.ThrottledCount} of {rateLimiter.RequestCount} requests, the final request rate was {rateLimiter.CurrentRate:F1} requests per second.");
+        }
+
+        private static void SaveMetrics(int exportedItemsCount, JiraRateLimiter rateLimiter)
+        {
+            if (string.IsNullOrEmpty(Logger.LogFilePath))
+                return;
+
+            try
+            {
+                var metricsFilePath = GetMetricsFilePath(Logger.LogFilePath);
+                ExportMetrics.Save(metricsFilePath, exportedItemsCount, rateLimiter);
+                Logger.Log(LogLevel.Info, $"Export metrics written to '{metricsFilePath}'.");
+            }
+            catch (Exception e)
+            {
+                Logger.Log(e, $"Failed to save the export metrics.", LogLevel.Warning);
+            }
+        }
+
+        private static void SaveManifest(ExportManifest manifest)
+        {
+            if (manifest == null)
+                return;
+
+            try
+            {
+                manifest.Save();
+            }
+            catch (Exception e)
             {
-                revisionsWithLinkChanges.AddRange(wiItem.Revisions.Where(r => r.Links != null && r.Links.Count != 0));
+                Logger.Log(e, $"Failed to save the export manifest.", LogLevel.Warning);
             }
+        }
+
+        internal static IEnumerable<WiRevision> GetRevisionsWithLinkChanges(WiItem wiItem)
+        {
+            return wiItem.Revisions
+                .Where(r => r.Links != null && r.Links.Count != 0)
+                .Select(r => new WiRevision() { ParentOriginId = wiItem.OriginId, Index = r.Index, Time = r.Time, Links = r.Links })
+                .ToList();
+        }
+
+        internal static void FixRevisionDates(List<WiRevision> revisionsWithLinkChanges, WiItemProvider localProvider)
+        {
+            var originalTimes = revisionsWithLinkChanges.ToDictionary(r => r, r => r.Time);
+
+            FixRevisionDates(revisionsWithLinkChanges);
+
+            foreach (var changedRevisions in revisionsWithLinkChanges.Where(r => r.Time != originalTimes[r]).GroupBy(r => r.ParentOriginId))
+            {
+                var wiItem = localProvider.Load(changedRevisions.Key);
+                foreach (var changedRevision in changedRevisions)
+                {
+                    var revision = wiItem.Revisions.Find(r => r.Index == changedRevision.Index);
+                    if (revision != null)
+                        revision.Time = changedRevision.Time;
+                }
+                localProvider.Save(wiItem);
+                Logger.Log(LogLevel.Debug, $"Fixed revision dates for '{wiItem.OriginId}'.");
+            }
+        }
+
+        private static void FixRevisionDates(List<WiRevision> revisionsWithLinkChanges)
+        {
             bool anyRevisionTimeUpdated = true;
             while (anyRevisionTimeUpdated)
             {
@@ -5,7 +5,6 @@ using Newtonsoft.Json.Linq;
 using System;
 using System.Collections.Generic;
 using System.Linq;
-using System.Text.RegularExpressions;
 
 namespace JiraExport
 {
@@ -15,14 +14,14 @@ namespace JiraExport
 
         public static JiraItem CreateFromRest(string issueKey, IJiraProvider jiraProvider)
         {
-            var remoteIssue = jiraProvider.DownloadIssue(issueKey);
+            var remoteIssue = ExportMetrics.MeasureStage("download", () => jiraProvider.DownloadIssue(issueKey));
             if (remoteIssue == null)
                 return default(JiraItem);
 
             Logger.Log(LogLevel.Debug, $"Downloaded item.");
 
             var jiraItem = new JiraItem(jiraProvider, remoteIssue);
-            var revisions = BuildRevisions(jiraItem, jiraProvider);
+            var revisions = ExportMetrics.MeasureStage("build-revisions", () => BuildRevisions(jiraItem, jiraProvider));
             jiraItem.Revisions = revisions;
             Logger.Log(LogLevel.Debug, $"Created {revisions.Count} history revisions.");
 
@@ -46,14 +45,14 @@ namespace JiraExport
             if (createdOn == DateTime.MinValue)
                 Logger.Log(LogLevel.Debug, "created key was not found, using DateTime default value");
 
-            var changelog = jiraProvider.DownloadChangelog(issueKey).OrderByDescending(c => (long)c.SelectToken("$.id")).ToList();
+            var changelog = GetChangelog(jiraItem, jiraProvider).OrderByDescending(c => (long)c.SelectToken("$.id")).ToList();
             Logger.Log(LogLevel.Debug, $"Downloaded issue: {issueKey} changelog.");
 
             Stack<JiraRevision> revisions = new Stack<JiraRevision>();
 
             foreach (var change in changelog)
             {
-                DateTime created = change.ExValue<DateTime>("$.created");
+                DateTime created = change.ExPropertyValue<DateTime>("created");
                 string author = GetAuthor(change);
 
                 List<RevisionAction<JiraLink>> linkChanges = new List<RevisionAction<JiraLink>>();
@@ -218,8 +217,30 @@ namespace JiraExport
             }
         }
 
+        // Batched downloads embed the changelog in the issue, it is only downloaded separately when Jira truncated it
+        private static IEnumerable<JObject> GetChangelog(JiraItem jiraItem, IJiraProvider jiraProvider)
+        {
+            var changelog = jiraItem.RemoteIssue.SelectToken("$.changelog");
+            if (IsCompletePage(changelog, "histories"))
+                return changelog.SelectTokens("$.histories[*]").Cast<JObject>();
+
+            return jiraProvider.DownloadChangelog(jiraItem.Key);
+        }
+
+        private static bool IsCompletePage(JToken page, string valuesProperty)
+        {
+            if (!(page is JObject) || !(page[valuesProperty] is JArray values))
+                return false;
+
+            var total = page.ExValue<int?>("$.total");
+            return total == null || total <= values.Count;
+        }
+
         private static List<JiraRevision> BuildCommentRevisions(JiraItem jiraItem, IJiraProvider jiraProvider)
         {
+            if (jiraProvider.GetSettings().BatchedDownload && TryBuildEmbeddedCommentRevisions(jiraItem, out List<JiraRevision> commentRevisions))
+                return commentRevisions;
+
             var comments = jiraProvider.GetCommentsByItemKey(jiraItem.Key);
             return comments.Select((c, i) =>
             {
@@ -227,30 +248,64 @@ namespace JiraExport
             }).ToList();
         }
 
+        // Comments embedded in a batched issue can only be used when they are complete and in plain text,
+        // API v3 returns them as Atlassian Document Format.
+        private static bool TryBuildEmbeddedCommentRevisions(JiraItem jiraItem, out List<JiraRevision> commentRevisions)
+        {
+            commentRevisions = null;
+
+            var commentPage = jiraItem.RemoteIssue.SelectToken("$.fields.comment");
+            if (!IsCompletePage(commentPage, "comments"))
+                return false;
+
+            var comments = commentPage.SelectTokens("$.comments[*]").ToList();
+            if (comments.Any(c => c["body"]?.Type != JTokenType.String))
+                return false;
+
+            var renderedBodies = jiraItem.RemoteIssue.SelectTokens("$.renderedFields.comment.comments[*]")
+                .Where(c => c["id"] != null)
+                .ToDictionary(c => c.ExValue<string>("$.id"), c => c.ExValue<string>("$.body"));
+
+            commentRevisions = comments.Select(c =>
+            {
+                var author = c["author"];
+                renderedBodies.TryGetValue(c.ExValue<string>("$.id") ?? string.Empty, out string renderedBody);
+                return BuildCommentRevision(
+                    author == null, author?.ExValue<string>("$.name"), author?.ExValue<string>("$.accountId"),
+                    c.ExValue<DateTime>("$.created"), c.ExValue<string>("$.body"), renderedBody, jiraItem);
+            }).ToList();
+            return true;
+        }
+
         private static JiraRevision BuildCommentRevision(Comment c, string rc, JiraItem jiraItem)
+        {
+            return BuildCommentRevision(c.AuthorUser is null, c.AuthorUser?.Username, c.AuthorUser?.AccountId, c.CreatedDate.Value, c.Body, rc, jiraItem);
+        }
+
+        private static JiraRevision BuildCommentRevision(bool authorMissing, string username, string accountId, DateTime created, string body, string rc, JiraItem jiraItem)
         {
             var author = "NoAuthorDefined";
-            if (c.AuthorUser is null)
+            if (authorMissing)
             {
                 Logger.Log(LogLevel.Warning, $"c.AuthorUser is null in comment revision for jiraItem.Key: '{jiraItem.Key}'. Using NoAuthorDefined as author. ");
             }
             else
             {
-                if (c.AuthorUser.Username is null)
+                if (username is null)
                 {
-                    author = GetAuthorIdentityOrDefault(c.AuthorUser.AccountId);
+                    author = GetAuthorIdentityOrDefault(accountId);
                 }
                 else
                 {
-                    author = c.AuthorUser.Username;
+                    author = username;
                 }
             }
 
             return new JiraRevision(jiraItem)
             {
                 Author = author,
-                Time = c.CreatedDate.Value,
-                Fields = new Dictionary<string, object>() { { "comment", c.Body }, { "comment$Rendered", rc } },
+                Time = created,
+                Fields = new Dictionary<string, object>() { { "comment", body }, { "comment$Rendered", rc } },
                 AttachmentActions = new List<RevisionAction<JiraAttachment>>(),
                 LinkActions = new List<RevisionAction<JiraLink>>()
             };
@@ -441,37 +496,34 @@ namespace JiraExport
             }).ToList();
         }
 
-        private static Dictionary<string, Func<JToken, object>> _fieldExtractionMapping = null;
+        private static readonly Func<JToken, object> _extractName = t => t.ExPropertyValue<string>("name");
+        private static readonly Func<JToken, object> _extractAccountIdOrUsername = t => t.ExPropertyValue<string>("name") ?? t.ExPropertyValue<string>("accountId");
+
+        // Built once, items are created concurrently when exporting in parallel
+        private static readonly Dictionary<string, Func<JToken, object>> _fieldExtractionMapping = new Dictionary<string, Func<JToken, object>>()
+            {
+                { "priority", _extractName },
+                { "labels", t => t.Values<string>().Any() ? string.Join(" ", t.Values<string>()) : null },
+                { "assignee", _extractAccountIdOrUsername },
+                { "creator", _extractAccountIdOrUsername },
+                { "reporter", _extractAccountIdOrUsername},
+                { "status", _extractName },
+                { "parent", t => t.ExPropertyValue<string>("key") },
+                { "issuetype", _extractName },
+                { "resolution", _extractName }
+            };
+
         private static Dictionary<string, object> ExtractFields(string key, JObject remoteIssue, IJiraProvider jira)
         {
             var fields = new Dictionary<string, object>();
 
-            var remoteFields = (JObject)remoteIssue.SelectToken("$.fields");
-            var renderedFields = (JObject)remoteIssue.SelectToken("$.renderedFields");
-
-            var extractName = new Func<JToken, object>((t) => t.ExValue<string>("$.name"));
-            var extractAccountIdOrUsername = new Func<JToken, object>((t) => t.ExValue<string>("$.name") ?? t.ExValue<string>("$.accountId"));
-
-            if (_fieldExtractionMapping == null)
-            {
-                _fieldExtractionMapping = new Dictionary<string, Func<JToken, object>>()
-                    {
-                        { "priority", extractName },
-                        { "labels", t => t.Values<string>().Any() ? string.Join(" ", t.Values<string>()) : null },
-                        { "assignee", extractAccountIdOrUsername },
-                        { "creator", extractAccountIdOrUsername },
-                        { "reporter", extractAccountIdOrUsername},
-                        { "status", extractName },
-                        { "parent", t => t.ExValue<string>("$.key") },
-                        { "issuetype", extractName },
-                        { "resolution", extractName }
-                    };
-            }
+            var remoteFields = (JObject)remoteIssue["fields"];
+            var renderedFields = (JObject)remoteIssue["renderedFields"];
 
             foreach (var prop in remoteFields.Properties())
             {
                 var type = prop.Value.Type;
-                var name = prop.Name.ToLower();
+                var name = prop.Name.ToLowerInvariant();
                 object value = null;
 
                 if (_fieldExtractionMapping.TryGetValue(name, out Func<JToken, object> mapping))
@@ -487,7 +539,7 @@ namespace JiraExport
                     && prop.Value["emailAddress"] != null && prop.Value["avatarUrls"] != null
                     && prop.Value["displayName"] != null)
                 {
-                    value = extractAccountIdOrUsername(prop.Value);
+                    value = _extractAccountIdOrUsername(prop.Value);
                 }
                 // User picker, on-prem
                 else if (type == JTokenType.Object && prop.Value["key"] != null
@@ -502,10 +554,10 @@ namespace JiraExport
                 }
                 else if (type == JTokenType.Array && prop.Value.Any())
                 {
-                    value = string.Join(";", prop.Value.Select(st => st.ExValue<string>("$.name")).ToList());
-                    if (Regex.Match((string)value, "^[;]+$", RegexOptions.None, TimeSpan.FromMilliseconds(100)).Success || (string)value == "")
+                    value = string.Join(";", prop.Value.Select(st => st.ExPropertyValue<string>("name")));
+                    if (((string)value).All(c => c == ';'))
                     {
-                        value = string.Join(";", prop.Value.Select(st => st.ExValue<string>("$.value")).ToList());
+                        value = string.Join(";", prop.Value.Select(st => st.ExPropertyValue<string>("value")));
                     }
                     if(value.ToString().All(c => c == ';'))
                     {
@@ -553,7 +605,7 @@ namespace JiraExport
         }
         private static string GetAuthor(JObject change)
         {
-            var author = change.ExValue<string>("$.author.name") ?? change.ExValue<string>("$.author.accountId");
+            var author = change.ExPropertyValue<string>("author", "name") ?? change.ExPropertyValue<string>("author", "accountId");
             return GetAuthorIdentityOrDefault(author);
 
         }
@@ -584,21 +636,32 @@ namespace JiraExport
 
         private readonly IJiraProvider _provider;
 
-        public string Key { get { return RemoteIssue.ExValue<string>("$.key"); } }
-        public string Type { get { return RemoteIssue.ExValue<string>("$.fields.issuetype.name")?.Trim(); } }
-        public string Id { get { return RemoteIssue.ExValue<string>("$.id"); } }
+        // The epic link field is resolved after the provider is initialized, so it is cached per field
+        private string _epicLinkField;
+        private string _epicParent;
+
+        public string Key { get; private set; }
+        public string Type { get; private set; }
+        public string Id { get; private set; }
+        public DateTime? Updated { get; private set; }
         public string EpicParent
         {
             get
             {
-                if (!string.IsNullOrEmpty(_provider.GetSettings().EpicLinkField))
-                    return RemoteIssue.ExValue<string>($"$.fields.{_provider.GetSettings().EpicLinkField}");
-                else
+                var epicLinkField = _provider.GetSettings().EpicLinkField;
+                if (string.IsNullOrEmpty(epicLinkField))
                     return null;
+
+                if (epicLinkField != _epicLinkField)
+                {
+                    _epicParent = RemoteIssue.ExPropertyValue<string>("fields", epicLinkField);
+                    _epicLinkField = epicLinkField;
+                }
+                return _epicParent;
             }
         }
-        public string Parent { get { return RemoteIssue.ExValue<string>("$.fields.parent.key"); } }
-        public List<string> SubItems { get { return GetSubTasksKey(); } }
+        public string Parent { get; private set; }
+        public List<string> SubItems { get; private set; }
 
         public JObject RemoteIssue { get; private set; }
         public List<JiraRevision> Revisions { get; set; }
@@ -606,6 +669,14 @@ namespace JiraExport
         {
             this._provider = provider;
             RemoteIssue = remoteIssue;
+
+            // Read the values used for every item once, instead of evaluating a JSONPath on each access
+            Key = remoteIssue.ExPropertyValue<string>("key");
+            Type = remoteIssue.ExPropertyValue<string>("fields", "issuetype", "name")?.Trim();
+            Id = remoteIssue.ExPropertyValue<string>("id");
+            Updated = remoteIssue.ExPropertyValue<DateTime?>("fields", "updated");
+            Parent = remoteIssue.ExPropertyValue<string>("fields", "parent", "key");
+            SubItems = GetSubTasksKey();
         }
         internal string GetUserEmail(string author)
         {
@@ -613,7 +684,8 @@ namespace JiraExport
         }
         internal List<string> GetSubTasksKey()
         {
-            return RemoteIssue.SelectTokens("$.fields.subtasks.[*]", false).Select(st => st.ExValue<string>("$.key")).ToList();
+            var subtasks = RemoteIssue.ExProperty("fields", "subtasks") as JArray;
+            return subtasks == null ? new List<string>() : subtasks.Select(st => st.ExPropertyValue<string>("key")).ToList();
         }
     }
 }
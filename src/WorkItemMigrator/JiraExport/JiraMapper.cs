@@ -18,6 +18,7 @@ namespace JiraExport
         private readonly Dictionary<string, FieldMapping<JiraRevision>> _fieldMappingsPerType;
         private readonly HashSet<string> _targetTypes;
         private readonly ConfigJson _config;
+        private readonly MappingPlan _mappingPlan;
         private readonly ExportIssuesSummary exportIssuesSummary;
 
         public JiraMapper(IJiraProvider jiraProvider, ConfigJson config, ExportIssuesSummary exportIssuesSummary)
@@ -25,6 +26,7 @@ namespace JiraExport
         {
             _jiraProvider = jiraProvider;
             _config = config;
+            _mappingPlan = new MappingPlan(config);
             _targetTypes = InitializeTypeMappings();
             _fieldMappingsPerType = InitializeFieldMappings(exportIssuesSummary);
             this.exportIssuesSummary = exportIssuesSummary;
@@ -41,7 +43,7 @@ namespace JiraExport
 
             if (_config.TypeMap.Types != null)
             {
-                var type = (from t in _config.TypeMap.Types where t.Source == issue.Type select t.Target).FirstOrDefault();
+                var type = _mappingPlan.GetTargetType(issue.Type);
 
                 if (type != null)
                 {
@@ -86,7 +88,7 @@ namespace JiraExport
 
                     if (item.Mapping?.Values != null)
                     {
-                        value = r => FieldMapperUtils.MapValue(r, item.Source, item.Target, _config, exportIssuesSummary);
+                        value = r => _mappingPlan.MapValue(r, item.Source, item.Target, exportIssuesSummary);
                     }
                     else if (!string.IsNullOrWhiteSpace(item.Mapper))
                     {
@@ -114,7 +116,8 @@ namespace JiraExport
                                 value = IfChanged<string>(item.Source, isCustomField, FieldMapperUtils.MapRemainingWork);
                                 break;
                             case "MapRendered":
-                                value = r => FieldMapperUtils.MapRenderedValue(r, item.Source, isCustomField, _jiraProvider.GetCustomId(item.Source), _config);
+                                var customFieldName = _jiraProvider.GetCustomId(item.Source);
+                                value = r => _mappingPlan.MapRenderedValue(r, item.Source, isCustomField, customFieldName);
                                 break;
                             case "MapLexoRank":
                                 value = IfChanged<string>(item.Source, isCustomField, FieldMapperUtils.MapLexoRank);
@@ -241,7 +244,7 @@ namespace JiraExport
 
                 if (_config.LinkMap.Links != null)
                 {
-                    var linkType = (from t in _config.LinkMap.Links where t.Source == jiraLinkAction.Value.LinkType select t.Target).FirstOrDefault();
+                    var linkType = _mappingPlan.GetLinkType(jiraLinkAction.Value.LinkType);
 
                     if (linkType != null)
                     {
@@ -310,7 +313,7 @@ namespace JiraExport
 
             if (_config.TypeMap.Types != null)
             {
-                var type = (from t in _config.TypeMap.Types where t.Source == r.Type select t.Target).FirstOrDefault();
+                var type = _mappingPlan.GetTargetType(r.Type);
 
                 if (type != null && _fieldMappingsPerType.TryGetValue(type, out var mapping))
                 {
@@ -392,10 +395,11 @@ namespace JiraExport
             {
                 sourceField = _jiraProvider.GetCustomId(sourceField) ?? sourceField;
             }
+            var fieldKey = sourceField.ToLower();
 
             return (r) =>
             {
-                if (r.Fields.TryGetValue(sourceField.ToLower(), out object value))
+                if (r.Fields.TryGetValue(fieldKey, out object value))
                 {
                     if (mapperFunc != null)
                     {
@@ -419,10 +423,11 @@ namespace JiraExport
             {
                 sourceField = _jiraProvider.GetCustomId(sourceField) ?? sourceField;
             }
+            var fieldKey = sourceField.ToLower();
 
             return (r) =>
             {
-                if (r.Fields.TryGetValue(sourceField.ToLower(), out object value))
+                if (r.Fields.TryGetValue(fieldKey, out object value))
                 {
                     if (mapperFunc != null)
                     {
@@ -464,18 +469,18 @@ namespace JiraExport
             return list;
         }
 
+        private static readonly Dictionary<string, int> FieldLimits = new Dictionary<string, int>()
+        {
+            { WiFieldReference.Title, 255 },
+            { WiFieldReference.Description, 1048576 }
+        };
+
         internal object TruncateField(object value, string field)
         {
             if (value == null) return value;
             string valueStr = value.ToString();
-            var fieldLimits = new Dictionary<string, int>()
-            {
-                { WiFieldReference.Title, 255 },
-                { WiFieldReference.Description, 1048576 }
-            };
-            if (fieldLimits.ContainsKey(field))
+            if (FieldLimits.TryGetValue(field, out int limit))
             {
-                int limit = fieldLimits[field];
                 if (valueStr.Length > limit)
                 {
                     string truncated = valueStr.Substring(0, limit - 3) + "...";
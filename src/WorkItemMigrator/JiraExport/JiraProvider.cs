@@ -4,9 +4,14 @@ using Migration.Common.Log;
 using Newtonsoft.Json.Linq;
 using RestSharp;
 using System;
+using System.Collections.Concurrent;
 using System.Collections.Generic;
+using System.Diagnostics;
 using System.IO;
 using System.Linq;
+using System.Net;
+using System.Security.Cryptography;
+using System.Threading;
 using System.Threading.Tasks;
 
 namespace JiraExport
@@ -30,14 +35,28 @@ namespace JiraExport
 
         readonly Dictionary<string, string> _userEmailCache = new Dictionary<string, string>();
 
+        private UserEmailCache _persistentUserCache;
+
         private readonly IJiraServiceWrapper _jiraServiceWrapper;
 
+        private SemaphoreSlim _exportThrottler;
+
+        private SemaphoreSlim _attachmentThrottler;
+
+        private AttachmentContentStore _attachmentStore;
+
+        private JiraRateLimiter _rateLimiter = new JiraRateLimiter(0);
+
+        private readonly ConcurrentDictionary<string, JObject> _batchedIssues = new ConcurrentDictionary<string, JObject>();
+
         public JiraSettings Settings { get; private set; }
 
         public ExportIssuesSummary exportIssuesSummary { get; private set; }
 
         public IEnumerable<IssueLinkType> LinkTypes { get; private set; }
 
+        public JiraRateLimiter RateLimiter { get { return _rateLimiter; } }
+
         public JiraProvider(IJiraServiceWrapper jiraServiceWrapper)
         {
             _jiraServiceWrapper = jiraServiceWrapper;
@@ -46,6 +65,29 @@ namespace JiraExport
         public void Initialize(JiraSettings settings, ExportIssuesSummary exportIssuesSummary)
         {
             Settings = settings;
+            this.exportIssuesSummary = exportIssuesSummary;
+
+            _exportThrottler = new SemaphoreSlim(Math.Max(1, Settings.ExportParallelism));
+            if (Settings.ExportParallelism > 1)
+            {
+                // Export workers block on the Jira REST client, make sure the thread pool does not starve them
+                ThreadPool.GetMinThreads(out int workerThreads, out int completionPortThreads);
+                ThreadPool.SetMinThreads(Math.Max(workerThreads, Settings.ExportParallelism * 2), completionPortThreads);
+            }
+
+            _attachmentThrottler = new SemaphoreSlim(Math.Max(1, Settings.AttachmentDownloadParallelism));
+            _rateLimiter = new JiraRateLimiter(Settings.RateLimit);
+            if (_jiraServiceWrapper.RestClient is JiraThrottlingRestClient throttlingRestClient)
+                throttlingRestClient.RateLimiter = _rateLimiter;
+            if (Settings.DeduplicateAttachments)
+            {
+                _attachmentStore = new AttachmentContentStore(Settings.AttachmentsDir);
+            }
+
+            if (Settings.UserCacheTtlHours > 0 && !string.IsNullOrEmpty(Settings.UserCacheFile))
+            {
+                _persistentUserCache = new UserEmailCache(Settings.UserCacheFile, TimeSpan.FromHours(Settings.UserCacheTtlHours));
+            }
 
             if (Settings.JiraApiVersion != 2 && Settings.JiraApiVersion != 3)
             {
@@ -55,7 +97,7 @@ namespace JiraExport
             Logger.Log(LogLevel.Info, "Retrieving Jira fields...");
             try
             {
-                _jiraServiceWrapper.Fields.GetCustomFieldsAsync().Wait();
+                ExecuteThrottledAsync("field/custom", async () => { await _jiraServiceWrapper.Fields.GetCustomFieldsAsync(); return true; }).Wait();
             }
             catch (AggregateException e)
             {
@@ -69,7 +111,7 @@ namespace JiraExport
             Logger.Log(LogLevel.Info, "Retrieving Jira link types...");
             try
             {
-                LinkTypes = _jiraServiceWrapper.Links.GetLinkTypesAsync().Result;
+                LinkTypes = ExecuteThrottledAsync("issueLinkType", () => _jiraServiceWrapper.Links.GetLinkTypesAsync()).Result;
             }
 
             catch (Exception e)
@@ -113,7 +155,7 @@ namespace JiraExport
         {
             var options = new CommentQueryOptions();
             options.Expand.Add("renderedBody");
-            return _jiraServiceWrapper.Issues.GetCommentsAsync(itemKey, options).Result;
+            return ExecuteThrottledAsync("issue/comment", () => _jiraServiceWrapper.Issues.GetCommentsAsync(itemKey, options)).Result;
         }
 
         public CustomField GetCustomField(string fieldName)
@@ -129,9 +171,14 @@ namespace JiraExport
             return found;
         }
 
-        private JiraItem ProcessItem(string issueKey, HashSet<string> skipList)
+        private JiraItem ProcessItem(string issueKey, HashSet<string> skipList, Dictionary<string, Task<JiraItem>> prefetchedItems = null)
         {
-            var issue = JiraItem.CreateFromRest(issueKey, this);
+            JiraItem issue;
+            if (prefetchedItems != null && prefetchedItems.TryGetValue(issueKey, out Task<JiraItem> prefetchedItem))
+                issue = prefetchedItem.GetAwaiter().GetResult();
+            else
+                issue = JiraItem.CreateFromRest(issueKey, this);
+
             if (issue == null)
                 return default(JiraItem);
 
@@ -139,13 +186,95 @@ namespace JiraExport
             return issue;
         }
 
+        // Start downloading the issues in the background, bounded by ExportParallelism. The caller still
+        // consumes them in its own order, items that are skipped by then are discarded. Issues that are
+        // already in the given prefetched items, e.g. sub-items on the same search page, are not downloaded again.
+        private Dictionary<string, Task<JiraItem>> PrefetchItems(IEnumerable<string> issueKeys, HashSet<string> skipList, Dictionary<string, Task<JiraItem>> prefetchedItems = null)
+        {
+            prefetchedItems = prefetchedItems ?? new Dictionary<string, Task<JiraItem>>();
+            if (Settings.ExportParallelism <= 1 || issueKeys == null)
+                return prefetchedItems;
+
+            foreach (var issueKey in issueKeys)
+            {
+                if (skipList.Contains(issueKey) || prefetchedItems.ContainsKey(issueKey))
+                    continue;
+
+                prefetchedItems.Add(issueKey, Task.Run(async () =>
+                {
+                    await _exportThrottler.WaitAsync();
+                    try
+                    {
+                        return JiraItem.CreateFromRest(issueKey, this);
+                    }
+                    finally
+                    {
+                        _exportThrottler.Release();
+                    }
+                }));
+            }
+
+            return prefetchedItems;
+        }
+
+        private Task<JToken> ExecuteRequestAsync(string endpoint, Method method, string resource, object requestBody = null)
+        {
+            return ExecuteThrottledAsync(endpoint, () => _jiraServiceWrapper.RestClient.ExecuteRequestAsync(method, resource, requestBody));
+        }
+
+        // All Jira requests pass the shared rate limiter, throttled requests are retried after a backoff
+        private async Task<T> ExecuteThrottledAsync<T>(string endpoint, Func<Task<T>> request)
+        {
+            for (int attempt = 1; ; attempt++)
+            {
+                await _rateLimiter.WaitAsync();
+                var responseSize = ExportMetrics.CountResponseSize();
+                var stopwatch = Stopwatch.StartNew();
+                try
+                {
+                    var response = await request();
+                    _rateLimiter.OnSuccess();
+                    ExportMetrics.RecordRequest(endpoint, stopwatch.Elapsed, responseSize.Bytes);
+                    return response;
+                }
+                catch (Exception e) when (attempt <= Settings.MaxThrottlingRetries && JiraRateLimiter.IsThrottlingException(e))
+                {
+                    ExportMetrics.RecordRequest(endpoint, stopwatch.Elapsed, throttled: true);
+                    LogThrottled(endpoint, _rateLimiter.OnThrottled(attempt, GetRetryAfter(e)));
+                }
+                catch
+                {
+                    ExportMetrics.RecordRequest(endpoint, stopwatch.Elapsed, failed: true);
+                    throw;
+                }
+            }
+        }
+
+        private static TimeSpan? GetRetryAfter(Exception exception)
+        {
+            for (var e = exception; e != null; e = e.InnerException)
+            {
+                if (e is JiraThrottledException throttled)
+                    return throttled.RetryAfter;
+                if (e is AggregateException aggregate)
+                    return aggregate.InnerExceptions.Select(GetRetryAfter).FirstOrDefault(r => r != null);
+            }
+            return null;
+        }
+
+        private void LogThrottled(string endpoint, TimeSpan delay)
+        {
+            Logger.Log(LogLevel.Warning, "Jira is throttling requests, the export slows down to the rate Jira allows.");
+            Logger.Log(LogLevel.Debug, $"Request to '{endpoint}' was throttled, retrying in {delay.TotalSeconds:F1} seconds at {_rateLimiter.CurrentRate:F1} requests per second.");
+        }
+
         private async Task<JiraAttachment> GetAttachmentInfo(string id)
         {
             Logger.Log(LogLevel.Debug, $"Downloading attachment info for attachment '{id}'.");
 
             try
             {
-                var response = await _jiraServiceWrapper.RestClient.ExecuteRequestAsync(Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/attachment/{id}");
+                var response = await ExecuteRequestAsync("attachment", Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/attachment/{id}");
                 var attObj = (JObject)response;
 
                 return new JiraAttachment
@@ -176,9 +305,7 @@ namespace JiraExport
                         var path = Path.Combine(Settings.AttachmentsDir, att.Id, att.Filename);
                         EnsurePath(path);
 
-                        await DownloadWithJiraRestClientAsync(att.Url, path);
-
-                        att.LocalPath = path;
+                        att.LocalPath = await DownloadWithJiraRestClientAsync(att.Url, path);
                         Logger.Log(LogLevel.Debug, $"Downloaded attachment '{att}'");
                     }
                     catch (Exception ex)
@@ -191,24 +318,93 @@ namespace JiraExport
             return att;
         }
 
-        private async Task DownloadWithJiraRestClientAsync(string url, string fileFullPath)
+        private async Task<JiraAttachment> DownloadAttachmentThrottledAsync(JiraAttachment att)
+        {
+            await _attachmentThrottler.WaitAsync();
+            try
+            {
+                return await DownloadAttachmentAsync(att);
+            }
+            finally
+            {
+                _attachmentThrottler.Release();
+            }
+        }
+
+        // Streams the attachment to disk and returns the local path, which is the path of an
+        // identical file that was downloaded earlier if attachment deduplication is enabled.
+        private async Task<string> DownloadWithJiraRestClientAsync(string url, string fileFullPath)
         {
-            var attachmentData = _jiraServiceWrapper.RestClient.DownloadData(url);
+            var downloadPath = fileFullPath + ".download";
+            string contentHash = null;
+            long downloadedBytes = 0;
+            var statusCode = default(HttpStatusCode);
 
-            using (var stream = new MemoryStream(attachmentData))
+            var request = new RestRequest(url, Method.GET);
+            request.AdvancedResponseWriter = (responseStream, httpResponse) =>
             {
-                using (var file = File.Create(fileFullPath))
+                statusCode = httpResponse.StatusCode;
+                if (statusCode != HttpStatusCode.OK)
+                    return;
+
+                using (var hash = IncrementalHash.CreateHash(HashAlgorithmName.SHA256))
+                using (var file = File.Create(downloadPath))
                 {
-                    try
+                    var buffer = new byte[81920];
+                    int read;
+                    while ((read = responseStream.Read(buffer, 0, buffer.Length)) > 0)
                     {
-                        await stream.CopyToAsync(file);
+                        file.Write(buffer, 0, read);
+                        hash.AppendData(buffer, 0, read);
+                        downloadedBytes += read;
                     }
-                    catch (Exception e)
+                    contentHash = BitConverter.ToString(hash.GetHashAndReset()).Replace("-", "");
+                }
+            };
+
+            try
+            {
+                IRestResponse response;
+                for (int attempt = 1; ; attempt++)
+                {
+                    await _rateLimiter.WaitAsync();
+                    var stopwatch = Stopwatch.StartNew();
+                    response = await _jiraServiceWrapper.RestClient.RestSharpClient.ExecuteAsync(request);
+
+                    var headers = (response.Headers ?? new List<Parameter>()).Select(h => new KeyValuePair<string, string>(h.Name, h.Value?.ToString()));
+                    _rateLimiter.OnResponseHeaders(headers);
+
+                    var throttled = JiraRateLimiter.IsThrottlingStatus(statusCode);
+                    if (!throttled || attempt > Settings.MaxThrottlingRetries)
                     {
-                        Logger.Log(e, $"Error while writing attachment to file: {fileFullPath}. Releasing file lock anyway.");
+                        if (statusCode == HttpStatusCode.OK)
+                            _rateLimiter.OnSuccess();
+                        ExportMetrics.RecordRequest("attachment/content", stopwatch.Elapsed, downloadedBytes, statusCode != HttpStatusCode.OK);
+                        break;
                     }
-                    file.Close();
+
+                    ExportMetrics.RecordRequest("attachment/content", stopwatch.Elapsed, throttled: true);
+                    LogThrottled("attachment/content", _rateLimiter.OnThrottled(attempt, JiraRateLimiter.GetRetryAfter(headers)));
+                }
+                if (response.ErrorException != null)
+                    throw response.ErrorException;
+                if (statusCode != HttpStatusCode.OK || contentHash == null)
+                    throw new InvalidOperationException($"Unexpected response status '{statusCode}' for '{url}'.");
+
+                if (_attachmentStore != null && _attachmentStore.TryGetExisting(contentHash, Path.GetFileName(fileFullPath), out string existingPath))
+                {
+                    Logger.Log(LogLevel.Debug, $"Attachment '{fileFullPath}' is identical to '{existingPath}', reusing it.");
+                    return existingPath;
                 }
+
+                File.Move(downloadPath, fileFullPath, true);
+                _attachmentStore?.Add(contentHash, fileFullPath);
+                return fileFullPath;
+            }
+            finally
+            {
+                if (File.Exists(downloadPath))
+                    File.Delete(downloadPath);
             }
         }
 
@@ -252,7 +448,7 @@ namespace JiraExport
                 JToken response = null;
                 try
                 {
-                    response = _jiraServiceWrapper.RestClient.ExecuteRequestAsync(Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/search?jql={jql}&startAt={currentStart}&maxResults={Settings.BatchSize}&fields=key").Result;
+                    response = ExecuteRequestAsync("search", Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/search?jql={jql}&startAt={currentStart}&maxResults={Settings.BatchSize}&{GetSearchFieldsQuery()}").Result;
                 }
                 catch (Exception e)
                 {
@@ -261,6 +457,7 @@ namespace JiraExport
                 }
                 if (response != null)
                 {
+                    CacheBatchedIssues(response);
                     remoteIssueBatch = response.SelectTokens("$.issues[*]").OfType<JObject>()
                                             .Select(i => i.SelectToken("$.key").Value<string>());
 
@@ -273,10 +470,13 @@ namespace JiraExport
                         break;
                     }
 
-                    currentStart += Settings.BatchSize;
+                    // Jira may return fewer issues than requested when fields and changelogs are included
+                    currentStart += remoteIssueBatch.Count();
 
                     int totalItems = (int)response.SelectToken("$.total");
 
+                    var prefetchedItems = PrefetchItems(remoteIssueBatch, skipList);
+
                     foreach (var issueKey in remoteIssueBatch)
                     {
                         if (skipList.Contains(issueKey))
@@ -287,7 +487,7 @@ namespace JiraExport
                         }
 
                         Logger.Log(LogLevel.Info, $"Processing {index + 1}/{totalItems} - '{issueKey}'.");
-                        var issue = ProcessItem(issueKey, skipList);
+                        var issue = ProcessItem(issueKey, skipList, prefetchedItems);
 
                         if (issue == null)
                             continue;
@@ -298,25 +498,26 @@ namespace JiraExport
                         if (downloadOptions.HasFlag(DownloadOptions.IncludeParentEpics) && (issue.EpicParent != null) && !skipList.Contains(issue.EpicParent))
                         {
                             Logger.Log(LogLevel.Info, $"Processing epic parent '{issue.EpicParent}'.");
-                            var parentEpic = ProcessItem(issue.EpicParent, skipList);
+                            var parentEpic = ProcessItem(issue.EpicParent, skipList, prefetchedItems);
                             yield return parentEpic;
                         }
 
                         if (downloadOptions.HasFlag(DownloadOptions.IncludeParents) && (issue.Parent != null) && !skipList.Contains(issue.Parent))
                         {
                             Logger.Log(LogLevel.Info, $"Processing parent issue '{issue.Parent}'.");
-                            var parent = ProcessItem(issue.Parent, skipList);
+                            var parent = ProcessItem(issue.Parent, skipList, prefetchedItems);
                             yield return parent;
                         }
 
                         if (downloadOptions.HasFlag(DownloadOptions.IncludeSubItems) && (issue.SubItems != null) && issue.SubItems.Any())
                         {
+                            PrefetchItems(issue.SubItems, skipList, prefetchedItems);
                             foreach (var subitemKey in issue.SubItems)
                             {
                                 if (!skipList.Contains(subitemKey))
                                 {
                                     Logger.Log(LogLevel.Info, $"Processing sub-item '{subitemKey}'.");
-                                    var subItem = ProcessItem(subitemKey, skipList);
+                                    var subItem = ProcessItem(subitemKey, skipList, prefetchedItems);
                                     yield return subItem;
                                 }
                             }
@@ -342,7 +543,7 @@ namespace JiraExport
                 JToken response = null;
                 try
                 {
-                    response = _jiraServiceWrapper.RestClient.ExecuteRequestAsync(Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/search/jql?jql={jql}&nextPageToken={nextPageToken}&maxResults={Settings.BatchSize}&fields=key").Result;
+                    response = ExecuteRequestAsync("search/jql", Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/search/jql?jql={jql}&nextPageToken={nextPageToken}&maxResults={Settings.BatchSize}&{GetSearchFieldsQuery()}").Result;
                     nextPageToken = (string)response.SelectToken("$.nextPageToken");
                 }
                 catch (Exception e)
@@ -352,6 +553,7 @@ namespace JiraExport
                 }
                 if (response != null)
                 {
+                    CacheBatchedIssues(response);
                     remoteIssueBatch = response.SelectTokens("$.issues[*]").OfType<JObject>()
                                             .Select(i => i.SelectToken("$.key").Value<string>());
 
@@ -364,6 +566,8 @@ namespace JiraExport
                         break;
                     }
 
+                    var prefetchedItems = PrefetchItems(remoteIssueBatch, skipList);
+
                     foreach (var issueKey in remoteIssueBatch)
                     {
                         if (skipList.Contains(issueKey))
@@ -374,7 +578,7 @@ namespace JiraExport
                         }
 
                         Logger.Log(LogLevel.Info, $"Processing {index + 1}/{totalItems} - '{issueKey}'.");
-                        var issue = ProcessItem(issueKey, skipList);
+                        var issue = ProcessItem(issueKey, skipList, prefetchedItems);
 
                         if (issue == null)
                             continue;
@@ -385,25 +589,26 @@ namespace JiraExport
                         if (downloadOptions.HasFlag(DownloadOptions.IncludeParentEpics) && (issue.EpicParent != null) && !skipList.Contains(issue.EpicParent))
                         {
                             Logger.Log(LogLevel.Info, $"Processing epic parent '{issue.EpicParent}'.");
-                            var parentEpic = ProcessItem(issue.EpicParent, skipList);
+                            var parentEpic = ProcessItem(issue.EpicParent, skipList, prefetchedItems);
                             yield return parentEpic;
                         }
 
                         if (downloadOptions.HasFlag(DownloadOptions.IncludeParents) && (issue.Parent != null) && !skipList.Contains(issue.Parent))
                         {
                             Logger.Log(LogLevel.Info, $"Processing parent issue '{issue.Parent}'.");
-                            var parent = ProcessItem(issue.Parent, skipList);
+                            var parent = ProcessItem(issue.Parent, skipList, prefetchedItems);
                             yield return parent;
                         }
 
                         if (downloadOptions.HasFlag(DownloadOptions.IncludeSubItems) && (issue.SubItems != null) && issue.SubItems.Any())
                         {
+                            PrefetchItems(issue.SubItems, skipList, prefetchedItems);
                             foreach (var subitemKey in issue.SubItems)
                             {
                                 if (!skipList.Contains(subitemKey))
                                 {
                                     Logger.Log(LogLevel.Info, $"Processing sub-item '{subitemKey}'.");
-                                    var subItem = ProcessItem(subitemKey, skipList);
+                                    var subItem = ProcessItem(subitemKey, skipList, prefetchedItems);
                                     yield return subItem;
                                 }
                             }
@@ -414,6 +619,24 @@ namespace JiraExport
             while (nextPageToken != null);
         }
 
+        private string GetSearchFieldsQuery()
+        {
+            return Settings.BatchedDownload ? "fields=*all&expand=renderedFields,changelog" : "fields=key";
+        }
+
+        // In batched mode the search page already holds the full issues, DownloadIssue picks them up from here
+        private void CacheBatchedIssues(JToken response)
+        {
+            if (!Settings.BatchedDownload)
+                return;
+
+            _batchedIssues.Clear();
+            foreach (var remoteIssue in response.SelectTokens("$.issues[*]").OfType<JObject>())
+            {
+                _batchedIssues[remoteIssue.ExValue<string>("$.key")] = remoteIssue;
+            }
+        }
+
         public struct JiraVersion
         {
             public string Version { get; set; }
@@ -433,7 +656,7 @@ namespace JiraExport
             {
                 if (Settings.JiraApiVersion == 2)
                 {
-                    var response = _jiraServiceWrapper.RestClient.ExecuteRequestAsync(Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/search?jql={jql}&maxResults=0").Result;
+                    var response = ExecuteRequestAsync("search/count", Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/search?jql={jql}&maxResults=0").Result;
                     return (int)response.SelectToken("$.total");
                 }
                 else if (Settings.JiraApiVersion == 3)
@@ -442,7 +665,7 @@ namespace JiraExport
                     {
                         jql = jql
                     };
-                    var response = _jiraServiceWrapper.RestClient.ExecuteRequestAsync(Method.POST, $"{JiraApi}/{Settings.JiraApiVersion}/search/approximate-count", requestBody).Result;
+                    var response = ExecuteRequestAsync("search/approximate-count", Method.POST, $"{JiraApi}/{Settings.JiraApiVersion}/search/approximate-count", requestBody).Result;
 
                     return (int)response.SelectToken("$.count");
                 }
@@ -463,22 +686,39 @@ namespace JiraExport
 
         public JiraVersion GetJiraVersion()
         {
-            var response = (JObject)_jiraServiceWrapper.RestClient.ExecuteRequestAsync(Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/serverInfo").Result;
+            var response = (JObject)ExecuteRequestAsync("serverInfo", Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/serverInfo").Result;
             return new JiraVersion((string)response.SelectToken("$.version"), (string)response.SelectToken("$.deploymentType"));
         }
 
+        public DateTime? GetServerTime()
+        {
+            try
+            {
+                var response = (JObject)ExecuteRequestAsync("serverInfo", Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/serverInfo").Result;
+                return response.SelectToken("$.serverTime")?.Value<DateTime?>();
+            }
+            catch (Exception e)
+            {
+                Logger.Log(e, $"Failed to get the Jira server time.", LogLevel.Warning);
+                return null;
+            }
+        }
+
         public IEnumerable<JObject> DownloadChangelog(string issueKey)
         {
-            var response = (JObject)_jiraServiceWrapper.RestClient.ExecuteRequestAsync(Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/issue/{issueKey}?expand=changelog,renderedFields&fields=created").Result;
+            var response = (JObject)ExecuteRequestAsync("issue/changelog", Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/issue/{issueKey}?expand=changelog,renderedFields&fields=created").Result;
             return response.SelectTokens("$.changelog.histories[*]").Cast<JObject>();
         }
 
         public JObject DownloadIssue(string key)
         {
+            if (_batchedIssues.TryRemove(key, out JObject batchedIssue))
+                return batchedIssue;
+
             try
             {
                 var response =
-                    _jiraServiceWrapper.RestClient.ExecuteRequestAsync(Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/issue/{key}?expand=renderedFields").Result;
+                    ExecuteRequestAsync("issue", Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/issue/{key}?expand=renderedFields").Result;
 
                 var remoteItem = (JObject)response;
                 return remoteItem;
@@ -496,16 +736,8 @@ namespace JiraExport
 
             if (attChanges != null && attChanges.Exists(a => a.ChangeType == RevisionChangeType.Added))
             {
-                var downloadedAtts = new List<JiraAttachment>();
-
-                foreach (var remoteAtt in attChanges)
-                {
-                    var jiraAtt = await DownloadAttachmentAsync(remoteAtt.Value);
-                    if (jiraAtt != null && !string.IsNullOrWhiteSpace(jiraAtt.LocalPath))
-                    {
-                        downloadedAtts.Add(jiraAtt);
-                    }
-                }
+                var jiraAtts = await Task.WhenAll(attChanges.Select(remoteAtt => DownloadAttachmentThrottledAsync(remoteAtt.Value)));
+                var downloadedAtts = jiraAtts.Where(jiraAtt => jiraAtt != null && !string.IsNullOrWhiteSpace(jiraAtt.LocalPath)).ToList();
 
                 // of added attachments, leave only attachments that have been successfully downloaded
                 attChanges.RemoveAll(ac => ac.ChangeType == RevisionChangeType.Added);
@@ -517,7 +749,7 @@ namespace JiraExport
 
         public int GetNumberOfComments(string key)
         {
-            return _jiraServiceWrapper.Issues.GetCommentsAsync(key).Result.Count();
+            return ExecuteThrottledAsync("issue/comment", () => _jiraServiceWrapper.Issues.GetCommentsAsync(key)).Result.Count();
         }
 
         public string GetUserEmail(string usernameOrAccountId)
@@ -526,10 +758,21 @@ namespace JiraExport
             {
                 return email;
             }
+            if (_persistentUserCache != null && _persistentUserCache.TryGetEmail(usernameOrAccountId, out email))
+            {
+                if (string.IsNullOrEmpty(email))
+                {
+                    exportIssuesSummary?.AddUnmappedUser(usernameOrAccountId);
+                    email = usernameOrAccountId;
+                }
+                _userEmailCache.Add(usernameOrAccountId, email);
+                return email;
+            }
             try
             {
-                var user = _jiraServiceWrapper.Users.GetUserAsync(usernameOrAccountId).Result;
+                var user = ExecuteThrottledAsync("user", () => _jiraServiceWrapper.Users.GetUserAsync(usernameOrAccountId)).Result;
                 var isUserEmailMissing = string.IsNullOrEmpty(user.Email);
+                _persistentUserCache?.Add(usernameOrAccountId, user.Email);
                 if (isUserEmailMissing)
                 {
                     Logger.Log(LogLevel.Info,
@@ -560,6 +803,46 @@ namespace JiraExport
             }
         }
 
+        // Fills the persistent user cache with all users assignable in the project, which covers
+        // most authors and assignees with a few paged requests instead of one request per user.
+        // Only the users that are not cached yet or expired are written to the cache.
+        public void PrefillUserCache()
+        {
+            if (_persistentUserCache == null || string.IsNullOrEmpty(Settings.Project))
+                return;
+
+            Logger.Log(LogLevel.Info, "Retrieving Jira users...");
+            var pageSize = 1000;
+            var startAt = 0;
+            var userCount = 0;
+            var addedCount = 0;
+            try
+            {
+                while (true)
+                {
+                    var response = ExecuteRequestAsync("user/assignable/search", Method.GET,
+                        $"{JiraApi}/{Settings.JiraApiVersion}/user/assignable/search?project={Settings.Project}&startAt={startAt}&maxResults={pageSize}").Result;
+
+                    var users = response as JArray;
+                    if (users == null || users.Count == 0)
+                        break;
+
+                    var idField = Settings.UsingJiraCloud ? "accountId" : "name";
+                    addedCount += _persistentUserCache.AddRange(users
+                        .Where(u => u.Value<bool?>("active") != false)
+                        .Select(u => new KeyValuePair<string, string>(u.Value<string>(idField), u.Value<string>("emailAddress"))));
+
+                    userCount += users.Count;
+                    startAt += users.Count;
+                }
+                Logger.Log(LogLevel.Info, $"Retrieved {userCount} Jira users, {addedCount} of them were not cached yet or expired.");
+            }
+            catch (Exception e)
+            {
+                Logger.Log(e, "Failed to retrieve users from Jira, users will be looked up one by one.", LogLevel.Warning);
+            }
+        }
+
         public string GetCustomId(string propertyName)
         {
             var customId = string.Empty;
@@ -567,7 +850,7 @@ namespace JiraExport
 
             if (JiraNameFieldCache == null)
             {
-                response = (JArray)_jiraServiceWrapper.RestClient.ExecuteRequestAsync(Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/field").Result;
+                response = (JArray)ExecuteRequestAsync("field", Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/field").Result;
                 JiraNameFieldCache = CreateFieldCacheLookup(response, "name", "id");
             }
 
@@ -577,7 +860,7 @@ namespace JiraExport
             {
                 if (JiraKeyFieldCache == null)
                 {
-                    response = response ?? (JArray)_jiraServiceWrapper.RestClient.ExecuteRequestAsync(Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/field").Result;
+                    response = response ?? (JArray)ExecuteRequestAsync("field", Method.GET, $"{JiraApi}/{Settings.JiraApiVersion}/field").Result;
                     JiraKeyFieldCache = CreateFieldCacheLookup(response, "key", "id");
                 }
                 customId = GetItemFromFieldCache(propertyName, JiraKeyFieldCache);
@@ -611,7 +894,7 @@ namespace JiraExport
 
         public IEnumerable<JObject> GetCommitRepositories(string issueId)
         {
-            var response = (JObject)_jiraServiceWrapper.RestClient.ExecuteRequestAsync(Method.GET, $"/rest/dev-status/latest/issue/detail?issueId={issueId}&applicationType=stash&dataType=repository").Result;
+            var response = (JObject)ExecuteRequestAsync("dev-status", Method.GET, $"/rest/dev-status/latest/issue/detail?issueId={issueId}&applicationType=stash&dataType=repository").Result;
             return response.SelectTokens("$.detail[*].repositories[*]").Cast<JObject>();
         }
     }
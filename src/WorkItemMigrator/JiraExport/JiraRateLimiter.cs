@@ -0,0 +1,180 @@
+﻿using System;
+using System.Collections.Generic;
+using System.Globalization;
+using System.Linq;
+using System.Net;
+using System.Threading.Tasks;
+
+namespace JiraExport
+{
+    // Token bucket shared by all Jira requests. The rate is lowered when Jira throttles and
+    // raised again step by step while requests succeed, up to the configured maximum rate.
+    public class JiraRateLimiter
+    {
+        public const double MinRate = 0.5;
+
+        private static readonly TimeSpan MaxBackoff = TimeSpan.FromSeconds(60);
+
+        private readonly double _maxRate;
+        private readonly Queue<DateTime> _recentRequests = new Queue<DateTime>();
+        private readonly Random _random = new Random();
+        private readonly object _syncRoot = new object();
+        private double _rate;
+        private double _tokens;
+        private DateTime _lastRefill = DateTime.UtcNow;
+        private DateTime _blockedUntil = DateTime.MinValue;
+        private long _requestCount;
+        private long _throttledCount;
+
+        // A maximum rate of 0 means no client side limit until Jira starts throttling
+        public JiraRateLimiter(double maxRequestsPerSecond)
+        {
+            _maxRate = maxRequestsPerSecond > 0 ? maxRequestsPerSecond : double.PositiveInfinity;
+            _rate = _maxRate;
+            _tokens = Burst;
+        }
+
+        public double CurrentRate { get { lock (_syncRoot) { return _rate; } } }
+        public long RequestCount { get { lock (_syncRoot) { return _requestCount; } } }
+        public long ThrottledCount { get { lock (_syncRoot) { return _throttledCount; } } }
+
+        private double Burst { get { return double.IsPositiveInfinity(_rate) ? 1 : Math.Max(1, _rate); } }
+
+        public Task WaitAsync()
+        {
+            var delay = Reserve(DateTime.UtcNow);
+            return delay > TimeSpan.Zero ? Task.Delay(delay) : Task.CompletedTask;
+        }
+
+        internal TimeSpan Reserve(DateTime now)
+        {
+            lock (_syncRoot)
+            {
+                _requestCount++;
+                _recentRequests.Enqueue(now);
+                while (_recentRequests.Count > 0 && now - _recentRequests.Peek() > TimeSpan.FromSeconds(1))
+                    _recentRequests.Dequeue();
+
+                var blocked = _blockedUntil > now ? _blockedUntil - now : TimeSpan.Zero;
+                if (double.IsPositiveInfinity(_rate))
+                    return blocked;
+
+                // Tokens may go negative, a request waits until its reserved token is refilled
+                var start = now + blocked;
+                _tokens = Math.Min(Burst, _tokens + Math.Max(0, (start - _lastRefill).TotalSeconds) * _rate);
+                _lastRefill = start > _lastRefill ? start : _lastRefill;
+                _tokens -= 1;
+
+                return _tokens >= 0 ? blocked : blocked + TimeSpan.FromSeconds(-_tokens / _rate);
+            }
+        }
+
+        public void OnSuccess()
+        {
+            lock (_syncRoot)
+            {
+                if (_rate < _maxRate)
+                    _rate = Math.Min(_maxRate, _rate + 0.1);
+            }
+        }
+
+        // Returns how long to wait before retrying, all requests are held back for that time
+        public TimeSpan OnThrottled(int attempt, TimeSpan? retryAfter)
+        {
+            lock (_syncRoot)
+            {
+                _throttledCount++;
+
+                var observedRate = Math.Max(MinRate, _recentRequests.Count);
+                _rate = Math.Max(MinRate, Math.Min(_rate, observedRate) / 2);
+                _tokens = Math.Min(_tokens, 0);
+
+                var delay = retryAfter ?? GetBackoff(attempt);
+                var now = DateTime.UtcNow;
+                if (now + delay > _blockedUntil)
+                    _blockedUntil = now + delay;
+
+                return delay;
+            }
+        }
+
+        public void OnResponseHeaders(IEnumerable<KeyValuePair<string, string>> headers)
+        {
+            var headerValues = ToDictionary(headers);
+
+            lock (_syncRoot)
+            {
+                if (headerValues.TryGetValue("X-RateLimit-Remaining", out string remaining) && remaining.Trim() == "0"
+                    && headerValues.TryGetValue("X-RateLimit-Reset", out string reset)
+                    && DateTime.TryParse(reset, CultureInfo.InvariantCulture, DateTimeStyles.AdjustToUniversal | DateTimeStyles.AssumeUniversal, out DateTime resetTime)
+                    && resetTime > _blockedUntil)
+                {
+                    _blockedUntil = resetTime;
+                }
+
+                if (headerValues.TryGetValue("X-RateLimit-NearLimit", out string nearLimit)
+                    && string.Equals(nearLimit.Trim(), "true", StringComparison.OrdinalIgnoreCase))
+                {
+                    var observedRate = Math.Max(MinRate, _recentRequests.Count);
+                    _rate = Math.Max(MinRate, Math.Min(_rate, observedRate) * 0.75);
+                }
+            }
+        }
+
+        public static TimeSpan? GetRetryAfter(IEnumerable<KeyValuePair<string, string>> headers)
+        {
+            if (!ToDictionary(headers).TryGetValue("Retry-After", out string retryAfter))
+                return null;
+
+            if (double.TryParse(retryAfter, NumberStyles.Float, CultureInfo.InvariantCulture, out double seconds))
+                return TimeSpan.FromSeconds(Math.Max(0, seconds));
+
+            if (DateTime.TryParse(retryAfter, CultureInfo.InvariantCulture, DateTimeStyles.AdjustToUniversal | DateTimeStyles.AssumeUniversal, out DateTime retryTime))
+                return retryTime > DateTime.UtcNow ? retryTime - DateTime.UtcNow : TimeSpan.Zero;
+
+            return null;
+        }
+
+        public static bool IsThrottlingStatus(HttpStatusCode statusCode)
+        {
+            return statusCode == (HttpStatusCode)429 || statusCode == HttpStatusCode.ServiceUnavailable;
+        }
+
+        // The Jira client wraps the exceptions of its requests in AggregateExceptions
+        public static bool IsThrottlingException(Exception exception)
+        {
+            for (var e = exception; e != null; e = e.InnerException)
+            {
+                if (e is AggregateException aggregate && aggregate.InnerExceptions.Any(IsThrottlingException))
+                    return true;
+
+                if (e is JiraThrottledException throttled && IsThrottlingStatus(throttled.StatusCode))
+                    return true;
+            }
+            return false;
+        }
+
+        // Exponential backoff with up to 50% jitter, so parallel workers do not retry in lockstep
+        internal TimeSpan GetBackoff(int attempt)
+        {
+            var seconds = Math.Min(MaxBackoff.TotalSeconds, Math.Pow(2, Math.Max(0, attempt - 1)));
+            double jitter;
+            lock (_random)
+            {
+                jitter = _random.NextDouble() * 0.5;
+            }
+            return TimeSpan.FromSeconds(Math.Min(MaxBackoff.TotalSeconds, seconds * (1 + jitter)));
+        }
+
+        private static Dictionary<string, string> ToDictionary(IEnumerable<KeyValuePair<string, string>> headers)
+        {
+            var result = new Dictionary<string, string>(StringComparer.OrdinalIgnoreCase);
+            foreach (var header in headers ?? Enumerable.Empty<KeyValuePair<string, string>>())
+            {
+                if (header.Key != null && header.Value != null)
+                    result[header.Key] = header.Value;
+            }
+            return result;
+        }
+    }
+}
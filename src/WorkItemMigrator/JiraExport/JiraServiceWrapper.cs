@@ -26,7 +26,8 @@ namespace JiraExport
             {
                 Logger.Log(LogLevel.Info, "Connecting to Jira...");
 
-                _jira = Jira.CreateRestClient(jiraSettings.Url, jiraSettings.UserID, jiraSettings.Pass);
+                var restClient = new JiraThrottlingRestClient(jiraSettings.Url, jiraSettings.UserID, jiraSettings.Pass);
+                _jira = Jira.CreateRestClient(restClient, restClient.Settings.Cache);
                 _jira.RestClient.RestSharpClient.AddDefaultHeader("X-Atlassian-Token", "no-check");
 
                 if (!string.IsNullOrWhiteSpace(jiraSettings.Token))
@@ -14,8 +14,16 @@ namespace JiraExport
         public string EpicLinkField { get; set; }
         public string SprintField { get; set; }
         public string UserMappingFile { get; set; }
+        public string UserCacheFile { get; set; }
+        public int UserCacheTtlHours { get; set; }
         public int BatchSize { get; set; }
+        public int ExportParallelism { get; set; } = 1;
+        public bool BatchedDownload { get; set; }
+        public double RateLimit { get; set; }
+        public int MaxThrottlingRetries { get; set; } = 5;
         public string AttachmentsDir { get; set; }
+        public int AttachmentDownloadParallelism { get; set; } = 1;
+        public bool DeduplicateAttachments { get; set; }
         public string JQL { get; set; }
         public bool UsingJiraCloud { get; set; }
         public bool IncludeDevelopmentLinks { get; set; }
@@ -0,0 +1,25 @@
+﻿using System;
+using System.Net;
+using System.Runtime.Serialization;
+
+namespace JiraExport
+{
+    [Serializable]
+    public class JiraThrottledException : Exception
+    {
+        protected JiraThrottledException(SerializationInfo serializationInfo, StreamingContext streamingContext) : base(serializationInfo, streamingContext)
+        {
+
+        }
+
+        public JiraThrottledException(HttpStatusCode statusCode, TimeSpan? retryAfter)
+            : base($"Jira throttled the request with status code {(int)statusCode}.")
+        {
+            StatusCode = statusCode;
+            RetryAfter = retryAfter;
+        }
+
+        public HttpStatusCode StatusCode { get; private set; }
+        public TimeSpan? RetryAfter { get; private set; }
+    }
+}
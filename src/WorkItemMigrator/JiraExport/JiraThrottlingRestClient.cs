@@ -0,0 +1,41 @@
+﻿using Atlassian.Jira.Remote;
+using RestSharp;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading;
+using System.Threading.Tasks;
+
+namespace JiraExport
+{
+    // All requests of the Jira client pass here. The size of every response is counted for the export metrics, its
+    // rate limit headers are passed to the shared rate limiter, and a throttled response is turned into a JiraThrottledException with its status code and
+    // Retry-After time, instead of the generic error the Jira client throws for it.
+    public class JiraThrottlingRestClient : JiraRestClient
+    {
+        public JiraThrottlingRestClient(string url, string username = null, string password = null)
+            : base(url, username, password)
+        {
+        }
+
+        public JiraRateLimiter RateLimiter { get; set; }
+
+        protected override async Task<IRestResponse> ExecuteRawResquestAsync(IRestRequest request, CancellationToken token)
+        {
+            var response = await base.ExecuteRawResquestAsync(request, token).ConfigureAwait(false);
+            OnResponse(response, RateLimiter);
+            return response;
+        }
+
+        internal static void OnResponse(IRestResponse response, JiraRateLimiter rateLimiter)
+        {
+            ExportMetrics.AddResponseSize(response.RawBytes?.LongLength ?? Math.Max(0, response.ContentLength));
+
+            var headers = (response.Headers ?? new List<Parameter>()).Select(h => new KeyValuePair<string, string>(h.Name, h.Value?.ToString())).ToList();
+            rateLimiter?.OnResponseHeaders(headers);
+
+            if (JiraRateLimiter.IsThrottlingStatus(response.StatusCode))
+                throw new JiraThrottledException(response.StatusCode, JiraRateLimiter.GetRetryAfter(headers));
+        }
+    }
+}
@@ -66,38 +66,7 @@ namespace JiraExport
             if (config == null)
                 throw new ArgumentNullException(nameof(config));
 
-            var targetWit = (from t in config.TypeMap.Types where t.Source == r.Type select t.Target).FirstOrDefault();
-
-            var hasFieldValue = r.Fields.TryGetValue(itemSource, out object value);
-
-            if (!hasFieldValue)
-                return (false, null);
-
-            foreach (var item in config.FieldMap.Fields.Where(i => i.Mapping?.Values != null))
-            {
-                var sourceAndTargetMatch = item.Source == itemSource && item.Target == itemTarget;
-                var forOrAllMatch = item.For.Contains(targetWit) || item.For == "All";  // matches "For": "All", or when this Wit is specifically named.
-                var notForMatch = !string.IsNullOrWhiteSpace(item.NotFor) && !item.NotFor.Contains(targetWit);  // matches if not-for is specified and doesn't contain this Wit.
-
-                if (sourceAndTargetMatch && (forOrAllMatch || notForMatch))
-                {
-                    if (value == null)
-                    {
-                        return (true, null);
-                    }
-                    var mappedValue = (from s in item.Mapping.Values where s.Source == value.ToString() select s.Target).FirstOrDefault();
-                    if (string.IsNullOrEmpty(mappedValue))
-                    {
-                        Logger.Log(LogLevel.Warning, $"Missing mapping value '{value}' for field '{itemSource}' for item type '{targetWit}'.");
-                        if(itemSource == "status")
-                        {
-                            exportIssuesSummary.AddUnmappedIssueState(targetWit, value.ToString());
-                        }
-                    }
-                    return (true, mappedValue);
-                }
-            }
-            return (true, value);
+            return new MappingPlan(config).MapValue(r, itemSource, itemTarget, exportIssuesSummary);
         }
 
         public static (bool, object) MapRenderedValue(JiraRevision r, string sourceField, bool isCustomField, string customFieldName, ConfigJson config)
@@ -108,33 +77,7 @@ namespace JiraExport
             if (config == null)
                 throw new ArgumentNullException(nameof(config));
 
-            sourceField = SetCustomFieldName(sourceField, isCustomField, customFieldName);
-
-            var fieldName = sourceField + "$Rendered";
-
-            var targetWit = (from t in config.TypeMap.Types where t.Source == r.Type select t.Target).FirstOrDefault();
-
-            var hasFieldValue = r.Fields.TryGetValue(fieldName, out object value);
-            if (!hasFieldValue)
-                return (false, null);
-
-            foreach (var item in config.FieldMap.Fields)
-            {
-                if (((item.Source == fieldName && (item.For.Contains(targetWit) || item.For == "All")) ||
-                      item.Source == fieldName && (!string.IsNullOrWhiteSpace(item.NotFor) && !item.NotFor.Contains(targetWit))) &&
-                      item.Mapping?.Values != null)
-                {
-                    var mappedValue = (from s in item.Mapping.Values where s.Source == value.ToString() select s.Target).FirstOrDefault();
-                    if (string.IsNullOrEmpty(mappedValue))
-                    {
-                        Logger.Log(LogLevel.Warning, $"Missing mapping value '{value}' for field '{fieldName}'.");
-                    }
-                    return (true, mappedValue);
-                }
-            }
-            value = CorrectRenderedHtmlvalue(value, r, config.IncludeJiraCssStyles);
-
-            return (true, value);
+            return new MappingPlan(config).MapRenderedValue(r, sourceField, isCustomField, customFieldName);
         }
 
 
@@ -178,8 +121,7 @@ namespace JiraExport
             // fields Rest API instead of the Sprint name
             if (iterationPathsString.StartsWith("com.atlassian.greenhopper.service.sprint.Sprint@"))
             {
-                Regex regex = new Regex(@",name=([^,]+),");
-                Match match = regex.Match(iterationPathsString);
+                Match match = SprintNameRegex.Match(iterationPathsString);
                 if (match.Success)
                 {
                     iterationPathsString = match.Groups[1].Value;
@@ -204,6 +146,12 @@ namespace JiraExport
             return iterationPath;
         }
 
+        private static readonly Regex SprintNameRegex = new Regex(@",name=([^,]+),", RegexOptions.Compiled);
+
+        private static readonly Regex AzdoInvalidCharactersRegex = new Regex("[/$?*:\"&<>#%|+]", RegexOptions.Compiled, TimeSpan.FromMilliseconds(100));
+
+        private static readonly Lazy<string> JiraCss = new Lazy<string>(() => ReadEmbeddedFile("JiraExport.jirastyles.css"));
+
         private static readonly Dictionary<string, decimal> CalculatedLexoRanks = new Dictionary<string, decimal>();
         private static readonly Dictionary<decimal, string> CalculatedRanks = new Dictionary<decimal, string>();
 
@@ -271,7 +219,7 @@ namespace JiraExport
 
             if (includeJiraStyle)
             {
-                string css = ReadEmbeddedFile("JiraExport.jirastyles.css");
+                string css = JiraCss.Value;
                 if (string.IsNullOrWhiteSpace(css))
                     Logger.Log(LogLevel.Warning, $"Could not read css styles for rendered field in {revision.OriginId}.");
                 else
@@ -298,19 +246,9 @@ namespace JiraExport
                 return "";
             }
         }
-        private static string SetCustomFieldName(string sourceField, bool isCustomField, string customFieldName)
-        {
-            if (isCustomField)
-            {
-                sourceField = customFieldName;
-            }
-
-            return sourceField;
-        }
-
         private static string ReplaceAzdoInvalidCharacters(string inputString)
         {
-            return Regex.Replace(inputString, "[/$?*:\"&<>#%|+]", "", RegexOptions.None, TimeSpan.FromMilliseconds(100));
+            return AzdoInvalidCharactersRegex.Replace(inputString, "");
         }
     }
 
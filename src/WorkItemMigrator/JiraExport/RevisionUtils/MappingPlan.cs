@@ -0,0 +1,151 @@
+﻿using Common.Config;
+using Migration.Common.Config;
+using Migration.Common.Log;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+
+namespace JiraExport
+{
+    // The lookups of the mapping configuration, resolved once so that mapping a revision
+    // does not scan the configuration. The first matching entry wins, like in the configuration.
+    public class MappingPlan
+    {
+        private readonly Dictionary<string, string> _targetTypes = new Dictionary<string, string>();
+        private readonly Dictionary<string, string> _linkTypes = new Dictionary<string, string>();
+        private readonly Dictionary<(string, string, string), Dictionary<string, string>> _valueMaps = new Dictionary<(string, string, string), Dictionary<string, string>>();
+        private readonly Dictionary<(string, string), Dictionary<string, string>> _renderedValueMaps = new Dictionary<(string, string), Dictionary<string, string>>();
+
+        public MappingPlan(ConfigJson config)
+        {
+            if (config == null)
+                throw new ArgumentNullException(nameof(config));
+
+            IncludeJiraCssStyles = config.IncludeJiraCssStyles;
+
+            foreach (var type in config.TypeMap?.Types ?? Enumerable.Empty<Migration.Common.Config.Type>())
+            {
+                if (type.Source != null && !_targetTypes.ContainsKey(type.Source))
+                    _targetTypes.Add(type.Source, type.Target);
+            }
+
+            foreach (var link in config.LinkMap?.Links ?? Enumerable.Empty<Link>())
+            {
+                if (link.Source != null && !_linkTypes.ContainsKey(link.Source))
+                    _linkTypes.Add(link.Source, link.Target);
+            }
+
+            var fieldsWithValueMaps = (config.FieldMap?.Fields ?? Enumerable.Empty<Field>()).Where(f => f.Source != null && f.Mapping?.Values != null).ToList();
+            foreach (var targetWit in _targetTypes.Values.Where(t => t != null).Distinct())
+            {
+                foreach (var field in fieldsWithValueMaps.Where(f => IsMappedFor(f, targetWit)))
+                {
+                    var values = ToValueMap(field.Mapping.Values);
+
+                    if (field.Target != null && !_valueMaps.ContainsKey((targetWit, field.Source, field.Target)))
+                        _valueMaps.Add((targetWit, field.Source, field.Target), values);
+
+                    if (!_renderedValueMaps.ContainsKey((targetWit, field.Source)))
+                        _renderedValueMaps.Add((targetWit, field.Source), values);
+                }
+            }
+        }
+
+        public bool IncludeJiraCssStyles { get; private set; }
+
+        public string GetTargetType(string sourceType)
+        {
+            return sourceType != null && _targetTypes.TryGetValue(sourceType, out string targetType) ? targetType : null;
+        }
+
+        public string GetLinkType(string sourceLinkType)
+        {
+            return sourceLinkType != null && _linkTypes.TryGetValue(sourceLinkType, out string linkType) ? linkType : null;
+        }
+
+        public bool TryGetValueMap(string targetWit, string source, string target, out Dictionary<string, string> values)
+        {
+            values = null;
+            return targetWit != null && source != null && target != null && _valueMaps.TryGetValue((targetWit, source, target), out values);
+        }
+
+        public bool TryGetRenderedValueMap(string targetWit, string source, out Dictionary<string, string> values)
+        {
+            values = null;
+            return targetWit != null && source != null && _renderedValueMaps.TryGetValue((targetWit, source), out values);
+        }
+
+        public (bool, object) MapValue(JiraRevision r, string itemSource, string itemTarget, ExportIssuesSummary exportIssuesSummary)
+        {
+            if (r == null)
+                throw new ArgumentNullException(nameof(r));
+
+            var hasFieldValue = r.Fields.TryGetValue(itemSource, out object value);
+
+            if (!hasFieldValue)
+                return (false, null);
+
+            var targetWit = GetTargetType(r.Type);
+            if (TryGetValueMap(targetWit, itemSource, itemTarget, out var values))
+            {
+                if (value == null)
+                {
+                    return (true, null);
+                }
+                values.TryGetValue(value.ToString(), out string mappedValue);
+                if (string.IsNullOrEmpty(mappedValue))
+                {
+                    Logger.Log(LogLevel.Warning, $"Missing mapping value '{value}' for field '{itemSource}' for item type '{targetWit}'.");
+                    if (itemSource == "status")
+                    {
+                        exportIssuesSummary.AddUnmappedIssueState(targetWit, value.ToString());
+                    }
+                }
+                return (true, mappedValue);
+            }
+            return (true, value);
+        }
+
+        public (bool, object) MapRenderedValue(JiraRevision r, string sourceField, bool isCustomField, string customFieldName)
+        {
+            if (r == null)
+                throw new ArgumentNullException(nameof(r));
+
+            var fieldName = (isCustomField ? customFieldName : sourceField) + "$Rendered";
+
+            var hasFieldValue = r.Fields.TryGetValue(fieldName, out object value);
+            if (!hasFieldValue)
+                return (false, null);
+
+            if (TryGetRenderedValueMap(GetTargetType(r.Type), fieldName, out var values))
+            {
+                values.TryGetValue(value.ToString(), out string mappedValue);
+                if (string.IsNullOrEmpty(mappedValue))
+                {
+                    Logger.Log(LogLevel.Warning, $"Missing mapping value '{value}' for field '{fieldName}'.");
+                }
+                return (true, mappedValue);
+            }
+
+            return (true, FieldMapperUtils.CorrectRenderedHtmlvalue(value, r, IncludeJiraCssStyles));
+        }
+
+        private static bool IsMappedFor(Field field, string targetWit)
+        {
+            // matches "For": "All", or when this Wit is specifically named, or if not-for is specified and doesn't contain this Wit
+            return field.For.Contains(targetWit) || field.For == "All"
+                || (!string.IsNullOrWhiteSpace(field.NotFor) && !field.NotFor.Contains(targetWit));
+        }
+
+        private static Dictionary<string, string> ToValueMap(IEnumerable<Value> values)
+        {
+            var valueMap = new Dictionary<string, string>();
+            foreach (var value in values.Where(v => v.Source != null))
+            {
+                if (!valueMap.ContainsKey(value.Source))
+                    valueMap.Add(value.Source, value.Target);
+            }
+            return valueMap;
+        }
+    }
+}
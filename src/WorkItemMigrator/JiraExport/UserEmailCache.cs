@@ -0,0 +1,109 @@
+﻿using System;
+using System.Collections.Generic;
+using System.Globalization;
+using System.IO;
+using System.Linq;
+
+namespace JiraExport
+{
+    public class UserEmailCache
+    {
+        public const string FileName = "user-cache.txt";
+
+        private readonly string _path;
+        private readonly TimeSpan _timeToLive;
+        private readonly Dictionary<string, (string Email, DateTime CachedAt)> _entries = new Dictionary<string, (string, DateTime)>();
+        private readonly object _syncRoot = new object();
+
+        public UserEmailCache(string path, TimeSpan timeToLive)
+        {
+            _path = path;
+            _timeToLive = timeToLive;
+
+            if (File.Exists(path))
+            {
+                // Entries are appended, a later line for the same user replaces an earlier one
+                var lineCount = 0;
+                foreach (var line in File.ReadLines(path))
+                {
+                    lineCount++;
+                    var parts = line.Split('\t');
+                    if (parts.Length != 3 || string.IsNullOrEmpty(parts[0]))
+                        continue;
+
+                    if (DateTime.TryParse(parts[2], CultureInfo.InvariantCulture, DateTimeStyles.RoundtripKind, out DateTime cachedAt) && !IsExpired(cachedAt))
+                        _entries[parts[0]] = (parts[1], cachedAt);
+                }
+
+                // Replaced, expired and unreadable lines are dropped from the file
+                if (lineCount > _entries.Count)
+                    Compact();
+            }
+        }
+
+        public int Count { get { lock (_syncRoot) { return _entries.Count; } } }
+
+        // An empty email is a cached miss, the user exists but the email is not visible
+        public bool TryGetEmail(string usernameOrAccountId, out string email)
+        {
+            lock (_syncRoot)
+            {
+                if (_entries.TryGetValue(usernameOrAccountId, out var entry) && !IsExpired(entry.CachedAt))
+                {
+                    email = entry.Email;
+                    return true;
+                }
+                email = null;
+                return false;
+            }
+        }
+
+        public void Add(string usernameOrAccountId, string email)
+        {
+            AddRange(new[] { new KeyValuePair<string, string>(usernameOrAccountId, email) });
+        }
+
+        // Only users that are not cached, expired or have a different email are added, returns how many were added
+        public int AddRange(IEnumerable<KeyValuePair<string, string>> emailsByUser)
+        {
+            lock (_syncRoot)
+            {
+                var cachedAt = DateTime.UtcNow;
+                var lines = new List<string>();
+                foreach (var user in emailsByUser)
+                {
+                    if (string.IsNullOrEmpty(user.Key))
+                        continue;
+
+                    var email = user.Value ?? "";
+                    if (_entries.TryGetValue(user.Key, out var entry) && entry.Email == email && !IsExpired(entry.CachedAt))
+                        continue;
+
+                    _entries[user.Key] = (email, cachedAt);
+                    lines.Add(FormatLine(user.Key, email, cachedAt));
+                }
+                if (lines.Count > 0)
+                    File.AppendAllLines(_path, lines);
+                return lines.Count;
+            }
+        }
+
+        private void Compact()
+        {
+            // Written next to the cache and moved over it, an interrupted compaction keeps the old cache
+            var tempPath = _path + ".tmp";
+            File.WriteAllLines(tempPath, _entries.Select(e => FormatLine(e.Key, e.Value.Email, e.Value.CachedAt)));
+            File.Move(tempPath, _path, true);
+        }
+
+        private static string FormatLine(string usernameOrAccountId, string email, DateTime cachedAt)
+        {
+            return $"{usernameOrAccountId}\t{email}\t{cachedAt.ToString("o", CultureInfo.InvariantCulture)}";
+        }
+
+        private bool IsExpired(DateTime cachedAt)
+        {
+            return DateTime.UtcNow - cachedAt.ToUniversalTime() > _timeToLive;
+        }
+    }
+}
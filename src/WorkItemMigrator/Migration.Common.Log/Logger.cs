@@ -26,6 +26,9 @@ namespace Migration.Common.Log
         private static readonly List<string> _warnings = new List<string>();
         private static TelemetryClient _telemetryClient = null;
         private static bool? _continueOnCritical;
+        private static readonly object _syncRoot = new object();
+
+        public static string LogFilePath { get { return _logFilePath; } }
 
         static Logger()
         {
@@ -90,8 +93,7 @@ namespace Migration.Common.Log
 
             if (level == LogLevel.Critical)
             {
-                if (!_errors.Contains(message))
-                    _errors.Add(message);
+                AddUnique(_errors, message);
 
                 ConsoleKey answer;
                 if (!_continueOnCritical.HasValue)
@@ -109,15 +111,25 @@ namespace Migration.Common.Log
             }
             else if (level == LogLevel.Error)
             {
-                if (!_errors.Contains(message))
-                    _errors.Add(message);
+                AddUnique(_errors, message);
             }
-            else if (level == LogLevel.Warning && !_warnings.Contains(message))
+            else if (level == LogLevel.Warning && AddUnique(_warnings, message))
             {
-                _warnings.Add(message);
                 LogTrace(message, level);
             }
         }
+
+        private static bool AddUnique(List<string> messages, string message)
+        {
+            lock (_syncRoot)
+            {
+                if (messages.Contains(message))
+                    return false;
+
+                messages.Add(message);
+                return true;
+            }
+        }
         public static void Log(Exception ex, string message, LogLevel logLevel = LogLevel.Error)
         {
             LogExceptionToApplicationInsights(ex);
@@ -130,8 +142,13 @@ namespace Migration.Common.Log
             {
                 if (level == LogLevel.Debug)
                     message = $"   {message}";
-                ToFile(level, message);
-                ToConsole(level, message);
+
+                // Export workers may log concurrently, keep file appends and console colors consistent
+                lock (_syncRoot)
+                {
+                    ToFile(level, message);
+                    ToConsole(level, message);
+                }
             }
         }
 
@@ -243,9 +260,9 @@ namespace Migration.Common.Log
             return result;
         }
 
-        public static int Warnings => _warnings.Count;
+        public static int Warnings { get { lock (_syncRoot) { return _warnings.Count; } } }
 
-        public static int Errors => _errors.Count;
+        public static int Errors { get { lock (_syncRoot) { return _errors.Count; } } }
 
         public static string SessionId { get; } = Guid.NewGuid().ToString();
 
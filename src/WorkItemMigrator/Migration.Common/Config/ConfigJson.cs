@@ -30,15 +30,45 @@ namespace Common.Config
         [JsonProperty(PropertyName = "batch-size")]
         public int BatchSize { get; set; } = 20;
 
+        [JsonProperty(PropertyName = "export-parallelism")]
+        public int ExportParallelism { get; set; } = 1;
+
+        [JsonProperty(PropertyName = "batched-download")]
+        public bool BatchedDownload { get; set; } = false;
+
+        [JsonProperty(PropertyName = "rate-limit")]
+        public double RateLimit { get; set; } = 0;
+
+        [JsonProperty(PropertyName = "max-throttling-retries")]
+        public int MaxThrottlingRetries { get; set; } = 5;
+
         [JsonProperty(PropertyName = "log-level")]
         public string LogLevel { get; set; } = "Debug";
 
         [JsonProperty(PropertyName = "attachment-folder", Required = Required.Always)]
         public string AttachmentsFolder { get; set; }
 
+        [JsonProperty(PropertyName = "attachment-download-parallelism")]
+        public int AttachmentDownloadParallelism { get; set; } = 1;
+
+        [JsonProperty(PropertyName = "deduplicate-attachments")]
+        public bool DeduplicateAttachments { get; set; } = false;
+
+        [JsonProperty(PropertyName = "indent-item-files")]
+        public bool IndentItemFiles { get; set; } = true;
+
+        [JsonProperty(PropertyName = "compress-item-files")]
+        public bool CompressItemFiles { get; set; } = false;
+
+        [JsonProperty(PropertyName = "pack-item-files")]
+        public bool PackItemFiles { get; set; } = false;
+
         [JsonProperty(PropertyName = "user-mapping-file", Required = Required.AllowNull)]
         public string UserMappingFile { get; set; }
 
+        [JsonProperty(PropertyName = "user-cache-ttl-hours")]
+        public int UserCacheTtlHours { get; set; } = 0;
+
         [JsonProperty(PropertyName = "base-area-path")]
         public string BaseAreaPath { get; set; } = "";
 
@@ -72,6 +102,39 @@ namespace Common.Config
         [JsonProperty(PropertyName = "include-link-comments")]
         public bool IncludeLinkComments { get; set; } = true;
 
+        [JsonProperty(PropertyName = "import-parallelism")]
+        public int ImportParallelism { get; set; } = 1;
+
+        [JsonProperty(PropertyName = "journal-flush-interval")]
+        public int JournalFlushInterval { get; set; } = 1;
+
+        [JsonProperty(PropertyName = "journal-sync-to-disk")]
+        public bool JournalSyncToDisk { get; set; } = false;
+
+        [JsonProperty(PropertyName = "item-cache-size")]
+        public int ItemCacheSize { get; set; } = 100;
+
+        [JsonProperty(PropertyName = "work-item-cache-size")]
+        public int WorkItemCacheSize { get; set; } = 1000;
+
+        [JsonProperty(PropertyName = "attachment-upload-parallelism")]
+        public int AttachmentUploadParallelism { get; set; } = 0;
+
+        [JsonProperty(PropertyName = "classification-parallelism")]
+        public int ClassificationParallelism { get; set; } = 4;
+
+        [JsonProperty(PropertyName = "coalesce-revision-updates")]
+        public bool CoalesceRevisionUpdates { get; set; } = false;
+
+        [JsonProperty(PropertyName = "resolve-links-offline")]
+        public bool ResolveLinksOffline { get; set; } = true;
+
+        [JsonProperty(PropertyName = "work-item-creation-batch-size")]
+        public int WorkItemCreationBatchSize { get; set; } = 0;
+
+        [JsonProperty(PropertyName = "max-connections-per-server")]
+        public int MaxConnectionsPerServer { get; set; } = 0;
+
         [JsonProperty(PropertyName = "sleep-time-between-revision-import-milliseconds")]
         public int SleepTimeBetweenRevisionImportMilliseconds { get; set; } = 0;
 
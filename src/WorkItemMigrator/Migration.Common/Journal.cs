@@ -1,24 +1,40 @@
 ﻿using Migration.Common.Log;
 using System;
 using System.Collections.Generic;
+using System.Globalization;
 using System.IO;
+using System.Linq;
+using System.Text;
 
 namespace Migration.Common
 {
-    public class Journal
+    // The journal files keep the text format "originId;wiId;rev" and "attOriginId;attWiId". Entries are
+    // appended through writers that stay open, and are flushed after every flush interval entries.
+    public class Journal : IDisposable
     {
+        // Compact when the items journal has this many more lines than items
+        private const int CompactionThreshold = 1000;
+
         #region Static methods
 
         internal static Journal Init(MigrationContext context)
         {
-            var journal = new Journal(context);
+            return Open(context.MigrationWorkspace, context.ForceFresh, context.JournalFlushInterval, context.JournalSyncToDisk);
+        }
+
+        public static Journal Open(string workspace, bool forceFresh, int flushInterval = 1, bool syncToDisk = false)
+        {
+            var journal = new Journal(workspace, flushInterval, syncToDisk);
 
-            if (File.Exists(journal.ItemsPath) && context.ForceFresh)
+            if (File.Exists(journal.ItemsPath) && forceFresh)
                 File.Delete(journal.ItemsPath);
 
-            if (File.Exists(journal.AttachmentsPath) && context.ForceFresh)
+            if (File.Exists(journal.AttachmentsPath) && forceFresh)
                 File.Delete(journal.AttachmentsPath);
 
+            if (File.Exists(journal.UploadsPath) && forceFresh)
+                File.Delete(journal.UploadsPath);
+
             return Load(journal);
         }
 
@@ -28,61 +44,208 @@ namespace Migration.Common
 
         internal static Journal Load(Journal journal)
         {
+            var revLineCount = 0;
             if (File.Exists(journal.ItemsPath))
             {
-                var revLines = File.ReadAllLines(journal.ItemsPath);
-                foreach (string rev in revLines)
+                TruncateIncompleteLine(journal.ItemsPath);
+                foreach (string rev in File.ReadLines(journal.ItemsPath))
                 {
-                    var props = rev.Split(';');
-                    journal.ProcessedRevisions[props[0]] = (Convert.ToInt32(props[1]), Convert.ToInt32(props[2]));
+                    if (rev.Length == 0)
+                        continue;
+
+                    // Parsed from the end, the origin id may contain ';'
+                    var revSeparator = rev.LastIndexOf(';');
+                    var wiIdSeparator = revSeparator > 0 ? rev.LastIndexOf(';', revSeparator - 1) : -1;
+                    if (wiIdSeparator <= 0
+                        || !int.TryParse(rev.AsSpan(wiIdSeparator + 1, revSeparator - wiIdSeparator - 1), NumberStyles.Integer, CultureInfo.InvariantCulture, out int wiId)
+                        || !int.TryParse(rev.AsSpan(revSeparator + 1), NumberStyles.Integer, CultureInfo.InvariantCulture, out int revIndex))
+                    {
+                        LogMalformedLine(journal.ItemsPath, rev);
+                        continue;
+                    }
+
+                    var originId = rev.Substring(0, wiIdSeparator);
+                    if (!journal.ProcessedRevisions.TryGetValue(originId, out var processed) || processed.Item2 <= revIndex)
+                        journal.ProcessedRevisions[originId] = (wiId, revIndex);
+                    revLineCount++;
                 }
             }
 
             if (File.Exists(journal.AttachmentsPath))
             {
-                var attLines = File.ReadAllLines(journal.AttachmentsPath);
-                foreach (string att in attLines)
+                TruncateIncompleteLine(journal.AttachmentsPath);
+                foreach (string att in File.ReadLines(journal.AttachmentsPath))
+                {
+                    if (att.Length == 0)
+                        continue;
+
+                    var separator = att.LastIndexOf(';');
+                    if (separator <= 0)
+                    {
+                        LogMalformedLine(journal.AttachmentsPath, att);
+                        continue;
+                    }
+
+                    journal.ProcessedAttachments[att.Substring(0, separator)] = att.Substring(separator + 1);
+                }
+            }
+
+            if (File.Exists(journal.UploadsPath))
+            {
+                TruncateIncompleteLine(journal.UploadsPath);
+                foreach (string upload in File.ReadLines(journal.UploadsPath))
                 {
-                    var props = att.Split(';');
-                    journal.ProcessedAttachments[props[0]] = props[1];
+                    if (upload.Length == 0)
+                        continue;
+
+                    // The url is last, it may contain ';'
+                    var idSeparator = upload.IndexOf(';');
+                    var urlSeparator = idSeparator > 0 ? upload.IndexOf(';', idSeparator + 1) : -1;
+                    if (urlSeparator < 0 || !Guid.TryParse(upload.AsSpan(idSeparator + 1, urlSeparator - idSeparator - 1), out Guid id))
+                    {
+                        LogMalformedLine(journal.UploadsPath, upload);
+                        continue;
+                    }
+
+                    journal.UploadedAttachments[upload.Substring(0, idSeparator)] = (id, upload.Substring(urlSeparator + 1));
                 }
             }
 
+            if (revLineCount - journal.ProcessedRevisions.Count >= CompactionThreshold)
+                journal.Compact();
+
             return journal;
         }
 
+        // An entry is written with its line end, a last line without one was cut off when the import stopped. It is
+        // removed, so the next entry is not appended to it, and its revision or attachment is imported again.
+        private static void TruncateIncompleteLine(string path)
+        {
+            using (var stream = new FileStream(path, FileMode.Open, FileAccess.ReadWrite, FileShare.Read))
+            {
+                void Read(byte[] bytes, int count)
+                {
+                    for (int offset = 0, read; offset < count; offset += read)
+                    {
+                        if ((read = stream.Read(bytes, offset, count - offset)) == 0)
+                            throw new EndOfStreamException();
+                    }
+                }
+
+                var buffer = new byte[4096];
+                var end = stream.Length;
+                while (end > 0)
+                {
+                    var count = (int)Math.Min(buffer.Length, end);
+                    stream.Position = end - count;
+                    Read(buffer, count);
+
+                    var lineEnd = Array.FindLastIndex(buffer, count - 1, count, b => b == '\n' || b == '\r');
+                    if (lineEnd >= 0)
+                    {
+                        end = end - count + lineEnd + 1;
+                        break;
+                    }
+                    end -= count;
+                }
+
+                if (end == stream.Length)
+                    return;
+
+                stream.Position = end;
+                var incompleteLine = new byte[stream.Length - end];
+                Read(incompleteLine, incompleteLine.Length);
+                Logger.Log(LogLevel.Warning, $"Removed the incomplete last line '{Encoding.UTF8.GetString(incompleteLine)}' from '{path}'.");
+                stream.SetLength(end);
+            }
+        }
+
+        private static void LogMalformedLine(string path, string line)
+        {
+            Logger.Log(LogLevel.Warning, $"Skipped the malformed line '{line}' in '{path}'.");
+        }
+
         #endregion
 
         public Dictionary<string, (int, int)> ProcessedRevisions { get; private set; } = new Dictionary<string, (int, int)>();
 
         public Dictionary<string, string> ProcessedAttachments { get; private set; } = new Dictionary<string, string>();
+
+        // Attachments uploaded to Azure DevOps, which may not be added to their work item yet
+        public Dictionary<string, (Guid, string)> UploadedAttachments { get; private set; } = new Dictionary<string, (Guid, string)>();
         public string ItemsPath { get; private set; }
         public string AttachmentsPath { get; private set; }
+        public string UploadsPath { get; private set; }
+        public int FlushInterval { get; private set; }
+        public bool SyncToDisk { get; private set; }
+
+        // Revisions are imported by several workers at a time
+        private readonly object _syncRoot = new object();
+        private StreamWriter _itemsWriter;
+        private StreamWriter _attachmentsWriter;
+        private StreamWriter _uploadsWriter;
+        private int _unflushedEntries;
 
         public Journal(MigrationContext context)
+            : this(context.MigrationWorkspace, context.JournalFlushInterval, context.JournalSyncToDisk)
+        {
+        }
+
+        public Journal(string workspace, int flushInterval = 1, bool syncToDisk = false)
         {
-            ItemsPath = Path.Combine(context.MigrationWorkspace, "itemsJournal.txt");
-            AttachmentsPath = Path.Combine(context.MigrationWorkspace, "attachmentsJournal.txt");
+            ItemsPath = Path.Combine(workspace, "itemsJournal.txt");
+            AttachmentsPath = Path.Combine(workspace, "attachmentsJournal.txt");
+            UploadsPath = Path.Combine(workspace, "attachmentUploadsJournal.txt");
+            FlushInterval = Math.Max(1, flushInterval);
+            SyncToDisk = syncToDisk;
         }
 
+        // A retried revision is imported after the later revisions of its item, the journal keeps the highest revision
         public void MarkRevProcessed(string originId, int wiId, int rev)
         {
+            lock (_syncRoot)
+            {
+                if (ProcessedRevisions.TryGetValue(originId, out var processed) && processed.Item2 > rev)
+                    return;
 
-            ProcessedRevisions[originId] = (wiId, rev);
-            WriteItem(originId, wiId, rev);
+                ProcessedRevisions[originId] = (wiId, rev);
+                WriteItem(originId, wiId, rev);
+            }
         }
 
         private void WriteItem(string originId, int wiId, int rev)
         {
-            File.AppendAllText(ItemsPath, $"{originId};{wiId};{rev}" + Environment.NewLine);
+            _itemsWriter ??= OpenWriter(ItemsPath);
+            _itemsWriter.WriteLine(FormattableString.Invariant($"{originId};{wiId};{rev}"));
+            EntryWritten();
+        }
+
+        // Work items created ahead of their first revision are journaled with revision -1, their first revision is
+        // still imported. The ids of a batch are added together and written to disk at once, whatever the sync
+        // setting, since a lost id would create the work items again when the import is started again.
+        public void MarkItemsCreated(IEnumerable<(string OriginId, int WiId)> items)
+        {
+            lock (_syncRoot)
+            {
+                foreach (var (originId, wiId) in items)
+                {
+                    ProcessedRevisions[originId] = (wiId, -1);
+                    _itemsWriter ??= OpenWriter(ItemsPath);
+                    _itemsWriter.WriteLine(FormattableString.Invariant($"{originId};{wiId};-1"));
+                }
+                FlushLocked(true);
+            }
         }
 
         public void MarkAttachmentAsProcessed(string attOriginId, string attWiId)
         {
             try
             {
-                ProcessedAttachments.Add(attOriginId, attWiId);
-                WriteAttachment(attOriginId, attWiId);
+                lock (_syncRoot)
+                {
+                    ProcessedAttachments.Add(attOriginId, attWiId);
+                    WriteAttachment(attOriginId, attWiId);
+                }
             }
             catch(Exception ex)
             {
@@ -94,21 +257,140 @@ namespace Migration.Common
 
         private void WriteAttachment(string attOriginId, string attWiId)
         {
-            File.AppendAllText(AttachmentsPath, $"{attOriginId};{attWiId}" + Environment.NewLine);
+            _attachmentsWriter ??= OpenWriter(AttachmentsPath);
+            _attachmentsWriter.WriteLine($"{attOriginId};{attWiId}");
+            EntryWritten();
+        }
+
+        public void MarkAttachmentUploaded(string attOriginId, Guid id, string url)
+        {
+            lock (_syncRoot)
+            {
+                UploadedAttachments[attOriginId] = (id, url);
+                _uploadsWriter ??= OpenWriter(UploadsPath);
+                _uploadsWriter.WriteLine($"{attOriginId};{id};{url}");
+                EntryWritten();
+            }
+        }
+
+        public bool IsAttachmentUploaded(string attOriginId, out Guid id, out string url)
+        {
+            (Guid, string) upload;
+            lock (_syncRoot)
+            {
+                if (!UploadedAttachments.TryGetValue(attOriginId, out upload))
+                {
+                    id = Guid.Empty;
+                    url = null;
+                    return false;
+                }
+            }
+            (id, url) = upload;
+            return true;
+        }
+
+        private static StreamWriter OpenWriter(string path)
+        {
+            var stream = new FileStream(path, FileMode.Append, FileAccess.Write, FileShare.Read, 64 * 1024);
+            return new StreamWriter(stream, new UTF8Encoding(false));
+        }
+
+        private void EntryWritten()
+        {
+            if (++_unflushedEntries >= FlushInterval)
+                FlushLocked();
+        }
+
+        public void Flush()
+        {
+            lock (_syncRoot)
+            {
+                FlushLocked();
+            }
+        }
+
+        private void FlushLocked(bool syncToDisk = false)
+        {
+            foreach (var writer in new[] { _itemsWriter, _attachmentsWriter, _uploadsWriter })
+            {
+                if (writer == null)
+                    continue;
+
+                writer.Flush();
+                if (SyncToDisk || syncToDisk)
+                    ((FileStream)writer.BaseStream).Flush(true);
+            }
+            _unflushedEntries = 0;
+        }
+
+        // Rewrites the journal files with only the latest entry of every item
+        public void Compact()
+        {
+            lock (_syncRoot)
+            {
+                CloseWriters();
+
+                Rewrite(ItemsPath, ProcessedRevisions.Select(r => FormattableString.Invariant($"{r.Key};{r.Value.Item1};{r.Value.Item2}")));
+                Rewrite(AttachmentsPath, ProcessedAttachments.Select(a => $"{a.Key};{a.Value}"));
+            }
+        }
+
+        private static void Rewrite(string path, IEnumerable<string> lines)
+        {
+            if (!File.Exists(path))
+                return;
+
+            // Written next to the journal and moved over it, an interrupted compaction keeps the old journal
+            var tempPath = path + ".tmp";
+            using (var writer = OpenWriter(tempPath))
+            {
+                foreach (var line in lines)
+                    writer.WriteLine(line);
+                writer.Flush();
+                ((FileStream)writer.BaseStream).Flush(true);
+            }
+            File.Move(tempPath, path, true);
+        }
+
+        private void CloseWriters()
+        {
+            FlushLocked();
+            _itemsWriter?.Dispose();
+            _itemsWriter = null;
+            _attachmentsWriter?.Dispose();
+            _attachmentsWriter = null;
+            _uploadsWriter?.Dispose();
+            _uploadsWriter = null;
+        }
+
+        public void Dispose()
+        {
+            lock (_syncRoot)
+            {
+                CloseWriters();
+            }
         }
 
         public bool IsItemMigrated(string originId, int rev)
         {
-            if (!ProcessedRevisions.TryGetValue(originId, out (int, int) migrationResult))
-                return false;
+            (int, int) migrationResult;
+            lock (_syncRoot)
+            {
+                if (!ProcessedRevisions.TryGetValue(originId, out migrationResult))
+                    return false;
+            }
             (_, int migratedRev) = migrationResult;
             return rev <= migratedRev;
         }
 
         public int GetMigratedId(string originId)
         {
-            if (!ProcessedRevisions.TryGetValue(originId, out (int, int) migrationResult))
-                return -1;
+            (int, int) migrationResult;
+            lock (_syncRoot)
+            {
+                if (!ProcessedRevisions.TryGetValue(originId, out migrationResult))
+                    return -1;
+            }
             (int wiId, _) = migrationResult;
 
             return wiId;
@@ -116,7 +398,10 @@ namespace Migration.Common
 
         public bool IsAttachmentMigrated(string attOriginId, out string attWiId)
         {
-            return ProcessedAttachments.TryGetValue(attOriginId, out attWiId);
+            lock (_syncRoot)
+            {
+                return ProcessedAttachments.TryGetValue(attOriginId, out attWiId);
+            }
         }
     }
 }
\ No newline at end of file
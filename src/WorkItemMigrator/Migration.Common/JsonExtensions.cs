@@ -22,6 +22,31 @@ namespace Migration.Common
             return value.Value<T>();
         }
 
+        // Plain property lookup without parsing a JSONPath, for values that are read for every item
+        public static JToken ExProperty(this JToken token, params string[] propertyNames)
+        {
+            if (token == null)
+                throw new ArgumentNullException(nameof(token));
+
+            foreach (var propertyName in propertyNames)
+            {
+                token = (token as JObject)?[propertyName];
+                if (token == null)
+                    return null;
+            }
+            return token;
+        }
+
+        public static T ExPropertyValue<T>(this JToken token, params string[] propertyNames)
+        {
+            var value = token.ExProperty(propertyNames);
+
+            if (value == null)
+                return default;
+
+            return value.Value<T>();
+        }
+
         public static IEnumerable<T> GetValues<T>(this JToken token, string path)
         {
             if (token == null)
@@ -17,8 +17,11 @@ namespace Migration.Common
         public string MigrationWorkspace { get; internal set; }
         public LogLevel LogLevel { get; internal set; }
         public bool ForceFresh { get; internal set; }
+        public int JournalFlushInterval { get; internal set; }
+        public bool JournalSyncToDisk { get; internal set; }
         public Journal Journal { get; internal set; }
         public WiItemProvider Provider { get; private set; }
+        public WiItemCache ItemCache { get; private set; }
 
         private MigrationContext(string app, ConfigJson config, string logLevel, bool forceFresh)
         {
@@ -29,6 +32,8 @@ namespace Migration.Common
             UserMapping = UserMapper.ParseUserMappings(UserMappingPath);
             LogLevel = Logger.GetLogLevelFromString(logLevel);
             ForceFresh = forceFresh;
+            JournalFlushInterval = config.JournalFlushInterval;
+            JournalSyncToDisk = config.JournalSyncToDisk;
         }
 
         public static MigrationContext Init(string app, ConfigJson config, string logLevel, bool forceFresh, string continueOnCritical)
@@ -38,7 +43,8 @@ namespace Migration.Common
             Logger.Init(app, config.Workspace, logLevel, continueOnCritical);
 
             Instance.Journal = Journal.Init(Instance);
-            Instance.Provider = new WiItemProvider(Instance.MigrationWorkspace);
+            Instance.Provider = new WiItemProvider(Instance.MigrationWorkspace, config.IndentItemFiles, config.CompressItemFiles, config.PackItemFiles);
+            Instance.ItemCache = new WiItemCache(config.ItemCacheSize);
 
             if (!Directory.Exists(Instance.AttachmentsPath))
                 Directory.CreateDirectory(Instance.AttachmentsPath);
@@ -46,9 +52,10 @@ namespace Migration.Common
             return Instance;
         }
 
+        // Items are shared through the item cache, the migrated ids are refreshed from the journal on every call
         public WiItem GetItem(string originId)
         {
-            var item = this.Provider.Load(originId);
+            var item = this.ItemCache.GetOrAdd(originId, this.Provider.Load);
             item.WiId = Journal.GetMigratedId(originId);
             foreach (var link in item.Revisions.SelectMany(r => r.Links))
             {
@@ -59,6 +66,12 @@ namespace Migration.Common
             return item;
         }
 
+        // Drops the cached item, the next call to GetItem reads it again
+        public void EvictItem(string originId)
+        {
+            this.ItemCache.Remove(originId);
+        }
+
         public IEnumerable<WiItem> EnumerateAllItems()
         {
             var result = new List<WiItem>();
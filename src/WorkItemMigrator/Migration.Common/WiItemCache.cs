@@ -0,0 +1,83 @@
+﻿using Migration.WIContract;
+using System;
+using System.Collections.Generic;
+using System.Threading;
+
+namespace Migration.Common
+{
+    // Keeps the most recently used items in memory, so an item is not read and deserialized again
+    // for every revision imported. The least recently used item is evicted when the cache is full.
+    public class WiItemCache
+    {
+        private readonly Dictionary<string, LinkedListNode<KeyValuePair<string, WiItem>>> _nodes = new Dictionary<string, LinkedListNode<KeyValuePair<string, WiItem>>>();
+        private readonly LinkedList<KeyValuePair<string, WiItem>> _recentlyUsed = new LinkedList<KeyValuePair<string, WiItem>>();
+        private readonly object _syncRoot = new object();
+        private long _hits;
+        private long _misses;
+        private long _evictions;
+
+        // A capacity of 0 disables the cache
+        public WiItemCache(int capacity)
+        {
+            Capacity = Math.Max(0, capacity);
+        }
+
+        public int Capacity { get; }
+        public long Hits { get { return Interlocked.Read(ref _hits); } }
+        public long Misses { get { return Interlocked.Read(ref _misses); } }
+        public long Evictions { get { return Interlocked.Read(ref _evictions); } }
+        public int Count { get { lock (_syncRoot) { return _nodes.Count; } } }
+
+        public WiItem GetOrAdd(string originId, Func<string, WiItem> load)
+        {
+            if (load == null)
+                throw new ArgumentNullException(nameof(load));
+
+            lock (_syncRoot)
+            {
+                if (_nodes.TryGetValue(originId, out var node))
+                {
+                    _recentlyUsed.Remove(node);
+                    _recentlyUsed.AddFirst(node);
+                    Interlocked.Increment(ref _hits);
+                    return node.Value.Value;
+                }
+            }
+
+            // Loaded outside the lock, so items of other work items can be read in parallel
+            var item = load(originId);
+            Interlocked.Increment(ref _misses);
+
+            if (Capacity == 0)
+                return item;
+
+            lock (_syncRoot)
+            {
+                // Another thread loaded the same item meanwhile, everyone shares the cached instance
+                if (_nodes.TryGetValue(originId, out var node))
+                    return node.Value.Value;
+
+                _nodes[originId] = _recentlyUsed.AddFirst(new KeyValuePair<string, WiItem>(originId, item));
+                while (_nodes.Count > Capacity)
+                {
+                    _nodes.Remove(_recentlyUsed.Last.Value.Key);
+                    _recentlyUsed.RemoveLast();
+                    Interlocked.Increment(ref _evictions);
+                }
+            }
+            return item;
+        }
+
+        public void Remove(string originId)
+        {
+            lock (_syncRoot)
+            {
+                if (_nodes.TryGetValue(originId, out var node))
+                {
+                    _recentlyUsed.Remove(node);
+                    _nodes.Remove(originId);
+                }
+            }
+        }
+    }
+}
@@ -0,0 +1,149 @@
+﻿using System;
+using System.IO;
+
+namespace Migration.WIContract
+{
+    // Cleans up the escape sequences of an item file while it is read, so the file does not have to
+    // be read into memory first. Escaped unicode sequences (\\uXXXX) are removed and the escape
+    // character (\u001b) is replaced with a new line.
+    internal class JsonEscapeFilterReader : TextReader
+    {
+        private const string EscapeCharacterSequence = "\\u001b";
+        private const int UnicodeSequenceLength = 7;
+
+        private readonly TextReader _reader;
+        private readonly char[] _buffer;
+        private readonly char[] _single = new char[1];
+        private int _position;
+        private int _length;
+        private bool _endOfInput;
+
+        public JsonEscapeFilterReader(TextReader reader, int bufferSize = 16 * 1024)
+        {
+            _reader = reader ?? throw new ArgumentNullException(nameof(reader));
+            _buffer = new char[Math.Max(bufferSize, UnicodeSequenceLength)];
+        }
+
+        public bool RemovedUnicodeSequences { get; private set; }
+
+        public override int Read()
+        {
+            return Read(_single, 0, 1) == 0 ? -1 : _single[0];
+        }
+
+        public override int Read(char[] buffer, int index, int count)
+        {
+            int written = 0;
+            while (written < count)
+            {
+                if (_length - _position < UnicodeSequenceLength && !_endOfInput)
+                    Fill();
+                if (_position == _length)
+                    break;
+
+                if (_buffer[_position] != '\\')
+                {
+                    // Copy everything up to the next escape sequence at once
+                    var available = Math.Min(count - written, _length - _position);
+                    var next = Array.IndexOf(_buffer, '\\', _position, available);
+                    var run = next < 0 ? available : next - _position;
+                    Array.Copy(_buffer, _position, buffer, index + written, run);
+                    _position += run;
+                    written += run;
+                }
+                else if (IsUnicodeSequence())
+                {
+                    _position += UnicodeSequenceLength;
+                    SkipUnicodeSequenceDigits();
+                    RemovedUnicodeSequences = true;
+                }
+                else if (IsEscapeCharacterSequence())
+                {
+                    _position += EscapeCharacterSequence.Length;
+                    buffer[index + written++] = '\n';
+                }
+                else
+                {
+                    buffer[index + written++] = '\\';
+                    _position++;
+                }
+            }
+            return written;
+        }
+
+        protected override void Dispose(bool disposing)
+        {
+            if (disposing)
+                _reader.Dispose();
+            base.Dispose(disposing);
+        }
+
+        private void Fill()
+        {
+            if (_position > 0)
+            {
+                Array.Copy(_buffer, _position, _buffer, 0, _length - _position);
+                _length -= _position;
+                _position = 0;
+            }
+
+            while (_length < UnicodeSequenceLength && !_endOfInput)
+            {
+                var read = _reader.Read(_buffer, _length, _buffer.Length - _length);
+                if (read == 0)
+                    _endOfInput = true;
+                _length += read;
+            }
+        }
+
+        // \\ followed by u and at least four characters in the range 0-F
+        private bool IsUnicodeSequence()
+        {
+            if (_length - _position < UnicodeSequenceLength || _buffer[_position + 1] != '\\' || _buffer[_position + 2] != 'u')
+                return false;
+
+            for (int i = 3; i < UnicodeSequenceLength; i++)
+            {
+                if (!IsUnicodeSequenceDigit(_buffer[_position + i]))
+                    return false;
+            }
+            return true;
+        }
+
+        private bool IsEscapeCharacterSequence()
+        {
+            if (_length - _position < EscapeCharacterSequence.Length)
+                return false;
+
+            for (int i = 1; i < EscapeCharacterSequence.Length; i++)
+            {
+                if (_buffer[_position + i] != EscapeCharacterSequence[i])
+                    return false;
+            }
+            return true;
+        }
+
+        private void SkipUnicodeSequenceDigits()
+        {
+            while (true)
+            {
+                if (_position == _length)
+                {
+                    if (_endOfInput)
+                        return;
+                    Fill();
+                    continue;
+                }
+
+                if (!IsUnicodeSequenceDigit(_buffer[_position]))
+                    return;
+                _position++;
+            }
+        }
+
+        private static bool IsUnicodeSequenceDigit(char c)
+        {
+            return c >= '0' && c <= 'F';
+        }
+    }
+}
@@ -0,0 +1,371 @@
+﻿using Migration.Common.Log;
+using Newtonsoft.Json;
+using System;
+using System.Collections.Generic;
+using System.IO;
+using System.Linq;
+using System.Text;
+
+namespace Migration.WIContract
+{
+    // Keeps all items of a workspace in one file, one item per line, instead of one file per item.
+    // An index file next to it holds the position of every item and a summary of its revisions, so
+    // an item is read without scanning the pack and the execution plan is built from the index alone.
+    // Saved items are appended, the last saved version of an item is used.
+    public class WiItemPack
+    {
+        public const string FileName = "items.ndjson";
+        public const string IndexFileName = "items.ndjson.idx";
+
+        private const int BufferSize = 64 * 1024;
+        private static readonly byte[] IndexHeader = Encoding.ASCII.GetBytes("WIPACK");
+        private const byte IndexFormatVersion = 1;
+
+        // The pack is read from an offset, the content after the item is not checked
+        private static readonly JsonSerializer LoadSerializer = JsonSerializer.CreateDefault(new JsonSerializerSettings() { NullValueHandling = NullValueHandling.Ignore });
+        private static readonly JsonSerializer SaveSerializer = JsonSerializer.CreateDefault();
+
+        private readonly Dictionary<string, WiItemPackEntry> _entries = new Dictionary<string, WiItemPackEntry>();
+        private readonly object _syncRoot = new object();
+        private long _indexLength;
+
+        public WiItemPack(string itemsDir)
+        {
+            PackPath = Path.Combine(itemsDir, FileName);
+            IndexPath = Path.Combine(itemsDir, IndexFileName);
+            LoadIndex();
+        }
+
+        public string PackPath { get; }
+        public string IndexPath { get; }
+
+        public static bool Exists(string itemsDir)
+        {
+            return File.Exists(Path.Combine(itemsDir, FileName));
+        }
+
+        // The items in the order they were saved
+        public IReadOnlyList<WiItemPackEntry> Entries
+        {
+            get
+            {
+                lock (_syncRoot)
+                {
+                    return _entries.Values.OrderBy(e => e.Offset).ToList();
+                }
+            }
+        }
+
+        // Size of the item versions that were saved again later
+        public long SupersededLength
+        {
+            get
+            {
+                lock (_syncRoot)
+                {
+                    var packLength = File.Exists(PackPath) ? new FileInfo(PackPath).Length : 0;
+                    return packLength - _entries.Values.Sum(e => e.Length + 1);
+                }
+            }
+        }
+
+        public bool Contains(string originId)
+        {
+            lock (_syncRoot)
+            {
+                return _entries.ContainsKey(originId);
+            }
+        }
+
+        public WiItem Load(string originId)
+        {
+            WiItemPackEntry entry;
+            lock (_syncRoot)
+            {
+                if (!_entries.TryGetValue(originId, out entry))
+                    throw new FileNotFoundException($"Item '{originId}' not found in '{PackPath}'.");
+            }
+
+            using (var stream = new FileStream(PackPath, FileMode.Open, FileAccess.Read, FileShare.ReadWrite, BufferSize))
+            {
+                stream.Position = entry.Offset;
+                return Deserialize(stream);
+            }
+        }
+
+        public void Save(WiItem item)
+        {
+            lock (_syncRoot)
+            {
+                long offset;
+                long length;
+                using (var stream = new FileStream(PackPath, FileMode.Append, FileAccess.Write, FileShare.Read, BufferSize))
+                {
+                    offset = stream.Position;
+                    using (var writer = new StreamWriter(stream, new UTF8Encoding(false), BufferSize, true))
+                    using (var jsonWriter = new JsonTextWriter(writer) { Formatting = Formatting.None })
+                    {
+                        SaveSerializer.Serialize(jsonWriter, item);
+                    }
+                    length = stream.Position - offset;
+                    stream.WriteByte((byte)'\n');
+                }
+
+                AppendToIndex(new[] { CreateEntry(item, offset, length) });
+            }
+        }
+
+        // Rewrites the pack with only the last saved version of every item
+        public void Compact()
+        {
+            lock (_syncRoot)
+            {
+                var entries = _entries.Values.OrderBy(e => e.Offset).ToList();
+                var tempPackPath = PackPath + ".tmp";
+                var compacted = new List<WiItemPackEntry>(entries.Count);
+                using (var source = new FileStream(PackPath, FileMode.Open, FileAccess.Read, FileShare.Read, BufferSize))
+                using (var target = new FileStream(tempPackPath, FileMode.Create, FileAccess.Write, FileShare.None, BufferSize))
+                {
+                    var buffer = new byte[BufferSize];
+                    foreach (var entry in entries)
+                    {
+                        compacted.Add(new WiItemPackEntry(entry.OriginId, target.Position, entry.Length, entry.Revisions));
+                        source.Position = entry.Offset;
+                        for (long remaining = entry.Length + 1; remaining > 0;)
+                        {
+                            var read = source.Read(buffer, 0, (int)Math.Min(buffer.Length, remaining));
+                            if (read == 0)
+                                throw new EndOfStreamException($"Item '{entry.OriginId}' is truncated in '{PackPath}'.");
+                            target.Write(buffer, 0, read);
+                            remaining -= read;
+                        }
+                    }
+                }
+
+                // Without an index the pack is indexed again when it is opened, so an interrupted
+                // compaction leaves either the old or the new pack and never a mismatched index
+                File.Delete(IndexPath);
+                File.Move(tempPackPath, PackPath, true);
+                _entries.Clear();
+                _indexLength = 0;
+                AppendToIndex(compacted);
+            }
+        }
+
+        private static WiItem Deserialize(Stream stream)
+        {
+            using (var filter = new JsonEscapeFilterReader(new StreamReader(stream, Encoding.UTF8, false, BufferSize, true)))
+            using (var reader = new JsonTextReader(filter))
+            {
+                var deserialized = LoadSerializer.Deserialize<WiItem>(reader);
+
+                if (filter.RemovedUnicodeSequences)
+                    Logger.Log(LogLevel.Warning, "Detected unicode characters, removed.");
+
+                foreach (var rev in deserialized.Revisions)
+                    rev.ParentOriginId = deserialized.OriginId;
+
+                return deserialized;
+            }
+        }
+
+        private static WiItemPackEntry CreateEntry(WiItem item, long offset, long length)
+        {
+            var revisions = item.Revisions.Select(r => new WiItemPackRevision(r.Index, r.Time,
+                (r.Links ?? new List<WiLink>()).Select(l => l.TargetOriginId).Where(t => !string.IsNullOrEmpty(t)).Distinct().ToArray())).ToList();
+            return new WiItemPackEntry(item.OriginId, offset, length, revisions);
+        }
+
+        private void LoadIndex()
+        {
+            long indexedLength = 0;
+            if (File.Exists(IndexPath))
+            {
+                using (var reader = new BinaryReader(new FileStream(IndexPath, FileMode.Open, FileAccess.Read, FileShare.Read, BufferSize), Encoding.UTF8))
+                {
+                    if (reader.ReadBytes(IndexHeader.Length).SequenceEqual(IndexHeader) && reader.ReadByte() == IndexFormatVersion)
+                    {
+                        _indexLength = reader.BaseStream.Position;
+                        // An entry cut off by an interrupted save is dropped and written again below
+                        while (TryReadEntry(reader, out var entry))
+                        {
+                            _entries[entry.OriginId] = entry;
+                            indexedLength = Math.Max(indexedLength, entry.Offset + entry.Length + 1);
+                            _indexLength = reader.BaseStream.Position;
+                        }
+                    }
+                    else
+                    {
+                        Logger.Log(LogLevel.Warning, $"Ignoring the item index '{IndexPath}', the file format is not supported.");
+                    }
+                }
+            }
+
+            var packLength = File.Exists(PackPath) ? new FileInfo(PackPath).Length : 0;
+            if (indexedLength > packLength)
+            {
+                Logger.Log(LogLevel.Warning, $"The item index '{IndexPath}' does not match '{PackPath}', rebuilding it.");
+                _entries.Clear();
+                _indexLength = 0;
+                indexedLength = 0;
+            }
+
+            if (indexedLength < packLength)
+            {
+                var entries = ScanPack(indexedLength, packLength, out long end);
+                if (end < packLength)
+                {
+                    // The last item was cut off by an interrupted save
+                    Logger.Log(LogLevel.Warning, $"Removing an incomplete item at the end of '{PackPath}'.");
+                    using (var stream = new FileStream(PackPath, FileMode.Open, FileAccess.Write, FileShare.Read))
+                        stream.SetLength(end);
+                }
+                AppendToIndex(entries);
+            }
+        }
+
+        // Reads the items that are in the pack but not in the index, up to the end of the last line
+        private List<WiItemPackEntry> ScanPack(long from, long to, out long end)
+        {
+            Logger.Log(LogLevel.Info, $"Indexing the items in '{PackPath}'...");
+            var result = new List<WiItemPackEntry>();
+            var lineStart = from;
+            using (var stream = new FileStream(PackPath, FileMode.Open, FileAccess.Read, FileShare.Read, BufferSize, FileOptions.SequentialScan))
+            using (var itemStream = new FileStream(PackPath, FileMode.Open, FileAccess.Read, FileShare.Read, BufferSize))
+            {
+                var buffer = new byte[BufferSize];
+                stream.Position = from;
+                while (stream.Position < to)
+                {
+                    var position = stream.Position;
+                    var read = stream.Read(buffer, 0, (int)Math.Min(buffer.Length, to - position));
+                    if (read == 0)
+                        break;
+
+                    for (int i = 0; i < read; i++)
+                    {
+                        if (buffer[i] != (byte)'\n')
+                            continue;
+
+                        var lineEnd = position + i;
+                        if (lineEnd > lineStart)
+                        {
+                            itemStream.Position = lineStart;
+                            try
+                            {
+                                result.Add(CreateEntry(Deserialize(itemStream), lineStart, lineEnd - lineStart));
+                            }
+                            catch (JsonException ex)
+                            {
+                                Logger.Log(LogLevel.Warning, $"Skipping an unreadable item at offset {lineStart} in '{PackPath}': {ex.Message}");
+                            }
+                        }
+                        lineStart = lineEnd + 1;
+                    }
+                }
+            }
+
+            end = lineStart;
+            return result;
+        }
+
+        private void AppendToIndex(IList<WiItemPackEntry> entries)
+        {
+            using (var stream = new FileStream(IndexPath, FileMode.OpenOrCreate, FileAccess.Write, FileShare.Read, BufferSize))
+            {
+                // Drops the header of an unsupported index or an entry cut off by an interrupted save
+                stream.SetLength(_indexLength);
+                stream.Position = _indexLength;
+                using (var writer = new BinaryWriter(stream, Encoding.UTF8, true))
+                {
+                    if (_indexLength == 0)
+                    {
+                        writer.Write(IndexHeader);
+                        writer.Write(IndexFormatVersion);
+                    }
+
+                    foreach (var entry in entries)
+                    {
+                        WriteEntry(writer, entry);
+                        _entries[entry.OriginId] = entry;
+                    }
+                }
+                _indexLength = stream.Position;
+            }
+        }
+
+        private static void WriteEntry(BinaryWriter writer, WiItemPackEntry entry)
+        {
+            writer.Write(entry.OriginId);
+            writer.Write7BitEncodedInt64(entry.Offset);
+            writer.Write7BitEncodedInt64(entry.Length);
+            writer.Write7BitEncodedInt(entry.Revisions.Count);
+            foreach (var revision in entry.Revisions)
+            {
+                writer.Write7BitEncodedInt(revision.Index);
+                writer.Write(revision.Time.ToBinary());
+                writer.Write7BitEncodedInt(revision.LinkedOriginIds.Count);
+                foreach (var linkedOriginId in revision.LinkedOriginIds)
+                    writer.Write(linkedOriginId);
+            }
+        }
+
+        private static bool TryReadEntry(BinaryReader reader, out WiItemPackEntry entry)
+        {
+            entry = null;
+            try
+            {
+                var originId = reader.ReadString();
+                var offset = reader.Read7BitEncodedInt64();
+                var length = reader.Read7BitEncodedInt64();
+                var revisions = new List<WiItemPackRevision>(reader.Read7BitEncodedInt());
+                for (int i = revisions.Capacity; i > 0; i--)
+                {
+                    var index = reader.Read7BitEncodedInt();
+                    var time = DateTime.FromBinary(reader.ReadInt64());
+                    var linkedOriginIds = new string[reader.Read7BitEncodedInt()];
+                    for (int j = 0; j < linkedOriginIds.Length; j++)
+                        linkedOriginIds[j] = reader.ReadString();
+                    revisions.Add(new WiItemPackRevision(index, time, linkedOriginIds));
+                }
+
+                entry = new WiItemPackEntry(originId, offset, length, revisions);
+                return true;
+            }
+            catch (Exception ex) when (ex is EndOfStreamException || ex is FormatException || ex is ArgumentException)
+            {
+                return false;
+            }
+        }
+    }
+
+    public class WiItemPackEntry
+    {
+        public WiItemPackEntry(string originId, long offset, long length, IReadOnlyList<WiItemPackRevision> revisions)
+        {
+            OriginId = originId;
+            Offset = offset;
+            Length = length;
+            Revisions = revisions;
+        }
+
+        public string OriginId { get; }
+        public long Offset { get; }
+        public long Length { get; }
+        public IReadOnlyList<WiItemPackRevision> Revisions { get; }
+    }
+
+    public class WiItemPackRevision
+    {
+        public WiItemPackRevision(int index, DateTime time, IReadOnlyList<string> linkedOriginIds)
+        {
+            Index = index;
+            Time = time;
+            LinkedOriginIds = linkedOriginIds;
+        }
+
+        public int Index { get; }
+        public DateTime Time { get; }
+        public IReadOnlyList<string> LinkedOriginIds { get; }
+    }
+}
@@ -3,38 +3,59 @@ using Newtonsoft.Json;
 using System;
 using System.Collections.Generic;
 using System.IO;
-using System.Text.RegularExpressions;
+using System.IO.Compression;
+using System.Linq;
+using System.Text;
 
 namespace Migration.WIContract
 {
     public class WiItemProvider
     {
+        private const int BufferSize = 64 * 1024;
+
+        private static readonly JsonSerializer LoadSerializer = CreateLoadSerializer();
+        private static readonly JsonSerializer SaveSerializer = JsonSerializer.CreateDefault();
+
         private readonly string _itemsDir;
 
-        public WiItemProvider(string itemsDir)
+        // Items are kept in a pack when packed is set or a pack already exists in the directory
+        public WiItemProvider(string itemsDir, bool indented = true, bool compressed = false, bool packed = false)
         {
             _itemsDir = itemsDir;
+            Indented = indented;
+            Compressed = compressed;
+            if (packed || WiItemPack.Exists(itemsDir))
+                Pack = new WiItemPack(itemsDir);
         }
 
+        // Formatting of the saved item files, item files are read in either format
+        public bool Indented { get; }
+        public bool Compressed { get; }
+
+        public WiItemPack Pack { get; }
+        public bool IsPacked { get { return Pack != null; } }
+
         public WiItem Load(string originId)
         {
+            if (IsPacked)
+                return Pack.Load(originId);
+
             var path = Path.Combine(_itemsDir, $"{originId}.json");
             return LoadFile(path);
         }
 
         private WiItem LoadFile(string path)
         {
-            var serialized = File.ReadAllText(path);
-
-            if (Regex.Matches(serialized, @"\\\\u[0-F]{4,}").Count > 0)
+            WiItem deserialized;
+            using (var stream = OpenRead(path))
+            using (var filter = new JsonEscapeFilterReader(new StreamReader(stream, Encoding.UTF8, true, BufferSize)))
+            using (var reader = new JsonTextReader(filter))
             {
-                Logger.Log(LogLevel.Warning, "Detected unicode characters, removed.");
-                serialized = Regex.Replace(serialized, @"\\\\u[0-F]{4,}", "");
-            }
+                deserialized = LoadSerializer.Deserialize<WiItem>(reader);
 
-            serialized = serialized.Replace("\\u001b", "\n"); // Clean up Unicode escape characters
-
-            var deserialized = JsonConvert.DeserializeObject<WiItem>(serialized, new JsonSerializerSettings() { NullValueHandling = NullValueHandling.Ignore });
+                if (filter.RemovedUnicodeSequences)
+                    Logger.Log(LogLevel.Warning, "Detected unicode characters, removed.");
+            }
 
             foreach (var rev in deserialized.Revisions)
                 rev.ParentOriginId = deserialized.OriginId;
@@ -44,15 +65,74 @@ namespace Migration.WIContract
 
         public void Save(WiItem item)
         {
+            if (IsPacked)
+            {
+                Pack.Save(item);
+                return;
+            }
+
             string path = Path.Combine(_itemsDir, $"{item.OriginId}.json");
-            var serialized = JsonConvert.SerializeObject(item, Formatting.Indented);
-            File.WriteAllText(path, serialized);
+            using (var file = new FileStream(path, FileMode.Create, FileAccess.Write, FileShare.None, BufferSize))
+            using (var stream = Compressed ? new GZipStream(file, CompressionLevel.Optimal) : (Stream)file)
+            using (var writer = new StreamWriter(stream, new UTF8Encoding(false), BufferSize))
+            using (var jsonWriter = new JsonTextWriter(writer) { Formatting = Indented ? Formatting.Indented : Formatting.None })
+            {
+                SaveSerializer.Serialize(jsonWriter, item);
+            }
+        }
+
+        // Compressed item files are recognized by the gzip header, they keep the .json extension
+        private static Stream OpenRead(string path)
+        {
+            var file = new FileStream(path, FileMode.Open, FileAccess.Read, FileShare.Read, BufferSize, FileOptions.SequentialScan);
+            try
+            {
+                var isCompressed = file.ReadByte() == 0x1f && file.ReadByte() == 0x8b;
+                file.Position = 0;
+                return isCompressed ? new GZipStream(file, CompressionMode.Decompress) : (Stream)file;
+            }
+            catch
+            {
+                file.Dispose();
+                throw;
+            }
+        }
+
+        private static JsonSerializer CreateLoadSerializer()
+        {
+            var serializer = JsonSerializer.CreateDefault(new JsonSerializerSettings() { NullValueHandling = NullValueHandling.Ignore });
+            serializer.CheckAdditionalContent = true;
+            return serializer;
+        }
+
+        public IEnumerable<string> EnumerateOriginIds()
+        {
+            if (IsPacked)
+                return Pack.Entries.Select(e => e.OriginId);
+
+            return Directory.EnumerateFiles(_itemsDir, "*.json").Select(f => Path.GetFileNameWithoutExtension(f));
         }
 
         public IEnumerable<WiItem> EnumerateAllItems()
         {
             var result = new List<WiItem>();
 
+            if (IsPacked)
+            {
+                foreach (var entry in Pack.Entries)
+                {
+                    try
+                    {
+                        result.Add(Pack.Load(entry.OriginId));
+                    }
+                    catch (Exception)
+                    {
+                        Logger.Log(LogLevel.Warning, $"Failed to load '{entry.OriginId}' from '{Pack.PackPath}'.");
+                    }
+                }
+                return result;
+            }
+
             foreach (var filePath in Directory.EnumerateFiles(_itemsDir, "*.json"))
             {
                 try
@@ -3,6 +3,7 @@ using Microsoft.TeamFoundation.Core.WebApi;
 using Microsoft.TeamFoundation.WorkItemTracking.WebApi.Models;
 using Microsoft.VisualStudio.Services.Common;
 using Microsoft.VisualStudio.Services.Operations;
+using Microsoft.VisualStudio.Services.WebApi.Patch.Json;
 using Migration.Common;
 using Migration.Common.Log;
 using Migration.WIContract;
@@ -12,6 +13,7 @@ using System.IO;
 using System.Linq;
 using System.Threading;
 using System.Threading.Tasks;
+using WorkItemImport.WitClient;
 using VsWebApi = Microsoft.VisualStudio.Services.WebApi;
 using WebApi = Microsoft.TeamFoundation.WorkItemTracking.WebApi;
 
@@ -22,14 +24,29 @@ namespace WorkItemImport
         private readonly MigrationContext _context;
         public Settings Settings { get; private set; }
         public VsWebApi.VssConnection RestConnection { get; private set; }
-        public Dictionary<string, int> IterationCache { get; private set; } = new Dictionary<string, int>();
+        public AdoRateLimiter RateLimiter { get; private set; }
+        public Dictionary<string, int> IterationCache { get; private set; } = new Dictionary<string, int>(StringComparer.InvariantCultureIgnoreCase);
         public int RootIteration { get; private set; }
-        public Dictionary<string, int> AreaCache { get; private set; } = new Dictionary<string, int>();
+        public Dictionary<string, int> AreaCache { get; private set; } = new Dictionary<string, int>(StringComparer.InvariantCultureIgnoreCase);
         public int RootArea { get; private set; }
         private readonly Dictionary<string, string> _iterationPathMap = new Dictionary<string, string>();
         private readonly Dictionary<string, string> _areaPathMap = new Dictionary<string, string>();
+        // The mapped node names, ADO classification nodes are case insensitive
+        private readonly HashSet<string> _iterationPathNames = new HashSet<string>(StringComparer.InvariantCultureIgnoreCase);
+        private readonly HashSet<string> _areaPathNames = new HashSet<string>(StringComparer.InvariantCultureIgnoreCase);
 
         private WitClientUtils _witClientUtils;
+        public WorkItemStateCache WorkItemCache { get; private set; }
+        public AttachmentUploader AttachmentUploader { get; private set; }
+        public WorkItemBatchCreator WorkItemCreator { get; private set; }
+
+        // When set, links are resolved from the link graph instead of by reading the linked work items
+        public LinkGraph LinkGraph
+        {
+            get => _witClientUtils.LinkGraph;
+            set => _witClientUtils.LinkGraph = value;
+        }
+
         private WebApi.WorkItemTrackingHttpClient _wiClient;
         public WebApi.WorkItemTrackingHttpClient WiClient
         {
@@ -59,131 +76,55 @@ namespace WorkItemImport
             return _witClientUtils.CreateWorkItem(type, suppressNotifications, createdDate, createdBy);
         }
 
-        public bool ImportRevision(WiRevision rev, WorkItem wi, Settings settings)
+        // The most requests Azure DevOps accepts in one $batch request
+        public const int MaxWorkItemBatchSize = 200;
+
+        // Creates the work items of the first revisions in batches during the import, see WorkItemBatchCreator, and
+        // journals their ids per batch. The first revisions then update the created work items, like the later
+        // revisions do. A work item that could not be created in a batch is created by its first revision.
+        public void PlanWorkItemCreations(IList<(string OriginId, string WiType, DateTime CreatedDate, string CreatedBy)> workItems, int batchSize)
         {
-            var incomplete = false;
-            try
+            var created = 0;
+            WorkItemCreator = new WorkItemBatchCreator(workItems, Math.Clamp(batchSize, 1, MaxWorkItemBatchSize), batch =>
             {
-                if (rev.Index == 0)
-                    _witClientUtils.EnsureClassificationFields(rev);
-
-                _witClientUtils.EnsureDateFields(rev, wi);
-                _witClientUtils.EnsureAuthorFields(rev);
-                _witClientUtils.EnsureAssigneeField(rev, wi);
-                _witClientUtils.EnsureFieldsOnStateChange(rev, wi);
-
-                _witClientUtils.EnsureWorkItemFieldsInitialized(rev, wi);
-
-                var attachmentMap = new Dictionary<string, WiAttachment>();
-                if (rev.Attachments.Any() && !_witClientUtils.ApplyAttachments(rev, wi, attachmentMap, _context.Journal.IsAttachmentMigrated))
-                    incomplete = true;
-
-                if (rev.Fields.Any() && !UpdateWIFields(rev.Fields, wi))
-                    incomplete = true;
-
-                if (rev.Fields.Any() && !UpdateWIHistoryField(rev.Fields, wi))
-                    incomplete = true;
-
-                if (rev.Links.Any() && !ApplyAndSaveLinks(rev, wi, settings))
-                    incomplete = true;
-
-                if (incomplete)
-                    Logger.Log(LogLevel.Warning, $"'{rev}' - not all changes were saved.");
-
-                if (wi.Fields.ContainsKey(WiFieldReference.History) && !string.IsNullOrEmpty(wi.Fields[WiFieldReference.History].ToString()))
-                {
-                    Logger.Log(LogLevel.Debug, $"Correcting comments on '{rev}'.");
-                    _witClientUtils.CorrectComment(wi, _context.GetItem(rev.ParentOriginId), rev, _context.Journal.IsAttachmentMigrated);
-                }
+                created += CreateWorkItems(batch);
+                Logger.Log(LogLevel.Info, $"Created {created}/{workItems.Count} work items ahead of their first revision.");
+            });
+        }
 
-                _witClientUtils.SaveWorkItemAttachments(rev, wi, settings);
+        private int CreateWorkItems(IList<(string OriginId, string WiType, DateTime CreatedDate, string CreatedBy)> batch)
+        {
+            var createdWorkItems = _witClientUtils.CreateWorkItems(
+                batch.Select(w => (w.WiType, (DateTime?)w.CreatedDate, w.CreatedBy)).ToList(), Settings.SuppressNotifications);
+
+            var createdIds = batch
+                .Zip(createdWorkItems, (w, wi) => (w.OriginId, WiId: wi?.Id ?? -1))
+                .Where(w => w.WiId > 0)
+                .ToList();
+            _context.Journal.MarkItemsCreated(createdIds);
+            return createdIds.Count;
+        }
 
-                foreach (string attOriginId in rev.Attachments.Select(wiAtt => wiAtt.AttOriginId))
-                {
-                    if (attachmentMap.TryGetValue(attOriginId, out WiAttachment tfsAtt))
-                        _context.Journal.MarkAttachmentAsProcessed(attOriginId, tfsAtt.AttOriginId);
-                }
+        public bool ImportRevision(WiRevision rev, WorkItem wi, Settings settings)
+        {
+            try
+            {
+                PrepareRevision(rev, wi);
 
-                if (rev.Attachments.Exists(a => a.Change == ReferenceChangeType.Added) && rev.AttachmentReferences)
+                var saved = false;
+                if (settings.CoalesceRevisionUpdates && wi.Id.HasValue && rev.DevelopmentLink == null)
                 {
-                    Logger.Log(LogLevel.Debug, $"Correcting description on separate revision on '{rev}'.");
-
-                    try
-                    {
-                        _witClientUtils.CorrectDescription(wi, _context.GetItem(rev.ParentOriginId), rev, _context.Journal.IsAttachmentMigrated);
-                    }
-                    catch (AttachmentNotFoundException)
-                    {
-                        throw;
-                    }
-                    catch (Exception ex)
+                    saved = ImportRevisionCoalesced(rev, wi, settings);
+                    if (!saved)
                     {
-                        Logger.Log(ex, $"Failed to correct description for '{wi.Id}', rev '{rev}'.");
-                    }
-
-                    if (wi.Fields.ContainsKey(WiFieldReference.AcceptanceCriteria) && !string.IsNullOrEmpty(wi.Fields[WiFieldReference.AcceptanceCriteria].ToString()))
-                    {
-                        Logger.Log(LogLevel.Debug, $"Correcting acceptance criteria on separate revision on '{rev}'.");
-
-                        try
-                        {
-                            _witClientUtils.CorrectAcceptanceCriteria(wi, _context.GetItem(rev.ParentOriginId), rev, _context.Journal.IsAttachmentMigrated);
-                        }
-                        catch (AttachmentNotFoundException)
-                        {
-                            throw;
-                        }
-                        catch (Exception ex)
-                        {
-                            Logger.Log(ex, $"Failed to correct acceptance criteria for '{wi.Id}', rev '{rev}'.");
-                        }
-                    }
-
-                    // Correct other HTMl fields than description
-                    foreach (var field in settings.FieldMap.Fields)
-                    {
-                        if (
-                            field.Mapper == "MapRendered"
-                            && (field.For == "All" || field.For.Split(',').Contains(wi.Fields[WiFieldReference.WorkItemType]))
-                            && (field.NotFor == null || !field.NotFor.Split(',').Contains(wi.Fields[WiFieldReference.WorkItemType]))
-                            && wi.Fields.ContainsKey(field.Target)
-                            && field.Target != WiFieldReference.Description
-                        )
-                        {
-                            try
-                            {
-                                _witClientUtils.CorrectRenderedField(
-                                    wi,
-                                    _context.GetItem(rev.ParentOriginId),
-                                    rev,
-                                    field.Target,
-                                    _context.Journal.IsAttachmentMigrated
-                                );
-                            }
-                            catch (AttachmentNotFoundException)
-                            {
-                                throw;
-                            }
-                            catch (Exception ex)
-                            {
-                                Logger.Log(ex, $"Failed to correct description for '{wi.Id}', rev '{rev}'.");
-                            }
-                        }
+                        // Nothing was saved, the revision is imported again with a separate update per change
+                        Logger.Log(LogLevel.Warning, $"'{rev}' - the combined update was rejected, saving the changes one by one.");
+                        wi = GetWorkItem(wi.Id.Value) ?? throw new MissingFieldException($"Work item {wi.Id} was not found.");
                     }
                 }
 
-                // rev with a development link won't have meaningful information, skip saving fields
-                if (rev.DevelopmentLink != null)
-                {
-                    if (settings.IncludeDevelopmentLinks)
-                    {
-                        _witClientUtils.SaveWorkItemArtifacts(rev, wi, settings);
-                    }
-                }
-                else
-                {
-                    _witClientUtils.SaveWorkItemFields(wi, settings);
-                }
+                if (!saved)
+                    ImportRevisionSeparately(rev, wi, settings);
 
                 if (wi.Id.HasValue)
                 {
@@ -219,27 +160,259 @@ namespace WorkItemImport
             }
         }
 
+        private void PrepareRevision(WiRevision rev, WorkItem wi)
+        {
+            if (rev.Index == 0)
+                _witClientUtils.EnsureClassificationFields(rev);
+
+            _witClientUtils.EnsureDateFields(rev, wi);
+            _witClientUtils.EnsureAuthorFields(rev);
+            _witClientUtils.EnsureAssigneeField(rev, wi);
+            _witClientUtils.EnsureFieldsOnStateChange(rev, wi);
+        }
+
+        private void ImportRevisionSeparately(WiRevision rev, WorkItem wi, Settings settings)
+        {
+            var incomplete = false;
+
+            _witClientUtils.EnsureWorkItemFieldsInitialized(rev, wi);
+
+            var attachmentMap = new Dictionary<string, WiAttachment>();
+            if (rev.Attachments.Any() && !_witClientUtils.ApplyAttachments(rev, wi, attachmentMap, _context.Journal.IsAttachmentMigrated))
+                incomplete = true;
+
+            if (rev.Fields.Any() && !UpdateWIFields(rev.Fields, wi))
+                incomplete = true;
+
+            if (rev.Fields.Any() && !UpdateWIHistoryField(rev.Fields, wi))
+                incomplete = true;
+
+            if (rev.Links.Any() && !ApplyAndSaveLinks(rev, wi, settings))
+                incomplete = true;
+
+            if (incomplete)
+                Logger.Log(LogLevel.Warning, $"'{rev}' - not all changes were saved.");
+
+            var textCorrection = new TextCorrection(this, rev, wi, _context.Journal.IsAttachmentMigrated);
+
+            if (wi.Fields.ContainsKey(WiFieldReference.History) && !string.IsNullOrEmpty(wi.Fields[WiFieldReference.History].ToString()))
+            {
+                Logger.Log(LogLevel.Debug, $"Correcting comments on '{rev}'.");
+                _witClientUtils.CorrectComment(wi, textCorrection.Item, rev, _context.Journal.IsAttachmentMigrated, textCorrection.UrlRewriter);
+            }
+
+            _witClientUtils.SaveWorkItemAttachments(rev, wi, settings);
+
+            foreach (string attOriginId in rev.Attachments.Select(wiAtt => wiAtt.AttOriginId))
+            {
+                if (attachmentMap.TryGetValue(attOriginId, out WiAttachment tfsAtt))
+                    _context.Journal.MarkAttachmentAsProcessed(attOriginId, tfsAtt.AttOriginId);
+            }
+
+            if (rev.Attachments.Exists(a => a.Change == ReferenceChangeType.Added) && rev.AttachmentReferences)
+                CorrectAttachmentReferences(rev, wi, settings, textCorrection);
+
+            // rev with a development link won't have meaningful information, skip saving fields
+            if (rev.DevelopmentLink != null)
+            {
+                if (settings.IncludeDevelopmentLinks)
+                {
+                    _witClientUtils.SaveWorkItemArtifacts(rev, wi, settings);
+                }
+            }
+            else
+            {
+                _witClientUtils.SaveWorkItemFields(wi, settings);
+            }
+        }
+
+        // Builds one update with the fields, links, attachments and corrected texts of the revision.
+        // Only the attachment uploads are separate requests. Returns false when the update was rejected.
+        private bool ImportRevisionCoalesced(WiRevision rev, WorkItem wi, Settings settings)
+        {
+            var incomplete = false;
+            var relationPatchDocument = new JsonPatchDocument();
+
+            _witClientUtils.EnsureWorkItemFieldsInitialized(rev, wi);
+
+            var attachmentMap = new Dictionary<string, WiAttachment>();
+            if (rev.Attachments.Any() && !_witClientUtils.ApplyAttachments(rev, wi, attachmentMap, _context.Journal.IsAttachmentMigrated))
+                incomplete = true;
+
+            if (rev.Fields.Any() && !UpdateWIFields(rev.Fields, wi))
+                incomplete = true;
+
+            if (rev.Fields.Any() && !UpdateWIHistoryField(rev.Fields, wi))
+                incomplete = true;
+
+            if (rev.Links.Any() && !ApplyAndSaveLinks(rev, wi, settings, relationPatchDocument))
+                incomplete = true;
+
+            if (incomplete)
+                Logger.Log(LogLevel.Warning, $"'{rev}' - not all changes were saved.");
+
+            var uploadedAttachments = _witClientUtils.AddWorkItemAttachments(rev, wi, relationPatchDocument);
+
+            // Attachments uploaded for this revision are only journaled once the update is saved
+            bool IsAttachmentMigrated(string attOriginId, out string attWiId)
+            {
+                if (uploadedAttachments.ContainsKey(attOriginId))
+                {
+                    attWiId = attOriginId;
+                    return true;
+                }
+                return _context.Journal.IsAttachmentMigrated(attOriginId, out attWiId);
+            }
+
+            var textCorrection = new TextCorrection(this, rev, wi, IsAttachmentMigrated);
+
+            if (wi.Fields.ContainsKey(WiFieldReference.History) && !string.IsNullOrEmpty(wi.Fields[WiFieldReference.History].ToString()))
+            {
+                Logger.Log(LogLevel.Debug, $"Correcting comments on '{rev}'.");
+                _witClientUtils.CorrectComment(wi, textCorrection.Item, rev, IsAttachmentMigrated, textCorrection.UrlRewriter);
+            }
+
+            if (rev.Attachments.Exists(a => a.Change == ReferenceChangeType.Added) && rev.AttachmentReferences)
+                CorrectAttachmentReferences(rev, wi, settings, textCorrection);
+
+            // The relations used to be saved with the time of the revision, the combined update takes that time
+            if (relationPatchDocument.Any()
+                && wi.Fields.TryGetValue(WiFieldReference.ChangedDate, out object changedDate)
+                && changedDate is DateTime currentChangedDate
+                && currentChangedDate.ToUniversalTime() < rev.Time.ToUniversalTime())
+            {
+                wi.Fields[WiFieldReference.ChangedDate] = rev.Time;
+            }
+
+            if (!_witClientUtils.SaveWorkItemFields(wi, settings, relationPatchDocument))
+                return false;
+
+            foreach (var attachment in uploadedAttachments.Values)
+                _context.Journal.MarkAttachmentAsProcessed(attachment.AttOriginId, attachment.AttOriginId);
+
+            return true;
+        }
+
+        // The item of a revision and the attachment URLs in it are read once, for all the texts that are corrected
+        private class TextCorrection
+        {
+            private readonly Agent _agent;
+            private readonly WiRevision _rev;
+            private readonly WorkItem _wi;
+            private WiItem _item;
+            private AttachmentUrlRewriter _urlRewriter;
+
+            public TextCorrection(Agent agent, WiRevision rev, WorkItem wi, WitClientUtils.IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigrated)
+            {
+                _agent = agent;
+                _rev = rev;
+                _wi = wi;
+                IsAttachmentMigrated = isAttachmentMigrated;
+            }
+
+            public WitClientUtils.IsAttachmentMigratedDelegate<string, string, bool> IsAttachmentMigrated { get; }
+            public WiItem Item => _item ??= _agent._context.GetItem(_rev.ParentOriginId);
+            public AttachmentUrlRewriter UrlRewriter => _urlRewriter ??= _agent._witClientUtils.CreateAttachmentUrlRewriter(_wi, Item, IsAttachmentMigrated);
+        }
+
+        private void CorrectAttachmentReferences(WiRevision rev, WorkItem wi, Settings settings, TextCorrection textCorrection)
+        {
+            var isAttachmentMigrated = textCorrection.IsAttachmentMigrated;
+
+            Logger.Log(LogLevel.Debug, $"Correcting description on separate revision on '{rev}'.");
+
+            try
+            {
+                _witClientUtils.CorrectDescription(wi, textCorrection.Item, rev, isAttachmentMigrated, textCorrection.UrlRewriter);
+            }
+            catch (AttachmentNotFoundException)
+            {
+                throw;
+            }
+            catch (Exception ex)
+            {
+                Logger.Log(ex, $"Failed to correct description for '{wi.Id}', rev '{rev}'.");
+            }
+
+            if (wi.Fields.ContainsKey(WiFieldReference.AcceptanceCriteria) && !string.IsNullOrEmpty(wi.Fields[WiFieldReference.AcceptanceCriteria].ToString()))
+            {
+                Logger.Log(LogLevel.Debug, $"Correcting acceptance criteria on separate revision on '{rev}'.");
+
+                try
+                {
+                    _witClientUtils.CorrectAcceptanceCriteria(wi, textCorrection.Item, rev, isAttachmentMigrated, textCorrection.UrlRewriter);
+                }
+                catch (AttachmentNotFoundException)
+                {
+                    throw;
+                }
+                catch (Exception ex)
+                {
+                    Logger.Log(ex, $"Failed to correct acceptance criteria for '{wi.Id}', rev '{rev}'.");
+                }
+            }
+
+            // Correct other HTMl fields than description
+            foreach (var field in settings.FieldMap.Fields)
+            {
+                if (
+                    field.Mapper == "MapRendered"
+                    && (field.For == "All" || field.For.Split(',').Contains(wi.Fields[WiFieldReference.WorkItemType]))
+                    && (field.NotFor == null || !field.NotFor.Split(',').Contains(wi.Fields[WiFieldReference.WorkItemType]))
+                    && wi.Fields.ContainsKey(field.Target)
+                    && field.Target != WiFieldReference.Description
+                )
+                {
+                    try
+                    {
+                        _witClientUtils.CorrectRenderedField(
+                            wi,
+                            textCorrection.Item,
+                            rev,
+                            field.Target,
+                            isAttachmentMigrated,
+                            textCorrection.UrlRewriter
+                        );
+                    }
+                    catch (AttachmentNotFoundException)
+                    {
+                        throw;
+                    }
+                    catch (Exception ex)
+                    {
+                        Logger.Log(ex, $"Failed to correct description for '{wi.Id}', rev '{rev}'.");
+                    }
+                }
+            }
+        }
+
         #region Static
-        internal static Agent Initialize(MigrationContext context, Settings settings)
+        internal static async Task<Agent> InitializeAsync(MigrationContext context, Settings settings)
         {
-            var restConnection = EstablishRestConnection(settings);
+            // The same rate limiter paces every connection to Azure DevOps
+            var rateLimiter = new AdoRateLimiter();
+            var restConnection = EstablishRestConnection(settings, rateLimiter);
             if (restConnection == null)
                 return null;
 
-            var agent = new Agent(context, settings, restConnection);
+            var agent = new Agent(context, settings, restConnection) { RateLimiter = rateLimiter };
 
-            var witClientWrapper = new WitClientWrapper(settings.Account, settings.Project, settings.Pat, settings.ChangedDateBumpMS);
+            var witClientWrapper = new WitClientWrapper(settings.Account, settings.Project, settings.Pat, settings.ChangedDateBumpMS, settings.WorkItemCacheSize,
+                settings.MaxConnectionsPerServer, rateLimiter, settings.MaxThrottlingRetries);
             agent._witClientUtils = new WitClientUtils(witClientWrapper);
+            agent.WorkItemCache = witClientWrapper.WorkItemCache;
+            agent.AttachmentUploader = new AttachmentUploader(witClientWrapper, context.Journal);
+            agent._witClientUtils.AttachmentUploader = agent.AttachmentUploader;
 
             // check if projects exists, if not create it
-            var project = agent.GetOrCreateProjectAsync().Result;
+            var project = await agent.GetOrCreateProjectAsync();
             if (project == null)
             {
                 Logger.Log(LogLevel.Critical, "Could not establish connection to the remote Azure DevOps/TFS project.");
                 return null;
             }
 
-            (var iterationCache, int rootIteration) = agent.CreateClasificationCacheAsync(settings.Project, TreeStructureGroup.Iterations).Result;
+            (var iterationCache, int rootIteration) = await agent.CreateClasificationCacheAsync(settings.Project, TreeStructureGroup.Iterations);
             if (iterationCache == null)
             {
                 Logger.Log(LogLevel.Critical, "Could not build iteration cache.");
@@ -249,7 +422,7 @@ namespace WorkItemImport
             agent.IterationCache = iterationCache;
             agent.RootIteration = rootIteration;
 
-            (var areaCache, int rootArea) = agent.CreateClasificationCacheAsync(settings.Project, TreeStructureGroup.Areas).Result;
+            (var areaCache, int rootArea) = await agent.CreateClasificationCacheAsync(settings.Project, TreeStructureGroup.Areas);
             if (areaCache == null)
             {
                 Logger.Log(LogLevel.Critical, "Could not build area cache.");
@@ -262,14 +435,12 @@ namespace WorkItemImport
             return agent;
         }
 
-        private static VsWebApi.VssConnection EstablishRestConnection(Settings settings)
+        private static VsWebApi.VssConnection EstablishRestConnection(Settings settings, AdoRateLimiter rateLimiter)
         {
             try
             {
                 Logger.Log(LogLevel.Info, "Connecting to Azure DevOps/TFS...");
-                var credentials = new VssBasicCredential("", settings.Pat);
-                var uri = new Uri(settings.Account);
-                return new VsWebApi.VssConnection(uri, credentials);
+                return WitClientWrapper.CreateConnection(settings.Account, settings.Pat, settings.MaxConnectionsPerServer, rateLimiter, settings.MaxThrottlingRetries);
             }
             catch (Exception ex)
             {
@@ -321,7 +492,7 @@ namespace WorkItemImport
 
             // Setup process properties       
             ProcessHttpClient processClient = RestConnection.GetClient<ProcessHttpClient>();
-            Guid processId = processClient.GetProcessesAsync().Result.Find(process => { return process.Name.Equals(processName, StringComparison.InvariantCultureIgnoreCase); }).Id;
+            Guid processId = (await processClient.GetProcessesAsync()).Find(process => { return process.Name.Equals(processName, StringComparison.InvariantCultureIgnoreCase); }).Id;
 
             Dictionary<string, string> processProperaties = new Dictionary<string, string>
             {
@@ -356,16 +527,16 @@ namespace WorkItemImport
                 OperationReference operation = await projectClient.QueueCreateProject(projectCreateParameters);
 
                 // Check the operation status every 5 seconds (for up to 30 seconds)
-                Operation completedOperation = WaitForLongRunningOperation(operation.Id, 5, 30).Result;
+                Operation completedOperation = await WaitForLongRunningOperation(operation.Id, 5, 30);
 
                 // Check if the operation succeeded (the project was created) or failed
                 if (completedOperation.Status == OperationStatus.Succeeded)
                 {
                     // Get the full details about the newly created project
-                    project = projectClient.GetProject(
+                    project = await projectClient.GetProject(
                         projectCreateParameters.Name,
                         includeCapabilities: true,
-                        includeHistory: true).Result;
+                        includeHistory: true);
 
                     Logger.Log(LogLevel.Info, $"Project created (ID: {project.Id})");
                 }
@@ -419,7 +590,7 @@ namespace WorkItemImport
                 Logger.Log(LogLevel.Info, $"Building {(structureGroup == TreeStructureGroup.Iterations ? "iteration" : "area")} cache...");
                 WorkItemClassificationNode all = await WiClient.GetClassificationNodeAsync(project, structureGroup, null, 1000);
 
-                var clasificationCache = new Dictionary<string, int>();
+                var clasificationCache = new Dictionary<string, int>(StringComparer.InvariantCultureIgnoreCase);
 
                 if (all.Children != null && all.Children.Any())
                 {
@@ -469,12 +640,12 @@ namespace WorkItemImport
 
             if (structureGroup == TreeStructureGroup.Iterations)
             {
-                nameMapped = GetMappedClassificationNodePath(_iterationPathMap, name);
+                nameMapped = GetMappedClassificationNodePath(_iterationPathMap, _iterationPathNames, name);
                 fullNameMapped = parent.IsNullOrEmpty() ? nameMapped : $"{parent}/{nameMapped}";
             }
             else if (structureGroup == TreeStructureGroup.Areas)
             {
-                nameMapped = GetMappedClassificationNodePath(_areaPathMap, name);
+                nameMapped = GetMappedClassificationNodePath(_areaPathMap, _areaPathNames, name);
                 fullNameMapped = parent.IsNullOrEmpty() ? nameMapped : $"{parent}/{nameMapped}";
             }
             else
@@ -492,31 +663,172 @@ namespace WorkItemImport
                 if (cache.TryGetValue(fullNameMapped, out int id))
                     return fullNameMapped;
 
-                WorkItemClassificationNode node = null;
+                var node = CreateClassificationNode(nameMapped, parent, fullNameMapped, structureGroup);
+                if (node != null)
+                {
+                    cache.Add(fullNameMapped, node.Id);
+                    return fullNameMapped;
+                }
+            }
+            return null;
+        }
+
+        private WorkItemClassificationNode CreateClassificationNode(string nameMapped, string parent, string fullNameMapped, TreeStructureGroup structureGroup)
+        {
+            try
+            {
+                var node = WiClient.CreateOrUpdateClassificationNodeAsync(
+                    new WorkItemClassificationNode() { Name = nameMapped, }, Settings.Project, structureGroup, parent).Result;
+                Logger.Log(LogLevel.Debug, $"{(structureGroup == TreeStructureGroup.Iterations ? "Iteration" : "Area")} '{fullNameMapped}' added to Azure DevOps/TFS.");
+                return node;
+            }
+            catch (Exception ex)
+            {
+                Logger.Log(ex, $"Error while adding {(structureGroup == TreeStructureGroup.Iterations ? "iteration" : "area")} '{fullNameMapped}' to Azure DevOps/TFS.", LogLevel.Warning);
+                return null;
+            }
+        }
+
+        // Creates the missing nodes of the given paths before the revisions are imported, so the revisions
+        // find every node in the cache. The tree is created one level at a time, the nodes of a level are
+        // created concurrently. The paths are given in the order of the import, node names are mapped in
+        // the same order as EnsureClasification would map them.
+        public void EnsureClassifications(IEnumerable<(TreeStructureGroup StructureGroup, string Path)> paths, int parallelism)
+        {
+            foreach (var group in paths.GroupBy(p => p.StructureGroup))
+            {
+                var structureGroup = group.Key;
+                var map = structureGroup == TreeStructureGroup.Iterations ? _iterationPathMap : _areaPathMap;
+                var names = structureGroup == TreeStructureGroup.Iterations ? _iterationPathNames : _areaPathNames;
+                var cache = structureGroup == TreeStructureGroup.Iterations ? IterationCache : AreaCache;
+
+                var levels = new List<List<(string Name, string Parent, string FullName)>>();
+                var added = new HashSet<string>(StringComparer.InvariantCultureIgnoreCase);
+                foreach (var path in group.Select(p => p.Path))
+                {
+                    var pathSplit = path.Split('/');
+                    for (int level = pathSplit.Length - 1; level >= 0; level--)
+                    {
+                        var parent = string.Join("/", pathSplit.Take(level));
+                        var nameMapped = GetMappedClassificationNodePath(map, names, pathSplit[level]);
+                        var fullNameMapped = parent.IsNullOrEmpty() ? nameMapped : $"{parent}/{nameMapped}";
+
+                        bool cached;
+                        lock (cache)
+                        {
+                            cached = cache.ContainsKey(fullNameMapped);
+                        }
+                        if (cached || !added.Add(fullNameMapped))
+                            continue;
 
+                        while (levels.Count <= level)
+                            levels.Add(new List<(string, string, string)>());
+                        levels[level].Add((nameMapped, parent, fullNameMapped));
+                    }
+                }
+
+                var count = levels.Sum(l => l.Count);
+                if (count == 0)
+                    continue;
+
+                Logger.Log(LogLevel.Info, $"Creating {count} {(structureGroup == TreeStructureGroup.Iterations ? "iterations" : "areas")} in {levels.Count(l => l.Count > 0)} levels...");
+                var options = new ParallelOptions { MaxDegreeOfParallelism = Math.Max(1, parallelism) };
+                foreach (var nodes in levels)
+                {
+                    Parallel.ForEach(nodes, options, node =>
+                    {
+                        var created = CreateClassificationNode(node.Name, node.Parent, node.FullName, structureGroup);
+                        if (created != null)
+                        {
+                            lock (cache)
+                            {
+                                cache[node.FullName] = created.Id;
+                            }
+                        }
+                    });
+                }
+            }
+        }
+
+        // The area and iteration paths of the revisions, in the order of the plan
+        public static List<(TreeStructureGroup StructureGroup, string Path)> GetClassificationPaths(
+            IEnumerable<RevisionReference> plan, Func<string, WiItem> loadItem, string baseAreaPath, string baseIterationPath)
+        {
+            var revisionsByItem = plan
+                .Select((revRef, position) => (revRef, position))
+                .GroupBy(r => r.revRef.OriginId);
+
+            var found = new List<(int Position, int Order, TreeStructureGroup StructureGroup, string Path)>();
+            foreach (var revisions in revisionsByItem)
+            {
+                WiItem item;
                 try
                 {
-                    node = WiClient.CreateOrUpdateClassificationNodeAsync(
-                        new WorkItemClassificationNode() { Name = nameMapped, }, Settings.Project, structureGroup, parent).Result;
+                    item = loadItem(revisions.Key);
                 }
                 catch (Exception ex)
                 {
-                    Logger.Log(ex, $"Error while adding {(structureGroup == TreeStructureGroup.Iterations ? "iteration" : "area")} '{fullNameMapped}' to Azure DevOps/TFS.", LogLevel.Warning);
+                    Logger.Log(LogLevel.Debug, $"Could not read item '{revisions.Key}' to create its areas and iterations ahead: {ex.Message}");
+                    continue;
                 }
 
-                if (node != null)
+                foreach (var (revRef, position) in revisions)
                 {
-                    Logger.Log(LogLevel.Debug, $"{(structureGroup == TreeStructureGroup.Iterations ? "Iteration" : "Area")} '{fullNameMapped}' added to Azure DevOps/TFS.");
-                    cache.Add(fullNameMapped, node.Id);
-                    return fullNameMapped;
+                    if (revRef.RevIndex < 0 || revRef.RevIndex >= item.Revisions.Count)
+                        continue;
+
+                    var order = 0;
+                    foreach (var field in item.Revisions[revRef.RevIndex].Fields ?? new List<WiField>())
+                    {
+                        if (field.ReferenceName.Equals(WiFieldReference.IterationPath, StringComparison.InvariantCultureIgnoreCase))
+                        {
+                            var iterationPath = GetClassificationPath(baseIterationPath, field.Value);
+                            if (!string.IsNullOrWhiteSpace(iterationPath))
+                                found.Add((position, order++, TreeStructureGroup.Iterations, iterationPath));
+                        }
+                        else if (field.ReferenceName.Equals(WiFieldReference.AreaPath, StringComparison.InvariantCultureIgnoreCase))
+                        {
+                            var areaPath = GetClassificationPath(baseAreaPath, field.Value);
+                            if (!string.IsNullOrWhiteSpace(areaPath))
+                                found.Add((position, order++, TreeStructureGroup.Areas, areaPath));
+                        }
+                    }
                 }
             }
-            return null;
+
+            return found
+                .OrderBy(f => f.Position).ThenBy(f => f.Order)
+                .Select(f => (f.StructureGroup, f.Path))
+                .Distinct()
+                .ToList();
+        }
+
+        private static string GetClassificationPath(string basePath, object fieldValue)
+        {
+            var path = basePath;
+
+            if (!string.IsNullOrWhiteSpace((string)fieldValue))
+            {
+                if (string.IsNullOrWhiteSpace(path))
+                    path = (string)fieldValue;
+                else
+                    path = string.Join("/", path, (string)fieldValue);
+            }
+
+            return path;
         }
 
         // Ensure that classification nodes with conflicting names in ADO are migrated with unique names.
         // ADO Classification nodes are case insensitive
-        private string GetMappedClassificationNodePath(Dictionary<string, string> dictionary, string name)
+        private string GetMappedClassificationNodePath(Dictionary<string, string> dictionary, HashSet<string> mappedNames, string name)
+        {
+            lock (dictionary)
+            {
+                return GetMappedClassificationNodePathLocked(dictionary, mappedNames, name);
+            }
+        }
+
+        private string GetMappedClassificationNodePathLocked(Dictionary<string, string> dictionary, HashSet<string> mappedNames, string name)
         {
             if (!dictionary.ContainsKey(name))
             {
@@ -525,7 +837,7 @@ namespace WorkItemImport
                 int suffix = 0;
                 while (!newSprintNameInIterationPathCaseInvariant)
                 {
-                    if (!DictionaryContainsValueCaseInvariant(dictionary, nameUpdated))
+                    if (mappedNames.Add(nameUpdated))
                     {
                         newSprintNameInIterationPathCaseInvariant = true;
                         dictionary[name] = nameUpdated;
@@ -538,18 +850,6 @@ namespace WorkItemImport
             return name;
         }
 
-        private bool DictionaryContainsValueCaseInvariant(Dictionary<string, string> dictionary, string name)
-        {
-            foreach (var value in dictionary.Values)
-            {
-                if (value.ToLower() == name.ToLower())
-                {
-                    return true;
-                }
-            }
-            return false;
-        }
-
 
         #endregion
 
@@ -580,15 +880,7 @@ namespace WorkItemImport
                     {
                         case var s when s.Equals(WiFieldReference.IterationPath, StringComparison.InvariantCultureIgnoreCase):
 
-                            var iterationPath = Settings.BaseIterationPath;
-
-                            if (!string.IsNullOrWhiteSpace((string)fieldValue))
-                            {
-                                if (string.IsNullOrWhiteSpace(iterationPath))
-                                    iterationPath = (string)fieldValue;
-                                else
-                                    iterationPath = string.Join("/", iterationPath, (string)fieldValue);
-                            }
+                            var iterationPath = GetClassificationPath(Settings.BaseIterationPath, fieldValue);
 
                             if (!string.IsNullOrWhiteSpace(iterationPath))
                             {
@@ -604,15 +896,7 @@ namespace WorkItemImport
 
                         case var s when s.Equals(WiFieldReference.AreaPath, StringComparison.InvariantCultureIgnoreCase):
 
-                            var areaPath = Settings.BaseAreaPath;
-
-                            if (!string.IsNullOrWhiteSpace((string)fieldValue))
-                            {
-                                if (string.IsNullOrWhiteSpace(areaPath))
-                                    areaPath = (string)fieldValue;
-                                else
-                                    areaPath = string.Join("/", areaPath, (string)fieldValue);
-                            }
+                            var areaPath = GetClassificationPath(Settings.BaseAreaPath, fieldValue);
 
                             if (!string.IsNullOrWhiteSpace(areaPath))
                             {
@@ -656,12 +940,13 @@ namespace WorkItemImport
             return success;
         }
 
-        private bool ApplyAndSaveLinks(WiRevision rev, WorkItem wi, Settings settings)
+        // With a patch document the links are added to it instead of being saved one by one
+        private bool ApplyAndSaveLinks(WiRevision rev, WorkItem wi, Settings settings, JsonPatchDocument patchDocument = null)
         {
             bool success = true;
 
             var saveLinkTimestamp = rev.Time;
-            if(rev.Fields.Count > 0)
+            if(rev.Fields.Count > 0 && patchDocument == null)
             {
                 // If this revision already has any fields, defer the link import by 2 miliseconds. Otherwise the Work Items API will
                 // send the response: "VS402625: Dates must be increasing with each revision"
@@ -675,6 +960,10 @@ namespace WorkItemImport
                 var link = rev.Links[i];
                 try
                 {
+                    // The source of a link is not saved in the item, it is the item of the revision
+                    if (string.IsNullOrEmpty(link.SourceOriginId))
+                        link.SourceOriginId = rev.ParentOriginId;
+
                     int sourceWiId = _context.Journal.GetMigratedId(link.SourceOriginId);
                     int targetWiId = _context.Journal.GetMigratedId(link.TargetOriginId);
 
@@ -691,7 +980,7 @@ namespace WorkItemImport
                         continue;
                     }
 
-                    if (i > 0)
+                    if (i > 0 && patchDocument == null)
                     {
                         // If this has multiple link updates, defer each ubsequent link import by 2 miliseconds.
                         // Otherwise the Work Items API will send the response: "VS402625: Dates must be increasing with each revision"
@@ -700,7 +989,14 @@ namespace WorkItemImport
                         wi.Fields[WiFieldReference.ChangedDate] = saveLinkTimestamp.AddMilliseconds(2);
                     }
 
-                    if (link.Change == ReferenceChangeType.Added && !_witClientUtils.AddAndSaveLink(link, wi, settings, rev.Author, saveLinkTimestamp))
+                    if (patchDocument != null)
+                    {
+                        if (link.Change == ReferenceChangeType.Added && !_witClientUtils.AddLink(link, wi, patchDocument, settings, rev.Author, rev.Time))
+                            success = false;
+                        else if (link.Change == ReferenceChangeType.Removed && !_witClientUtils.RemoveLink(link, wi, patchDocument))
+                            success = false;
+                    }
+                    else if (link.Change == ReferenceChangeType.Added && !_witClientUtils.AddAndSaveLink(link, wi, settings, rev.Author, saveLinkTimestamp))
                     {
                         success = false;
                     }
@@ -0,0 +1,106 @@
+﻿using Microsoft.TeamFoundation.WorkItemTracking.WebApi.Models;
+using Migration.Common;
+using Migration.Common.Log;
+using Migration.WIContract;
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Linq;
+using System.Threading;
+using System.Threading.Tasks;
+
+namespace WorkItemImport
+{
+    // Uploads the attachment files to Azure DevOps. Uploading does not depend on the order of the
+    // revisions, so the attachments of upcoming revisions can be uploaded in the background while
+    // the revisions are imported. Uploaded attachments are recorded in the journal, the revision
+    // that adds an attachment then only has to add the relation to the work item.
+    public class AttachmentUploader
+    {
+        private readonly IWitClientWrapper _witClientWrapper;
+        private readonly Journal _journal;
+        private readonly ConcurrentDictionary<string, Lazy<AttachmentReference>> _uploads = new ConcurrentDictionary<string, Lazy<AttachmentReference>>();
+        private long _uploadedAhead;
+
+        public AttachmentUploader(IWitClientWrapper witClientWrapper, Journal journal)
+        {
+            _witClientWrapper = witClientWrapper ?? throw new ArgumentNullException(nameof(witClientWrapper));
+            _journal = journal ?? throw new ArgumentNullException(nameof(journal));
+        }
+
+        public long UploadedAhead { get { return Interlocked.Read(ref _uploadedAhead); } }
+
+        // Returns the attachment uploaded before, waits for an upload in progress or uploads it now
+        public AttachmentReference GetOrUpload(WiAttachment attachment)
+        {
+            if (_journal.IsAttachmentUploaded(attachment.AttOriginId, out Guid id, out string url))
+                return new AttachmentReference { Id = id, Url = url };
+
+            var upload = _uploads.GetOrAdd(attachment.AttOriginId,
+                _ => new Lazy<AttachmentReference>(() => Upload(attachment), LazyThreadSafetyMode.ExecutionAndPublication));
+            try
+            {
+                return upload.Value;
+            }
+            catch (Exception)
+            {
+                // A failed upload is tried again by the next caller
+                _uploads.TryRemove(new KeyValuePair<string, Lazy<AttachmentReference>>(attachment.AttOriginId, upload));
+                throw;
+            }
+        }
+
+        public Task UploadAheadAsync(IEnumerable<WiAttachment> attachments, int parallelism, CancellationToken cancellationToken)
+        {
+            var options = new ParallelOptions { MaxDegreeOfParallelism = Math.Max(1, parallelism), CancellationToken = cancellationToken };
+            return Task.Run(() => Parallel.ForEach(attachments, options, attachment =>
+            {
+                try
+                {
+                    GetOrUpload(attachment);
+                    Interlocked.Increment(ref _uploadedAhead);
+                }
+                catch (Exception ex)
+                {
+                    Logger.Log(LogLevel.Debug, $"Could not upload attachment '{attachment}' ahead, it is uploaded when its revision is imported: {ex.Message}");
+                }
+            }), cancellationToken);
+        }
+
+        // The attachments added in the plan that are not migrated yet, in the order of the plan. The items only need
+        // their attachments, e.g. the summaries saved in the workspace.
+        public static IEnumerable<WiAttachment> GetUpcomingAttachments(IEnumerable<RevisionReference> plan, Func<string, WiItem> loadItem, Journal journal)
+        {
+            var seen = new HashSet<string>();
+            foreach (var originId in plan.Select(r => r.OriginId))
+            {
+                if (!seen.Add(originId))
+                    continue;
+
+                WiItem item;
+                try
+                {
+                    item = loadItem(originId);
+                }
+                catch (Exception ex)
+                {
+                    Logger.Log(LogLevel.Debug, $"Could not read item '{originId}' to upload its attachments ahead: {ex.Message}");
+                    continue;
+                }
+
+                var attachments = item.Revisions
+                    .SelectMany(r => r.Attachments)
+                    .Where(a => a.Change == ReferenceChangeType.Added && !journal.IsAttachmentMigrated(a.AttOriginId, out _));
+                foreach (var attachment in attachments)
+                    yield return attachment;
+            }
+        }
+
+        private AttachmentReference Upload(WiAttachment attachment)
+        {
+            var reference = _witClientWrapper.CreateAttachment(attachment);
+            _journal.MarkAttachmentUploaded(attachment.AttOriginId, reference.Id, reference.Url);
+            return reference;
+        }
+    }
+}
@@ -30,6 +30,11 @@ namespace WorkItemImport
             this._context = context;
         }
 
+        public ExecutionItem GetExecutionItem(RevisionReference revRef)
+        {
+            return TransformToExecutionItem(revRef);
+        }
+
         private ExecutionItem TransformToExecutionItem(RevisionReference revRef)
         {
             var item = _context.GetItem(revRef.OriginId);
@@ -1,8 +1,10 @@
 ﻿using Migration.Common;
 using Migration.Common.Log;
+using Migration.WIContract;
 using System;
 using System.Collections.Generic;
 using System.IO;
+using System.Linq;
 
 namespace WorkItemImport
 {
@@ -17,18 +19,24 @@ namespace WorkItemImport
 
         public ExecutionPlan BuildExecutionPlan()
         {
-            var path = _context.MigrationWorkspace;
-
-            // get the file attributes for file or directory
-            FileAttributes attr = File.GetAttributes(path);
-            if (attr.HasFlag(FileAttributes.Directory))
-                return new ExecutionPlan(BuildExecutionPlanFromDir(), _context);
+            // The workspace is always a directory since it also holds the journal and the logs,
+            // the items are read either from the item files or from the pack in the workspace
+            if (_context.Provider.IsPacked)
+                return new ExecutionPlan(BuildExecutionPlanFromFile(_context.Provider.Pack), _context);
             else
-                return new ExecutionPlan(BuildExecutionPlanFromFile(path), _context);
+                return new ExecutionPlan(BuildExecutionPlanFromDir(), _context);
         }
 
         private IEnumerable<RevisionReference> BuildExecutionPlanFromDir()
         {
+            var store = new ExecutionPlanStore(_context.MigrationWorkspace);
+            var fingerprint = store.ComputeWorkspaceFingerprint();
+            if (store.TryLoad(fingerprint, out var savedPlan))
+            {
+                Logger.Log(LogLevel.Info, $"Using the execution plan saved in '{store.PlanPath}' ({savedPlan.Count} revisions).");
+                return savedPlan;
+            }
+
             Logger.Log(LogLevel.Info, $"Building execution plan...");
             var actionPlan = new List<RevisionReference>();
             foreach (var wi in _context.EnumerateAllItems())
@@ -36,7 +44,8 @@ namespace WorkItemImport
                 Logger.Log(LogLevel.Debug, $"Analyzing item '{wi.OriginId}'.");
                 foreach (var rev in wi.Revisions)
                 {
-                    var revRef = new RevisionReference() { OriginId = wi.OriginId, RevIndex = rev.Index, Time = rev.Time };
+                    var linkedOriginIds = rev.Links.Select(l => l.TargetOriginId).Where(t => !string.IsNullOrEmpty(t)).Distinct().ToArray();
+                    var revRef = new RevisionReference() { OriginId = wi.OriginId, RevIndex = rev.Index, Time = rev.Time, LinkedOriginIds = linkedOriginIds };
                     actionPlan.Add(revRef);
                 }
             }
@@ -44,6 +53,15 @@ namespace WorkItemImport
 
             EnsureIncreasingTimes(actionPlan);
 
+            try
+            {
+                store.Save(fingerprint, actionPlan);
+            }
+            catch (Exception ex) when (ex is IOException || ex is UnauthorizedAccessException)
+            {
+                Logger.Log(LogLevel.Warning, $"Could not save the execution plan to '{store.PlanPath}': {ex.Message}");
+            }
+
             return actionPlan;
         }
 
@@ -67,9 +85,24 @@ namespace WorkItemImport
             }
         }
 
-        private IEnumerable<RevisionReference> BuildExecutionPlanFromFile(string path)
+        // The index of the pack holds the revisions of every item, the items themselves are not read
+        private IEnumerable<RevisionReference> BuildExecutionPlanFromFile(WiItemPack pack)
         {
-            throw new NotImplementedException();
+            Logger.Log(LogLevel.Info, $"Building execution plan from '{pack.IndexPath}'...");
+            var actionPlan = new List<RevisionReference>();
+            foreach (var entry in pack.Entries)
+            {
+                foreach (var rev in entry.Revisions)
+                {
+                    var revRef = new RevisionReference() { OriginId = entry.OriginId, RevIndex = rev.Index, Time = rev.Time, LinkedOriginIds = rev.LinkedOriginIds };
+                    actionPlan.Add(revRef);
+                }
+            }
+            actionPlan.Sort();
+
+            EnsureIncreasingTimes(actionPlan);
+
+            return actionPlan;
         }
     }
 }
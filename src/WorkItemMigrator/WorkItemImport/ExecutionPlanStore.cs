@@ -0,0 +1,169 @@
+﻿using Migration.Common.Log;
+using Migration.WIContract;
+using System;
+using System.Collections.Generic;
+using System.IO;
+using System.Linq;
+using System.Text;
+
+namespace WorkItemImport
+{
+    // Saves the execution plan as a compact binary file in the workspace, so an import that is
+    // started again does not have to read every item to build the same plan. The saved plan is
+    // only used while the item files of the workspace are unchanged.
+    public class ExecutionPlanStore
+    {
+        public const string FileName = "executionPlan.bin";
+
+        private static readonly byte[] Header = Encoding.ASCII.GetBytes("WIPLAN");
+        private const byte FormatVersion = 1;
+
+        public ExecutionPlanStore(string workspace)
+        {
+            Workspace = workspace;
+            PlanPath = Path.Combine(workspace, FileName);
+        }
+
+        public string Workspace { get; }
+        public string PlanPath { get; }
+
+        // Hash of the names, sizes and modification times of the item files and the item pack, the files are not read
+        public long ComputeWorkspaceFingerprint()
+        {
+            const ulong offsetBasis = 14695981039346656037;
+            const ulong prime = 1099511628211;
+
+            ulong hash = offsetBasis;
+            void Add(long value)
+            {
+                for (int i = 0; i < 8; i++)
+                {
+                    hash ^= (byte)(value >> (i * 8));
+                    hash *= prime;
+                }
+            }
+
+            var workspace = new DirectoryInfo(Workspace);
+            var files = workspace.EnumerateFiles("*.json")
+                .Concat(workspace.EnumerateFiles(WiItemPack.FileName))
+                .OrderBy(f => f.Name, StringComparer.Ordinal);
+            foreach (var file in files)
+            {
+                foreach (var c in file.Name)
+                    Add(c);
+                Add(file.Length);
+                Add(file.LastWriteTimeUtc.Ticks);
+            }
+            return unchecked((long)hash);
+        }
+
+        public bool TryLoad(long fingerprint, out List<RevisionReference> plan)
+        {
+            plan = null;
+            if (!File.Exists(PlanPath))
+                return false;
+
+            try
+            {
+                using (var reader = new BinaryReader(File.OpenRead(PlanPath), Encoding.UTF8))
+                {
+                    if (!reader.ReadBytes(Header.Length).SequenceEqual(Header) || reader.ReadByte() != FormatVersion)
+                    {
+                        Logger.Log(LogLevel.Warning, $"Ignoring the saved execution plan '{PlanPath}', the file format is not supported.");
+                        return false;
+                    }
+
+                    if (reader.ReadInt64() != fingerprint)
+                    {
+                        Logger.Log(LogLevel.Info, "The workspace has changed since the execution plan was saved.");
+                        return false;
+                    }
+
+                    var originIds = new string[reader.Read7BitEncodedInt()];
+                    for (int i = 0; i < originIds.Length; i++)
+                        originIds[i] = reader.ReadString();
+
+                    var count = reader.Read7BitEncodedInt();
+                    var result = new List<RevisionReference>(count);
+                    for (int i = 0; i < count; i++)
+                    {
+                        var revRef = new RevisionReference()
+                        {
+                            OriginId = originIds[reader.Read7BitEncodedInt()],
+                            RevIndex = reader.Read7BitEncodedInt(),
+                            Time = DateTime.FromBinary(reader.ReadInt64())
+                        };
+
+                        var linkedOriginIds = new string[reader.Read7BitEncodedInt()];
+                        for (int j = 0; j < linkedOriginIds.Length; j++)
+                            linkedOriginIds[j] = originIds[reader.Read7BitEncodedInt()];
+                        revRef.LinkedOriginIds = linkedOriginIds;
+
+                        result.Add(revRef);
+                    }
+
+                    plan = result;
+                    return true;
+                }
+            }
+            catch (Exception ex) when (ex is IOException || ex is FormatException || ex is IndexOutOfRangeException || ex is ArgumentException || ex is UnauthorizedAccessException)
+            {
+                Logger.Log(LogLevel.Warning, $"Ignoring the saved execution plan '{PlanPath}', it could not be read: {ex.Message}");
+                return false;
+            }
+        }
+
+        public void Save(long fingerprint, IList<RevisionReference> plan)
+        {
+            if (plan == null)
+                throw new ArgumentNullException(nameof(plan));
+
+            var originIdIndex = new Dictionary<string, int>(StringComparer.Ordinal);
+            var originIds = new List<string>();
+            int IndexOf(string originId)
+            {
+                if (!originIdIndex.TryGetValue(originId, out int index))
+                {
+                    index = originIds.Count;
+                    originIdIndex[originId] = index;
+                    originIds.Add(originId);
+                }
+                return index;
+            }
+
+            foreach (var revRef in plan)
+            {
+                IndexOf(revRef.OriginId);
+                foreach (var linkedOriginId in revRef.LinkedOriginIds ?? Array.Empty<string>())
+                    IndexOf(linkedOriginId);
+            }
+
+            // Written next to the plan and moved over it, so an interrupted save leaves no partial plan
+            var tempPath = PlanPath + ".tmp";
+            using (var writer = new BinaryWriter(File.Create(tempPath), Encoding.UTF8))
+            {
+                writer.Write(Header);
+                writer.Write(FormatVersion);
+                writer.Write(fingerprint);
+
+                writer.Write7BitEncodedInt(originIds.Count);
+                foreach (var originId in originIds)
+                    writer.Write(originId);
+
+                writer.Write7BitEncodedInt(plan.Count);
+                foreach (var revRef in plan)
+                {
+                    writer.Write7BitEncodedInt(originIdIndex[revRef.OriginId]);
+                    writer.Write7BitEncodedInt(revRef.RevIndex);
+                    writer.Write(revRef.Time.ToBinary());
+
+                    var linkedOriginIds = revRef.LinkedOriginIds ?? Array.Empty<string>();
+                    writer.Write7BitEncodedInt(linkedOriginIds.Count);
+                    foreach (var linkedOriginId in linkedOriginIds)
+                        writer.Write7BitEncodedInt(originIdIndex[linkedOriginId]);
+                }
+            }
+            File.Move(tempPath, PlanPath, true);
+        }
+    }
+}
@@ -4,11 +4,14 @@ using Microsoft.TeamFoundation.WorkItemTracking.WebApi.Models;
 using Migration.Common;
 using Migration.Common.Config;
 using Migration.Common.Log;
+using Migration.WIContract;
 using System;
 using System.Collections.Generic;
 using System.Diagnostics;
+using System.IO;
 using System.Linq;
 using System.Threading;
+using System.Threading.Tasks;
 
 namespace WorkItemImport
 {
@@ -16,7 +19,7 @@ namespace WorkItemImport
     {
         private CommandLineApplication commandLineApplication;
         private string[] args;
-        private List<ExecutionPlan.ExecutionItem> deferredExecutionItems = new List<ExecutionPlan.ExecutionItem>();
+        private int importedItems;
 
         public ImportCommandLine(params string[] args)
         {
@@ -67,9 +70,9 @@ namespace WorkItemImport
         private bool ExecuteMigration(CommandOption token, CommandOption url, CommandOption configFile, bool forceFresh, CommandOption continueOnCritical)
         {
             ConfigJson config = null;
+            MigrationContext context = null;
             var itemCount = 0;
             var revisionCount = 0;
-            var importedItems = 0;
             var sw = new Stopwatch();
             sw.Start();
             bool succeeded = true;
@@ -80,7 +83,7 @@ namespace WorkItemImport
                 ConfigReaderJson configReaderJson = new ConfigReaderJson(configFileName);
                 config = configReaderJson.Deserialize();
 
-                var context = MigrationContext.Init("wi-import", config, config.LogLevel, forceFresh, continueOnCritical.Value());
+                context = MigrationContext.Init("wi-import", config, config.LogLevel, forceFresh, continueOnCritical.Value());
 
                 // connection settings for Azure DevOps/TFS:
                 // full base url incl https, name of the project where the items will be migrated (if it doesn't exist on destination it will be created), personal access token
@@ -94,11 +97,15 @@ namespace WorkItemImport
                     IncludeDevelopmentLinks = config.IncludeDevelopmentLinks,
                     FieldMap = config.FieldMap,
                     SuppressNotifications = config.SuppressNotifications,
+                    CoalesceRevisionUpdates = config.CoalesceRevisionUpdates,
+                    WorkItemCacheSize = config.WorkItemCacheSize,
+                    MaxConnectionsPerServer = config.MaxConnectionsPerServer,
+                    MaxThrottlingRetries = config.MaxThrottlingRetries,
                     ChangedDateBumpMS = config.ChangedDateBumpMS
                 };
 
                 // initialize Azure DevOps/TFS connection. Creates/fetches project, fills area and iteration caches.
-                var agent = Agent.Initialize(context, settings);
+                var agent = Agent.InitializeAsync(context, settings).Result;
 
                 if (agent == null)
                 {
@@ -114,94 +121,77 @@ namespace WorkItemImport
 
                 BeginSession(configFileName, config, forceFresh, agent, itemCount, revisionCount);
 
-                while (plan.ReferenceQueue.Count > 0 || deferredExecutionItems.Count > 0)
+                // Areas and iterations are created before the import, the revisions only look them up. The same summaries
+                // of the items build the link graph that resolves the parent links offline and list the attachments to
+                // upload ahead, the items themselves are only read when the summaries are not saved in the workspace yet.
+                var summaries = GetItemSummaries(context, plan.ReferenceQueue);
+                WiItem LoadSummary(string originId)
                 {
-                    ExecutionPlan.ExecutionItem executionItem = null;
-                    try
-                    {
-                        executionItem = GetDeferredItemIfAvailable(plan, executionItem);
-
-                        if (executionItem == null)
-                        {
-                            plan.TryPop(out executionItem);
-                        }
-
-                        if (
-                            !forceFresh
-                            && !executionItem.isDeferred
-                            && context.Journal.IsItemMigrated(executionItem.OriginId, executionItem.Revision.Index)
-                        )
-                        {
-                            continue;
-                        }
-
-                        WorkItem wi = null;
-
-                        if (executionItem.WiId > 0)
-                        {
-                            wi = agent.GetWorkItem(executionItem.WiId);
-                            if (wi == null)
-                            {
-                                Logger.Log(LogLevel.Error, $"Tried fetching work item with id={executionItem.WiId}, " +
-                                    "but that work item does not exist on the target ADO organization/collection. " +
-                                    "Perhaps the item has been deleted manually? If so, the ItemsJournal.txt file " +
-                                    "is no longer valid. Please delete the work items in the target project and " +
-                                    "rerun the wi-import, or run the import with --force enabled."
-                                );
-                                continue;
-                            }
-                        }
-                        else
-                        {
-                            wi = agent.CreateWorkItem(executionItem.WiType, settings.SuppressNotifications, executionItem.Revision.Time, executionItem.Revision.Author);
-                        }
-
-                        Logger.Log(LogLevel.Info, $"Processing {importedItems + 1}/{revisionCount} - wi '{(wi.Id > 0 ? wi.Id.ToString() : "Initial revision")}', jira '{executionItem.OriginId}, rev {executionItem.Revision.Index}'.");
-
-                        importedItems++;
-
-                        if (config.IgnoreEmptyRevisions &&
-                            executionItem.Revision.Fields.Count == 0 &&
-                            executionItem.Revision.Links.Count == 0 &&
-                            executionItem.Revision.Attachments.Count == 0 &&
-                            executionItem.Revision.DevelopmentLink == null)
-                        {
-                            Logger.Log(LogLevel.Info, $"Skipped processing empty revision: {executionItem.OriginId}, rev {executionItem.Revision.Index}");
-                            continue;
-                        }
-
-                        try
-                        {
-                            agent.ImportRevision(executionItem.Revision, wi, settings);
-                        }
-                        catch (AttachmentNotFoundException)
-                        {
-                            importedItems = DeferItem(importedItems, executionItem);
-                        }
-
-                        // Artifical wait (optional) to avoid throttling for ADO Services
-                        if (config.SleepTimeBetweenRevisionImportMilliseconds > 0)
-                        {
-                            Thread.Sleep(config.SleepTimeBetweenRevisionImportMilliseconds);
-                        }
-                    }
-                    catch (AbortMigrationException)
-                    {
-                        Logger.Log(LogLevel.Info, "Aborting migration...");
-                        break;
-                    }
-                    catch (Exception ex)
+                    return summaries.TryGetValue(originId, out var summary) ? summary : throw new FileNotFoundException($"Item '{originId}' could not be read.");
+                }
+                var classificationPaths = Agent.GetClassificationPaths(plan.ReferenceQueue, LoadSummary, settings.BaseAreaPath, settings.BaseIterationPath);
+                agent.EnsureClassifications(classificationPaths, config.ClassificationParallelism);
+
+                // New work items are created in batches just ahead of their first revision, in the order of the plan
+                if (config.WorkItemCreationBatchSize > 0)
+                {
+                    var creations = new List<(string OriginId, string WiType, DateTime CreatedDate, string CreatedBy)>();
+                    foreach (var revRef in plan.ReferenceQueue.Where(r => r.RevIndex == 0 && context.Journal.GetMigratedId(r.OriginId) <= 0))
                     {
-                        try
-                        {
-                            Logger.Log(ex, $"Failed to import '{executionItem}'.");
-                        }
-                        catch (AbortMigrationException)
-                        {
-                            break;
-                        }
+                        if (summaries.TryGetValue(revRef.OriginId, out var summary) && summary.Revisions.Count > 0)
+                            creations.Add((revRef.OriginId, summary.Type, revRef.Time, summary.Revisions[0].Author));
                     }
+                    if (creations.Count > 0)
+                        agent.PlanWorkItemCreations(creations, config.WorkItemCreationBatchSize);
+                }
+
+                if (config.ResolveLinksOffline)
+                {
+                    var linkGraph = new LinkGraph(plan.ReferenceQueue);
+                    foreach (var summary in summaries.Values)
+                        linkGraph.Add(summary);
+                    agent.LinkGraph = linkGraph;
+                    Logger.Log(LogLevel.Info, $"Link graph: {linkGraph.HierarchyLinkCount} parent/child link changes, {linkGraph.ReplacedParentCount} of them replace a parent.");
+                }
+
+                var scheduler = new ImportScheduler(plan.ReferenceQueue.ToList());
+                var parallelism = Math.Max(1, config.ImportParallelism);
+                if (parallelism > 1)
+                    Logger.Log(LogLevel.Info, $"Importing with {parallelism} workers, keeping {scheduler.DependencyCount} revisions ordered after an earlier revision of the same or a linked item.");
+
+                // Attachments of upcoming revisions are uploaded in the background, the revisions only add the relations
+                using var uploadCancellation = new CancellationTokenSource();
+                var uploadAhead = Task.CompletedTask;
+                if (config.AttachmentUploadParallelism > 0)
+                {
+                    var upcomingAttachments = AttachmentUploader.GetUpcomingAttachments(plan.ReferenceQueue.ToList(), LoadSummary, context.Journal);
+                    uploadAhead = agent.AttachmentUploader.UploadAheadAsync(upcomingAttachments, config.AttachmentUploadParallelism, uploadCancellation.Token);
+                }
+
+                try
+                {
+                    scheduler.Run(parallelism, (revisionReference, isDeferred) =>
+                        ImportRevision(plan, revisionReference, isDeferred, context, agent, settings, config, forceFresh, revisionCount));
+                }
+                finally
+                {
+                    uploadCancellation.Cancel();
+                    WaitForUploads(uploadAhead);
                 }
+
+                if (scheduler.DeferredCount > 0)
+                    Logger.Log(LogLevel.Info, $"Deferred {scheduler.DeferredCount} revisions because an attachment they refer to was not imported yet, {scheduler.RetriedCount} were retried.");
+                if (config.AttachmentUploadParallelism > 0)
+                    Logger.Log(LogLevel.Info, $"Uploaded {agent.AttachmentUploader.UploadedAhead} attachments ahead of their revisions.");
+
+                var itemCache = context.ItemCache;
+                Logger.Log(LogLevel.Info, $"Item cache: {itemCache.Hits} hits, {itemCache.Misses} misses, {itemCache.Evictions} evictions with a size of {itemCache.Capacity} items.");
+                Logger.Log(LogLevel.Info, $"Work item cache: {agent.WorkItemCache.Hits} hits, {agent.WorkItemCache.Misses} misses with a size of {agent.WorkItemCache.Capacity} work items.");
+                Logger.Log(LogLevel.Info, $"Azure DevOps requests: {agent.RateLimiter.RequestCount} sent, {agent.RateLimiter.ThrottledCount} throttled, held back for {string.Format("{0:hh\\:mm\\:ss}", agent.RateLimiter.TotalDelay)} in total.");
+            }
+            catch (AbortMigrationException)
+            {
+                Logger.Log(LogLevel.Info, "Aborting migration...");
             }
             catch (CommandParsingException e)
             {
@@ -215,47 +205,139 @@ namespace WorkItemImport
             }
             finally
             {
+                context?.Journal?.Dispose();
                 EndSession(itemCount, revisionCount, sw);
             }
             return succeeded;
         }
 
-        private int DeferItem(int importedItems, ExecutionPlan.ExecutionItem executionItem)
+        // Returns false when the revision has to be deferred because an attachment it refers to is not imported yet
+        private bool ImportRevision(ExecutionPlan plan, RevisionReference revisionReference, bool isDeferred, MigrationContext context, Agent agent, Settings settings, ConfigJson config, bool forceFresh, int revisionCount)
         {
-            if (!executionItem.isDeferred)
+            ExecutionPlan.ExecutionItem executionItem = null;
+            try
             {
-                executionItem.Revision.Time = executionItem.Revision.Time.AddMinutes(5);
-                executionItem.isDeferred = true;
-                deferredExecutionItems.Add(executionItem);
-                importedItems--;
-            }
+                executionItem = plan.GetExecutionItem(revisionReference);
+                executionItem.isDeferred = isDeferred;
+
+                if (
+                    !forceFresh
+                    && !executionItem.isDeferred
+                    && context.Journal.IsItemMigrated(executionItem.OriginId, executionItem.Revision.Index)
+                )
+                {
+                    return true;
+                }
 
-            return importedItems;
-        }
+                WorkItem wi = null;
 
-        private ExecutionPlan.ExecutionItem GetDeferredItemIfAvailable(ExecutionPlan plan, ExecutionPlan.ExecutionItem executionItem)
-        {
-            foreach (var executionItemDeferred in deferredExecutionItems)
-            {
-                if (plan.TryPeek(out var nextItem))
+                if (executionItem.WiId <= 0 && agent.WorkItemCreator != null && agent.WorkItemCreator.EnsureCreated(executionItem.OriginId))
+                    executionItem.WiId = context.Journal.GetMigratedId(executionItem.OriginId);
+
+                if (executionItem.WiId > 0)
                 {
-                    if (executionItemDeferred.Revision.Time < nextItem.Revision.Time)
+                    wi = agent.GetWorkItem(executionItem.WiId);
+                    if (wi == null)
                     {
-                        executionItem = executionItemDeferred;
-                        deferredExecutionItems.Remove(executionItem);
-                        executionItem.Revision.Time = nextItem.Revision.Time.AddMilliseconds(-5);
-                        break;
+                        Logger.Log(LogLevel.Error, $"Tried fetching work item with id={executionItem.WiId}, " +
+                            "but that work item does not exist on the target ADO organization/collection. " +
+                            "Perhaps the item has been deleted manually? If so, the ItemsJournal.txt file " +
+                            "is no longer valid. Please delete the work items in the target project and " +
+                            "rerun the wi-import, or run the import with --force enabled."
+                        );
+                        return true;
                     }
                 }
                 else
                 {
-                    executionItem = executionItemDeferred;
-                    deferredExecutionItems.Remove(executionItem);
-                    break;
+                    wi = agent.CreateWorkItem(executionItem.WiType, settings.SuppressNotifications, executionItem.Revision.Time, executionItem.Revision.Author);
+                }
+
+                var processed = Interlocked.Increment(ref importedItems);
+                Logger.Log(LogLevel.Info, $"Processing {processed}/{revisionCount} - wi '{(wi.Id > 0 ? wi.Id.ToString() : "Initial revision")}', jira '{executionItem.OriginId}, rev {executionItem.Revision.Index}'.");
+
+                if (config.IgnoreEmptyRevisions &&
+                    executionItem.Revision.Fields.Count == 0 &&
+                    executionItem.Revision.Links.Count == 0 &&
+                    executionItem.Revision.Attachments.Count == 0 &&
+                    executionItem.Revision.DevelopmentLink == null)
+                {
+                    Logger.Log(LogLevel.Info, $"Skipped processing empty revision: {executionItem.OriginId}, rev {executionItem.Revision.Index}");
+                    return true;
+                }
+
+                try
+                {
+                    agent.ImportRevision(executionItem.Revision, wi, settings);
+                }
+                catch (AttachmentNotFoundException)
+                {
+                    if (!executionItem.isDeferred)
+                    {
+                        // The deferred revision was already changed by the import, it is read again when retried
+                        context.EvictItem(executionItem.OriginId);
+                        Interlocked.Decrement(ref importedItems);
+                        return false;
+                    }
+                    Logger.Log(LogLevel.Warning, $"'{executionItem}' still refers to an attachment that is not imported after it was deferred, the reference is not corrected.");
+                }
+
+                // Artifical wait (optional) to avoid throttling for ADO Services
+                if (config.SleepTimeBetweenRevisionImportMilliseconds > 0)
+                {
+                    Thread.Sleep(config.SleepTimeBetweenRevisionImportMilliseconds);
+                }
+            }
+            catch (AbortMigrationException)
+            {
+                throw;
+            }
+            catch (Exception ex)
+            {
+                Logger.Log(ex, $"Failed to import '{executionItem}'.");
+            }
+            return true;
+        }
+
+        // The summaries of the items in the plan, read from the workspace or built from the items and saved there
+        private static Dictionary<string, WiItem> GetItemSummaries(MigrationContext context, IEnumerable<RevisionReference> plan)
+        {
+            var fingerprint = new ExecutionPlanStore(context.MigrationWorkspace).ComputeWorkspaceFingerprint();
+            var store = new ItemSummaryStore(context.MigrationWorkspace);
+            if (store.TryLoad(fingerprint, out var savedSummaries))
+            {
+                Logger.Log(LogLevel.Info, $"Using the item summaries saved in '{store.SummaryPath}' ({savedSummaries.Count} items).");
+                return savedSummaries;
+            }
+
+            Logger.Log(LogLevel.Info, "Reading the items to create their areas, iterations and work items ahead...");
+            var summaries = new Dictionary<string, WiItem>();
+            foreach (var originId in plan.Select(r => r.OriginId))
+            {
+                if (summaries.ContainsKey(originId))
+                    continue;
+
+                try
+                {
+                    // Read without the item cache, so the cache starts empty for the import
+                    summaries[originId] = ItemSummaryStore.Summarize(context.Provider.Load(originId));
+                }
+                catch (Exception ex)
+                {
+                    Logger.Log(LogLevel.Debug, $"Could not read item '{originId}' ahead of its revisions: {ex.Message}");
                 }
             }
 
-            return executionItem;
+            try
+            {
+                store.Save(fingerprint, summaries.Values);
+            }
+            catch (Exception ex) when (ex is IOException || ex is UnauthorizedAccessException)
+            {
+                Logger.Log(LogLevel.Warning, $"Could not save the item summaries to '{store.SummaryPath}': {ex.Message}");
+            }
+
+            return summaries;
         }
 
         private static void BeginSession(string configFile, ConfigJson config, bool force, Agent agent, int itemsCount, int revisionCount)
@@ -306,6 +388,18 @@ namespace WorkItemImport
             }
         }
 
+        private static void WaitForUploads(Task uploads)
+        {
+            try
+            {
+                uploads.Wait();
+            }
+            catch (AggregateException e) when (e.InnerExceptions.All(inner => inner is OperationCanceledException))
+            {
+                // The remaining attachments are uploaded when their revisions are imported
+            }
+        }
+
         private static void EndSession(int itemsCount, int revisionCount, Stopwatch sw)
         {
             sw.Stop();
@@ -0,0 +1,253 @@
+﻿using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Runtime.ExceptionServices;
+using System.Threading;
+
+namespace WorkItemImport
+{
+    // Runs the revisions of the execution plan on several workers. A revision waits only for the
+    // revisions planned before it that touch the same work items: the earlier revisions of its own
+    // item and of the items it links to. Revisions of one work item are therefore imported in plan
+    // order, which keeps their changed dates increasing, while unrelated items are imported in parallel.
+    public class ImportScheduler
+    {
+        public static readonly TimeSpan DefaultDeferralDelay = TimeSpan.FromMinutes(5);
+
+        // Longer than the 50 ms a corrected text moves the changed date of a revision
+        public static readonly TimeSpan RetryTimeShift = TimeSpan.FromMilliseconds(100);
+
+        private readonly IList<RevisionReference> _revisions;
+        private readonly int[] _pendingDependencies;
+        private readonly List<int>[] _dependents;
+        private readonly TimeSpan _deferralDelay;
+        private int _deferredCount;
+        private int _retriedCount;
+
+        public ImportScheduler(IList<RevisionReference> orderedRevisions, TimeSpan? deferralDelay = null)
+        {
+            _revisions = orderedRevisions ?? throw new ArgumentNullException(nameof(orderedRevisions));
+            _deferralDelay = deferralDelay ?? DefaultDeferralDelay;
+            _pendingDependencies = new int[_revisions.Count];
+            _dependents = new List<int>[_revisions.Count];
+
+            var lastRevisionOfItem = new Dictionary<string, int>(StringComparer.InvariantCultureIgnoreCase);
+            for (int i = 0; i < _revisions.Count; i++)
+            {
+                foreach (var originId in GetTouchedOriginIds(_revisions[i]))
+                {
+                    if (lastRevisionOfItem.TryGetValue(originId, out int previous))
+                        AddDependency(previous, i);
+                    lastRevisionOfItem[originId] = i;
+                }
+            }
+        }
+
+        public int Count { get { return _revisions.Count; } }
+
+        public int DependencyCount { get { return _pendingDependencies.Sum(); } }
+
+        public int DeferredCount { get { return Volatile.Read(ref _deferredCount); } }
+        public int RetriedCount { get { return Volatile.Read(ref _retriedCount); } }
+
+        // Imports every revision once its dependencies are imported. The import returns false to defer
+        // a revision, e.g. when it refers to an attachment that a later revision of the item adds. The
+        // later revisions of the items a deferred revision touches are imported without waiting for it.
+        // A deferred revision is retried once, when the plan has passed its time plus the deferral delay
+        // or when no other revision is ready, and never at the same time as a revision of the items it
+        // touches. The retry is imported with a time after the revisions of these items that are already
+        // imported. An exception thrown by the import stops all workers and is rethrown.
+        public void Run(int parallelism, Func<RevisionReference, bool, bool> import)
+        {
+            if (import == null)
+                throw new ArgumentNullException(nameof(import));
+
+            var pendingDependencies = (int[])_pendingDependencies.Clone();
+            var ready = new SortedSet<int>(Enumerable.Range(0, _revisions.Count).Where(i => pendingDependencies[i] == 0));
+            // Ordered by the time the revision is due to be retried
+            var deferred = new PriorityQueue<int, (DateTime Due, int Index)>();
+            // The items of the running revisions and of the running retries, and the latest time imported per item
+            var runningItems = new Dictionary<string, int>(StringComparer.InvariantCultureIgnoreCase);
+            var retryingItems = new HashSet<string>(StringComparer.InvariantCultureIgnoreCase);
+            var importedTimes = new Dictionary<string, DateTime>(StringComparer.InvariantCultureIgnoreCase);
+            var syncRoot = new object();
+            var running = 0;
+            ExceptionDispatchInfo failure = null;
+
+            bool TrySelect(out int index, out bool isDeferred)
+            {
+                HashSet<string> waitingRetryItems = null;
+                if (deferred.TryPeek(out int retry, out var next) && (ready.Count == 0 || next.Due < _revisions[ready.Min].Time))
+                {
+                    var retryItems = GetTouchedOriginIds(_revisions[retry]).ToList();
+                    if (!retryItems.Any(runningItems.ContainsKey))
+                    {
+                        deferred.Dequeue();
+                        index = retry;
+                        isDeferred = true;
+                        return true;
+                    }
+
+                    // The revisions of its items are held back until the retry can run
+                    waitingRetryItems = new HashSet<string>(retryItems, StringComparer.InvariantCultureIgnoreCase);
+                }
+
+                foreach (var candidate in ready)
+                {
+                    var items = GetTouchedOriginIds(_revisions[candidate]);
+                    if (!items.Any(item => retryingItems.Contains(item) || (waitingRetryItems?.Contains(item) ?? false)))
+                    {
+                        ready.Remove(candidate);
+                        index = candidate;
+                        isDeferred = false;
+                        return true;
+                    }
+                }
+
+                index = -1;
+                isDeferred = false;
+                return false;
+            }
+
+            RevisionReference Start(int index, bool isDeferred)
+            {
+                var revision = _revisions[index];
+                var items = GetTouchedOriginIds(revision).ToList();
+
+                if (isDeferred)
+                {
+                    // A partial save of the deferred revision or a later revision may already have used its time
+                    var time = revision.Time;
+                    foreach (var item in items)
+                    {
+                        if (importedTimes.TryGetValue(item, out DateTime imported) && imported > time)
+                            time = imported;
+                    }
+                    revision = new RevisionReference
+                    {
+                        OriginId = revision.OriginId,
+                        RevIndex = revision.RevIndex,
+                        Time = time.Add(RetryTimeShift),
+                        LinkedOriginIds = revision.LinkedOriginIds
+                    };
+                    retryingItems.UnionWith(items);
+                    _retriedCount++;
+                }
+
+                foreach (var item in items)
+                {
+                    runningItems[item] = runningItems.TryGetValue(item, out int count) ? count + 1 : 1;
+                    if (!importedTimes.TryGetValue(item, out DateTime imported) || imported < revision.Time)
+                        importedTimes[item] = revision.Time;
+                }
+                running++;
+                return revision;
+            }
+
+            void Finish(int index, bool isDeferred)
+            {
+                foreach (var item in GetTouchedOriginIds(_revisions[index]))
+                {
+                    if (--runningItems[item] == 0)
+                        runningItems.Remove(item);
+                    if (isDeferred)
+                        retryingItems.Remove(item);
+                }
+                running--;
+            }
+
+            void Work()
+            {
+                while (true)
+                {
+                    int index = -1;
+                    bool isDeferred = false;
+                    RevisionReference revision;
+                    lock (syncRoot)
+                    {
+                        while (failure == null && !TrySelect(out index, out isDeferred))
+                        {
+                            if (running == 0)
+                                return;
+                            Monitor.Wait(syncRoot);
+                        }
+
+                        if (failure != null)
+                            return;
+
+                        revision = Start(index, isDeferred);
+                    }
+
+                    bool done;
+                    try
+                    {
+                        // A retry is not deferred again
+                        done = import(revision, isDeferred) || isDeferred;
+                    }
+                    catch (Exception e)
+                    {
+                        lock (syncRoot)
+                        {
+                            failure = failure ?? ExceptionDispatchInfo.Capture(e);
+                            Finish(index, isDeferred);
+                            Monitor.PulseAll(syncRoot);
+                        }
+                        return;
+                    }
+
+                    lock (syncRoot)
+                    {
+                        Finish(index, isDeferred);
+                        if (!done)
+                        {
+                            deferred.Enqueue(index, (_revisions[index].Time.Add(_deferralDelay), index));
+                            _deferredCount++;
+                        }
+
+                        // The dependents of a deferred revision were released when it was deferred
+                        if (!isDeferred)
+                        {
+                            foreach (var dependent in _dependents[index] ?? Enumerable.Empty<int>())
+                            {
+                                if (--pendingDependencies[dependent] == 0)
+                                    ready.Add(dependent);
+                            }
+                        }
+                        Monitor.PulseAll(syncRoot);
+                    }
+                }
+            }
+
+            var workers = Enumerable.Range(0, Math.Max(1, parallelism))
+                .Select(n => new Thread(Work) { IsBackground = true, Name = $"import-worker-{n + 1}" })
+                .ToList();
+            workers.ForEach(w => w.Start());
+            workers.ForEach(w => w.Join());
+
+            failure?.Throw();
+        }
+
+        private static IEnumerable<string> GetTouchedOriginIds(RevisionReference revision)
+        {
+            yield return revision.OriginId;
+
+            foreach (var linkedOriginId in revision.LinkedOriginIds ?? Enumerable.Empty<string>())
+            {
+                if (!string.Equals(linkedOriginId, revision.OriginId, StringComparison.InvariantCultureIgnoreCase))
+                    yield return linkedOriginId;
+            }
+        }
+
+        private void AddDependency(int revision, int dependent)
+        {
+            var dependents = _dependents[revision] ?? (_dependents[revision] = new List<int>(1));
+
+            // A revision linking to several items can depend on the same earlier revision more than once
+            if (dependents.Count > 0 && dependents[dependents.Count - 1] == dependent)
+                return;
+
+            dependents.Add(dependent);
+            _pendingDependencies[dependent]++;
+        }
+    }
+}
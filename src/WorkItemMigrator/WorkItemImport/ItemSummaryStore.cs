@@ -0,0 +1,124 @@
+﻿using Migration.Common.Log;
+using Migration.WIContract;
+using Newtonsoft.Json;
+using System;
+using System.Collections.Generic;
+using System.Globalization;
+using System.IO;
+using System.Linq;
+using System.Text;
+
+namespace WorkItemImport
+{
+    // Saves what is needed from the items before the import starts: the type and creator, the area and iteration
+    // paths, the parent/child links and the added attachments. An import that is started again takes these
+    // summaries from the workspace instead of reading every item. Like the saved execution plan, they are only
+    // used while the items in the workspace are unchanged.
+    public class ItemSummaryStore
+    {
+        public const string FileName = "itemSummaries.ndjson";
+
+        private const string Header = "WISUMMARY";
+        private const int FormatVersion = 1;
+
+        private static readonly JsonSerializerSettings SerializerSettings = new JsonSerializerSettings() { NullValueHandling = NullValueHandling.Ignore };
+
+        public ItemSummaryStore(string workspace)
+        {
+            Workspace = workspace;
+            SummaryPath = Path.Combine(workspace, FileName);
+        }
+
+        public string Workspace { get; }
+        public string SummaryPath { get; }
+
+        // The summary keeps every revision at its position, revisions without any of the summarized parts are empty
+        public static WiItem Summarize(WiItem item)
+        {
+            if (item == null)
+                throw new ArgumentNullException(nameof(item));
+
+            var revisions = item.Revisions ?? new List<WiRevision>();
+            return new WiItem()
+            {
+                OriginId = item.OriginId,
+                Type = item.Type,
+                Revisions = revisions.Select((rev, position) => new WiRevision()
+                {
+                    Index = rev.Index,
+                    Time = rev.Time,
+                    Author = position == 0 ? rev.Author : null,
+                    Fields = (rev.Fields ?? new List<WiField>())
+                        .Where(f => f.ReferenceName != null
+                            && (f.ReferenceName.Equals(WiFieldReference.AreaPath, StringComparison.InvariantCultureIgnoreCase)
+                                || f.ReferenceName.Equals(WiFieldReference.IterationPath, StringComparison.InvariantCultureIgnoreCase)))
+                        .ToList(),
+                    Links = (rev.Links ?? new List<WiLink>())
+                        .Where(l => l.WiType == LinkGraph.HierarchyForward || l.WiType == LinkGraph.HierarchyReverse)
+                        .ToList(),
+                    Attachments = (rev.Attachments ?? new List<WiAttachment>())
+                        .Where(a => a.Change == ReferenceChangeType.Added)
+                        .ToList()
+                }).ToList()
+            };
+        }
+
+        public bool TryLoad(long fingerprint, out Dictionary<string, WiItem> summaries)
+        {
+            summaries = null;
+            if (!File.Exists(SummaryPath))
+                return false;
+
+            try
+            {
+                using (var reader = new StreamReader(SummaryPath, Encoding.UTF8))
+                {
+                    var header = reader.ReadLine()?.Split(' ');
+                    if (header == null || header.Length != 3 || header[0] != Header || header[1] != FormatVersion.ToString(CultureInfo.InvariantCulture))
+                    {
+                        Logger.Log(LogLevel.Warning, $"Ignoring the saved item summaries '{SummaryPath}', the file format is not supported.");
+                        return false;
+                    }
+
+                    if (header[2] != fingerprint.ToString(CultureInfo.InvariantCulture))
+                    {
+                        Logger.Log(LogLevel.Info, "The workspace has changed since the item summaries were saved.");
+                        return false;
+                    }
+
+                    var result = new Dictionary<string, WiItem>();
+                    string line;
+                    while ((line = reader.ReadLine()) != null)
+                    {
+                        var summary = JsonConvert.DeserializeObject<WiItem>(line, SerializerSettings);
+                        result[summary.OriginId] = summary;
+                    }
+
+                    summaries = result;
+                    return true;
+                }
+            }
+            catch (Exception ex) when (ex is IOException || ex is JsonException || ex is NullReferenceException || ex is UnauthorizedAccessException)
+            {
+                Logger.Log(LogLevel.Warning, $"Ignoring the saved item summaries '{SummaryPath}', they could not be read: {ex.Message}");
+                return false;
+            }
+        }
+
+        public void Save(long fingerprint, IEnumerable<WiItem> summaries)
+        {
+            if (summaries == null)
+                throw new ArgumentNullException(nameof(summaries));
+
+            // Written next to the summaries and moved over them, so an interrupted save leaves no partial file
+            var tempPath = SummaryPath + ".tmp";
+            using (var writer = new StreamWriter(tempPath, false, new UTF8Encoding(false)))
+            {
+                writer.WriteLine($"{Header} {FormatVersion.ToString(CultureInfo.InvariantCulture)} {fingerprint.ToString(CultureInfo.InvariantCulture)}");
+                foreach (var summary in summaries)
+                    writer.WriteLine(JsonConvert.SerializeObject(summary, Formatting.None, SerializerSettings));
+            }
+            File.Move(tempPath, SummaryPath, true);
+        }
+    }
+}
@@ -0,0 +1,165 @@
+﻿using Migration.WIContract;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+
+namespace WorkItemImport
+{
+    // The parent/child links of all items in the workspace, indexed by the origin id of the child and the time
+    // of the revision that changes them. It is built once before the import, so that the parent a work item
+    // has when it gets a new one is known without reading the work item and its relations from Azure DevOps.
+    public class LinkGraph
+    {
+        public const string HierarchyForward = "System.LinkTypes.Hierarchy-Forward";
+        public const string HierarchyReverse = "System.LinkTypes.Hierarchy-Reverse";
+
+        private class HierarchyChange
+        {
+            public DateTime Time { get; set; }
+            public string ParentOriginId { get; set; }
+            public ReferenceChangeType Change { get; set; }
+            public string ReplacedParentOriginId { get; set; }
+        }
+
+        private readonly Dictionary<string, List<HierarchyChange>> _changesByChild = new Dictionary<string, List<HierarchyChange>>(StringComparer.InvariantCultureIgnoreCase);
+        private readonly Dictionary<(string OriginId, int RevIndex), DateTime> _plannedTimes = new Dictionary<(string OriginId, int RevIndex), DateTime>();
+        private readonly object _lock = new object();
+        private bool _resolved;
+
+        public LinkGraph() : this(Enumerable.Empty<RevisionReference>())
+        {
+        }
+
+        // The revisions in the plan are imported with their planned time, the others with the time in the item
+        public LinkGraph(IEnumerable<RevisionReference> plan)
+        {
+            foreach (var revRef in plan)
+                _plannedTimes[(revRef.OriginId, revRef.RevIndex)] = revRef.Time;
+        }
+
+        public int HierarchyLinkCount { get; private set; }
+
+        public int ReplacedParentCount
+        {
+            get
+            {
+                lock (_lock)
+                {
+                    Resolve();
+                    return _changesByChild.Values.Sum(changes => changes.Count(c => c.ReplacedParentOriginId != null));
+                }
+            }
+        }
+
+        public void Add(WiItem item)
+        {
+            if (item == null)
+                throw new ArgumentNullException(nameof(item));
+
+            foreach (var rev in item.Revisions ?? new List<WiRevision>())
+            {
+                if (!_plannedTimes.TryGetValue((item.OriginId, rev.Index), out DateTime time))
+                    time = rev.Time;
+                Add(item.OriginId, time, rev.Links);
+            }
+        }
+
+        public void Add(string originId, DateTime time, IEnumerable<WiLink> links)
+        {
+            foreach (var link in links ?? Enumerable.Empty<WiLink>())
+            {
+                if (string.IsNullOrEmpty(link.TargetOriginId))
+                    continue;
+
+                string childOriginId, parentOriginId;
+                if (link.WiType == HierarchyForward)
+                {
+                    childOriginId = link.TargetOriginId;
+                    parentOriginId = originId;
+                }
+                else if (link.WiType == HierarchyReverse)
+                {
+                    childOriginId = originId;
+                    parentOriginId = link.TargetOriginId;
+                }
+                else
+                    continue;
+
+                lock (_lock)
+                {
+                    if (!_changesByChild.TryGetValue(childOriginId, out var changes))
+                    {
+                        changes = new List<HierarchyChange>();
+                        _changesByChild.Add(childOriginId, changes);
+                    }
+                    changes.Add(new HierarchyChange { Time = time, ParentOriginId = parentOriginId, Change = link.Change });
+                    HierarchyLinkCount++;
+                    _resolved = false;
+                }
+            }
+        }
+
+        // Returns the parent that the child still has when the link to the new parent is added at the given time,
+        // or null when the link does not replace a parent
+        public string GetReplacedParent(string childOriginId, string parentOriginId, DateTime time)
+        {
+            if (string.IsNullOrEmpty(childOriginId) || string.IsNullOrEmpty(parentOriginId))
+                return null;
+
+            lock (_lock)
+            {
+                Resolve();
+
+                if (!_changesByChild.TryGetValue(childOriginId, out var changes))
+                    return null;
+
+                for (int i = changes.Count - 1; i >= 0; i--)
+                {
+                    var change = changes[i];
+                    if (change.Time <= time
+                        && change.Change == ReferenceChangeType.Added
+                        && string.Equals(change.ParentOriginId, parentOriginId, StringComparison.InvariantCultureIgnoreCase))
+                    {
+                        return change.ReplacedParentOriginId;
+                    }
+                }
+                return null;
+            }
+        }
+
+        // Replays the changes of every child in time order. Within one revision the removed links are replayed
+        // first, so a parent that is changed in a single revision is not reported as replaced.
+        private void Resolve()
+        {
+            if (_resolved)
+                return;
+
+            foreach (var childOriginId in _changesByChild.Keys.ToList())
+            {
+                var changes = _changesByChild[childOriginId]
+                    .OrderBy(c => c.Time)
+                    .ThenBy(c => c.Change == ReferenceChangeType.Added ? 1 : 0)
+                    .ToList();
+
+                string parentOriginId = null;
+                foreach (var change in changes)
+                {
+                    var isCurrentParent = string.Equals(change.ParentOriginId, parentOriginId, StringComparison.InvariantCultureIgnoreCase);
+                    if (change.Change == ReferenceChangeType.Added)
+                    {
+                        change.ReplacedParentOriginId = parentOriginId != null && !isCurrentParent ? parentOriginId : null;
+                        parentOriginId = change.ParentOriginId;
+                    }
+                    else
+                    {
+                        change.ReplacedParentOriginId = null;
+                        if (isCurrentParent)
+                            parentOriginId = null;
+                    }
+                }
+                _changesByChild[childOriginId] = changes;
+            }
+            _resolved = true;
+        }
+    }
+}
@@ -1,4 +1,5 @@
 ﻿using System;
+using System.Collections.Generic;
 
 namespace WorkItemImport
 {
@@ -7,6 +8,7 @@ namespace WorkItemImport
         public string OriginId { get; set; }
         public int RevIndex { get; set; }
         public DateTime Time { get; set; }
+        public IReadOnlyList<string> LinkedOriginIds { get; set; }
 
         public int CompareTo(RevisionReference other)
         {
@@ -22,6 +22,10 @@ namespace WorkItemImport
         public bool IncludeDevelopmentLinks { get; internal set; }
         public FieldMap FieldMap { get; internal set; }
         public bool SuppressNotifications { get; internal set; }
+        public bool CoalesceRevisionUpdates { get; internal set; }
+        public int WorkItemCacheSize { get; internal set; }
+        public int MaxConnectionsPerServer { get; internal set; }
+        public int MaxThrottlingRetries { get; internal set; }
         public int ChangedDateBumpMS { get; set; }
     }
 }
\ No newline at end of file
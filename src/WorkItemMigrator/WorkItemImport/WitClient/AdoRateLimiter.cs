@@ -0,0 +1,137 @@
+﻿using System;
+using System.Collections.Generic;
+using System.Globalization;
+using System.Linq;
+using System.Threading;
+using System.Threading.Tasks;
+
+[assembly: System.Runtime.CompilerServices.InternalsVisibleTo("Migration.Wi-Import.Tests")]
+
+namespace WorkItemImport
+{
+    // Paces all requests to Azure DevOps by the rate limit headers of its responses. Azure DevOps only sends
+    // X-RateLimit-Remaining and X-RateLimit-Reset once a client uses a large share of its limit, and Retry-After
+    // when it delays or blocks the client. Without these headers requests are not held back at all, with them
+    // the remaining requests are spread until the limit is reset.
+    public class AdoRateLimiter
+    {
+        private static readonly TimeSpan MaxBackoff = TimeSpan.FromSeconds(60);
+
+        private readonly object _syncRoot = new object();
+        private DateTime _blockedUntil = DateTime.MinValue;
+        private DateTime _nextRequest = DateTime.MinValue;
+        private TimeSpan _interval = TimeSpan.Zero;
+        private long _requestCount;
+        private long _throttledCount;
+        private TimeSpan _totalDelay = TimeSpan.Zero;
+
+        public long RequestCount { get { lock (_syncRoot) { return _requestCount; } } }
+        public long ThrottledCount { get { lock (_syncRoot) { return _throttledCount; } } }
+        public TimeSpan TotalDelay { get { lock (_syncRoot) { return _totalDelay; } } }
+        public TimeSpan CurrentInterval { get { lock (_syncRoot) { return _interval; } } }
+
+        public Task WaitAsync(CancellationToken cancellationToken = default)
+        {
+            var delay = Reserve(DateTime.UtcNow);
+            return delay > TimeSpan.Zero ? Task.Delay(delay, cancellationToken) : Task.CompletedTask;
+        }
+
+        internal TimeSpan Reserve(DateTime now)
+        {
+            lock (_syncRoot)
+            {
+                _requestCount++;
+
+                var start = now;
+                if (_blockedUntil > start)
+                    start = _blockedUntil;
+                if (_nextRequest > start)
+                    start = _nextRequest;
+                _nextRequest = start + _interval;
+
+                var delay = start - now;
+                _totalDelay += delay;
+                return delay;
+            }
+        }
+
+        // Returns how long to wait before a throttled request is sent again, or null when the request was not
+        // throttled. All requests are held back for that time.
+        public TimeSpan? OnResponse(int statusCode, IEnumerable<KeyValuePair<string, string>> headers, DateTime now, int attempt = 1)
+        {
+            var headerValues = ToDictionary(headers);
+            var retryAfter = GetRetryAfter(headerValues, now);
+
+            lock (_syncRoot)
+            {
+                if (headerValues.TryGetValue("X-RateLimit-Remaining", out string remainingValue)
+                    && double.TryParse(remainingValue, NumberStyles.Float, CultureInfo.InvariantCulture, out double remaining)
+                    && headerValues.TryGetValue("X-RateLimit-Reset", out string resetValue)
+                    && long.TryParse(resetValue, NumberStyles.Integer, CultureInfo.InvariantCulture, out long resetSeconds))
+                {
+                    var reset = DateTimeOffset.FromUnixTimeSeconds(resetSeconds).UtcDateTime;
+                    if (remaining < 1)
+                    {
+                        Block(reset);
+                        _interval = TimeSpan.Zero;
+                    }
+                    else
+                        _interval = reset > now ? TimeSpan.FromTicks((long)((reset - now).Ticks / remaining)) : TimeSpan.Zero;
+                }
+                else
+                {
+                    // Azure DevOps has room for this client again
+                    _interval = TimeSpan.Zero;
+                }
+
+                if (retryAfter.HasValue)
+                    Block(now + retryAfter.Value);
+
+                var throttled = statusCode == 429 || (statusCode == 503 && retryAfter.HasValue);
+                if (!throttled)
+                    return null;
+
+                _throttledCount++;
+                var delay = retryAfter ?? GetBackoff(attempt);
+                Block(now + delay);
+                return delay;
+            }
+        }
+
+        private void Block(DateTime until)
+        {
+            if (until > _blockedUntil)
+                _blockedUntil = until;
+        }
+
+        private static TimeSpan? GetRetryAfter(Dictionary<string, string> headerValues, DateTime now)
+        {
+            if (!headerValues.TryGetValue("Retry-After", out string retryAfter))
+                return null;
+
+            if (double.TryParse(retryAfter, NumberStyles.Float, CultureInfo.InvariantCulture, out double seconds))
+                return TimeSpan.FromSeconds(Math.Max(0, seconds));
+
+            if (DateTime.TryParse(retryAfter, CultureInfo.InvariantCulture, DateTimeStyles.AdjustToUniversal | DateTimeStyles.AssumeUniversal, out DateTime retryTime))
+                return retryTime > now ? retryTime - now : TimeSpan.Zero;
+
+            return null;
+        }
+
+        private static TimeSpan GetBackoff(int attempt)
+        {
+            return TimeSpan.FromSeconds(Math.Min(MaxBackoff.TotalSeconds, Math.Pow(2, Math.Max(0, attempt - 1))));
+        }
+
+        private static Dictionary<string, string> ToDictionary(IEnumerable<KeyValuePair<string, string>> headers)
+        {
+            var result = new Dictionary<string, string>(StringComparer.OrdinalIgnoreCase);
+            foreach (var header in headers ?? Enumerable.Empty<KeyValuePair<string, string>>())
+            {
+                if (header.Key != null && header.Value != null)
+                    result[header.Key] = header.Value;
+            }
+            return result;
+        }
+    }
+}
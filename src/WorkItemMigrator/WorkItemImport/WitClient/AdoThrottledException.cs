@@ -0,0 +1,22 @@
+﻿using System;
+using System.Runtime.Serialization;
+
+namespace WorkItemImport
+{
+    [Serializable]
+    public class AdoThrottledException : Exception
+    {
+        protected AdoThrottledException(SerializationInfo serializationInfo, StreamingContext streamingContext) : base(serializationInfo, streamingContext)
+        {
+
+        }
+
+        public AdoThrottledException(TimeSpan retryAfter)
+            : base($"Azure DevOps throttled the request, it can be sent again in {retryAfter.TotalSeconds:F1} seconds.")
+        {
+            RetryAfter = retryAfter;
+        }
+
+        public TimeSpan RetryAfter { get; private set; }
+    }
+}
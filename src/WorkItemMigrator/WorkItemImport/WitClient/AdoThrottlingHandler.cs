@@ -0,0 +1,63 @@
+﻿using Migration.Common.Log;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Net.Http;
+using System.Threading;
+using System.Threading.Tasks;
+
+namespace WorkItemImport
+{
+    // Sends every request to Azure DevOps through the shared rate limiter. A throttled request is sent again after
+    // the time Azure DevOps asked for. A stream cannot be read twice, a throttled request with a stream throws an
+    // AdoThrottledException instead, the caller sends it again with a new stream.
+    public class AdoThrottlingHandler : DelegatingHandler
+    {
+        private readonly AdoRateLimiter _rateLimiter;
+        private readonly int _maxRetries;
+
+        public AdoThrottlingHandler(AdoRateLimiter rateLimiter, int maxRetries)
+        {
+            _rateLimiter = rateLimiter;
+            _maxRetries = maxRetries;
+        }
+
+        protected override async Task<HttpResponseMessage> SendAsync(HttpRequestMessage request, CancellationToken cancellationToken)
+        {
+            for (int attempt = 1; ; attempt++)
+            {
+                await _rateLimiter.WaitAsync(cancellationToken);
+                var response = await base.SendAsync(request, cancellationToken);
+
+                var headers = response.Headers.Select(h => new KeyValuePair<string, string>(h.Key, string.Join(",", h.Value)));
+                var retryDelay = _rateLimiter.OnResponse((int)response.StatusCode, headers, DateTime.UtcNow, attempt);
+                if (retryDelay == null || attempt > _maxRetries)
+                    return response;
+
+                if (request.Content is StreamContent)
+                {
+                    response.Dispose();
+                    throw new AdoThrottledException(retryDelay.Value);
+                }
+
+                Logger.Log(LogLevel.Warning, "Azure DevOps is throttling requests, the import slows down to the rate Azure DevOps allows.");
+                Logger.Log(LogLevel.Debug, $"Request '{request.Method} {request.RequestUri?.AbsolutePath}' was throttled, retrying in {retryDelay.Value.TotalSeconds:F1} seconds.");
+                response.Dispose();
+            }
+        }
+
+        // The client library may wrap the exceptions of its requests
+        public static bool IsThrottlingException(Exception exception)
+        {
+            for (var e = exception; e != null; e = e.InnerException)
+            {
+                if (e is AggregateException aggregate && aggregate.InnerExceptions.Any(IsThrottlingException))
+                    return true;
+
+                if (e is AdoThrottledException)
+                    return true;
+            }
+            return false;
+        }
+    }
+}
@@ -0,0 +1,234 @@
+﻿using Migration.WIContract;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Web;
+
+namespace WorkItemImport
+{
+    // Replaces the Jira URLs of attachments in an HTML text by their Azure DevOps URLs. The attachments of an item
+    // are indexed once per revision, every text of the revision is then rewritten in a single scan. An attachment is
+    // referenced by a src or href attribute that contains its id or file name, or by a !file name! marker of Jira.
+    // The src attributes and the markers are replaced, the href attributes are left as they are.
+    public class AttachmentUrlRewriter
+    {
+        private class AttachmentEntry
+        {
+            public WiAttachment Attachment { get; set; }
+            public string Url { get; set; }
+        }
+
+        private readonly Func<WiAttachment, string> _resolveUrl;
+        private readonly Dictionary<string, AttachmentEntry> _byOriginId = new Dictionary<string, AttachmentEntry>(StringComparer.Ordinal);
+        private readonly Dictionary<string, AttachmentEntry> _byFileName = new Dictionary<string, AttachmentEntry>(StringComparer.OrdinalIgnoreCase);
+        private readonly Dictionary<string, AttachmentEntry> _byMarker = new Dictionary<string, AttachmentEntry>(StringComparer.Ordinal);
+        private readonly int _maxMarkerLength;
+
+        // resolveUrl returns the Azure DevOps URL of a migrated attachment, or null when it is not migrated yet
+        public AttachmentUrlRewriter(IEnumerable<WiAttachment> attachments, Func<WiAttachment, string> resolveUrl)
+        {
+            _resolveUrl = resolveUrl ?? throw new ArgumentNullException(nameof(resolveUrl));
+
+            // A later attachment with the same file name replaces the earlier one, like in Jira
+            foreach (var att in attachments ?? Enumerable.Empty<WiAttachment>())
+            {
+                if (string.IsNullOrEmpty(att.AttOriginId))
+                    continue;
+
+                var entry = new AttachmentEntry { Attachment = att };
+                _byOriginId[att.AttOriginId] = entry;
+
+                var fileName = att.FilePath?.Split('\\').Last();
+                foreach (var name in new[] { fileName, att.FileName }.Where(n => !string.IsNullOrEmpty(n)))
+                {
+                    _byFileName[name] = entry;
+                    _byFileName[EncodeFileName(name)] = entry;
+                }
+
+                if (!string.IsNullOrEmpty(fileName))
+                {
+                    _byMarker[fileName] = entry;
+                    _maxMarkerLength = Math.Max(_maxMarkerLength, fileName.Length);
+                }
+            }
+        }
+
+        // Returns the rewritten text. updated is set when the text references a migrated attachment, missingAttachment
+        // is the first referenced attachment that is not migrated yet.
+        public string Rewrite(string text, out bool updated, out WiAttachment missingAttachment)
+        {
+            updated = false;
+            missingAttachment = null;
+            if (string.IsNullOrEmpty(text) || _byOriginId.Count == 0)
+                return text;
+
+            StringBuilder result = null;
+            int copied = 0;
+            int i = 0;
+            while (i < text.Length)
+            {
+                int start, end, next;
+                AttachmentEntry entry;
+                bool replaceAll;
+                if (text[i] == '!' && TryMatchMarker(text, i, out entry, out next))
+                {
+                    start = i;
+                    end = next;
+                    replaceAll = true;
+                }
+                else if (TryMatchAttribute(text, i, out bool isSource, out start, out end))
+                {
+                    entry = FindEntry(text, start, end);
+                    next = end + 1;
+                    replaceAll = false;
+                    if (!isSource && entry != null)
+                    {
+                        // A link to the attachment is a reference, but is not replaced
+                        Resolve(entry, ref updated, ref missingAttachment);
+                        entry = null;
+                    }
+                }
+                else
+                {
+                    i++;
+                    continue;
+                }
+
+                if (entry != null && Resolve(entry, ref updated, ref missingAttachment))
+                {
+                    result ??= new StringBuilder(text.Length);
+                    result.Append(text, copied, start - copied);
+                    result.Append(replaceAll ? $"<img src=\"{entry.Url}\"/>" : entry.Url);
+                    copied = end;
+                }
+                i = next;
+            }
+
+            if (result == null)
+                return text;
+
+            result.Append(text, copied, text.Length - copied);
+            return result.ToString();
+        }
+
+        public static string EncodeFileName(string fileName)
+        {
+            return HttpUtility.UrlEncode(fileName).Replace("(", "%28").Replace(")", "%29");
+        }
+
+        private bool Resolve(AttachmentEntry entry, ref bool updated, ref WiAttachment missingAttachment)
+        {
+            // Only a found URL is kept, an attachment may be migrated between the texts of a revision
+            entry.Url ??= _resolveUrl(entry.Attachment);
+            if (entry.Url == null)
+            {
+                missingAttachment ??= entry.Attachment;
+                return false;
+            }
+            updated = true;
+            return true;
+        }
+
+        // Matches !file name! at the given position, next is the position after the closing !
+        private bool TryMatchMarker(string text, int position, out AttachmentEntry entry, out int next)
+        {
+            entry = null;
+            next = position + 1;
+
+            int limit = Math.Min(text.Length, position + _maxMarkerLength + 2);
+            for (int j = position + 1; j < limit; j++)
+            {
+                char c = text[j];
+                if (c == '!')
+                {
+                    if (j > position + 1 && _byMarker.TryGetValue(text.Substring(position + 1, j - position - 1), out entry))
+                    {
+                        next = j + 1;
+                        return true;
+                    }
+                    return false;
+                }
+                if (c == '\n' || c == '<' || c == '>')
+                    return false;
+            }
+            return false;
+        }
+
+        // Matches a src or href attribute with a quoted value at the given position, the value is text[start..end)
+        private static bool TryMatchAttribute(string text, int position, out bool isSource, out int start, out int end)
+        {
+            isSource = false;
+            start = end = -1;
+
+            if (position > 0 && !char.IsWhiteSpace(text[position - 1]))
+                return false;
+
+            int j;
+            if (string.Compare(text, position, "src", 0, 3, StringComparison.OrdinalIgnoreCase) == 0)
+            {
+                isSource = true;
+                j = position + 3;
+            }
+            else if (string.Compare(text, position, "href", 0, 4, StringComparison.OrdinalIgnoreCase) == 0)
+                j = position + 4;
+            else
+                return false;
+
+            j = SkipWhiteSpace(text, j);
+            if (j >= text.Length || text[j] != '=')
+                return false;
+            j = SkipWhiteSpace(text, j + 1);
+            if (j >= text.Length || (text[j] != '"' && text[j] != '\''))
+                return false;
+
+            int close = text.IndexOf(text[j], j + 1);
+            if (close < 0)
+                return false;
+
+            start = j + 1;
+            end = close;
+            return true;
+        }
+
+        // The attachment id is one of the words of the URL, e.g. /secure/attachment/10001/image.png,
+        // /rest/api/2/attachment/content/10001 or _thumb_10001.png. Otherwise the URL ends with the file name.
+        private AttachmentEntry FindEntry(string text, int start, int end)
+        {
+            int j = start;
+            while (j < end)
+            {
+                if (!char.IsLetterOrDigit(text[j]))
+                {
+                    j++;
+                    continue;
+                }
+
+                int wordStart = j;
+                while (j < end && char.IsLetterOrDigit(text[j]))
+                    j++;
+                if (_byOriginId.TryGetValue(text.Substring(wordStart, j - wordStart), out var entry))
+                    return entry;
+            }
+
+            int nameEnd = end;
+            int query = text.IndexOfAny(new[] { '?', '#' }, start, end - start);
+            if (query >= 0)
+                nameEnd = query;
+            int nameStart = text.LastIndexOfAny(new[] { '/', '\\' }, nameEnd - 1, nameEnd - start) + 1;
+            if (nameStart < start)
+                nameStart = start;
+
+            return nameEnd > nameStart && _byFileName.TryGetValue(text.Substring(nameStart, nameEnd - nameStart), out var fileEntry)
+                ? fileEntry
+                : null;
+        }
+
+        private static int SkipWhiteSpace(string text, int position)
+        {
+            while (position < text.Length && char.IsWhiteSpace(text[position]))
+                position++;
+            return position;
+        }
+    }
+}
@@ -5,17 +5,25 @@ using Microsoft.VisualStudio.Services.WebApi.Patch.Json;
 using Migration.WIContract;
 using System;
 using System.Collections.Generic;
+using System.Threading.Tasks;
 
 namespace WorkItemImport
 {
     public interface IWitClientWrapper
     {
         WorkItem CreateWorkItem(string wiType, bool suppressNotifications, DateTime? createdDate = null, string createdBy = "");
+        List<WorkItem> CreateWorkItems(IList<(string WiType, DateTime? CreatedDate, string CreatedBy)> workItems, bool suppressNotifications);
         WorkItem GetWorkItem(int wiId);
         WorkItem UpdateWorkItem(JsonPatchDocument patchDocument, int workItemId, bool suppressNotifications);
         TeamProject GetProject(string projectId);
         GitRepository GetRepository(string project, string repository);
         List<WorkItemRelationType> GetRelationTypes();
         AttachmentReference CreateAttachment(WiAttachment attachment);
+        Task<WorkItem> CreateWorkItemAsync(string wiType, bool suppressNotifications, DateTime? createdDate = null, string createdBy = "");
+        Task<List<WorkItem>> CreateWorkItemsAsync(IList<(string WiType, DateTime? CreatedDate, string CreatedBy)> workItems, bool suppressNotifications);
+        Task<WorkItem> GetWorkItemAsync(int wiId);
+        Task<WorkItem> UpdateWorkItemAsync(JsonPatchDocument patchDocument, int workItemId, bool suppressNotifications);
+        Task<List<WorkItemRelationType>> GetRelationTypesAsync();
+        Task<AttachmentReference> CreateAttachmentAsync(WiAttachment attachment);
     }
 }
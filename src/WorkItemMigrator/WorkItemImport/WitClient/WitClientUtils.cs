@@ -9,8 +9,6 @@ using Migration.WIContract;
 using System;
 using System.Collections.Generic;
 using System.Linq;
-using System.Text.RegularExpressions;
-using System.Web;
 using WorkItemImport.WitClient;
 
 namespace WorkItemImport
@@ -32,6 +30,13 @@ namespace WorkItemImport
             _witClientWrapper = witClientWrapper;
         }
 
+        // When set, attachments uploaded ahead of their revision are reused
+        public AttachmentUploader AttachmentUploader { get; set; }
+
+        // When set, links are resolved offline: the target url is built from the id, cycles are found among the
+        // relations of the work item itself and conflicting parents are removed before the link is added
+        public LinkGraph LinkGraph { get; set; }
+
         public delegate V IsAttachmentMigratedDelegate<in T, U, out V>(T input, out U output);
 
         public WorkItem CreateWorkItem(string type, bool suppressNotifications, DateTime? createdDate = null, string createdBy = "")
@@ -39,6 +44,16 @@ namespace WorkItemImport
             return _witClientWrapper.CreateWorkItem(type, suppressNotifications, createdDate, createdBy);
         }
 
+        public List<WorkItem> CreateWorkItems(IList<(string WiType, DateTime? CreatedDate, string CreatedBy)> workItems, bool suppressNotifications)
+        {
+            if (workItems == null)
+            {
+                throw new ArgumentException(nameof(workItems));
+            }
+
+            return _witClientWrapper.CreateWorkItems(workItems, suppressNotifications);
+        }
+
         public bool IsDuplicateWorkItemLink(IEnumerable<WorkItemRelation> links, WorkItemRelation relatedLink)
         {
             if (links == null || relatedLink == null)
@@ -74,19 +89,23 @@ namespace WorkItemImport
             {
                 try
                 {
-                    WorkItem targetWorkItem = GetWorkItem(link.TargetWiId);
+                    string targetUrl = GetTargetWorkItemUrl(link, wi);
 
                     WorkItemRelation relatedLink = new WorkItemRelation
                     {
                         Rel = parsedLink.ReferenceName,
-                        Url = targetWorkItem.Url
+                        Url = targetUrl
                     };
 
                     relatedLink = ResolveCyclicalLinks(relatedLink, wi);
                     if (!IsDuplicateWorkItemLink(wi.Relations, relatedLink))
                     {
+                        var linkPatchDocument = new JsonPatchDocument();
+                        if (LinkGraph != null)
+                            RemoveConflictingParentLinks(link, wi, linkPatchDocument, settings, author, time);
+
                         wi.Relations.Add(relatedLink);
-                        AddSingleLinkToWorkItemAndSave(link, wi, targetWorkItem, settings, "Imported link from JIRA", author, time);
+                        AddSingleLinkToWorkItemAndSave(link, wi, targetUrl, linkPatchDocument, settings, "Imported link from JIRA", author, time);
                         return true;
                     }
                     return false;
@@ -186,6 +205,155 @@ namespace WorkItemImport
             return true;
         }
 
+        // Adds the link to the relations of the work item and to the patch document, instead of saving it
+        public bool AddLink(WiLink link, WorkItem wi, JsonPatchDocument patchDocument, Settings settings = null, string author = null, DateTime time = default)
+        {
+            if (link == null)
+            {
+                throw new ArgumentException(nameof(link));
+            }
+            if (wi == null)
+            {
+                throw new ArgumentException(nameof(wi));
+            }
+            if (patchDocument == null)
+            {
+                throw new ArgumentException(nameof(patchDocument));
+            }
+
+            WorkItemRelationType parsedLink = ParseLink(link);
+            if (parsedLink == null)
+                return false;
+
+            string targetUrl = GetTargetWorkItemUrl(link, wi);
+
+            WorkItemRelation relatedLink = new WorkItemRelation
+            {
+                Rel = parsedLink.ReferenceName,
+                Url = targetUrl
+            };
+
+            relatedLink = ResolveCyclicalLinks(relatedLink, wi);
+            if (IsDuplicateWorkItemLink(wi.Relations, relatedLink))
+                return false;
+
+            if (LinkGraph != null)
+                RemoveConflictingParentLinks(link, wi, patchDocument, settings, author, time);
+
+            wi.Relations.Add(relatedLink);
+            patchDocument.Add(new JsonPatchOperation()
+            {
+                Operation = Operation.Add,
+                Path = "/relations/-",
+                Value = new
+                {
+                    rel = link.WiType,
+                    url = targetUrl,
+                    attributes = new
+                    {
+                        comment = "Imported link from JIRA"
+                    }
+                }
+            });
+            return true;
+        }
+
+        // The work items are imported into one project, so the url of the target is the url of this work item with the
+        // id of the target. Without a link graph the target is read to get its url.
+        private string GetTargetWorkItemUrl(WiLink link, WorkItem wi)
+        {
+            if (LinkGraph != null && wi.Id.HasValue && !string.IsNullOrEmpty(wi.Url) && wi.Url.EndsWith("/" + wi.Id.Value))
+                return wi.Url.Substring(0, wi.Url.Length - wi.Id.Value.ToString().Length) + link.TargetWiId;
+
+            return GetWorkItem(link.TargetWiId).Url;
+        }
+
+        // A work item can only have one parent. Adding a parent link removes the other parent links of the work item in
+        // the same update. Adding a child link first removes the parent link of the child when the link graph tells that
+        // the child still has another parent at this time, instead of retrying after Azure DevOps rejected the link.
+        private void RemoveConflictingParentLinks(WiLink link, WorkItem wi, JsonPatchDocument patchDocument, Settings settings, string author, DateTime time)
+        {
+            if (link.WiType == LinkGraph.HierarchyReverse)
+            {
+                var otherParents = wi.Relations
+                    .Where(r => r.Rel == LinkGraph.HierarchyReverse && r.Url != null && GetRelatedWorkItemIdFromLink(r) != link.TargetWiId)
+                    .ToList();
+                foreach (var relation in otherParents)
+                {
+                    var parentWiId = GetRelatedWorkItemIdFromLink(relation);
+                    Logger.Log(LogLevel.Info, $"'{link}' - replacing the parent link of work item ID:{wi.Id} to work item ID:{parentWiId}.");
+                    RemoveLink(new WiLink
+                    {
+                        Change = ReferenceChangeType.Removed,
+                        SourceWiId = wi.Id ?? 0,
+                        TargetWiId = parentWiId,
+                        WiType = LinkGraph.HierarchyReverse
+                    }, wi, patchDocument);
+                }
+            }
+            else if (link.WiType == LinkGraph.HierarchyForward && settings != null)
+            {
+                var replacedParent = LinkGraph.GetReplacedParent(link.TargetOriginId, link.SourceOriginId, time);
+                if (replacedParent == null)
+                    return;
+
+                var child = GetWorkItem(link.TargetWiId);
+                var otherParents = child.Relations
+                    .Where(r => r.Rel == LinkGraph.HierarchyReverse && r.Url != null && GetRelatedWorkItemIdFromLink(r) != wi.Id)
+                    .ToList();
+                foreach (var relation in otherParents)
+                {
+                    var parentWiId = GetRelatedWorkItemIdFromLink(relation);
+                    Logger.Log(LogLevel.Info, $"'{link}' - removing the parent link of work item ID:{child.Id} to work item ID:{parentWiId} ('{replacedParent}').");
+                    RemoveAndSaveLink(new WiLink
+                    {
+                        Change = ReferenceChangeType.Removed,
+                        SourceWiId = child.Id.Value,
+                        TargetWiId = parentWiId,
+                        WiType = LinkGraph.HierarchyReverse
+                    }, child, settings, author, time);
+                }
+            }
+        }
+
+        // Removes the link from the relations of the work item and adds the removal to the patch document, instead of saving it
+        public bool RemoveLink(WiLink link, WorkItem wi, JsonPatchDocument patchDocument)
+        {
+            if (link == null)
+            {
+                throw new ArgumentException(nameof(link));
+            }
+            if (wi == null)
+            {
+                throw new ArgumentException(nameof(wi));
+            }
+            if (patchDocument == null)
+            {
+                throw new ArgumentException(nameof(patchDocument));
+            }
+
+            WorkItemRelation linkToRemove = wi.Relations.OfType<WorkItemRelation>().FirstOrDefault(
+                rl =>
+                    rl.Rel == link.WiType
+                    && rl.Url != null
+                    && GetRelatedWorkItemIdFromLink(rl) == link.TargetWiId);
+            if (linkToRemove == null)
+            {
+                Logger.Log(LogLevel.Warning, $"{link} - cannot identify link to remove for '{wi.Id}'.");
+                return false;
+            }
+
+            // Attachments that are not uploaded yet have no url and are not among the relations in Azure DevOps
+            int relIndex = wi.Relations.TakeWhile(r => r != linkToRemove).Count(r => r.Url != null);
+            patchDocument.Add(new JsonPatchOperation()
+            {
+                Operation = Operation.Remove,
+                Path = "/relations/" + relIndex
+            });
+            wi.Relations.Remove(linkToRemove);
+            return true;
+        }
+
         public void EnsureAuthorFields(WiRevision rev)
         {
             if (rev == null)
@@ -429,7 +597,7 @@ namespace WorkItemImport
             }
         }
 
-        public bool CorrectDescription(WorkItem wi, WiItem wiItem, WiRevision rev, IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigratedDelegate)
+        public bool CorrectDescription(WorkItem wi, WiItem wiItem, WiRevision rev, IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigratedDelegate, AttachmentUrlRewriter urlRewriter = null)
         {
             if (wi == null)
             {
@@ -452,7 +620,7 @@ namespace WorkItemImport
 
             bool descUpdated = false;
 
-            CorrectImagePath(wi, wiItem, rev, ref description, ref descUpdated, isAttachmentMigratedDelegate);
+            CorrectImagePath(wi, wiItem, rev, ref description, ref descUpdated, isAttachmentMigratedDelegate, urlRewriter);
 
             if (descUpdated)
             {
@@ -469,7 +637,7 @@ namespace WorkItemImport
             return descUpdated;
         }
 
-        public bool CorrectRenderedField(WorkItem wi, WiItem wiItem, WiRevision rev, string fieldRef, IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigratedDelegate)
+        public bool CorrectRenderedField(WorkItem wi, WiItem wiItem, WiRevision rev, string fieldRef, IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigratedDelegate, AttachmentUrlRewriter urlRewriter = null)
         {
             if (wi == null)
             {
@@ -492,7 +660,7 @@ namespace WorkItemImport
 
             bool updated = false;
 
-            CorrectImagePath(wi, wiItem, rev, ref fieldValue, ref updated, isAttachmentMigratedDelegate);
+            CorrectImagePath(wi, wiItem, rev, ref fieldValue, ref updated, isAttachmentMigratedDelegate, urlRewriter);
 
             if (updated)
             {
@@ -502,7 +670,7 @@ namespace WorkItemImport
             return updated;
         }
 
-        public bool CorrectAcceptanceCriteria(WorkItem wi, WiItem wiItem, WiRevision rev, IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigratedDelegate)
+        public bool CorrectAcceptanceCriteria(WorkItem wi, WiItem wiItem, WiRevision rev, IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigratedDelegate, AttachmentUrlRewriter urlRewriter = null)
         {
             if (wi == null)
             {
@@ -525,7 +693,7 @@ namespace WorkItemImport
 
             bool updated = false;
 
-            CorrectImagePath(wi, wiItem, rev, ref acceptanceCriteria, ref updated, isAttachmentMigratedDelegate);
+            CorrectImagePath(wi, wiItem, rev, ref acceptanceCriteria, ref updated, isAttachmentMigratedDelegate, urlRewriter);
 
             if (updated)
             {
@@ -535,7 +703,7 @@ namespace WorkItemImport
             return updated;
         }
 
-        public void CorrectComment(WorkItem wi, WiItem wiItem, WiRevision rev, IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigratedDelegate)
+        public void CorrectComment(WorkItem wi, WiItem wiItem, WiRevision rev, IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigratedDelegate, AttachmentUrlRewriter urlRewriter = null)
         {
             if (wi == null)
             {
@@ -554,7 +722,7 @@ namespace WorkItemImport
 
             string currentComment = wi.Fields[WiFieldReference.History].ToString();
             bool commentUpdated = false;
-            CorrectImagePath(wi, wiItem, rev, ref currentComment, ref commentUpdated, isAttachmentMigratedDelegate);
+            CorrectImagePath(wi, wiItem, rev, ref currentComment, ref commentUpdated, isAttachmentMigratedDelegate, urlRewriter);
 
             if (commentUpdated)
                 wi.Fields[WiFieldReference.History] = currentComment;
@@ -625,6 +793,100 @@ namespace WorkItemImport
             }
         }
 
+        // Uploads the attachments added in the revision and adds them to the relations of the work item and
+        // to the patch document, instead of saving each of them. Returns the uploaded attachments by original id.
+        public Dictionary<string, WiAttachment> AddWorkItemAttachments(WiRevision rev, WorkItem wi, JsonPatchDocument patchDocument)
+        {
+            if (rev == null)
+            {
+                throw new ArgumentException(nameof(rev));
+            }
+
+            if (wi == null)
+            {
+                throw new ArgumentException(nameof(wi));
+            }
+
+            if (patchDocument == null)
+            {
+                throw new ArgumentException(nameof(patchDocument));
+            }
+
+            var uploaded = new Dictionary<string, WiAttachment>();
+            foreach (WiAttachment att in rev.Attachments.Where(a => a.Change == ReferenceChangeType.Added))
+            {
+                // The relation added by ApplyAttachments is replaced by the uploaded attachment
+                wi.Relations.RemoveAll(r => r.Rel == AttachedFile && r.Url == null && Equals(r.Attributes?[Comment], att.Comment));
+
+                if (wi.Relations.Count(r => r.Rel == AttachedFile && r.Url != null) >= 100)
+                {
+                    Logger.Log(LogLevel.Warning, $"'{rev}' - tried to add an attachment, but hit the workitem attachment " +
+                        $"limit (cannot add more than 100 attachments. Skipping attachment: {att.FileName}");
+                    continue;
+                }
+
+                AttachmentReference attachment;
+                try
+                {
+                    attachment = UploadAttachment(att);
+                }
+                catch (AggregateException e)
+                {
+                    Logger.Log(LogLevel.Warning, $"'{rev}' - tried to add an attachment, but encountered an unhandled " +
+                        $"exception. Skipping attachment: {att.FileName}. See full error " +
+                        $"message below.\n{e.InnerException?.Message}");
+                    continue;
+                }
+
+                var comment = $"{att.Comment}, original ID: {att.AttOriginId}";
+                wi.Relations.Add(new WorkItemRelation
+                {
+                    Rel = AttachedFile,
+                    Url = attachment.Url,
+                    Attributes = new Dictionary<string, object> { { Comment, comment } }
+                });
+                patchDocument.Add(new JsonPatchOperation()
+                {
+                    Operation = Operation.Add,
+                    Path = "/relations/-",
+                    Value = new
+                    {
+                        rel = AttachedFile,
+                        url = attachment.Url,
+                        attributes = new
+                        {
+                            comment
+                        }
+                    }
+                });
+                uploaded[att.AttOriginId] = att;
+            }
+
+            foreach (WiAttachment att in rev.Attachments.Where(a => a.Change == ReferenceChangeType.Removed))
+            {
+                WorkItemRelation existingAttachmentRelation = wi.Relations.FirstOrDefault(
+                    a => a.Rel == AttachedFile && a.Url != null &&
+                    a.Attributes[Comment].ToString().Split(
+                        new string[] { ", original ID: " }, StringSplitOptions.None).ElementAtOrDefault(1) == att.AttOriginId
+                );
+
+                if (existingAttachmentRelation == null)
+                {
+                    Logger.Log(LogLevel.Warning, $"Skipping saving attachment {att.AttOriginId}, since that attachment was not found.");
+                    continue;
+                }
+
+                patchDocument.Add(new JsonPatchOperation()
+                {
+                    Operation = Operation.Remove,
+                    Path = "/relations/" + wi.Relations.TakeWhile(r => r != existingAttachmentRelation).Count(r => r.Url != null)
+                });
+                wi.Relations.Remove(existingAttachmentRelation);
+            }
+
+            return uploaded;
+        }
+
         public void SaveWorkItemFields(WorkItem wi, Settings settings)
         {
             if (wi == null)
@@ -632,6 +894,58 @@ namespace WorkItemImport
                 throw new ArgumentException(nameof(wi));
             }
 
+            JsonPatchDocument patchDocument = CreateFieldsPatchDocument(wi);
+
+            try
+            {
+                if (wi.Id.HasValue)
+                    _witClientWrapper.UpdateWorkItem(patchDocument, wi.Id.Value, settings.SuppressNotifications);
+                else
+                    throw new MissingFieldException($"Work item ID was null: {wi.Url}");
+            }
+            catch (AggregateException ex)
+            {
+                foreach (Exception ex2 in ex.InnerExceptions)
+                {
+                    Logger.Log(LogLevel.Error, ex2.Message);
+                }
+                Logger.Log(LogLevel.Error, "Work Item " + wi.Id + " failed to save.");
+            }
+        }
+
+        // Saves the fields together with the relation changes of the revision in one update.
+        // Returns false when Azure DevOps rejected the update, in that case nothing was saved.
+        public bool SaveWorkItemFields(WorkItem wi, Settings settings, JsonPatchDocument relationPatchDocument)
+        {
+            if (wi == null)
+            {
+                throw new ArgumentException(nameof(wi));
+            }
+
+            if (!wi.Id.HasValue)
+                throw new MissingFieldException($"Work item ID was null: {wi.Url}");
+
+            JsonPatchDocument patchDocument = new JsonPatchDocument();
+            patchDocument.AddRange(relationPatchDocument ?? new JsonPatchDocument());
+            patchDocument.AddRange(CreateFieldsPatchDocument(wi));
+
+            try
+            {
+                _witClientWrapper.UpdateWorkItem(patchDocument, wi.Id.Value, settings.SuppressNotifications);
+                return true;
+            }
+            catch (AggregateException ex)
+            {
+                foreach (Exception ex2 in ex.InnerExceptions)
+                {
+                    Logger.Log(LogLevel.Warning, ex2.Message);
+                }
+                return false;
+            }
+        }
+
+        private static JsonPatchDocument CreateFieldsPatchDocument(WorkItem wi)
+        {
             // Build json patch document from fields
             JsonPatchDocument patchDocument = new JsonPatchDocument();
             foreach (string key in wi.Fields.Keys)
@@ -658,22 +972,7 @@ namespace WorkItemImport
                     );
                 }
             }
-
-            try
-            {
-                if (wi.Id.HasValue)
-                    _witClientWrapper.UpdateWorkItem(patchDocument, wi.Id.Value, settings.SuppressNotifications);
-                else
-                    throw new MissingFieldException($"Work item ID was null: {wi.Url}");
-            }
-            catch (AggregateException ex)
-            {
-                foreach (Exception ex2 in ex.InnerExceptions)
-                {
-                    Logger.Log(LogLevel.Error, ex2.Message);
-                }
-                Logger.Log(LogLevel.Error, "Work Item " + wi.Id + " failed to save.");
-            }
+            return patchDocument;
         }
 
         public void SaveWorkItemArtifacts(WiRevision rev, WorkItem wi, Settings settings)
@@ -721,7 +1020,8 @@ namespace WorkItemImport
             }
         }
 
-        private void CorrectImagePath(WorkItem wi, WiItem wiItem, WiRevision rev, ref string textField, ref bool isUpdated, IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigratedDelegate)
+        // The attachments of the item are indexed once, all texts of a revision can share the rewriter
+        public AttachmentUrlRewriter CreateAttachmentUrlRewriter(WorkItem wi, WiItem wiItem, IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigratedDelegate)
         {
             if (wi == null)
             {
@@ -733,48 +1033,47 @@ namespace WorkItemImport
                 throw new ArgumentException(nameof(wiItem));
             }
 
-            if (rev == null)
+            return new AttachmentUrlRewriter(
+                wiItem.Revisions.SelectMany(r => r.Attachments.Where(a => a.Change == ReferenceChangeType.Added)),
+                att => IdentifyAttachment(att, wi, isAttachmentMigratedDelegate)?.Url);
+        }
+
+        private void CorrectImagePath(WorkItem wi, WiItem wiItem, WiRevision rev, ref string textField, ref bool isUpdated, IsAttachmentMigratedDelegate<string, string, bool> isAttachmentMigratedDelegate,
+            AttachmentUrlRewriter urlRewriter = null)
+        {
+            if (wi == null)
             {
-                throw new ArgumentException(nameof(rev));
+                throw new ArgumentException(nameof(wi));
             }
 
-            var filteredRelations = wiItem.Revisions.SelectMany(r => r.Attachments.Where(a => a.Change == ReferenceChangeType.Added));
+            if (wiItem == null)
+            {
+                throw new ArgumentException(nameof(wiItem));
+            }
 
-            foreach (var att in filteredRelations)
+            if (rev == null)
             {
-                string fileName = att.FilePath.Split('\\').Last() ?? string.Empty;
-                string encodedFileName = EncodeFileNameUsingJiraStandard(fileName);
-                string restApiUrlOptionV2 = "/rest/api/2/attachment/content/" + att.AttOriginId;
-                string restApiUrlOptionV3 = "/rest/api/3/attachment/content/" + att.AttOriginId;
-                if (
-                    textField.Contains(fileName)
-                    || textField.IndexOf(encodedFileName, StringComparison.OrdinalIgnoreCase) >= 0
-                    || textField.Contains("_thumb_" + att.AttOriginId)
-                    || textField.Contains(restApiUrlOptionV2)
-                    || textField.Contains(restApiUrlOptionV3)
-                )
-                {
-                    var tfsAtt = IdentifyAttachment(att, wi, isAttachmentMigratedDelegate);
+                throw new ArgumentException(nameof(rev));
+            }
 
-                    if (tfsAtt != null)
-                    {
-                        string imageSrcPattern1 = $"src.*?=.*?\"([^\"])(?=.*{att.AttOriginId}).*?\"";
-                        textField = Regex.Replace(textField, imageSrcPattern1, $"src=\"{tfsAtt.Url}\"");
+            urlRewriter ??= CreateAttachmentUrlRewriter(wi, wiItem, isAttachmentMigratedDelegate);
+            string rewritten = urlRewriter.Rewrite(textField, out bool referencesMigrated, out WiAttachment missingAttachment);
 
-                        string imageSrcPattern2 = $"!{att.FileName}!";
-                        textField = Regex.Replace(textField, imageSrcPattern2, $"<img src=\"{tfsAtt.Url}\"/>");
+            if (missingAttachment != null
+                && wi.Relations.Where(r => r.Rel == "AttachedFile").Count() < 100) // Do not throw AttachmentNotFoundException if there are
+                                                                                  // 100 attachments (ADO attachment count limit/work item).
+                                                                                  // This means that some attachments could have been skipped.
+            {
+                Logger.Log(LogLevel.Warning, $"Attachment '{missingAttachment}' referenced in text but is missing from work item {wiItem.OriginId}/{wi.Id}. This revision will be deferred until later.");
+                throw new AttachmentNotFoundException("Attachment not found on work item");
+            }
 
-                        isUpdated = true;
-                    }
-                    else if (wi.Relations.Where(r => r.Rel == "AttachedFile").Count() < 100) // Do not throw AttachmentNotFoundException if there are
-                                                                                             // 100 attachments (ADO attachment count limit/work item).
-                                                                                             // This means that some attachments could have been skipped.
-                    {
-                        Logger.Log(LogLevel.Warning, $"Attachment '{att}' referenced in text but is missing from work item {wiItem.OriginId}/{wi.Id}. This revision will be deferred until later.");
-                        throw new AttachmentNotFoundException("Attachment not found on work item");
-                    }
-                }
+            if (referencesMigrated)
+            {
+                textField = rewritten;
+                isUpdated = true;
             }
+
             if (isUpdated)
             {
                 DateTime changedDate;
@@ -790,10 +1089,7 @@ namespace WorkItemImport
 
         public string EncodeFileNameUsingJiraStandard(string fileName)
         {
-            string fileNameEncoded = HttpUtility.UrlEncode(fileName);
-            fileNameEncoded = fileNameEncoded.Replace("(", "%28");
-            fileNameEncoded = fileNameEncoded.Replace(")", "%29");
-            return fileNameEncoded;
+            return AttachmentUrlRewriter.EncodeFileName(fileName);
         }
 
 
@@ -906,10 +1202,15 @@ namespace WorkItemImport
             }
         }
 
+        private AttachmentReference UploadAttachment(WiAttachment att)
+        {
+            return AttachmentUploader != null ? AttachmentUploader.GetOrUpload(att) : _witClientWrapper.CreateAttachment(att);
+        }
+
         private void AddSingleAttachmentToWorkItemAndSave(WiAttachment att, WorkItem wi, Settings settings, DateTime? changedDate = null, string changedBy = "")
         {
             // Upload attachment
-            AttachmentReference attachment = _witClientWrapper.CreateAttachment(att);
+            AttachmentReference attachment = UploadAttachment(att);
             Logger.Log(LogLevel.Info, "Adding single attachment");
             Logger.Log(LogLevel.Info, $"ID: {attachment.Id}");
             Logger.Log(LogLevel.Info, $"URL: '{attachment.Url}'");
@@ -1040,28 +1341,24 @@ namespace WorkItemImport
             wi.Relations = result.Relations;
         }
 
-        private void AddSingleLinkToWorkItemAndSave(WiLink link, WorkItem sourceWI, WorkItem targetWI, Settings settings, string comment, string changedBy, DateTime changedDate)
+        private void AddSingleLinkToWorkItemAndSave(WiLink link, WorkItem sourceWI, string targetUrl, JsonPatchDocument linkPatchDocument, Settings settings, string comment, string changedBy, DateTime changedDate)
         {
-            // Create a patch document for a new work item.
-            // Specify a relation to the existing work item.
-            JsonPatchDocument linkPatchDocument = new JsonPatchDocument
+            // Add a relation to the existing work item to the patch document, after the relations it already removes.
+            linkPatchDocument.Add(new JsonPatchOperation()
             {
-                new JsonPatchOperation()
+                Operation = Operation.Add,
+                Path = "/relations/-",
+                Value = new
                 {
-                    Operation = Operation.Add,
-                    Path = "/relations/-",
-                    Value = new
+                    rel = link.WiType,
+                    url = targetUrl,
+                    attributes = new
                     {
-                        rel = link.WiType,
-                        url = targetWI.Url,
-                        attributes = new
-                        {
-                            comment
-                        }
+                        comment
                     }
-                },
-                JsonPatchDocUtils.CreateJsonFieldPatchOp(Operation.Add, WiFieldReference.ChangedDate, changedDate)
-            };
+                }
+            });
+            linkPatchDocument.Add(JsonPatchDocUtils.CreateJsonFieldPatchOp(Operation.Add, WiFieldReference.ChangedDate, changedDate));
 
             if (!string.IsNullOrEmpty(changedBy))
             {
@@ -1075,7 +1372,7 @@ namespace WorkItemImport
             else
                 throw new MissingFieldException($"Work item ID was null: {sourceWI.Url}");
 
-            Logger.Log(LogLevel.Info, $"Updated new work item Id:{sourceWI.Id} with link to work item ID:{targetWI.Id}");
+            Logger.Log(LogLevel.Info, $"Updated new work item Id:{sourceWI.Id} with link to work item ID:{link.TargetWiId}");
         }
 
         private void RemoveSingleLinkFromWorkItemAndSave(WiLink link, WorkItem sourceWI, Settings settings, string changedBy, DateTime changedDate)
@@ -1161,6 +1458,16 @@ namespace WorkItemImport
 
         private bool DetectCycle(WorkItem startingWi, WorkItemRelation startingLink)
         {
+            // Work item links have a reverse end, so the target links back to this work item exactly when one of the
+            // relations of this work item points to the target
+            if (LinkGraph != null)
+            {
+                var targetWiId = GetRelatedWorkItemIdFromLink(startingLink);
+                return startingWi.Relations.OfType<WorkItemRelation>()
+                    .Where(rl => rl.Rel != AttachedFile && rl.Rel != "Hyperlink" && rl.Url != null)
+                    .Any(rl => rl.Url.EndsWith("/" + targetWiId) && GetRelatedWorkItemIdFromLink(rl) == targetWiId);
+            }
+
             var nextWiLink = startingLink;
             do
             {
@@ -8,11 +8,17 @@ using Microsoft.VisualStudio.Services.WebApi.Patch;
 using Microsoft.VisualStudio.Services.WebApi.Patch.Json;
 using Migration.Common.Log;
 using Migration.WIContract;
+using Newtonsoft.Json;
 using System;
 using System.Collections.Concurrent;
 using System.Collections.Generic;
 using System.IO;
+using System.Linq;
+using System.Net.Http;
+using System.Net.Http.Headers;
+using System.Text;
 using System.Threading;
+using System.Threading.Tasks;
 using WorkItemImport.WitClient;
 
 namespace WorkItemImport
@@ -22,6 +28,13 @@ namespace WorkItemImport
         // Cache fields
         private readonly ConcurrentDictionary<string, TeamProject> _projectCache = new ConcurrentDictionary<string, TeamProject>();
         private readonly ConcurrentDictionary<string, GitRepository> _repositoryCache = new ConcurrentDictionary<string, GitRepository>();
+        private readonly WorkItemStateCache _workItemCache;
+        private List<WorkItemRelationType> _relationTypes;
+        private readonly Lazy<HttpClient> _uploadClient;
+
+        // Files above the size limit of a single upload are uploaded in chunks
+        private const long ChunkedUploadThreshold = 100L * 1024 * 1024;
+        private const int UploadChunkSize = 16 * 1024 * 1024;
 
         private WorkItemTrackingHttpClient WitClient { get; }
         private ProjectHttpClient ProjectClient { get; }
@@ -29,19 +42,122 @@ namespace WorkItemImport
         private TeamProjectReference TeamProject { get; }
         private GitHttpClient GitClient { get; }
         private int ChangedDateBumpMS { get; }
+        private Uri CollectionUri { get; }
+        private string PersonalAccessToken { get; }
+        private AdoRateLimiter RateLimiter { get; }
+        private int MaxThrottlingRetries { get; }
+        public WorkItemStateCache WorkItemCache { get { return _workItemCache; } }
 
-        public WitClientWrapper(string collectionUri, string project, string personalAccessToken, int changedDateBumpMS)
+        public WitClientWrapper(string collectionUri, string project, string personalAccessToken, int changedDateBumpMS, int workItemCacheSize = 0,
+            int maxConnectionsPerServer = 0, AdoRateLimiter rateLimiter = null, int maxThrottlingRetries = 5)
         {
-            var credentials = new VssBasicCredential("", personalAccessToken);
-            Connection = new VssConnection(new Uri(collectionUri), credentials);
+            _workItemCache = new WorkItemStateCache(workItemCacheSize);
+            RateLimiter = rateLimiter;
+            MaxThrottlingRetries = maxThrottlingRetries;
+            Connection = CreateConnection(collectionUri, personalAccessToken, maxConnectionsPerServer, rateLimiter, maxThrottlingRetries);
             WitClient = Connection.GetClient<WorkItemTrackingHttpClient>();
             ProjectClient = Connection.GetClient<ProjectHttpClient>();
             TeamProject = ProjectClient.GetProject(project).Result;
             GitClient = Connection.GetClient<GitHttpClient>();
             ChangedDateBumpMS = changedDateBumpMS;
+            CollectionUri = new Uri(collectionUri.TrimEnd('/') + "/");
+            PersonalAccessToken = personalAccessToken;
+            _uploadClient = new Lazy<HttpClient>(() => CreateUploadClient(maxConnectionsPerServer), LazyThreadSafetyMode.ExecutionAndPublication);
+        }
+
+        // All connections to Azure DevOps share the rate limiter. A maximum of 0 connections per server keeps the default
+        // of the HTTP handler.
+        public static VssConnection CreateConnection(string collectionUri, string personalAccessToken, int maxConnectionsPerServer, AdoRateLimiter rateLimiter, int maxThrottlingRetries)
+        {
+            var credentials = new VssBasicCredential("", personalAccessToken);
+            var httpClientHandler = new HttpClientHandler();
+            if (maxConnectionsPerServer > 0)
+                httpClientHandler.MaxConnectionsPerServer = maxConnectionsPerServer;
+
+            var messageHandler = new VssHttpMessageHandler(credentials, VssClientHttpRequestSettings.Default.Clone(), httpClientHandler);
+            var delegatingHandlers = rateLimiter != null
+                ? new DelegatingHandler[] { new AdoThrottlingHandler(rateLimiter, maxThrottlingRetries) }
+                : Array.Empty<DelegatingHandler>();
+            return new VssConnection(new Uri(collectionUri), messageHandler, delegatingHandlers);
         }
 
+        // The synchronous methods wait for their asynchronous counterpart, errors are reported in an AggregateException
+        // like the client library reports them.
         public WorkItem CreateWorkItem(string wiType, bool suppressNotifications, DateTime? createdDate = null, string createdBy = "")
+        {
+            return CreateWorkItemAsync(wiType, suppressNotifications, createdDate, createdBy).Result;
+        }
+
+        public async Task<WorkItem> CreateWorkItemAsync(string wiType, bool suppressNotifications, DateTime? createdDate = null, string createdBy = "")
+        {
+            JsonPatchDocument patchDoc = CreateWorkItemPatchDocument(createdDate, createdBy);
+
+            WorkItem wiOut;
+            try
+            {
+                wiOut = await WitClient.CreateWorkItemAsync(document: patchDoc, project: TeamProject.Name, type: wiType, bypassRules: true, suppressNotifications: suppressNotifications, expand: WorkItemExpand.All);
+            }
+            catch (Exception e)
+            {
+                Logger.Log(LogLevel.Error, $"Error when creating new Work item: {e.Message} - {(e.InnerException != null ? e.InnerException.Message : "")}");
+                return null;
+            }
+
+            if (wiOut.Relations == null)
+                wiOut.Relations = new List<WorkItemRelation>();
+
+            _workItemCache.Set(wiOut);
+            return wiOut;
+        }
+
+        // Creates the work items with one $batch request. The requests of a batch are independent, the result has the
+        // created work item or null for every work item, in the same order.
+        public List<WorkItem> CreateWorkItems(IList<(string WiType, DateTime? CreatedDate, string CreatedBy)> workItems, bool suppressNotifications)
+        {
+            return CreateWorkItemsAsync(workItems, suppressNotifications).Result;
+        }
+
+        public async Task<List<WorkItem>> CreateWorkItemsAsync(IList<(string WiType, DateTime? CreatedDate, string CreatedBy)> workItems, bool suppressNotifications)
+        {
+            var requests = new List<WitBatchRequest>();
+            foreach (var (wiType, createdDate, createdBy) in workItems)
+            {
+                requests.Add(WitClient.CreateWorkItemBatchRequest(TeamProject.Name, wiType, CreateWorkItemPatchDocument(createdDate, createdBy),
+                    bypassRules: true, suppressNotifications: suppressNotifications));
+            }
+
+            List<WitBatchResponse> responses;
+            try
+            {
+                responses = await WitClient.ExecuteBatchRequest(requests);
+            }
+            catch (Exception e)
+            {
+                Logger.Log(LogLevel.Error, $"Error when creating {workItems.Count} new Work items in a batch: {e.Message} - {(e.InnerException != null ? e.InnerException.Message : "")}");
+                return workItems.Select(_ => (WorkItem)null).ToList();
+            }
+
+            var created = new List<WorkItem>();
+            for (int i = 0; i < workItems.Count; i++)
+            {
+                var response = i < responses.Count ? responses[i] : null;
+                if (response == null || response.Code < 200 || response.Code >= 300)
+                {
+                    Logger.Log(LogLevel.Warning, $"Could not create a new '{workItems[i].WiType}' Work item in a batch: {response?.Code} {response?.Body}");
+                    created.Add(null);
+                    continue;
+                }
+
+                var wiOut = response.ParseBody<WorkItem>();
+                if (wiOut.Relations == null)
+                    wiOut.Relations = new List<WorkItemRelation>();
+                _workItemCache.Set(wiOut);
+                created.Add(wiOut);
+            }
+            return created;
+        }
+
+        private static JsonPatchDocument CreateWorkItemPatchDocument(DateTime? createdDate, string createdBy)
         {
             JsonPatchDocument patchDoc = new JsonPatchDocument
             {
@@ -70,59 +186,63 @@ namespace WorkItemImport
                 );
             }
 
-            WorkItem wiOut;
-            try
-            {
-                wiOut = WitClient.CreateWorkItemAsync(document: patchDoc, project: TeamProject.Name, type: wiType, bypassRules: true, suppressNotifications: suppressNotifications, expand: WorkItemExpand.All).Result;
-            }
-            catch (Exception e)
-            {
-                Logger.Log(LogLevel.Error, $"Error when creating new Work item: {e.Message} - {(e.InnerException != null ? e.InnerException.Message : "")}");
-                return null;
-            }
-
-            if (wiOut.Relations == null)
-                wiOut.Relations = new List<WorkItemRelation>();
-
-            return wiOut;
+            return patchDoc;
         }
 
         public WorkItem GetWorkItem(int wiId)
         {
+            return GetWorkItemAsync(wiId).Result;
+        }
+
+        public async Task<WorkItem> GetWorkItemAsync(int wiId)
+        {
+            // The state saved by the last update of the work item, instead of reading it again
+            if (_workItemCache.TryGet(wiId, out WorkItem cachedWi))
+                return cachedWi;
+
             WorkItem wiOut;
             try
             {
-                wiOut = WitClient.GetWorkItemAsync(wiId, expand: WorkItemExpand.All).Result;
+                wiOut = await WitClient.GetWorkItemAsync(wiId, expand: WorkItemExpand.All);
             }
-            catch (System.AggregateException)
+            catch (Exception)
             {
                 // Work item was not found, return null
                 return null;
             }
             if (wiOut.Relations == null)
                 wiOut.Relations = new List<WorkItemRelation>();
+            _workItemCache.Set(wiOut);
             return wiOut;
         }
 
         public WorkItem UpdateWorkItem(JsonPatchDocument patchDocument, int workItemId, bool suppressNotifications)
+        {
+            return UpdateWorkItemAsync(patchDocument, workItemId, suppressNotifications).Result;
+        }
+
+        public async Task<WorkItem> UpdateWorkItemAsync(JsonPatchDocument patchDocument, int workItemId, bool suppressNotifications)
         {
             while (true)
             {
                 try
                 {
-                    var result = WitClient.UpdateWorkItemAsync(
+                    var result = await WitClient.UpdateWorkItemAsync(
                         document: patchDocument,
                         id: workItemId,
                         suppressNotifications: suppressNotifications,
                         bypassRules: true,
                         expand: WorkItemExpand.All
-                    ).Result;
+                    );
+                    if (result.Relations == null)
+                        result.Relations = new List<WorkItemRelation>();
+                    _workItemCache.Updated(workItemId, patchDocument, result);
                     return result;
                 }
-                catch (AggregateException ex)
+                catch (Exception ex)
                 {
                     bool errorHandled = false;
-                    foreach (Exception ex2 in ex.InnerExceptions)
+                    foreach (Exception ex2 in ex is AggregateException aggregate ? aggregate.InnerExceptions : (IEnumerable<Exception>)new[] { ex })
                     {
                         // Handle 'VS402625' error responses, the supplied ChangedDate was older than the latest revision already in ADO.
                         // We must bump the ChangedDate by a small factor and try again.
@@ -147,11 +267,14 @@ namespace WorkItemImport
                         {
                             Logger.Log(LogLevel.Warning, $"Received response while updating Work Item: {ex2.Message}." +
                                 $" Waiting and trying again...");
-                           errorHandled = true;
+                            await Task.Delay(ChangedDateBumpMS);
+                            errorHandled = true;
                         }
                     }
                     if (!errorHandled)
                     {
+                        // The work item may have been changed by someone else, it is read again
+                        _workItemCache.Remove(workItemId);
                         throw;
                     }
                 }
@@ -190,13 +313,89 @@ namespace WorkItemImport
 
         public List<WorkItemRelationType> GetRelationTypes()
         {
-            return WitClient.GetRelationTypesAsync().Result;
+            return GetRelationTypesAsync().Result;
+        }
+
+        // The link types of the organization do not change during the import, they are read once
+        public async Task<List<WorkItemRelationType>> GetRelationTypesAsync()
+        {
+            return _relationTypes ??= await WitClient.GetRelationTypesAsync();
         }
 
         public AttachmentReference CreateAttachment(WiAttachment attachment)
         {
+            return CreateAttachmentAsync(attachment).Result;
+        }
+
+        public async Task<AttachmentReference> CreateAttachmentAsync(WiAttachment attachment)
+        {
+            if (new FileInfo(attachment.FilePath).Length > ChunkedUploadThreshold)
+                return await CreateAttachmentInChunksAsync(attachment);
+
+            // A throttled upload is sent again with the file opened again, the rate limiter holds it back until then
+            for (int attempt = 1; ; attempt++)
+            {
+                try
+                {
+                    using (FileStream uploadStream = File.Open(attachment.FilePath, FileMode.Open, FileAccess.Read))
+                        return await WitClient.CreateAttachmentAsync(uploadStream, attachment.FileName, null, null, null, new CancellationToken());
+                }
+                catch (Exception e) when (attempt <= MaxThrottlingRetries && AdoThrottlingHandler.IsThrottlingException(e))
+                {
+                    Logger.Log(LogLevel.Debug, $"Upload of attachment '{attachment.FileName}' was throttled, uploading it again.");
+                }
+            }
+        }
+
+        // The client library only uploads a file in one request, chunked uploads use the REST API:
+        // the upload is started with uploadType=Chunked and every chunk is sent with a Content-Range.
+        private async Task<AttachmentReference> CreateAttachmentInChunksAsync(WiAttachment attachment)
+        {
+            var fileName = Uri.EscapeDataString(attachment.FileName);
+            var httpClient = _uploadClient.Value;
+
             using (FileStream uploadStream = File.Open(attachment.FilePath, FileMode.Open, FileAccess.Read))
-                return WitClient.CreateAttachmentAsync(uploadStream, attachment.FileName, null, null, null, new CancellationToken()).Result;
+            {
+                var startResponse = await httpClient.PostAsync(
+                    $"{Uri.EscapeDataString(TeamProject.Name)}/_apis/wit/attachments?fileName={fileName}&uploadType=Chunked&api-version=6.0",
+                    new ByteArrayContent(Array.Empty<byte>()));
+                startResponse.EnsureSuccessStatusCode();
+                var reference = JsonConvert.DeserializeObject<AttachmentReference>(await startResponse.Content.ReadAsStringAsync());
+
+                var buffer = new byte[UploadChunkSize];
+                long offset = 0;
+                int read;
+                while ((read = await uploadStream.ReadAsync(buffer, 0, buffer.Length)) > 0)
+                {
+                    var chunk = new ByteArrayContent(buffer, 0, read);
+                    chunk.Headers.ContentType = new MediaTypeHeaderValue("application/octet-stream");
+                    chunk.Headers.ContentRange = new ContentRangeHeaderValue(offset, offset + read - 1, uploadStream.Length);
+
+                    var chunkResponse = await httpClient.PutAsync($"{reference.Url}?fileName={fileName}&api-version=6.0", chunk);
+                    chunkResponse.EnsureSuccessStatusCode();
+                    offset += read;
+                }
+
+                Logger.Log(LogLevel.Debug, $"Uploaded attachment '{attachment.FileName}' in {(offset + UploadChunkSize - 1) / UploadChunkSize} chunks.");
+                return reference;
+            }
+        }
+
+        // One client is shared by all chunked uploads, so their connections are reused
+        private HttpClient CreateUploadClient(int maxConnectionsPerServer)
+        {
+            var httpClientHandler = new HttpClientHandler();
+            if (maxConnectionsPerServer > 0)
+                httpClientHandler.MaxConnectionsPerServer = maxConnectionsPerServer;
+
+            HttpMessageHandler handler = httpClientHandler;
+            if (RateLimiter != null)
+                handler = new AdoThrottlingHandler(RateLimiter, MaxThrottlingRetries) { InnerHandler = handler };
+
+            var httpClient = new HttpClient(handler) { BaseAddress = CollectionUri };
+            httpClient.DefaultRequestHeaders.Authorization = new AuthenticationHeaderValue("Basic",
+                Convert.ToBase64String(Encoding.ASCII.GetBytes($":{PersonalAccessToken}")));
+            return httpClient;
         }
     }
 }
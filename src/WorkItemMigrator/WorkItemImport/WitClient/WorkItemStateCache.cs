@@ -0,0 +1,161 @@
+﻿using Microsoft.TeamFoundation.WorkItemTracking.WebApi.Models;
+using Microsoft.VisualStudio.Services.WebApi.Patch;
+using Microsoft.VisualStudio.Services.WebApi.Patch.Json;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text.RegularExpressions;
+using System.Threading;
+
+namespace WorkItemImport.WitClient
+{
+    // Keeps the last known state of the work items returned by Azure DevOps when they were created,
+    // read or updated, so the next revision of a work item does not have to read it again. Copies
+    // are returned, since the import changes the work item locally before it is saved.
+    public class WorkItemStateCache
+    {
+        private static readonly Regex WorkItemUrlRegex = new Regex(@"/workItems/(\d+)$", RegexOptions.IgnoreCase | RegexOptions.Compiled);
+
+        private readonly Dictionary<int, LinkedListNode<WorkItem>> _nodes = new Dictionary<int, LinkedListNode<WorkItem>>();
+        private readonly LinkedList<WorkItem> _recentlyUsed = new LinkedList<WorkItem>();
+        private readonly object _syncRoot = new object();
+        private long _hits;
+        private long _misses;
+
+        // A capacity of 0 disables the cache
+        public WorkItemStateCache(int capacity)
+        {
+            Capacity = Math.Max(0, capacity);
+        }
+
+        public int Capacity { get; }
+        public long Hits { get { return Interlocked.Read(ref _hits); } }
+        public long Misses { get { return Interlocked.Read(ref _misses); } }
+
+        public bool TryGet(int workItemId, out WorkItem workItem)
+        {
+            lock (_syncRoot)
+            {
+                if (_nodes.TryGetValue(workItemId, out var node))
+                {
+                    _recentlyUsed.Remove(node);
+                    _recentlyUsed.AddFirst(node);
+                    Interlocked.Increment(ref _hits);
+                    workItem = Copy(node.Value);
+                    return true;
+                }
+            }
+
+            Interlocked.Increment(ref _misses);
+            workItem = null;
+            return false;
+        }
+
+        public void Set(WorkItem workItem)
+        {
+            if (workItem?.Id == null || Capacity == 0)
+                return;
+
+            lock (_syncRoot)
+            {
+                SetLocked(workItem);
+            }
+        }
+
+        // Azure DevOps also changes the work items on the other end of an added or removed link,
+        // so those are read again the next time they are needed.
+        public void Updated(int workItemId, JsonPatchDocument patchDocument, WorkItem result)
+        {
+            if (Capacity == 0)
+                return;
+
+            lock (_syncRoot)
+            {
+                var relationOperations = patchDocument?.Where(op => op.Path != null && op.Path.StartsWith("/relations/")).ToList() ?? new List<JsonPatchOperation>();
+                if (relationOperations.Count > 0)
+                {
+                    if (_nodes.TryGetValue(workItemId, out var previous))
+                    {
+                        foreach (var linkedId in GetLinkedWorkItemIds(previous.Value))
+                            RemoveLocked(linkedId);
+                    }
+                    else if (relationOperations.Any(op => op.Operation == Operation.Remove))
+                    {
+                        // The removed relation is unknown without the previous state
+                        _nodes.Clear();
+                        _recentlyUsed.Clear();
+                    }
+
+                    foreach (var linkedId in GetLinkedWorkItemIds(result))
+                        RemoveLocked(linkedId);
+                }
+
+                RemoveLocked(workItemId);
+                if (result?.Id != null)
+                    SetLocked(result);
+            }
+        }
+
+        public void Remove(int workItemId)
+        {
+            lock (_syncRoot)
+            {
+                RemoveLocked(workItemId);
+            }
+        }
+
+        public static int? GetWorkItemId(string url)
+        {
+            var match = url == null ? null : WorkItemUrlRegex.Match(url);
+            return match != null && match.Success ? int.Parse(match.Groups[1].Value) : (int?)null;
+        }
+
+        private static IEnumerable<int> GetLinkedWorkItemIds(WorkItem workItem)
+        {
+            return (workItem?.Relations ?? Enumerable.Empty<WorkItemRelation>())
+                .Select(r => GetWorkItemId(r.Url))
+                .Where(id => id.HasValue)
+                .Select(id => id.Value)
+                .Where(id => id != workItem.Id);
+        }
+
+        private void SetLocked(WorkItem workItem)
+        {
+            RemoveLocked(workItem.Id.Value);
+            _nodes[workItem.Id.Value] = _recentlyUsed.AddFirst(Copy(workItem));
+            while (_nodes.Count > Capacity)
+            {
+                _nodes.Remove(_recentlyUsed.Last.Value.Id.Value);
+                _recentlyUsed.RemoveLast();
+            }
+        }
+
+        private void RemoveLocked(int workItemId)
+        {
+            if (_nodes.TryGetValue(workItemId, out var node))
+            {
+                _recentlyUsed.Remove(node);
+                _nodes.Remove(workItemId);
+            }
+        }
+
+        private static WorkItem Copy(WorkItem workItem)
+        {
+            return new WorkItem
+            {
+                Id = workItem.Id,
+                Rev = workItem.Rev,
+                Url = workItem.Url,
+                Links = workItem.Links,
+                Fields = workItem.Fields == null ? new Dictionary<string, object>() : new Dictionary<string, object>(workItem.Fields),
+                Relations = (workItem.Relations ?? new List<WorkItemRelation>()).Select(r => new WorkItemRelation
+                {
+                    Rel = r.Rel,
+                    Url = r.Url,
+                    Title = r.Title,
+                    Attributes = r.Attributes == null ? null : new Dictionary<string, object>(r.Attributes)
+                }).ToList()
+            };
+        }
+    }
+}
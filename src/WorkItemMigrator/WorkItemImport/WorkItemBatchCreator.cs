@@ -0,0 +1,52 @@
+﻿using System;
+using System.Collections.Generic;
+using System.Linq;
+
+namespace WorkItemImport
+{
+    // Creates the new work items in batches just ahead of the import. A batch is created when the import reaches the
+    // first revision of a work item in it that is not created yet, so the created work items are still in the work
+    // item cache when their first revisions update them. The work items are created in the order of the plan.
+    public class WorkItemBatchCreator
+    {
+        private readonly IList<(string OriginId, string WiType, DateTime CreatedDate, string CreatedBy)> _workItems;
+        private readonly Dictionary<string, int> _positions = new Dictionary<string, int>(StringComparer.InvariantCultureIgnoreCase);
+        private readonly int _batchSize;
+        private readonly Action<IList<(string OriginId, string WiType, DateTime CreatedDate, string CreatedBy)>> _createBatch;
+        private readonly object _syncRoot = new object();
+        private int _next;
+
+        public WorkItemBatchCreator(IList<(string OriginId, string WiType, DateTime CreatedDate, string CreatedBy)> workItems, int batchSize,
+            Action<IList<(string OriginId, string WiType, DateTime CreatedDate, string CreatedBy)>> createBatch)
+        {
+            _workItems = workItems ?? throw new ArgumentNullException(nameof(workItems));
+            _createBatch = createBatch ?? throw new ArgumentNullException(nameof(createBatch));
+            _batchSize = Math.Max(1, batchSize);
+
+            for (int i = 0; i < _workItems.Count; i++)
+                _positions[_workItems[i].OriginId] = i;
+        }
+
+        public int Count { get { return _workItems.Count; } }
+
+        // Creates the batches up to the one with the work item. Returns false when the work item is not planned to be
+        // created in a batch. The batch may not have created it, its first revision then creates it.
+        public bool EnsureCreated(string originId)
+        {
+            if (!_positions.TryGetValue(originId, out int position))
+                return false;
+
+            // The other first revisions of the batch wait for it, revisions of created work items do not get here
+            lock (_syncRoot)
+            {
+                while (_next <= position)
+                {
+                    var batch = _workItems.Skip(_next).Take(_batchSize).ToList();
+                    _createBatch(batch);
+                    _next += batch.Count;
+                }
+            }
+            return true;
+        }
+    }
+}
@@ -0,0 +1,72 @@
+﻿using NUnit.Framework;
+using System;
+using System.Diagnostics;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+
+namespace Migration.Common.Tests
+{
+    // Not part of the regular test run, execute with: dotnet test --filter TestCategory=Benchmark
+    [TestFixture]
+    [Explicit]
+    [Category("Benchmark")]
+    [ExcludeFromCodeCoverage]
+    public class JournalBenchmarks
+    {
+        private const int ItemCount = 100_000;
+        private const int RevisionsPerItem = 100;
+
+        private string _workspace;
+
+        [SetUp]
+        public void Setup()
+        {
+            _workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(_workspace);
+        }
+
+        [TearDown]
+        public void TearDown()
+        {
+            Directory.Delete(_workspace, true);
+        }
+
+        [TestCase(1)]
+        [TestCase(1000)]
+        public void Measure_appends_per_second_and_load_time_for_10M_entries(int flushInterval)
+        {
+            const int entries = ItemCount * RevisionsPerItem;
+
+            var appendTime = Measure(() =>
+            {
+                using var journal = Journal.Open(_workspace, true, flushInterval);
+                for (int rev = 0; rev < RevisionsPerItem; rev++)
+                {
+                    for (int item = 0; item < ItemCount; item++)
+                        journal.MarkRevProcessed($"ITEM-{item}", item + 1, rev);
+                }
+            });
+            var fileSize = new FileInfo(Path.Combine(_workspace, "itemsJournal.txt")).Length;
+
+            Journal loaded = null;
+            var loadAndCompactTime = Measure(() => loaded = Journal.Open(_workspace, false));
+            loaded.Dispose();
+            var compactedSize = new FileInfo(loaded.ItemsPath).Length;
+
+            var loadTime = Measure(() => Journal.Open(_workspace, false).Dispose());
+
+            TestContext.WriteLine($"Entries: {entries}, items: {ItemCount}, flush interval: {flushInterval}");
+            TestContext.WriteLine($"Append:            {entries / appendTime.TotalSeconds:F0} entries/s ({fileSize / 1024 / 1024} MB)");
+            TestContext.WriteLine($"Load and compact:  {loadAndCompactTime.TotalMilliseconds:F0} ms ({compactedSize / 1024 / 1024} MB after compaction)");
+            TestContext.WriteLine($"Load compacted:    {loadTime.TotalMilliseconds:F0} ms");
+        }
+
+        private static TimeSpan Measure(Action action)
+        {
+            var sw = Stopwatch.StartNew();
+            action();
+            sw.Stop();
+            return sw.Elapsed;
+        }
+    }
+}
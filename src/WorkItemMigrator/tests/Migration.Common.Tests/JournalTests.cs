@@ -0,0 +1,212 @@
+﻿using NUnit.Framework;
+using System;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+using System.Linq;
+
+namespace Migration.Common.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class JournalTests
+    {
+        private string _workspace;
+
+        [SetUp]
+        public void Setup()
+        {
+            _workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(_workspace);
+        }
+
+        [TearDown]
+        public void TearDown()
+        {
+            Directory.Delete(_workspace, true);
+        }
+
+        [Test]
+        public void When_a_journal_is_opened_again_Then_the_processed_revisions_and_attachments_are_loaded()
+        {
+            //Arrange
+            using (var journal = Journal.Open(_workspace, false))
+            {
+                journal.MarkRevProcessed("ITEM-1", 10, 0);
+                journal.MarkRevProcessed("ITEM;2", 11, 0);
+                journal.MarkRevProcessed("ITEM-1", 10, 1);
+                journal.MarkAttachmentAsProcessed("100", "100");
+            }
+
+            //Act
+            using var sut = Journal.Open(_workspace, false);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(sut.GetMigratedId("ITEM-1"), Is.EqualTo(10));
+                Assert.That(sut.IsItemMigrated("ITEM-1", 1), Is.True);
+                Assert.That(sut.GetMigratedId("ITEM;2"), Is.EqualTo(11));
+                Assert.That(sut.IsAttachmentMigrated("100", out string attWiId), Is.True);
+                Assert.That(attWiId, Is.EqualTo("100"));
+            });
+        }
+
+        [Test]
+        public void When_a_lower_revision_is_journaled_after_a_higher_one_Then_the_higher_revision_is_kept()
+        {
+            //Arrange
+            File.WriteAllLines(Path.Combine(_workspace, "itemsJournal.txt"), new[] { "ITEM-1;10;0", "ITEM-1;10;2", "ITEM-1;10;1" });
+
+            //Act
+            using var sut = Journal.Open(_workspace, false);
+            sut.MarkRevProcessed("ITEM-1", 10, 0);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(sut.ProcessedRevisions["ITEM-1"], Is.EqualTo((10, 2)));
+                Assert.That(sut.IsItemMigrated("ITEM-1", 2), Is.True);
+            });
+        }
+
+        [Test]
+        public void When_an_uploaded_attachment_is_recorded_Then_it_is_loaded_when_the_journal_is_opened_again()
+        {
+            //Arrange
+            var id = Guid.NewGuid();
+            using (var journal = Journal.Open(_workspace, false))
+                journal.MarkAttachmentUploaded("100", id, "https://example/_apis/wit/attachments/1?fileName=a;b.png");
+
+            //Act
+            using var sut = Journal.Open(_workspace, false);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(sut.IsAttachmentUploaded("100", out Guid uploadedId, out string url), Is.True);
+                Assert.That(uploadedId, Is.EqualTo(id));
+                Assert.That(url, Is.EqualTo("https://example/_apis/wit/attachments/1?fileName=a;b.png"));
+                Assert.That(sut.IsAttachmentMigrated("100", out _), Is.False);
+            });
+        }
+
+        [Test]
+        public void When_work_items_are_created_ahead_Then_their_ids_are_flushed_and_their_first_revision_is_not_migrated()
+        {
+            //Arrange
+            var sut = Journal.Open(_workspace, false, 100);
+
+            //Act
+            sut.MarkItemsCreated(new[] { ("ITEM-1", 10), ("ITEM-2", 11) });
+            var lines = File.ReadAllLines(sut.ItemsPath);
+            sut.Dispose();
+
+            //Assert
+            using var reopened = Journal.Open(_workspace, false);
+            Assert.Multiple(() =>
+            {
+                Assert.That(lines, Is.EqualTo(new[] { "ITEM-1;10;-1", "ITEM-2;11;-1" }));
+                Assert.That(reopened.GetMigratedId("ITEM-2"), Is.EqualTo(11));
+                Assert.That(reopened.IsItemMigrated("ITEM-2", 0), Is.False);
+            });
+        }
+
+        [Test]
+        public void When_entries_are_written_within_the_flush_interval_Then_they_are_written_when_the_journal_is_disposed()
+        {
+            //Arrange
+            var sut = Journal.Open(_workspace, false, 100);
+
+            //Act
+            sut.MarkRevProcessed("ITEM-1", 10, 0);
+            var linesBeforeDispose = File.Exists(sut.ItemsPath) ? File.ReadAllText(sut.ItemsPath) : "";
+            sut.Dispose();
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(linesBeforeDispose, Is.Empty);
+                Assert.That(File.ReadAllLines(sut.ItemsPath), Is.EqualTo(new[] { "ITEM-1;10;0" }));
+            });
+        }
+
+        [Test]
+        public void When_a_journal_is_compacted_Then_only_the_latest_entry_of_every_item_is_kept()
+        {
+            //Arrange
+            var sut = Journal.Open(_workspace, false);
+            for (int rev = 0; rev < 5; rev++)
+            {
+                sut.MarkRevProcessed("ITEM-1", 10, rev);
+                sut.MarkRevProcessed("ITEM-2", 11, rev);
+            }
+
+            //Act
+            sut.Compact();
+            sut.MarkRevProcessed("ITEM-3", 12, 0);
+            sut.Dispose();
+
+            //Assert
+            Assert.That(File.ReadAllLines(sut.ItemsPath), Is.EqualTo(new[] { "ITEM-1;10;4", "ITEM-2;11;4", "ITEM-3;12;0" }));
+        }
+
+        [Test]
+        public void When_a_journal_with_many_superseded_entries_is_opened_Then_it_is_compacted()
+        {
+            //Arrange
+            var itemsPath = Path.Combine(_workspace, "itemsJournal.txt");
+            File.WriteAllLines(itemsPath, Enumerable.Range(0, 2000).Select(rev => $"ITEM-1;10;{rev}"));
+
+            //Act
+            using var sut = Journal.Open(_workspace, false);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(File.ReadAllLines(itemsPath), Is.EqualTo(new[] { "ITEM-1;10;1999" }));
+                Assert.That(sut.IsItemMigrated("ITEM-1", 1999), Is.True);
+            });
+        }
+
+        [Test]
+        public void When_the_last_line_of_a_journal_is_cut_off_Then_it_is_skipped_and_removed_before_appending()
+        {
+            //Arrange
+            var itemsPath = Path.Combine(_workspace, "itemsJournal.txt");
+            var attachmentsPath = Path.Combine(_workspace, "attachmentsJournal.txt");
+            File.WriteAllText(itemsPath, "ITEM-1;10;3\nITEM-2;11;1\nITEM-3;1");
+            File.WriteAllText(attachmentsPath, "100;https://example/100\n101");
+
+            //Act
+            using (var journal = Journal.Open(_workspace, false))
+            {
+                journal.MarkRevProcessed("ITEM-3", 12, 0);
+                journal.MarkAttachmentAsProcessed("101", "https://example/101");
+            }
+            using var sut = Journal.Open(_workspace, false);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(File.ReadAllLines(itemsPath), Is.EqualTo(new[] { "ITEM-1;10;3", "ITEM-2;11;1", "ITEM-3;12;0" }));
+                Assert.That(sut.IsItemMigrated("ITEM-2", 1), Is.True);
+                Assert.That(sut.GetMigratedId("ITEM-3"), Is.EqualTo(12));
+                Assert.That(sut.IsAttachmentMigrated("101", out string attWiId), Is.True);
+                Assert.That(attWiId, Is.EqualTo("https://example/101"));
+            });
+        }
+
+        [Test]
+        public void When_a_journal_line_is_malformed_Then_it_is_skipped()
+        {
+            //Arrange
+            File.WriteAllLines(Path.Combine(_workspace, "itemsJournal.txt"), new[] { "ITEM-1;10;3", "ITEM-2", "ITEM-3;x;1", "ITEM-4;13;0" });
+
+            //Act
+            using var sut = Journal.Open(_workspace, false);
+
+            //Assert
+            Assert.That(sut.ProcessedRevisions.Keys, Is.EqualTo(new[] { "ITEM-1", "ITEM-4" }));
+        }
+    }
+}
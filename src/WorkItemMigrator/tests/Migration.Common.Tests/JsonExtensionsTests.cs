@@ -45,5 +45,26 @@ namespace Migration.Common.Tests
             Assert.Throws<ArgumentNullException>(() => { JsonExtensions.GetValues<JToken>(null, ""); });
         }
 
+        [Test]
+        public void When_getting_a_nested_property_value_Then_the_same_result_as_the_json_path_is_returned()
+        {
+            JObject jObject = JObject.Parse(@"{ id: 10001, fields: { parent: { key: 'ABC-1' }, status: null, labels: [ 'a' ] }}");
+
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(jObject.ExValue<string>("$.fields.parent.key"), jObject.ExPropertyValue<string>("fields", "parent", "key"));
+                Assert.AreEqual("10001", jObject.ExPropertyValue<string>("id"));
+                Assert.IsNull(jObject.ExPropertyValue<string>("fields", "status", "name"));
+                Assert.IsNull(jObject.ExPropertyValue<string>("fields", "labels", "name"));
+                Assert.IsNull(jObject.ExPropertyValue<string>("fields", "missing"));
+            });
+        }
+
+        [Test]
+        public void When_getting_a_property_value_with_null_input_Then_an_exception_is_thrown()
+        {
+            Assert.Throws<ArgumentNullException>(() => { JsonExtensions.ExPropertyValue<string>(null, "id"); });
+        }
+
     }
 }
\ No newline at end of file
@@ -0,0 +1,105 @@
+﻿using Migration.WIContract;
+using NUnit.Framework;
+using System.Diagnostics.CodeAnalysis;
+
+namespace Migration.Common.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class WiItemCacheTests
+    {
+        private int _loads;
+
+        [SetUp]
+        public void Setup()
+        {
+            _loads = 0;
+        }
+
+        private WiItem Load(string originId)
+        {
+            _loads++;
+            return new WiItem { OriginId = originId };
+        }
+
+        [Test]
+        public void When_getting_an_item_twice_Then_it_is_loaded_once()
+        {
+            //Arrange
+            var sut = new WiItemCache(2);
+
+            //Act
+            var first = sut.GetOrAdd("ITEM-1", Load);
+            var second = sut.GetOrAdd("ITEM-1", Load);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(second, Is.SameAs(first));
+                Assert.That(_loads, Is.EqualTo(1));
+                Assert.That(sut.Hits, Is.EqualTo(1));
+                Assert.That(sut.Misses, Is.EqualTo(1));
+            });
+        }
+
+        [Test]
+        public void When_the_cache_is_full_Then_the_least_recently_used_item_is_evicted()
+        {
+            //Arrange
+            var sut = new WiItemCache(2);
+            sut.GetOrAdd("ITEM-1", Load);
+            sut.GetOrAdd("ITEM-2", Load);
+            sut.GetOrAdd("ITEM-1", Load);
+
+            //Act
+            sut.GetOrAdd("ITEM-3", Load);
+            sut.GetOrAdd("ITEM-1", Load);
+            sut.GetOrAdd("ITEM-2", Load);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(_loads, Is.EqualTo(4));
+                Assert.That(sut.Evictions, Is.EqualTo(2));
+                Assert.That(sut.Count, Is.EqualTo(2));
+            });
+        }
+
+        [Test]
+        public void When_an_item_is_removed_Then_it_is_loaded_again()
+        {
+            //Arrange
+            var sut = new WiItemCache(2);
+            var first = sut.GetOrAdd("ITEM-1", Load);
+
+            //Act
+            sut.Remove("ITEM-1");
+            var second = sut.GetOrAdd("ITEM-1", Load);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(second, Is.Not.SameAs(first));
+                Assert.That(_loads, Is.EqualTo(2));
+            });
+        }
+
+        [Test]
+        public void When_the_capacity_is_zero_Then_every_item_is_loaded()
+        {
+            //Arrange
+            var sut = new WiItemCache(0);
+
+            //Act
+            sut.GetOrAdd("ITEM-1", Load);
+            sut.GetOrAdd("ITEM-1", Load);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(_loads, Is.EqualTo(2));
+                Assert.That(sut.Count, Is.EqualTo(0));
+            });
+        }
+    }
+}
@@ -0,0 +1,80 @@
+﻿using JiraExport;
+using NUnit.Framework;
+using System;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+
+namespace Migration.Jira_Export.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class AttachmentContentStoreTests
+    {
+        private string _attachmentsDir;
+
+        [SetUp]
+        public void Setup()
+        {
+            _attachmentsDir = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+        }
+
+        [TearDown]
+        public void TearDown()
+        {
+            if (Directory.Exists(_attachmentsDir))
+                Directory.Delete(_attachmentsDir, true);
+        }
+
+        [Test]
+        public void When_content_and_file_name_match_Then_the_existing_path_is_returned()
+        {
+            var sut = new AttachmentContentStore(_attachmentsDir);
+            var path = CreateAttachmentFile("10001", "screenshot.png");
+
+            sut.Add("ABCDEF", path);
+
+            Assert.Multiple(() =>
+            {
+                Assert.IsTrue(sut.TryGetExisting("ABCDEF", "screenshot.png", out string existingPath));
+                Assert.AreEqual(path, existingPath);
+                Assert.IsFalse(sut.TryGetExisting("ABCDEF", "other.png", out _));
+                Assert.IsFalse(sut.TryGetExisting("123456", "screenshot.png", out _));
+            });
+        }
+
+        [Test]
+        public void When_reopening_the_store_Then_previously_added_files_are_found()
+        {
+            var path = CreateAttachmentFile("10001", "design.pdf");
+            new AttachmentContentStore(_attachmentsDir).Add("ABCDEF", path);
+
+            var sut = new AttachmentContentStore(_attachmentsDir);
+
+            Assert.Multiple(() =>
+            {
+                Assert.IsTrue(sut.TryGetExisting("ABCDEF", "design.pdf", out string existingPath));
+                Assert.AreEqual(path, existingPath);
+            });
+        }
+
+        [Test]
+        public void When_a_stored_file_was_deleted_Then_it_is_not_reused()
+        {
+            var sut = new AttachmentContentStore(_attachmentsDir);
+            var path = CreateAttachmentFile("10001", "design.pdf");
+            sut.Add("ABCDEF", path);
+
+            File.Delete(path);
+
+            Assert.IsFalse(sut.TryGetExisting("ABCDEF", "design.pdf", out _));
+        }
+
+        private string CreateAttachmentFile(string id, string fileName)
+        {
+            var path = Path.Combine(_attachmentsDir, id, fileName);
+            Directory.CreateDirectory(Path.GetDirectoryName(path));
+            File.WriteAllText(path, "content");
+            return path;
+        }
+    }
+}
@@ -0,0 +1,95 @@
+﻿using JiraExport;
+using Migration.WIContract;
+using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+
+namespace Migration.Jira_Export.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class ExportManifestTests
+    {
+        private string _workspace;
+
+        [SetUp]
+        public void Setup()
+        {
+            _workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(_workspace);
+        }
+
+        [TearDown]
+        public void TearDown()
+        {
+            if (Directory.Exists(_workspace))
+                Directory.Delete(_workspace, true);
+        }
+
+        [Test]
+        public void When_no_manifest_exists_Then_there_is_no_last_export_time()
+        {
+            var sut = ExportManifest.Load(_workspace);
+
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(0, sut.Count);
+                Assert.IsNull(sut.LastExportTime);
+            });
+        }
+
+        [Test]
+        public void When_reloading_a_saved_manifest_Then_entries_are_preserved()
+        {
+            var older = new DateTime(2024, 3, 5, 14, 7, 0, DateTimeKind.Utc);
+            var newer = new DateTime(2024, 3, 6, 9, 30, 0, DateTimeKind.Utc);
+            var manifest = ExportManifest.Load(_workspace);
+            manifest.Update("ABC-1", older, "HASH1");
+            manifest.Update("ABC-2", newer, "HASH2");
+            manifest.Update("ABC-3", null, "HASH3");
+            manifest.CompleteExport(newer);
+            manifest.Save();
+
+            var sut = ExportManifest.Load(_workspace);
+
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(3, sut.Count);
+                Assert.AreEqual(newer, sut.LastExportTime);
+                Assert.IsTrue(sut.IsUnchanged("ABC-1", "HASH1"));
+                Assert.IsFalse(sut.IsUnchanged("ABC-1", "HASH2"));
+                Assert.IsFalse(sut.IsUnchanged("ABC-4", "HASH1"));
+            });
+        }
+
+        [Test]
+        public void When_an_export_is_not_completed_Then_the_last_export_time_is_not_taken_from_the_items()
+        {
+            var lastExportTime = new DateTime(2024, 3, 1, 8, 0, 0, DateTimeKind.Utc);
+            var manifest = ExportManifest.Load(_workspace);
+            manifest.CompleteExport(lastExportTime);
+            manifest.Save();
+
+            var sut = ExportManifest.Load(_workspace);
+            sut.Update("ABC-1", new DateTime(2024, 3, 6, 9, 30, 0, DateTimeKind.Utc), "HASH1");
+            sut.Save();
+
+            Assert.AreEqual(lastExportTime, ExportManifest.Load(_workspace).LastExportTime);
+        }
+
+        [Test]
+        public void When_an_item_changes_Then_the_content_hash_changes()
+        {
+            var wiItem = new WiItem() { OriginId = "ABC-1", Type = "Task", Revisions = new List<WiRevision>() };
+            var hash = ExportManifest.GetContentHash(wiItem);
+
+            Assert.AreEqual(hash, ExportManifest.GetContentHash(wiItem));
+
+            wiItem.Type = "Bug";
+
+            Assert.AreNotEqual(hash, ExportManifest.GetContentHash(wiItem));
+        }
+    }
+}
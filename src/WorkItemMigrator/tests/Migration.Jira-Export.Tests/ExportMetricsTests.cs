@@ -0,0 +1,79 @@
+﻿using JiraExport;
+using NUnit.Framework;
+using System;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+using System.Linq;
+using System.Threading.Tasks;
+
+namespace Migration.Jira_Export.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class ExportMetricsTests
+    {
+        [SetUp]
+        public void Setup()
+        {
+            ExportMetrics.Reset();
+        }
+
+        [Test]
+        public void When_requests_are_recorded_Then_the_report_contains_percentiles_per_endpoint()
+        {
+            foreach (var milliseconds in Enumerable.Range(1, 100))
+                ExportMetrics.RecordRequest("issue", TimeSpan.FromMilliseconds(milliseconds), 10);
+            ExportMetrics.RecordRequest("search", TimeSpan.FromMilliseconds(5), failed: true);
+
+            var report = ExportMetrics.GetReport(3);
+
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(3, report.Value<int>("item-count"));
+                var issue = report["requests"]["issue"];
+                Assert.AreEqual(100, issue.Value<int>("count"));
+                Assert.AreEqual(1000, issue.Value<long>("bytes"));
+                Assert.AreEqual(50, issue.Value<double>("p50-ms"));
+                Assert.AreEqual(95, issue.Value<double>("p95-ms"));
+                Assert.AreEqual(99, issue.Value<double>("p99-ms"));
+                Assert.AreEqual(100, issue.Value<double>("max-ms"));
+                Assert.AreEqual(1, report["requests"]["search"].Value<int>("failed"));
+                Assert.IsNull(report["requests"]["search"]["bytes"]);
+            });
+        }
+
+        [Test]
+        public void When_responses_are_counted_Then_their_size_is_recorded_for_the_request()
+        {
+            var responseSize = ExportMetrics.CountResponseSize();
+            Task.Run(() => ExportMetrics.AddResponseSize(300)).Wait();
+            ExportMetrics.AddResponseSize(200);
+            ExportMetrics.RecordRequest("issue/changelog", TimeSpan.FromMilliseconds(5), responseSize.Bytes);
+
+            Assert.AreEqual(500, ExportMetrics.GetReport(0)["requests"]["issue/changelog"].Value<long>("bytes"));
+        }
+
+        [Test]
+        public void When_a_stage_is_measured_Then_it_is_recorded_without_bytes()
+        {
+            var result = ExportMetrics.MeasureStage("map", () => 42);
+
+            var stage = ExportMetrics.GetReport(0)["stages"]["map"];
+
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(42, result);
+                Assert.AreEqual(1, stage.Value<int>("count"));
+                Assert.IsNull(stage["bytes"]);
+            });
+        }
+
+        [Test]
+        public void When_getting_the_metrics_file_path_Then_it_is_placed_in_the_metrics_folder_next_to_the_log()
+        {
+            var logFilePath = Path.Combine("workspace", "jira-export-log-240305-140700.txt");
+
+            Assert.AreEqual(Path.Combine("workspace", "metrics", "jira-export-metrics-240305-140700.json"), JiraCommandLine.GetMetricsFilePath(logFilePath));
+        }
+    }
+}
@@ -1,9 +1,13 @@
 ﻿using AutoFixture;
 using AutoFixture.AutoNSubstitute;
 using JiraExport;
+using Migration.WIContract;
 using NUnit.Framework;
 using System;
+using System.Collections.Generic;
 using System.Diagnostics.CodeAnalysis;
+using System.IO;
+using System.Linq;
 
 namespace Migration.Jira_Export.Tests
 {
@@ -50,5 +54,98 @@ namespace Migration.Jira_Export.Tests
 
             Assert.AreEqual(-1, sut.Run());
         }
+
+        [Test]
+        public void When_errors_occurred_during_the_export_Then_the_last_export_time_is_not_advanced()
+        {
+            var workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(workspace);
+            try
+            {
+                var previousExportTime = new DateTime(2024, 3, 1, 8, 0, 0, DateTimeKind.Utc);
+                var exportStartTime = new DateTime(2024, 3, 6, 9, 30, 0, DateTimeKind.Utc);
+                var manifest = ExportManifest.Load(workspace);
+                manifest.CompleteExport(previousExportTime);
+
+                JiraCommandLine.CompleteExport(manifest, exportStartTime, 1);
+                JiraCommandLine.CompleteExport(manifest, null, 0);
+
+                Assert.AreEqual(previousExportTime, manifest.LastExportTime);
+
+                JiraCommandLine.CompleteExport(manifest, exportStartTime, 0);
+
+                Assert.AreEqual(exportStartTime, manifest.LastExportTime);
+            }
+            finally
+            {
+                Directory.Delete(workspace, true);
+            }
+        }
+
+        [Test]
+        public void When_fixing_revision_dates_Then_the_saved_items_are_updated()
+        {
+            var workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(workspace);
+            try
+            {
+                var provider = new WiItemProvider(workspace);
+                var linkAddedTime = new DateTime(2020, 1, 1, 12, 0, 0);
+
+                var parent = new WiItem()
+                {
+                    OriginId = "PARENT-1",
+                    Type = "Epic",
+                    Revisions = new List<WiRevision>() {
+                        new WiRevision() { Index = 0, Time = linkAddedTime.AddDays(-1) },
+                        new WiRevision() { Index = 1, Time = linkAddedTime, Links = new List<WiLink>() {
+                            new WiLink() { Change = ReferenceChangeType.Added, SourceOriginId = "PARENT-1", TargetOriginId = "CHILD-1", WiType = "System.LinkTypes.Hierarchy-Forward" } } }
+                    }
+                };
+                var child = new WiItem()
+                {
+                    OriginId = "CHILD-1",
+                    Type = "Task",
+                    Revisions = new List<WiRevision>() {
+                        new WiRevision() { Index = 0, Time = linkAddedTime.AddSeconds(1), Links = new List<WiLink>() {
+                            new WiLink() { Change = ReferenceChangeType.Removed, SourceOriginId = "CHILD-1", TargetOriginId = "PARENT-1", WiType = "System.LinkTypes.Hierarchy-Reverse" } } }
+                    }
+                };
+                provider.Save(parent);
+                provider.Save(child);
+
+                var revisionsWithLinkChanges = JiraCommandLine.GetRevisionsWithLinkChanges(parent)
+                    .Concat(JiraCommandLine.GetRevisionsWithLinkChanges(child)).ToList();
+
+                JiraCommandLine.FixRevisionDates(revisionsWithLinkChanges, provider);
+
+                Assert.Multiple(() =>
+                {
+                    Assert.AreEqual(2, revisionsWithLinkChanges.Count);
+                    Assert.AreEqual(linkAddedTime, provider.Load("CHILD-1").Revisions[0].Time);
+                    Assert.AreEqual(linkAddedTime, provider.Load("PARENT-1").Revisions[1].Time);
+                });
+            }
+            finally
+            {
+                Directory.Delete(workspace, true);
+            }
+        }
+
+        [Test]
+        public void When_building_an_incremental_query_Then_the_updated_condition_is_added_before_the_ordering()
+        {
+            var updatedSince = new DateTime(2024, 3, 5, 14, 7, 0);
+
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual("(project = ABC) AND updated >= \"2024-03-05 14:07\" ORDER BY Rank ASC",
+                    JiraCommandLine.GetIncrementalQuery("project = ABC ORDER BY Rank ASC", updatedSince));
+                Assert.AreEqual("(project = ABC OR project = DEF) AND updated >= \"2024-03-05 14:07\"",
+                    JiraCommandLine.GetIncrementalQuery("project = ABC OR project = DEF", updatedSince));
+                Assert.AreEqual("updated >= \"2024-03-05 14:07\" order by key",
+                    JiraCommandLine.GetIncrementalQuery("order by key", updatedSince));
+            });
+        }
     }
-}
\ No newline at end of file
+}
@@ -0,0 +1,136 @@
+﻿using AutoFixture;
+using AutoFixture.AutoNSubstitute;
+using JiraExport;
+using Migration.Common;
+using Newtonsoft.Json.Linq;
+using NSubstitute;
+using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Diagnostics.CodeAnalysis;
+using System.Linq;
+
+namespace Migration.Jira_Export.Tests
+{
+    // Not part of the regular test run, execute with: dotnet test --filter TestCategory=Benchmark
+    [TestFixture]
+    [Explicit]
+    [Category("Benchmark")]
+    [ExcludeFromCodeCoverage]
+    public class JiraItemBenchmarks
+    {
+        private const int ItemCount = 200;
+        private const int PropertyReadsPerItem = 20;
+
+        private Fixture _fixture;
+
+        [SetUp]
+        public void Setup()
+        {
+            _fixture = new Fixture();
+            _fixture.Customize(new AutoNSubstituteCustomization() { });
+        }
+
+        [Test]
+        public void Measure_per_item_cpu_time_for_large_issues()
+        {
+            var corpus = Enumerable.Range(1, ItemCount).Select(CreateLargeIssue).ToDictionary(i => i.Value<string>("key"));
+
+            var provider = _fixture.Freeze<IJiraProvider>();
+            provider.DownloadIssue(default).ReturnsForAnyArgs(ci => corpus[ci.ArgAt<string>(0)]);
+            provider.DownloadChangelog(default).ReturnsForAnyArgs(new List<JObject>());
+            provider.GetSettings().ReturnsForAnyArgs(new JiraSettings("userID", "pass", "token", "url", "project") { EpicLinkField = "customfield_10008" });
+
+            // Warm up
+            foreach (var key in corpus.Keys.Take(10))
+                ReadProperties(JiraItem.CreateFromRest(key, provider));
+
+            var items = new List<JiraItem>();
+            var createTime = Measure(() =>
+            {
+                foreach (var key in corpus.Keys)
+                    items.Add(JiraItem.CreateFromRest(key, provider));
+            });
+            var propertyTime = Measure(() => items.ForEach(ReadProperties));
+            var jsonPathTime = Measure(() => items.ForEach(i => ReadPropertiesWithJsonPath(i.RemoteIssue)));
+
+            TestContext.WriteLine($"Items: {ItemCount}, property reads per item: {PropertyReadsPerItem}");
+            TestContext.WriteLine($"Create item:              {createTime.TotalMilliseconds / ItemCount:F3} ms/item");
+            TestContext.WriteLine($"Read projected properties: {propertyTime.TotalMilliseconds / ItemCount:F3} ms/item");
+            TestContext.WriteLine($"Read with JSONPath:        {jsonPathTime.TotalMilliseconds / ItemCount:F3} ms/item");
+
+            Assert.AreEqual(ItemCount, items.Count(i => i.SubItems.Count == 50));
+        }
+
+        private static TimeSpan Measure(Action action)
+        {
+            var process = Process.GetCurrentProcess();
+            var cpuTime = process.TotalProcessorTime;
+            action();
+            process.Refresh();
+            return process.TotalProcessorTime - cpuTime;
+        }
+
+        private static void ReadProperties(JiraItem item)
+        {
+            for (int i = 0; i < PropertyReadsPerItem; i++)
+            {
+                GC.KeepAlive(item.Key);
+                GC.KeepAlive(item.Type);
+                GC.KeepAlive(item.Id);
+                GC.KeepAlive(item.Parent);
+                GC.KeepAlive(item.EpicParent);
+                GC.KeepAlive(item.SubItems);
+            }
+        }
+
+        // The accessors as they were before the values were projected
+        private static void ReadPropertiesWithJsonPath(JObject remoteIssue)
+        {
+            for (int i = 0; i < PropertyReadsPerItem; i++)
+            {
+                GC.KeepAlive(remoteIssue.ExValue<string>("$.key"));
+                GC.KeepAlive(remoteIssue.ExValue<string>("$.fields.issuetype.name")?.Trim());
+                GC.KeepAlive(remoteIssue.ExValue<string>("$.id"));
+                GC.KeepAlive(remoteIssue.ExValue<string>("$.fields.parent.key"));
+                GC.KeepAlive(remoteIssue.ExValue<string>("$.fields.customfield_10008"));
+                GC.KeepAlive(remoteIssue.SelectTokens("$.fields.subtasks.[*]", false).Select(st => st.ExValue<string>("$.key")).ToList());
+            }
+        }
+
+        private static JObject CreateLargeIssue(int number)
+        {
+            var fields = new JObject
+            {
+                { "issuetype", new JObject { { "name", "Story" } } },
+                { "priority", new JObject { { "name", "High" } } },
+                { "status", new JObject { { "name", "In Progress" } } },
+                { "reporter", new JObject { { "accountId", "reporter-1" } } },
+                { "parent", new JObject { { "key", $"ABC-{number + 100000}" } } },
+                { "labels", new JArray("backend", "migration") },
+                { "created", new DateTime(2024, 1, 1) },
+                { "customfield_10008", "ABC-99999" },
+                { "subtasks", new JArray(Enumerable.Range(1, 50).Select(s => new JObject { { "key", $"ABC-{number}-{s}" } })) }
+            };
+            for (int f = 0; f < 300; f++)
+            {
+                switch (f % 4)
+                {
+                    case 0: fields.Add($"customfield_{20000 + f}", $"Text value {f}"); break;
+                    case 1: fields.Add($"customfield_{20000 + f}", f * 1.5); break;
+                    case 2: fields.Add($"customfield_{20000 + f}", new JObject { { "value", $"Option {f}" } }); break;
+                    default: fields.Add($"customfield_{20000 + f}", new JArray(new JObject { { "name", "A" } }, new JObject { { "name", "B" } })); break;
+                }
+            }
+
+            return new JObject
+            {
+                { "id", number },
+                { "key", $"ABC-{number}" },
+                { "fields", fields },
+                { "renderedFields", new JObject() }
+            };
+        }
+    }
+}
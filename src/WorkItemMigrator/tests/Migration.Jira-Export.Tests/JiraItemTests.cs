@@ -743,6 +743,158 @@ namespace Migration.Jira_Export.Tests
             });
         }
 
+        [Test]
+        public void When_the_issue_contains_a_complete_changelog_Then_it_is_not_downloaded_again()
+        {
+            //Arrange
+            var provider = _fixture.Freeze<IJiraProvider>();
+            string issueKey = _fixture.Create<string>();
+
+            var history = new HistoryItem()
+            {
+                Field = "summary",
+                FieldType = "jira",
+                From = null,
+                FromString = "Old summary",
+                To = null,
+                ToString = "New summary"
+            }.ToJObject();
+
+            JObject remoteIssue = new JObject
+            {
+                { "id", _fixture.Create<long>() },
+                { "key", issueKey },
+                { "fields", JObject.Parse("{ 'issuetype': { 'name': 'Story' }, 'summary': 'New summary' }") },
+                { "renderedFields", new JObject() },
+                { "changelog", new JObject { { "startAt", 0 }, { "maxResults", 100 }, { "total", 1 }, { "histories", new JArray(history) } } }
+            };
+
+            provider.DownloadIssue(default).ReturnsForAnyArgs(remoteIssue);
+            provider.GetSettings().ReturnsForAnyArgs(CreateJiraSettings());
+
+            //Act
+            var jiraItem = JiraItem.CreateFromRest(issueKey, provider);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                provider.DidNotReceiveWithAnyArgs().DownloadChangelog(default);
+                Assert.AreEqual(2, jiraItem.Revisions.Count);
+                Assert.AreEqual("Old summary", jiraItem.Revisions[0].Fields["summary"]);
+                Assert.AreEqual("New summary", jiraItem.Revisions[1].Fields["summary"]);
+            });
+        }
+
+        [Test]
+        public void When_the_issue_contains_a_truncated_changelog_Then_it_is_downloaded()
+        {
+            //Arrange
+            var provider = _fixture.Freeze<IJiraProvider>();
+            string issueKey = _fixture.Create<string>();
+
+            JObject remoteIssue = new JObject
+            {
+                { "id", _fixture.Create<long>() },
+                { "key", issueKey },
+                { "fields", JObject.Parse("{ 'issuetype': { 'name': 'Story' } }") },
+                { "renderedFields", new JObject() },
+                { "changelog", new JObject { { "startAt", 0 }, { "maxResults", 0 }, { "total", 1 }, { "histories", new JArray() } } }
+            };
+
+            provider.DownloadIssue(default).ReturnsForAnyArgs(remoteIssue);
+            provider.DownloadChangelog(default).ReturnsForAnyArgs(new List<JObject>());
+            provider.GetSettings().ReturnsForAnyArgs(CreateJiraSettings());
+
+            //Act
+            JiraItem.CreateFromRest(issueKey, provider);
+
+            //Assert
+            provider.Received(1).DownloadChangelog(issueKey);
+        }
+
+        [Test]
+        public void When_batched_download_is_enabled_Then_embedded_comments_are_used()
+        {
+            //Arrange
+            var provider = _fixture.Freeze<IJiraProvider>();
+            string issueKey = _fixture.Create<string>();
+
+            var fields = JObject.Parse(@"{
+                'issuetype': { 'name': 'Story' },
+                'comment': {
+                    'startAt': 0, 'maxResults': 50, 'total': 1,
+                    'comments': [ { 'id': '100', 'author': { 'name': 'jdoe' }, 'body': 'A *comment*', 'created': '2020-01-01T12:00:00.000Z' } ]
+                }
+            }");
+            var renderedFields = JObject.Parse(@"{
+                'comment': { 'comments': [ { 'id': '100', 'body': '<p>A <b>comment</b></p>' } ] }
+            }");
+
+            JObject remoteIssue = new JObject
+            {
+                { "id", _fixture.Create<long>() },
+                { "key", issueKey },
+                { "fields", fields },
+                { "renderedFields", renderedFields }
+            };
+
+            var jiraSettings = CreateJiraSettings();
+            jiraSettings.BatchedDownload = true;
+
+            provider.DownloadIssue(default).ReturnsForAnyArgs(remoteIssue);
+            provider.DownloadChangelog(default).ReturnsForAnyArgs(new List<JObject>());
+            provider.GetSettings().ReturnsForAnyArgs(jiraSettings);
+
+            //Act
+            var jiraItem = JiraItem.CreateFromRest(issueKey, provider);
+            var commentRevision = jiraItem.Revisions.Single(r => r.Fields.ContainsKey("comment$Rendered"));
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                provider.DidNotReceiveWithAnyArgs().GetCommentsByItemKey(default);
+                Assert.AreEqual("jdoe", commentRevision.Author);
+                Assert.AreEqual("A *comment*", commentRevision.Fields["comment"]);
+                Assert.AreEqual("<p>A <b>comment</b></p>", commentRevision.Fields["comment$Rendered"]);
+            });
+        }
+
+        [Test]
+        public void When_an_item_is_created_Then_the_issue_properties_are_read_from_the_remote_issue()
+        {
+            //Arrange
+            var provider = _fixture.Freeze<IJiraProvider>();
+            var remoteIssue = JObject.Parse(@"{
+                'id': 10001,
+                'key': 'ABC-2',
+                'fields': {
+                    'issuetype': { 'name': ' Story ' },
+                    'parent': { 'key': 'ABC-1' },
+                    'EpicLinkField': 'ABC-0',
+                    'subtasks': [ { 'key': 'ABC-3' }, { 'key': 'ABC-4' } ]
+                },
+                'renderedFields': {}
+            }");
+
+            provider.DownloadIssue(default).ReturnsForAnyArgs(remoteIssue);
+            provider.DownloadChangelog(default).ReturnsForAnyArgs(new List<JObject>());
+            provider.GetSettings().ReturnsForAnyArgs(CreateJiraSettings());
+
+            //Act
+            var jiraItem = JiraItem.CreateFromRest("ABC-2", provider);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual("ABC-2", jiraItem.Key);
+                Assert.AreEqual("10001", jiraItem.Id);
+                Assert.AreEqual("Story", jiraItem.Type);
+                Assert.AreEqual("ABC-1", jiraItem.Parent);
+                Assert.AreEqual("ABC-0", jiraItem.EpicParent);
+                CollectionAssert.AreEqual(new[] { "ABC-3", "ABC-4" }, jiraItem.SubItems);
+            });
+        }
+
         private JiraSettings CreateJiraSettings()
         {
             JiraSettings settings = new JiraSettings("userID", "pass", "token", "url", "project")
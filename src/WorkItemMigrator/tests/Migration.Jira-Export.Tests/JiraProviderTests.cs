@@ -5,7 +5,10 @@ using Newtonsoft.Json.Linq;
 using NSubstitute;
 using NUnit.Framework;
 using RestSharp;
+using System;
+using System.Collections.Generic;
 using System.Diagnostics.CodeAnalysis;
+using System.IO;
 using System.Linq;
 
 namespace Migration.Jira_Export.Tests
@@ -165,5 +168,197 @@ namespace Migration.Jira_Export.Tests
                 Assert.AreEqual(customFieldId2, actualId2);
             });
         }
+
+        [Test]
+        public void When_enumerating_issues_in_parallel_Then_the_issues_are_returned_in_query_order()
+        {
+            //Arrange
+            var issueKeys = new[] { "ISSUE-1", "ISSUE-2", "ISSUE-3", "ISSUE-4", "ISSUE-5" };
+            var jiraServiceMock = CreateSearchServiceMock(issueKeys);
+
+            JiraProvider sut = new JiraProvider(jiraServiceMock);
+
+            var jiraSettings = new JiraSettings("", "", "", "", "");
+            jiraSettings.JiraApiVersion = 2;
+            jiraSettings.BatchSize = 10;
+            jiraSettings.ExportParallelism = 3;
+            sut.Initialize(jiraSettings, new ExportIssuesSummary());
+
+            var skipList = new HashSet<string>();
+
+            //Act
+            var actualKeys = sut.EnumerateIssues("project=ISSUE", skipList, JiraProvider.DownloadOptions.None).Select(i => i.Key).ToList();
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                CollectionAssert.AreEqual(issueKeys, actualKeys);
+                CollectionAssert.AreEquivalent(issueKeys, skipList);
+            });
+        }
+
+        [Test]
+        public void When_enumerating_issues_in_parallel_Then_skipped_issues_are_not_downloaded()
+        {
+            //Arrange
+            var issueKeys = new[] { "ISSUE-1", "ISSUE-2", "ISSUE-3" };
+            var jiraServiceMock = CreateSearchServiceMock(issueKeys);
+
+            JiraProvider sut = new JiraProvider(jiraServiceMock);
+
+            var jiraSettings = new JiraSettings("", "", "", "", "");
+            jiraSettings.JiraApiVersion = 2;
+            jiraSettings.BatchSize = 10;
+            jiraSettings.ExportParallelism = 3;
+            sut.Initialize(jiraSettings, new ExportIssuesSummary());
+
+            var skipList = new HashSet<string>() { "ISSUE-2" };
+
+            //Act
+            var actualKeys = sut.EnumerateIssues("project=ISSUE", skipList, JiraProvider.DownloadOptions.None).Select(i => i.Key).ToList();
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                CollectionAssert.AreEqual(new[] { "ISSUE-1", "ISSUE-3" }, actualKeys);
+                jiraServiceMock.RestClient.DidNotReceive().ExecuteRequestAsync(Method.GET, Arg.Is<string>(r => r.Contains("issue/ISSUE-2")));
+            });
+        }
+
+        [Test]
+        public void When_a_sub_item_is_on_the_same_search_page_Then_it_is_downloaded_once()
+        {
+            //Arrange
+            var issueKeys = new[] { "ISSUE-1", "ISSUE-2", "ISSUE-3" };
+            var jiraServiceMock = CreateSearchServiceMock(issueKeys, new Dictionary<string, string[]> { { "ISSUE-1", new[] { "ISSUE-2" } } });
+
+            JiraProvider sut = new JiraProvider(jiraServiceMock);
+
+            var jiraSettings = new JiraSettings("", "", "", "", "");
+            jiraSettings.JiraApiVersion = 2;
+            jiraSettings.BatchSize = 10;
+            jiraSettings.ExportParallelism = 3;
+            sut.Initialize(jiraSettings, new ExportIssuesSummary());
+
+            var skipList = new HashSet<string>();
+
+            //Act
+            var actualKeys = sut.EnumerateIssues("project=ISSUE", skipList, JiraProvider.DownloadOptions.IncludeSubItems).Select(i => i.Key).ToList();
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                CollectionAssert.AreEqual(issueKeys, actualKeys);
+                jiraServiceMock.RestClient.Received(1).ExecuteRequestAsync(Method.GET, Arg.Is<string>(r => r.Contains("issue/ISSUE-2?expand=renderedFields")));
+            });
+        }
+
+        [Test]
+        public void When_the_user_cache_is_prefilled_Then_users_are_not_looked_up_again()
+        {
+            //Arrange
+            var userCacheFile = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            var jiraServiceMock = _fixture.Create<IJiraServiceWrapper>();
+            jiraServiceMock.RestClient.ExecuteRequestAsync(Method.GET, Arg.Any<string>()).Returns(ci =>
+                ci.ArgAt<string>(1).Contains("user/assignable/search") && ci.ArgAt<string>(1).Contains("startAt=0&")
+                    ? JArray.Parse("[{ 'accountId': 'user-1', 'emailAddress': 'user1@example.com' }, { 'accountId': 'user-2' }]")
+                    : new JArray());
+
+            var jiraSettings = new JiraSettings("", "", "", "", "ABC")
+            {
+                JiraApiVersion = 3,
+                UsingJiraCloud = true,
+                UserCacheFile = userCacheFile,
+                UserCacheTtlHours = 24
+            };
+
+            try
+            {
+                var prefill = new JiraProvider(jiraServiceMock);
+                prefill.Initialize(jiraSettings, new ExportIssuesSummary());
+                prefill.PrefillUserCache();
+
+                // A new provider reads the cache from disk, like a later export run
+                var sut = new JiraProvider(jiraServiceMock);
+                var exportIssuesSummary = new ExportIssuesSummary();
+                sut.Initialize(jiraSettings, exportIssuesSummary);
+
+                //Act
+                var email = sut.GetUserEmail("user-1");
+                var privateEmail = sut.GetUserEmail("user-2");
+
+                //Assert
+                Assert.Multiple(() =>
+                {
+                    Assert.AreEqual("user1@example.com", email);
+                    Assert.AreEqual("user-2", privateEmail);
+                    Assert.IsTrue(exportIssuesSummary.GetReportString().Contains("user-2"));
+                    jiraServiceMock.Users.DidNotReceive().GetUserAsync(Arg.Any<string>());
+                });
+            }
+            finally
+            {
+                File.Delete(userCacheFile);
+            }
+        }
+
+        [Test]
+        public void When_jira_throttles_a_request_Then_the_request_is_retried()
+        {
+            //Arrange
+            var apiResponse = JArray.Parse("[{ 'id': 'customfield_00001', 'name': 'Story'}]");
+            var calls = 0;
+
+            var jiraServiceMock = _fixture.Create<IJiraServiceWrapper>();
+            jiraServiceMock.RestClient.ExecuteRequestAsync(Method.GET, Arg.Any<string>()).Returns(ci =>
+            {
+                if (++calls == 1)
+                    throw new InvalidOperationException("Response Status Code: 429. Response Content: ");
+                return (JToken)apiResponse;
+            });
+
+            JiraProvider sut = new JiraProvider(jiraServiceMock);
+
+            var jiraSettings = new JiraSettings("", "", "", "", "");
+            jiraSettings.JiraApiVersion = 3;
+            sut.Initialize(jiraSettings, new ExportIssuesSummary());
+
+            //Act
+            var id = sut.GetCustomId("Story");
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual("customfield_00001", id);
+                Assert.AreEqual(2, calls);
+                Assert.AreEqual(1, sut.RateLimiter.ThrottledCount);
+            });
+        }
+
+        private IJiraServiceWrapper CreateSearchServiceMock(string[] issueKeys, Dictionary<string, string[]> subItems = null)
+        {
+            var jiraServiceMock = _fixture.Create<IJiraServiceWrapper>();
+            jiraServiceMock.RestClient.ExecuteRequestAsync(Method.GET, Arg.Any<string>()).Returns(ci =>
+            {
+                var resource = ci.ArgAt<string>(1);
+                if (resource.Contains("/search?"))
+                {
+                    var issues = resource.Contains("startAt=0&") ? issueKeys.Select(k => new JObject { { "key", k } }) : Enumerable.Empty<JObject>();
+                    return (JToken)new JObject { { "total", issueKeys.Length }, { "issues", new JArray(issues) } };
+                }
+
+                var key = resource.Substring(resource.IndexOf("/issue/") + "/issue/".Length).Split('?')[0];
+                if (resource.Contains("expand=changelog"))
+                {
+                    return JObject.Parse("{ 'changelog': { 'histories': [] } }");
+                }
+
+                var issue = JObject.Parse($"{{ 'id': '{key}', 'key': '{key}', 'fields': {{ 'issuetype': {{ 'name': 'Story' }} }}, 'renderedFields': {{}} }}");
+                if (subItems != null && subItems.TryGetValue(key, out var subItemKeys))
+                    issue["fields"]["subtasks"] = new JArray(subItemKeys.Select(k => new JObject { { "key", k } }));
+                return issue;
+            });
+            return jiraServiceMock;
+        }
     }
 }
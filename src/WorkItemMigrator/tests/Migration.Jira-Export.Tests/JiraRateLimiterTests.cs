@@ -0,0 +1,164 @@
+﻿using JiraExport;
+using NUnit.Framework;
+using RestSharp;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.Net;
+
+namespace Migration.Jira_Export.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class JiraRateLimiterTests
+    {
+        [Test]
+        public void When_requests_exceed_the_rate_Then_they_are_spaced_out()
+        {
+            //Arrange
+            var sut = new JiraRateLimiter(2);
+            var now = DateTime.UtcNow;
+
+            //Act
+            var first = sut.Reserve(now);
+            var second = sut.Reserve(now);
+            var third = sut.Reserve(now);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(TimeSpan.Zero, first);
+                Assert.AreEqual(TimeSpan.Zero, second);
+                Assert.AreEqual(0.5, third.TotalSeconds, 0.01);
+                Assert.AreEqual(3, sut.RequestCount);
+            });
+        }
+
+        [Test]
+        public void When_throttled_Then_the_rate_is_halved_and_recovers_on_success()
+        {
+            //Arrange
+            var sut = new JiraRateLimiter(10);
+
+            //Act
+            sut.OnThrottled(1, TimeSpan.Zero);
+            var throttledRate = sut.CurrentRate;
+            for (int i = 0; i < 100; i++)
+                sut.OnSuccess();
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(JiraRateLimiter.MinRate, throttledRate);
+                Assert.AreEqual(10, sut.CurrentRate);
+                Assert.AreEqual(1, sut.ThrottledCount);
+            });
+        }
+
+        [Test]
+        public void When_throttled_with_retry_after_Then_requests_wait_for_it()
+        {
+            //Arrange
+            var sut = new JiraRateLimiter(0);
+
+            //Act
+            var delay = sut.OnThrottled(1, TimeSpan.FromSeconds(30));
+            var wait = sut.Reserve(DateTime.UtcNow);
+
+            //Assert
+            Assert.AreEqual(30, delay.TotalSeconds);
+            Assert.That(wait.TotalSeconds, Is.InRange(29, 30));
+        }
+
+        [Test]
+        public void When_retry_after_is_sent_Then_it_is_parsed()
+        {
+            var seconds = new[] { new KeyValuePair<string, string>("retry-after", "12") };
+            var date = new[] { new KeyValuePair<string, string>("Retry-After", DateTime.UtcNow.AddSeconds(60).ToString("R")) };
+
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(12, JiraRateLimiter.GetRetryAfter(seconds).Value.TotalSeconds);
+                Assert.That(JiraRateLimiter.GetRetryAfter(date).Value.TotalSeconds, Is.InRange(58, 60));
+                Assert.IsNull(JiraRateLimiter.GetRetryAfter(new KeyValuePair<string, string>[0]));
+            });
+        }
+
+        [Test]
+        public void When_no_requests_remain_Then_requests_wait_until_the_reset()
+        {
+            //Arrange
+            var sut = new JiraRateLimiter(0);
+            var headers = new[]
+            {
+                new KeyValuePair<string, string>("X-RateLimit-Remaining", "0"),
+                new KeyValuePair<string, string>("X-RateLimit-Reset", DateTime.UtcNow.AddSeconds(20).ToString("o"))
+            };
+
+            //Act
+            sut.OnResponseHeaders(headers);
+            var wait = sut.Reserve(DateTime.UtcNow);
+
+            //Assert
+            Assert.That(wait.TotalSeconds, Is.InRange(19, 20));
+        }
+
+        [Test]
+        public void When_backing_off_Then_the_delay_grows_with_jitter_up_to_a_maximum()
+        {
+            var sut = new JiraRateLimiter(0);
+
+            Assert.Multiple(() =>
+            {
+                Assert.That(sut.GetBackoff(1).TotalSeconds, Is.InRange(1, 1.5));
+                Assert.That(sut.GetBackoff(3).TotalSeconds, Is.InRange(4, 6));
+                Assert.That(sut.GetBackoff(20).TotalSeconds, Is.InRange(59.9, 60));
+            });
+        }
+
+        [Test]
+        public void When_checking_exceptions_Then_only_throttling_is_detected()
+        {
+            Assert.Multiple(() =>
+            {
+                Assert.IsTrue(JiraRateLimiter.IsThrottlingException(new AggregateException(new JiraThrottledException((HttpStatusCode)429, null))));
+                Assert.IsTrue(JiraRateLimiter.IsThrottlingException(new JiraThrottledException(HttpStatusCode.ServiceUnavailable, TimeSpan.FromSeconds(5))));
+                Assert.IsFalse(JiraRateLimiter.IsThrottlingException(new InvalidOperationException("Response Status Code: 429. Response Content: ")));
+                Assert.IsFalse(JiraRateLimiter.IsThrottlingStatus(HttpStatusCode.BadRequest));
+            });
+        }
+
+        [Test]
+        public void When_a_jira_response_is_near_the_limit_Then_the_rate_is_lowered_without_throttling()
+        {
+            //Arrange
+            var sut = new JiraRateLimiter(10);
+            var response = new RestResponse { StatusCode = HttpStatusCode.OK };
+            response.Headers.Add(new Parameter("X-RateLimit-NearLimit", "true", ParameterType.HttpHeader));
+
+            //Act
+            JiraThrottlingRestClient.OnResponse(response, sut);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.Less(sut.CurrentRate, 10.0);
+                Assert.AreEqual(0, sut.ThrottledCount);
+            });
+        }
+
+        [Test]
+        public void When_a_jira_response_is_throttled_Then_a_typed_exception_with_the_retry_after_time_is_thrown()
+        {
+            //Arrange
+            var response = new RestResponse { StatusCode = (HttpStatusCode)429 };
+            response.Headers.Add(new Parameter("Retry-After", "7", ParameterType.HttpHeader));
+
+            //Act
+            var exception = Assert.Throws<JiraThrottledException>(() => JiraThrottlingRestClient.OnResponse(response, new JiraRateLimiter(0)));
+
+            //Assert
+            Assert.AreEqual(TimeSpan.FromSeconds(7), exception.RetryAfter);
+        }
+    }
+}
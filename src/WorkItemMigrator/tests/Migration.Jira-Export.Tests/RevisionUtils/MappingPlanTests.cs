@@ -0,0 +1,96 @@
+﻿using Common.Config;
+using JiraExport;
+using Migration.Common.Config;
+using NUnit.Framework;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using Type = Migration.Common.Config.Type;
+
+namespace Migration.Jira_Export.Tests.RevisionUtils
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class MappingPlanTests
+    {
+        private ConfigJson _config;
+
+        [SetUp]
+        public void Setup()
+        {
+            _config = new ConfigJson
+            {
+                TypeMap = new TypeMap
+                {
+                    Types = new List<Type>
+                    {
+                        new Type { Source = "Bug", Target = "Bug" },
+                        new Type { Source = "Story", Target = "User Story" },
+                        new Type { Source = "Story", Target = "Product Backlog Item" }
+                    }
+                },
+                LinkMap = new LinkMap
+                {
+                    Links = new List<Link>
+                    {
+                        new Link { Source = "Relates", Target = "System.LinkTypes.Related" }
+                    }
+                },
+                FieldMap = new FieldMap
+                {
+                    Fields = new List<Field>
+                    {
+                        new Field
+                        {
+                            Source = "status", Target = "System.State", For = "Bug",
+                            Mapping = new Mapping { Values = new List<Value> { new Value { Source = "Open", Target = "New" } } }
+                        },
+                        new Field
+                        {
+                            Source = "status", Target = "System.State", NotFor = "Bug",
+                            Mapping = new Mapping
+                            {
+                                Values = new List<Value>
+                                {
+                                    new Value { Source = "Open", Target = "Active" },
+                                    new Value { Source = "Open", Target = "Ignored" }
+                                }
+                            }
+                        },
+                        new Field { Source = "summary", Target = "System.Title" }
+                    }
+                }
+            };
+        }
+
+        [Test]
+        public void When_a_type_is_mapped_more_than_once_Then_the_first_mapping_is_used()
+        {
+            var sut = new MappingPlan(_config);
+
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual("User Story", sut.GetTargetType("Story"));
+                Assert.IsNull(sut.GetTargetType("Epic"));
+                Assert.IsNull(sut.GetTargetType(null));
+                Assert.AreEqual("System.LinkTypes.Related", sut.GetLinkType("Relates"));
+                Assert.IsNull(sut.GetLinkType("Blocks"));
+            });
+        }
+
+        [Test]
+        public void When_value_maps_are_restricted_by_type_Then_the_map_for_the_target_type_is_used()
+        {
+            var sut = new MappingPlan(_config);
+
+            Assert.Multiple(() =>
+            {
+                Assert.IsTrue(sut.TryGetValueMap("Bug", "status", "System.State", out var bugValues));
+                Assert.AreEqual("New", bugValues["Open"]);
+                Assert.IsTrue(sut.TryGetValueMap("User Story", "status", "System.State", out var storyValues));
+                Assert.AreEqual("Active", storyValues["Open"]);
+                Assert.IsFalse(sut.TryGetValueMap("Bug", "summary", "System.Title", out _));
+                Assert.IsFalse(sut.TryGetValueMap(null, "status", "System.State", out _));
+            });
+        }
+    }
+}
@@ -0,0 +1,120 @@
+﻿using JiraExport;
+using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+
+namespace Migration.Jira_Export.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class UserEmailCacheTests
+    {
+        private string _cacheFile;
+
+        [SetUp]
+        public void Setup()
+        {
+            _cacheFile = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+        }
+
+        [TearDown]
+        public void TearDown()
+        {
+            if (File.Exists(_cacheFile))
+                File.Delete(_cacheFile);
+        }
+
+        [Test]
+        public void When_reopening_the_cache_Then_emails_and_misses_are_found()
+        {
+            var cache = new UserEmailCache(_cacheFile, TimeSpan.FromHours(1));
+            cache.Add("user-1", "user1@example.com");
+            cache.Add("user-2", null);
+
+            var sut = new UserEmailCache(_cacheFile, TimeSpan.FromHours(1));
+
+            Assert.Multiple(() =>
+            {
+                Assert.IsTrue(sut.TryGetEmail("user-1", out string email));
+                Assert.AreEqual("user1@example.com", email);
+                Assert.IsTrue(sut.TryGetEmail("user-2", out string missingEmail));
+                Assert.AreEqual("", missingEmail);
+                Assert.IsFalse(sut.TryGetEmail("user-3", out _));
+            });
+        }
+
+        [Test]
+        public void When_an_entry_is_expired_Then_it_is_not_used()
+        {
+            File.WriteAllLines(_cacheFile, new[]
+            {
+                $"user-1\told@example.com\t{DateTime.UtcNow.AddHours(-2):o}",
+                $"user-2\tuser2@example.com\t{DateTime.UtcNow:o}"
+            });
+
+            var sut = new UserEmailCache(_cacheFile, TimeSpan.FromHours(1));
+
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(1, sut.Count);
+                Assert.IsFalse(sut.TryGetEmail("user-1", out _));
+                Assert.IsTrue(sut.TryGetEmail("user-2", out _));
+            });
+        }
+
+        [Test]
+        public void When_a_user_is_cached_again_Then_the_latest_email_is_used()
+        {
+            var cache = new UserEmailCache(_cacheFile, TimeSpan.FromHours(1));
+            cache.Add("user-1", "old@example.com");
+            cache.Add("user-1", "new@example.com");
+
+            var sut = new UserEmailCache(_cacheFile, TimeSpan.FromHours(1));
+
+            Assert.IsTrue(sut.TryGetEmail("user-1", out string email));
+            Assert.AreEqual("new@example.com", email);
+        }
+
+        [Test]
+        public void When_cached_users_are_added_again_Then_they_are_not_written_again()
+        {
+            var sut = new UserEmailCache(_cacheFile, TimeSpan.FromHours(1));
+            sut.AddRange(new[] { new KeyValuePair<string, string>("user-1", "user1@example.com"), new KeyValuePair<string, string>("user-2", null) });
+
+            var added = sut.AddRange(new[]
+            {
+                new KeyValuePair<string, string>("user-1", "user1@example.com"),
+                new KeyValuePair<string, string>("user-2", null),
+                new KeyValuePair<string, string>("user-3", "user3@example.com")
+            });
+
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(1, added);
+                Assert.AreEqual(3, File.ReadAllLines(_cacheFile).Length);
+            });
+        }
+
+        [Test]
+        public void When_the_cache_has_replaced_or_expired_lines_Then_they_are_removed_from_the_file()
+        {
+            File.WriteAllLines(_cacheFile, new[]
+            {
+                $"user-1\told@example.com\t{DateTime.UtcNow.AddHours(-2):o}",
+                $"user-2\told@example.com\t{DateTime.UtcNow.AddMinutes(-2):o}",
+                $"user-2\tuser2@example.com\t{DateTime.UtcNow.AddMinutes(-1):o}"
+            });
+
+            var sut = new UserEmailCache(_cacheFile, TimeSpan.FromHours(1));
+
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(1, sut.Count);
+                Assert.AreEqual(1, File.ReadAllLines(_cacheFile).Length);
+                Assert.That(File.ReadAllLines(_cacheFile)[0].StartsWith("user-2\tuser2@example.com\t"), Is.True);
+            });
+        }
+    }
+}
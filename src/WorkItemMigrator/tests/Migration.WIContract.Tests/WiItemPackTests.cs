@@ -0,0 +1,155 @@
+﻿using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+using System.Linq;
+
+namespace Migration.WIContract.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class WiItemPackTests
+    {
+        private string _workspace;
+
+        [SetUp]
+        public void Setup()
+        {
+            _workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(_workspace);
+        }
+
+        [TearDown]
+        public void TearDown()
+        {
+            Directory.Delete(_workspace, true);
+        }
+
+        private static WiItem CreateItem(string originId, string title, params string[] linkedOriginIds)
+        {
+            return new WiItem
+            {
+                OriginId = originId,
+                Type = "Task",
+                Revisions = new List<WiRevision>
+                {
+                    new WiRevision
+                    {
+                        Index = 0,
+                        Time = new DateTime(2023, 1, 1, 0, 0, 0, DateTimeKind.Utc),
+                        Fields = new List<WiField> { new WiField { ReferenceName = "System.Title", Value = title } },
+                        Links = linkedOriginIds.Select(l => new WiLink { Change = ReferenceChangeType.Added, TargetOriginId = l, WiType = "System.LinkTypes.Related" }).ToList()
+                    }
+                }
+            };
+        }
+
+        [Test]
+        public void When_items_are_saved_Then_the_last_version_is_loaded_by_a_new_pack()
+        {
+            //Arrange
+            var pack = new WiItemPack(_workspace);
+            pack.Save(CreateItem("ITEM-1", "first"));
+            pack.Save(CreateItem("ITEM-2", "second", "ITEM-1"));
+            pack.Save(CreateItem("ITEM-1", "changed"));
+
+            //Act
+            var sut = new WiItemPack(_workspace);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(sut.Entries.Select(e => e.OriginId), Is.EqualTo(new[] { "ITEM-2", "ITEM-1" }));
+                Assert.That(sut.Entries[0].Revisions[0].LinkedOriginIds, Is.EqualTo(new[] { "ITEM-1" }));
+                Assert.That(sut.Load("ITEM-1").Revisions[0].Fields[0].Value, Is.EqualTo("changed"));
+                Assert.That(sut.Load("ITEM-2").Revisions[0].Fields[0].Value, Is.EqualTo("second"));
+            });
+        }
+
+        [Test]
+        public void When_the_index_is_missing_Then_it_is_rebuilt_from_the_pack()
+        {
+            //Arrange
+            var pack = new WiItemPack(_workspace);
+            pack.Save(CreateItem("ITEM-1", "first"));
+            pack.Save(CreateItem("ITEM-1", "changed"));
+            File.Delete(pack.IndexPath);
+
+            //Act
+            var sut = new WiItemPack(_workspace);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(File.Exists(sut.IndexPath), Is.True);
+                Assert.That(sut.Entries, Has.Count.EqualTo(1));
+                Assert.That(sut.Load("ITEM-1").Revisions[0].Fields[0].Value, Is.EqualTo("changed"));
+            });
+        }
+
+        [Test]
+        public void When_the_last_item_is_incomplete_Then_it_is_removed_from_the_pack()
+        {
+            //Arrange
+            var pack = new WiItemPack(_workspace);
+            pack.Save(CreateItem("ITEM-1", "first"));
+            var length = new FileInfo(pack.PackPath).Length;
+            File.AppendAllText(pack.PackPath, "{ \"OriginId\": \"ITEM-2\", \"Revi");
+
+            //Act
+            var sut = new WiItemPack(_workspace);
+            sut.Save(CreateItem("ITEM-3", "third"));
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(sut.Entries.Select(e => e.OriginId), Is.EqualTo(new[] { "ITEM-1", "ITEM-3" }));
+                Assert.That(sut.Entries[1].Offset, Is.EqualTo(length));
+                Assert.That(sut.Load("ITEM-3").Revisions[0].Fields[0].Value, Is.EqualTo("third"));
+            });
+        }
+
+        [Test]
+        public void When_the_pack_is_compacted_Then_only_the_last_versions_are_kept()
+        {
+            //Arrange
+            var sut = new WiItemPack(_workspace);
+            sut.Save(CreateItem("ITEM-1", "first"));
+            sut.Save(CreateItem("ITEM-2", "second"));
+            sut.Save(CreateItem("ITEM-1", "changed"));
+
+            //Act
+            sut.Compact();
+
+            //Assert
+            var reopened = new WiItemPack(_workspace);
+            Assert.Multiple(() =>
+            {
+                Assert.That(sut.SupersededLength, Is.EqualTo(0));
+                Assert.That(File.ReadAllLines(sut.PackPath), Has.Length.EqualTo(2));
+                Assert.That(reopened.Load("ITEM-1").Revisions[0].Fields[0].Value, Is.EqualTo("changed"));
+                Assert.That(reopened.Load("ITEM-2").Revisions[0].Fields[0].Value, Is.EqualTo("second"));
+            });
+        }
+
+        [Test]
+        public void When_a_pack_exists_Then_the_provider_reads_the_items_from_the_pack()
+        {
+            //Arrange
+            new WiItemProvider(_workspace, packed: true).Save(CreateItem("ITEM-1", "first"));
+
+            //Act
+            var sut = new WiItemProvider(_workspace);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(sut.IsPacked, Is.True);
+                Assert.That(sut.EnumerateOriginIds(), Is.EqualTo(new[] { "ITEM-1" }));
+                Assert.That(sut.EnumerateAllItems().Single().OriginId, Is.EqualTo("ITEM-1"));
+                Assert.That(Directory.EnumerateFiles(_workspace, "*.json"), Is.Empty);
+            });
+        }
+    }
+}
@@ -0,0 +1,107 @@
+﻿using Newtonsoft.Json;
+using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+using System.Linq;
+using System.Text;
+using System.Text.RegularExpressions;
+
+namespace Migration.WIContract.Tests
+{
+    // Not part of the regular test run, execute with: dotnet test --filter TestCategory=Benchmark
+    [TestFixture]
+    [Explicit]
+    [Category("Benchmark")]
+    [ExcludeFromCodeCoverage]
+    public class WiItemProviderBenchmarks
+    {
+        private const int ItemCount = 500;
+        private const int RevisionsPerItem = 50;
+        private const int HtmlLength = 16 * 1024;
+
+        private string _workspace;
+        private List<WiItem> _corpus;
+
+        [OneTimeSetUp]
+        public void OneTimeSetup()
+        {
+            var html = new StringBuilder();
+            while (html.Length < HtmlLength)
+                html.Append("<p>Rendered <b>description</b> with a <a href=\"https://jira/secure/attachment/1/image.png\">link</a>\u001b</p>");
+
+            _corpus = Enumerable.Range(0, ItemCount).Select(i => new WiItem
+            {
+                OriginId = $"ITEM-{i}",
+                Type = "Task",
+                Revisions = Enumerable.Range(0, RevisionsPerItem).Select(r => new WiRevision
+                {
+                    Index = r,
+                    Author = "user",
+                    Fields = new List<WiField> { new WiField { ReferenceName = "System.Description", Value = html.ToString() } },
+                    Links = new List<WiLink>(),
+                    Attachments = new List<WiAttachment>()
+                }).ToList()
+            }).ToList();
+        }
+
+        [SetUp]
+        public void Setup()
+        {
+            _workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(_workspace);
+        }
+
+        [TearDown]
+        public void TearDown()
+        {
+            Directory.Delete(_workspace, true);
+        }
+
+        [TestCase(true, false)]
+        [TestCase(false, false)]
+        [TestCase(false, true)]
+        public void Measure_save_and_load_throughput(bool indented, bool compressed)
+        {
+            var sut = new WiItemProvider(_workspace, indented, compressed);
+
+            var saveTime = Measure(() => _corpus.ForEach(sut.Save));
+            var size = Directory.EnumerateFiles(_workspace, "*.json").Sum(f => new FileInfo(f).Length);
+            var loadTime = Measure(() => _corpus.ForEach(i => sut.Load(i.OriginId)));
+
+            TestContext.WriteLine($"Items: {ItemCount}, indented: {indented}, compressed: {compressed}, size: {size / 1024 / 1024} MB");
+            TestContext.WriteLine($"Save: {ItemCount / saveTime.TotalSeconds:F0} items/s");
+            TestContext.WriteLine($"Load: {ItemCount / loadTime.TotalSeconds:F0} items/s");
+        }
+
+        [Test]
+        public void Measure_load_throughput_of_reading_the_whole_file_first()
+        {
+            var sut = new WiItemProvider(_workspace);
+            _corpus.ForEach(sut.Save);
+
+            // The item files were read into a string and cleaned up before they were deserialized
+            var loadTime = Measure(() => _corpus.ForEach(i =>
+            {
+                var serialized = File.ReadAllText(Path.Combine(_workspace, $"{i.OriginId}.json"));
+                if (Regex.Matches(serialized, @"\\\\u[0-F]{4,}").Count > 0)
+                    serialized = Regex.Replace(serialized, @"\\\\u[0-F]{4,}", "");
+                serialized = serialized.Replace("\\u001b", "\n");
+                JsonConvert.DeserializeObject<WiItem>(serialized, new JsonSerializerSettings() { NullValueHandling = NullValueHandling.Ignore });
+            }));
+
+            TestContext.WriteLine($"Items: {ItemCount}, reading the whole file first");
+            TestContext.WriteLine($"Load: {ItemCount / loadTime.TotalSeconds:F0} items/s");
+        }
+
+        private static TimeSpan Measure(Action action)
+        {
+            var sw = Stopwatch.StartNew();
+            action();
+            sw.Stop();
+            return sw.Elapsed;
+        }
+    }
+}
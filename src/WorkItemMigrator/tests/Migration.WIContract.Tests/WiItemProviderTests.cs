@@ -0,0 +1,116 @@
+﻿using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+using System.Linq;
+
+namespace Migration.WIContract.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class WiItemProviderTests
+    {
+        private string _workspace;
+
+        [SetUp]
+        public void Setup()
+        {
+            _workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(_workspace);
+        }
+
+        [TearDown]
+        public void TearDown()
+        {
+            Directory.Delete(_workspace, true);
+        }
+
+        private static WiItem CreateItem()
+        {
+            return new WiItem
+            {
+                OriginId = "ITEM-1",
+                Type = "Task",
+                Revisions = new List<WiRevision>
+                {
+                    new WiRevision
+                    {
+                        Index = 0,
+                        Author = "user",
+                        Time = new DateTime(2023, 1, 1, 0, 0, 0, DateTimeKind.Utc),
+                        Fields = new List<WiField> { new WiField { ReferenceName = "System.Description", Value = "<p>Description</p>" } }
+                    }
+                }
+            };
+        }
+
+        [TestCase(true, false)]
+        [TestCase(false, false)]
+        [TestCase(true, true)]
+        [TestCase(false, true)]
+        public void When_an_item_is_saved_Then_it_is_loaded_by_any_provider(bool indented, bool compressed)
+        {
+            //Arrange
+            new WiItemProvider(_workspace, indented, compressed).Save(CreateItem());
+            var sut = new WiItemProvider(_workspace);
+
+            //Act
+            var item = sut.Load("ITEM-1");
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(item.OriginId, Is.EqualTo("ITEM-1"));
+                Assert.That(item.Revisions, Has.Count.EqualTo(1));
+                Assert.That(item.Revisions[0].ParentOriginId, Is.EqualTo("ITEM-1"));
+                Assert.That(item.Revisions[0].Fields[0].Value, Is.EqualTo("<p>Description</p>"));
+            });
+        }
+
+        [Test]
+        public void When_an_item_is_saved_compressed_Then_the_file_is_gzip()
+        {
+            //Arrange
+            var sut = new WiItemProvider(_workspace, compressed: true);
+
+            //Act
+            sut.Save(CreateItem());
+
+            //Assert
+            var header = File.ReadAllBytes(Path.Combine(_workspace, "ITEM-1.json")).Take(2);
+            Assert.That(header, Is.EqualTo(new byte[] { 0x1f, 0x8b }));
+        }
+
+        [Test]
+        public void When_an_item_contains_escape_sequences_Then_they_are_cleaned_up()
+        {
+            //Arrange
+            var json = "{ \"OriginId\": \"ITEM-1\", \"Revisions\": [ { \"Fields\": [ { \"ReferenceName\": \"System.Title\", " +
+                "\"Value\": \"a\\\\uD83D\\\\uDE00b\\u001bc\\\\d\" } ] } ] }";
+            File.WriteAllText(Path.Combine(_workspace, "ITEM-1.json"), json);
+            var sut = new WiItemProvider(_workspace);
+
+            //Act
+            var item = sut.Load("ITEM-1");
+
+            //Assert
+            Assert.That(item.Revisions[0].Fields[0].Value, Is.EqualTo("ab\nc\\d"));
+        }
+
+        [Test]
+        public void When_enumerating_items_Then_files_that_are_not_items_are_skipped()
+        {
+            //Arrange
+            var sut = new WiItemProvider(_workspace);
+            sut.Save(CreateItem());
+            File.WriteAllText(Path.Combine(_workspace, "other.json"), "not an item");
+
+            //Act
+            var items = sut.EnumerateAllItems().ToList();
+
+            //Assert
+            Assert.That(items.Select(i => i.OriginId), Is.EqualTo(new[] { "ITEM-1" }));
+        }
+    }
+}
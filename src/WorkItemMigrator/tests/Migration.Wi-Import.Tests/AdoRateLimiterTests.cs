@@ -0,0 +1,147 @@
+﻿using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+using System.Net;
+using System.Net.Http;
+using System.Threading;
+using System.Threading.Tasks;
+using WorkItemImport;
+
+namespace Migration.Wi_Import.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class AdoRateLimiterTests
+    {
+        private static readonly DateTime Now = new DateTime(2023, 1, 1, 0, 0, 0, DateTimeKind.Utc);
+
+        private class ThrottleOnceHandler : HttpMessageHandler
+        {
+            public int SentCount { get; private set; }
+
+            protected override Task<HttpResponseMessage> SendAsync(HttpRequestMessage request, CancellationToken cancellationToken)
+            {
+                var response = new HttpResponseMessage(++SentCount == 1 ? (HttpStatusCode)429 : HttpStatusCode.OK);
+                response.Headers.Add("Retry-After", "0");
+                return Task.FromResult(response);
+            }
+        }
+
+        private static KeyValuePair<string, string> Header(string name, string value)
+        {
+            return new KeyValuePair<string, string>(name, value);
+        }
+
+        [Test]
+        public void When_a_response_has_retry_after_Then_all_requests_wait()
+        {
+            //Arrange
+            var sut = new AdoRateLimiter();
+
+            //Act
+            var retryDelay = sut.OnResponse(200, new[] { Header("Retry-After", "10") }, Now);
+            var first = sut.Reserve(Now);
+            var second = sut.Reserve(Now.AddSeconds(4));
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.IsNull(retryDelay);
+                Assert.AreEqual(10, first.TotalSeconds, 0.01);
+                Assert.AreEqual(6, second.TotalSeconds, 0.01);
+                Assert.AreEqual(0, sut.ThrottledCount);
+            });
+        }
+
+        [Test]
+        public void When_the_limit_is_almost_used_Then_the_remaining_requests_are_spread_until_the_reset()
+        {
+            //Arrange
+            var sut = new AdoRateLimiter();
+            var reset = new DateTimeOffset(Now.AddSeconds(20)).ToUnixTimeSeconds().ToString();
+
+            //Act
+            sut.OnResponse(200, new[] { Header("X-RateLimit-Remaining", "10"), Header("X-RateLimit-Reset", reset) }, Now);
+            var first = sut.Reserve(Now);
+            var second = sut.Reserve(Now);
+            var third = sut.Reserve(Now);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(2, sut.CurrentInterval.TotalSeconds, 0.01);
+                Assert.AreEqual(TimeSpan.Zero, first);
+                Assert.AreEqual(2, second.TotalSeconds, 0.01);
+                Assert.AreEqual(4, third.TotalSeconds, 0.01);
+            });
+        }
+
+        [Test]
+        public void When_a_response_has_no_rate_limit_headers_Then_requests_are_not_held_back()
+        {
+            //Arrange
+            var sut = new AdoRateLimiter();
+            var reset = new DateTimeOffset(Now.AddSeconds(20)).ToUnixTimeSeconds().ToString();
+            sut.OnResponse(200, new[] { Header("X-RateLimit-Remaining", "10"), Header("X-RateLimit-Reset", reset) }, Now);
+
+            //Act
+            sut.OnResponse(200, new KeyValuePair<string, string>[0], Now);
+            var first = sut.Reserve(Now.AddSeconds(5));
+            var second = sut.Reserve(Now.AddSeconds(5));
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(TimeSpan.Zero, sut.CurrentInterval);
+                Assert.AreEqual(TimeSpan.Zero, first);
+                Assert.AreEqual(TimeSpan.Zero, second);
+            });
+        }
+
+        [Test]
+        public void When_a_request_is_throttled_without_retry_after_Then_it_backs_off_exponentially()
+        {
+            //Arrange
+            var sut = new AdoRateLimiter();
+
+            //Act
+            var firstDelay = sut.OnResponse(429, null, Now, 1);
+            var thirdDelay = sut.OnResponse(429, null, Now, 3);
+            var lastDelay = sut.OnResponse(429, null, Now, 10);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(1, firstDelay.Value.TotalSeconds, 0.01);
+                Assert.AreEqual(4, thirdDelay.Value.TotalSeconds, 0.01);
+                Assert.AreEqual(60, lastDelay.Value.TotalSeconds, 0.01);
+                Assert.AreEqual(3, sut.ThrottledCount);
+            });
+        }
+
+        [Test]
+        public void When_a_request_is_throttled_Then_it_is_sent_again_unless_its_content_is_a_stream()
+        {
+            //Arrange
+            var bytesInner = new ThrottleOnceHandler();
+            var streamInner = new ThrottleOnceHandler();
+            var bytesClient = new HttpClient(new AdoThrottlingHandler(new AdoRateLimiter(), 5) { InnerHandler = bytesInner });
+            var streamClient = new HttpClient(new AdoThrottlingHandler(new AdoRateLimiter(), 5) { InnerHandler = streamInner });
+
+            //Act
+            var response = bytesClient.PostAsync("https://example/_apis", new ByteArrayContent(new byte[] { 1 })).Result;
+            var exception = Assert.Catch(() => streamClient.PostAsync("https://example/_apis", new StreamContent(new MemoryStream(new byte[] { 1 }))).Wait());
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(HttpStatusCode.OK, response.StatusCode);
+                Assert.AreEqual(2, bytesInner.SentCount);
+                Assert.AreEqual(1, streamInner.SentCount);
+                Assert.IsTrue(AdoThrottlingHandler.IsThrottlingException(exception));
+            });
+        }
+    }
+}
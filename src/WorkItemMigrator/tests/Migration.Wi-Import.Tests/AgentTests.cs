@@ -0,0 +1,85 @@
+﻿using Microsoft.TeamFoundation.WorkItemTracking.WebApi.Models;
+using Migration.WIContract;
+using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.Linq;
+using WorkItemImport;
+
+namespace Migration.Wi_Import.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class AgentTests
+    {
+        private static WiRevision CreateRevision(int index, params WiField[] fields)
+        {
+            return new WiRevision { Index = index, Fields = fields.ToList() };
+        }
+
+        private static RevisionReference CreateReference(string originId, int revIndex, int minute)
+        {
+            return new RevisionReference { OriginId = originId, RevIndex = revIndex, Time = new DateTime(2023, 1, 1, 0, minute, 0, DateTimeKind.Utc) };
+        }
+
+        [Test]
+        public void When_getting_classification_paths_Then_the_distinct_paths_are_returned_in_the_order_of_the_plan()
+        {
+            //Arrange
+            var items = new Dictionary<string, WiItem>
+            {
+                ["ITEM-1"] = new WiItem
+                {
+                    OriginId = "ITEM-1",
+                    Revisions = new List<WiRevision>
+                    {
+                        CreateRevision(0, new WiField { ReferenceName = WiFieldReference.IterationPath, Value = "Sprint 2" }),
+                        CreateRevision(1, new WiField { ReferenceName = WiFieldReference.AreaPath, Value = "Team/Backend" })
+                    }
+                },
+                ["ITEM-2"] = new WiItem
+                {
+                    OriginId = "ITEM-2",
+                    Revisions = new List<WiRevision>
+                    {
+                        CreateRevision(0,
+                            new WiField { ReferenceName = WiFieldReference.IterationPath, Value = "Sprint 1" },
+                            new WiField { ReferenceName = WiFieldReference.AreaPath, Value = "Team/Backend" }),
+                        CreateRevision(1, new WiField { ReferenceName = WiFieldReference.IterationPath, Value = "Sprint 2" })
+                    }
+                }
+            };
+            var plan = new[] { CreateReference("ITEM-2", 0, 0), CreateReference("ITEM-1", 0, 1), CreateReference("ITEM-2", 1, 2), CreateReference("ITEM-1", 1, 3) };
+            var loads = 0;
+
+            //Act
+            var paths = Agent.GetClassificationPaths(plan, originId => { loads++; return items[originId]; }, null, "Base");
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(paths, Is.EqualTo(new[]
+                {
+                    (TreeStructureGroup.Iterations, "Base/Sprint 1"),
+                    (TreeStructureGroup.Areas, "Team/Backend"),
+                    (TreeStructureGroup.Iterations, "Base/Sprint 2")
+                }));
+                Assert.That(loads, Is.EqualTo(2));
+            });
+        }
+
+        [Test]
+        public void When_an_item_cannot_be_read_Then_its_paths_are_skipped()
+        {
+            //Arrange
+            var plan = new[] { CreateReference("ITEM-1", 0, 0) };
+
+            //Act
+            var paths = Agent.GetClassificationPaths(plan, originId => throw new InvalidOperationException(), "Area", "Iteration");
+
+            //Assert
+            Assert.That(paths, Is.Empty);
+        }
+    }
+}
@@ -0,0 +1,147 @@
+﻿using Microsoft.TeamFoundation.WorkItemTracking.WebApi.Models;
+using Migration.Common;
+using Migration.WIContract;
+using NSubstitute;
+using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+using System.Linq;
+using System.Threading;
+using WorkItemImport;
+
+namespace Migration.Wi_Import.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class AttachmentUploaderTests
+    {
+        private string _workspace;
+        private Journal _journal;
+        private IWitClientWrapper _witClientWrapper;
+
+        [SetUp]
+        public void Setup()
+        {
+            _workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(_workspace);
+            _journal = Journal.Open(_workspace, false);
+            _witClientWrapper = Substitute.For<IWitClientWrapper>();
+            _witClientWrapper.CreateAttachment(Arg.Any<WiAttachment>())
+                .Returns(ci => new AttachmentReference { Id = Guid.NewGuid(), Url = $"https://example/_apis/wit/attachments/{ci.Arg<WiAttachment>().AttOriginId}" });
+        }
+
+        [TearDown]
+        public void TearDown()
+        {
+            _journal.Dispose();
+            Directory.Delete(_workspace, true);
+        }
+
+        private static WiAttachment CreateAttachment(string attOriginId)
+        {
+            return new WiAttachment { AttOriginId = attOriginId, FilePath = $"C:\\Temp\\{attOriginId}\\image.png", Change = ReferenceChangeType.Added };
+        }
+
+        [Test]
+        public void When_an_attachment_is_uploaded_Then_it_is_recorded_in_the_journal_and_not_uploaded_again()
+        {
+            //Arrange
+            var sut = new AttachmentUploader(_witClientWrapper, _journal);
+            var attachment = CreateAttachment("100");
+
+            //Act
+            var first = sut.GetOrUpload(attachment);
+            var second = new AttachmentUploader(_witClientWrapper, _journal).GetOrUpload(attachment);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(second.Url, Is.EqualTo(first.Url));
+                Assert.That(second.Id, Is.EqualTo(first.Id));
+                Assert.That(_journal.IsAttachmentUploaded("100", out _, out string url), Is.True);
+                Assert.That(url, Is.EqualTo(first.Url));
+                _witClientWrapper.Received(1).CreateAttachment(attachment);
+            });
+        }
+
+        [Test]
+        public void When_attachments_are_uploaded_ahead_Then_the_revisions_do_not_upload_them()
+        {
+            //Arrange
+            var sut = new AttachmentUploader(_witClientWrapper, _journal);
+            var attachments = Enumerable.Range(100, 10).Select(i => CreateAttachment(i.ToString())).ToList();
+
+            //Act
+            sut.UploadAheadAsync(attachments, 4, CancellationToken.None).Wait();
+            attachments.ForEach(a => sut.GetOrUpload(a));
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(sut.UploadedAhead, Is.EqualTo(10));
+                _witClientWrapper.Received(10).CreateAttachment(Arg.Any<WiAttachment>());
+            });
+        }
+
+        [Test]
+        public void When_listing_upcoming_attachments_Then_each_item_is_read_once_and_migrated_attachments_are_skipped()
+        {
+            //Arrange
+            var items = new Dictionary<string, WiItem>
+            {
+                ["ITEM-1"] = new WiItem
+                {
+                    OriginId = "ITEM-1",
+                    Revisions = new List<WiRevision>
+                    {
+                        new WiRevision { Index = 0, Attachments = new List<WiAttachment> { CreateAttachment("100") } },
+                        new WiRevision { Index = 1, Attachments = new List<WiAttachment> { CreateAttachment("101") } }
+                    }
+                },
+                ["ITEM-2"] = new WiItem
+                {
+                    OriginId = "ITEM-2",
+                    Revisions = new List<WiRevision> { new WiRevision { Index = 0, Attachments = new List<WiAttachment> { CreateAttachment("200") } } }
+                }
+            };
+            var plan = new List<RevisionReference>
+            {
+                new RevisionReference { OriginId = "ITEM-1", RevIndex = 0 },
+                new RevisionReference { OriginId = "ITEM-2", RevIndex = 0 },
+                new RevisionReference { OriginId = "ITEM-1", RevIndex = 1 }
+            };
+            _journal.MarkAttachmentAsProcessed("101", "https://example/_apis/wit/attachments/101");
+            var loads = new List<string>();
+
+            //Act
+            var attachments = AttachmentUploader.GetUpcomingAttachments(plan, originId => { loads.Add(originId); return items[originId]; }, _journal).ToList();
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(attachments.Select(a => a.AttOriginId), Is.EqualTo(new[] { "100", "200" }));
+                Assert.That(loads, Is.EqualTo(new[] { "ITEM-1", "ITEM-2" }));
+            });
+        }
+
+        [Test]
+        public void When_an_upload_fails_Then_it_is_tried_again()
+        {
+            //Arrange
+            var attachment = CreateAttachment("100");
+            _witClientWrapper.CreateAttachment(attachment).Returns(
+                _ => throw new AggregateException(new InvalidOperationException("Upload failed")),
+                _ => new AttachmentReference { Id = Guid.NewGuid(), Url = "https://example/_apis/wit/attachments/100" });
+            var sut = new AttachmentUploader(_witClientWrapper, _journal);
+
+            //Act
+            Assert.Throws<AggregateException>(() => sut.GetOrUpload(attachment));
+            var reference = sut.GetOrUpload(attachment);
+
+            //Assert
+            Assert.That(reference.Url, Is.EqualTo("https://example/_apis/wit/attachments/100"));
+        }
+    }
+}
@@ -0,0 +1,100 @@
+﻿using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+using WorkItemImport;
+
+namespace Migration.Wi_Import.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class ExecutionPlanStoreTests
+    {
+        private string _workspace;
+
+        [SetUp]
+        public void Setup()
+        {
+            _workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(_workspace);
+            File.WriteAllText(Path.Combine(_workspace, "ITEM-1.json"), "{}");
+            File.WriteAllText(Path.Combine(_workspace, "ITEM-2.json"), "{}");
+        }
+
+        [TearDown]
+        public void TearDown()
+        {
+            Directory.Delete(_workspace, true);
+        }
+
+        private static List<RevisionReference> CreatePlan()
+        {
+            return new List<RevisionReference>
+            {
+                new RevisionReference { OriginId = "ITEM-1", RevIndex = 0, Time = new DateTime(2023, 1, 1, 0, 0, 0, DateTimeKind.Utc), LinkedOriginIds = new string[0] },
+                new RevisionReference { OriginId = "ITEM-2", RevIndex = 0, Time = new DateTime(2023, 1, 2, 0, 0, 0, DateTimeKind.Utc), LinkedOriginIds = new[] { "ITEM-1" } },
+                new RevisionReference { OriginId = "ITEM-1", RevIndex = 1, Time = new DateTime(2023, 1, 2, 0, 0, 0, 2, DateTimeKind.Utc), LinkedOriginIds = new[] { "OTHER-1" } }
+            };
+        }
+
+        [Test]
+        public void When_a_saved_plan_is_loaded_Then_the_revisions_are_the_same()
+        {
+            //Arrange
+            var sut = new ExecutionPlanStore(_workspace);
+            var plan = CreatePlan();
+            sut.Save(sut.ComputeWorkspaceFingerprint(), plan);
+
+            //Act
+            var loaded = sut.TryLoad(sut.ComputeWorkspaceFingerprint(), out var loadedPlan);
+
+            //Assert
+            Assert.That(loaded, Is.True);
+            Assert.That(loadedPlan, Has.Count.EqualTo(plan.Count));
+            for (int i = 0; i < plan.Count; i++)
+            {
+                Assert.Multiple(() =>
+                {
+                    Assert.That(loadedPlan[i].OriginId, Is.EqualTo(plan[i].OriginId));
+                    Assert.That(loadedPlan[i].RevIndex, Is.EqualTo(plan[i].RevIndex));
+                    Assert.That(loadedPlan[i].Time, Is.EqualTo(plan[i].Time));
+                    Assert.That(loadedPlan[i].LinkedOriginIds, Is.EqualTo(plan[i].LinkedOriginIds));
+                });
+            }
+        }
+
+        [Test]
+        public void When_an_item_file_has_changed_Then_the_saved_plan_is_not_used()
+        {
+            //Arrange
+            var sut = new ExecutionPlanStore(_workspace);
+            sut.Save(sut.ComputeWorkspaceFingerprint(), CreatePlan());
+            File.WriteAllText(Path.Combine(_workspace, "ITEM-2.json"), "{ \"OriginId\": \"ITEM-2\" }");
+
+            //Act
+            var loaded = sut.TryLoad(sut.ComputeWorkspaceFingerprint(), out var loadedPlan);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(loaded, Is.False);
+                Assert.That(loadedPlan, Is.Null);
+            });
+        }
+
+        [Test]
+        public void When_the_saved_plan_is_corrupt_Then_the_saved_plan_is_not_used()
+        {
+            //Arrange
+            var sut = new ExecutionPlanStore(_workspace);
+            File.WriteAllText(sut.PlanPath, "not a plan");
+
+            //Act
+            var loaded = sut.TryLoad(sut.ComputeWorkspaceFingerprint(), out _);
+
+            //Assert
+            Assert.That(loaded, Is.False);
+        }
+    }
+}
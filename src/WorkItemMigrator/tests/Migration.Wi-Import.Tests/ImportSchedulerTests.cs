@@ -0,0 +1,236 @@
+﻿using Migration.Common;
+using NUnit.Framework;
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+using System.Linq;
+using System.Threading;
+using WorkItemImport;
+
+namespace Migration.Wi_Import.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class ImportSchedulerTests
+    {
+        private static RevisionReference Rev(string originId, int index, params string[] linkedOriginIds)
+        {
+            return new RevisionReference { OriginId = originId, RevIndex = index, Time = new DateTime(2024, 1, 1).AddMinutes(index), LinkedOriginIds = linkedOriginIds };
+        }
+
+        [Test]
+        public void When_importing_in_parallel_Then_revisions_of_an_item_are_imported_in_order()
+        {
+            //Arrange
+            var revisions = Enumerable.Range(0, 20)
+                .SelectMany(index => new[] { "A-1", "A-2", "A-3", "A-4" }.Select(id => Rev(id, index)))
+                .ToList();
+            var sut = new ImportScheduler(revisions);
+            var imported = new ConcurrentQueue<RevisionReference>();
+            var running = new ConcurrentDictionary<string, int>();
+            var overlapping = 0;
+
+            //Act
+            sut.Run(4, (revision, isDeferred) =>
+            {
+                if (running.AddOrUpdate(revision.OriginId, 1, (_, count) => count + 1) > 1)
+                    Interlocked.Increment(ref overlapping);
+                Thread.Sleep(1);
+                imported.Enqueue(revision);
+                running.AddOrUpdate(revision.OriginId, 0, (_, count) => count - 1);
+                return true;
+            });
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(revisions.Count, imported.Count);
+                Assert.AreEqual(0, overlapping);
+                foreach (var item in imported.GroupBy(r => r.OriginId))
+                    CollectionAssert.IsOrdered(item.Select(r => r.RevIndex));
+            });
+        }
+
+        [Test]
+        public void When_a_revision_links_to_another_item_Then_it_is_ordered_with_the_revisions_of_that_item()
+        {
+            //Arrange
+            var revisions = new List<RevisionReference>
+            {
+                Rev("A-2", 0),
+                Rev("A-1", 0),
+                Rev("A-1", 1, "A-2"),
+                Rev("A-2", 1),
+                Rev("A-3", 0)
+            };
+            var sut = new ImportScheduler(revisions);
+            var imported = new ConcurrentQueue<RevisionReference>();
+
+            //Act
+            sut.Run(3, (revision, isDeferred) =>
+            {
+                imported.Enqueue(revision);
+                return true;
+            });
+
+            //Assert
+            var order = imported.ToList();
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(3, sut.DependencyCount);
+                Assert.Less(order.IndexOf(revisions[0]), order.IndexOf(revisions[2]));
+                Assert.Less(order.IndexOf(revisions[1]), order.IndexOf(revisions[2]));
+                Assert.Less(order.IndexOf(revisions[2]), order.IndexOf(revisions[3]));
+            });
+        }
+
+        [Test]
+        public void When_a_revision_is_deferred_Then_the_next_revision_of_the_item_is_imported_before_the_retry()
+        {
+            //Arrange
+            var revisions = new List<RevisionReference> { Rev("A-1", 0), Rev("A-2", 0), Rev("A-1", 1) };
+            var sut = new ImportScheduler(revisions);
+            var imported = new List<(RevisionReference, bool)>();
+
+            //Act
+            sut.Run(1, (revision, isDeferred) =>
+            {
+                imported.Add((revision, isDeferred));
+                return revision != revisions[0];
+            });
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                CollectionAssert.AreEqual(
+                    new[] { (revisions[0], false), (revisions[1], false), (revisions[2], false), (revisions[0], true) },
+                    imported);
+                Assert.AreEqual(revisions[2].Time + ImportScheduler.RetryTimeShift, imported[3].Item1.Time);
+            });
+        }
+
+        [Test]
+        public void When_a_deferred_revision_is_retried_after_a_later_revision_Then_the_reloaded_journal_keeps_the_later_revision()
+        {
+            //Arrange
+            var workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(workspace);
+            var revisions = new List<RevisionReference> { Rev("A-1", 0), Rev("A-1", 1), Rev("A-1", 2) };
+            var sut = new ImportScheduler(revisions);
+
+            try
+            {
+                //Act
+                using (var journal = Journal.Open(workspace, false))
+                {
+                    sut.Run(1, (revision, isDeferred) =>
+                    {
+                        if (revision.RevIndex == 1 && !isDeferred)
+                            return false;
+                        journal.MarkRevProcessed(revision.OriginId, 42, revision.RevIndex);
+                        return true;
+                    });
+                }
+
+                using (var reloaded = Journal.Open(workspace, false))
+                {
+                    //Assert
+                    Assert.Multiple(() =>
+                    {
+                        Assert.AreEqual(1, sut.RetriedCount);
+                        Assert.AreEqual((42, 2), reloaded.ProcessedRevisions["A-1"]);
+                        Assert.IsTrue(reloaded.IsItemMigrated("A-1", 2));
+                    });
+                }
+            }
+            finally
+            {
+                Directory.Delete(workspace, true);
+            }
+        }
+
+        [Test]
+        public void When_a_later_revision_of_the_item_adds_the_missing_attachment_Then_the_retry_succeeds()
+        {
+            //Arrange
+            var revisions = new List<RevisionReference> { Rev("A-1", 0), Rev("A-1", 1), Rev("A-1", 2) };
+            var sut = new ImportScheduler(revisions);
+            var attachments = new HashSet<string>();
+            var results = new List<(int RevIndex, bool IsDeferred, bool Imported)>();
+
+            //Act
+            sut.Run(4, (revision, isDeferred) =>
+            {
+                // Revision 0 refers to the attachment that revision 1 adds
+                if (revision.RevIndex == 1)
+                    attachments.Add("att-1");
+                var imported = revision.RevIndex != 0 || attachments.Contains("att-1");
+                lock (results)
+                    results.Add((revision.RevIndex, isDeferred, imported));
+                return imported;
+            });
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                CollectionAssert.AreEqual(new[] { (0, false, false), (1, false, true), (2, false, true), (0, true, true) }, results);
+                Assert.AreEqual(1, sut.DeferredCount);
+                Assert.AreEqual(1, sut.RetriedCount);
+            });
+        }
+
+        [Test]
+        public void When_the_plan_passes_the_time_of_a_deferred_revision_Then_it_is_retried_before_the_later_revisions()
+        {
+            //Arrange
+            var revisions = new List<RevisionReference> { Rev("A-1", 0) };
+            revisions.AddRange(Enumerable.Range(1, 10).Select(index => Rev("A-2", index)));
+            var sut = new ImportScheduler(revisions, TimeSpan.FromMinutes(5));
+            var imported = new List<(RevisionReference, bool)>();
+
+            //Act
+            sut.Run(1, (revision, isDeferred) =>
+            {
+                imported.Add((revision, isDeferred));
+                return revision != revisions[0];
+            });
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.AreEqual(6, imported.IndexOf((revisions[0], true)));
+                Assert.AreEqual(revisions[5], imported[5].Item1);
+                Assert.AreEqual(revisions[6], imported[7].Item1);
+                Assert.AreEqual(1, sut.DeferredCount);
+                Assert.AreEqual(1, sut.RetriedCount);
+            });
+        }
+
+        [Test]
+        public void When_an_import_throws_Then_the_workers_stop_and_the_exception_is_rethrown()
+        {
+            //Arrange
+            var revisions = Enumerable.Range(0, 10).Select(index => Rev("A-1", index)).ToList();
+            var sut = new ImportScheduler(revisions);
+            var importCount = 0;
+
+            //Act
+            void Run() => sut.Run(2, (revision, isDeferred) =>
+            {
+                Interlocked.Increment(ref importCount);
+                if (revision.RevIndex == 3)
+                    throw new InvalidOperationException("abort");
+                return true;
+            });
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(() => Run(), Throws.InvalidOperationException);
+                Assert.AreEqual(4, importCount);
+            });
+        }
+    }
+}
@@ -0,0 +1,140 @@
+﻿using Migration.WIContract;
+using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.IO;
+using System.Linq;
+using WorkItemImport;
+
+namespace Migration.Wi_Import.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class ItemSummaryStoreTests
+    {
+        private string _workspace;
+
+        [SetUp]
+        public void Setup()
+        {
+            _workspace = Path.Combine(Path.GetTempPath(), Guid.NewGuid().ToString());
+            Directory.CreateDirectory(_workspace);
+        }
+
+        [TearDown]
+        public void TearDown()
+        {
+            Directory.Delete(_workspace, true);
+        }
+
+        private static WiItem CreateItem()
+        {
+            return new WiItem
+            {
+                OriginId = "ITEM-1",
+                Type = "Task",
+                Revisions = new List<WiRevision>
+                {
+                    new WiRevision
+                    {
+                        Index = 0,
+                        Author = "creator@example.com",
+                        Time = new DateTime(2023, 1, 1, 0, 0, 0, DateTimeKind.Utc),
+                        Fields = new List<WiField>
+                        {
+                            new WiField { ReferenceName = WiFieldReference.Title, Value = "Title" },
+                            new WiField { ReferenceName = WiFieldReference.AreaPath, Value = "Team A" }
+                        },
+                        Links = new List<WiLink>
+                        {
+                            new WiLink { Change = ReferenceChangeType.Added, TargetOriginId = "EPIC-1", WiType = LinkGraph.HierarchyReverse },
+                            new WiLink { Change = ReferenceChangeType.Added, TargetOriginId = "ITEM-2", WiType = "System.LinkTypes.Related" }
+                        },
+                        Attachments = new List<WiAttachment>
+                        {
+                            new WiAttachment { Change = ReferenceChangeType.Added, AttOriginId = "100", FilePath = "100/image.png" }
+                        }
+                    },
+                    new WiRevision
+                    {
+                        Index = 1,
+                        Author = "editor@example.com",
+                        Time = new DateTime(2023, 1, 2, 0, 0, 0, DateTimeKind.Utc),
+                        Fields = new List<WiField> { new WiField { ReferenceName = WiFieldReference.IterationPath, Value = "Sprint 1" } },
+                        Attachments = new List<WiAttachment>
+                        {
+                            new WiAttachment { Change = ReferenceChangeType.Removed, AttOriginId = "100", FilePath = "100/image.png" }
+                        }
+                    }
+                }
+            };
+        }
+
+        [Test]
+        public void When_an_item_is_summarized_Then_only_the_parts_needed_ahead_are_kept()
+        {
+            //Act
+            var summary = ItemSummaryStore.Summarize(CreateItem());
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(summary.Type, Is.EqualTo("Task"));
+                Assert.That(summary.Revisions.Select(r => r.Index), Is.EqualTo(new[] { 0, 1 }));
+                Assert.That(summary.Revisions.Select(r => r.Author), Is.EqualTo(new[] { "creator@example.com", null }));
+                Assert.That(summary.Revisions[0].Fields.Select(f => f.ReferenceName), Is.EqualTo(new[] { WiFieldReference.AreaPath }));
+                Assert.That(summary.Revisions[0].Links.Select(l => l.TargetOriginId), Is.EqualTo(new[] { "EPIC-1" }));
+                Assert.That(summary.Revisions[0].Attachments.Select(a => a.AttOriginId), Is.EqualTo(new[] { "100" }));
+                Assert.That(summary.Revisions[1].Fields.Select(f => f.ReferenceName), Is.EqualTo(new[] { WiFieldReference.IterationPath }));
+                Assert.That(summary.Revisions[1].Attachments, Is.Empty);
+            });
+        }
+
+        [Test]
+        public void When_saved_summaries_are_loaded_Then_they_are_the_same()
+        {
+            //Arrange
+            var sut = new ItemSummaryStore(_workspace);
+            sut.Save(42, new[] { ItemSummaryStore.Summarize(CreateItem()) });
+
+            //Act
+            var loaded = sut.TryLoad(42, out var summaries);
+
+            //Assert
+            Assert.That(loaded, Is.True);
+            var summary = summaries["ITEM-1"];
+            Assert.Multiple(() =>
+            {
+                Assert.That(summary.Type, Is.EqualTo("Task"));
+                Assert.That(summary.Revisions[0].Author, Is.EqualTo("creator@example.com"));
+                Assert.That(summary.Revisions[1].Time, Is.EqualTo(new DateTime(2023, 1, 2, 0, 0, 0, DateTimeKind.Utc)));
+                Assert.That(summary.Revisions[0].Fields.Single().Value, Is.EqualTo("Team A"));
+                Assert.That(summary.Revisions[0].Links.Single().WiType, Is.EqualTo(LinkGraph.HierarchyReverse));
+                Assert.That(summary.Revisions[0].Attachments.Single().FilePath, Is.EqualTo("100/image.png"));
+            });
+        }
+
+        [Test]
+        public void When_the_item_pack_has_changed_Then_the_saved_summaries_are_not_used()
+        {
+            //Arrange
+            var packPath = Path.Combine(_workspace, WiItemPack.FileName);
+            File.WriteAllText(packPath, "{}\n");
+            var fingerprintStore = new ExecutionPlanStore(_workspace);
+            var sut = new ItemSummaryStore(_workspace);
+            sut.Save(fingerprintStore.ComputeWorkspaceFingerprint(), new[] { ItemSummaryStore.Summarize(CreateItem()) });
+            File.AppendAllText(packPath, "{}\n");
+
+            //Act
+            var loaded = sut.TryLoad(fingerprintStore.ComputeWorkspaceFingerprint(), out var summaries);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(loaded, Is.False);
+                Assert.That(summaries, Is.Null);
+            });
+        }
+    }
+}
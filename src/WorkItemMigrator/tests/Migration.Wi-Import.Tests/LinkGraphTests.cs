@@ -0,0 +1,109 @@
+﻿using Migration.WIContract;
+using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using WorkItemImport;
+
+namespace Migration.Wi_Import.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class LinkGraphTests
+    {
+        private static DateTime At(int minute)
+        {
+            return new DateTime(2023, 1, 1, 0, minute, 0, DateTimeKind.Utc);
+        }
+
+        private static WiLink CreateLink(string targetOriginId, string wiType, ReferenceChangeType change = ReferenceChangeType.Added)
+        {
+            return new WiLink { Change = change, TargetOriginId = targetOriginId, WiType = wiType };
+        }
+
+        [Test]
+        public void When_a_child_gets_a_second_parent_Then_the_first_parent_is_replaced()
+        {
+            //Arrange
+            var sut = new LinkGraph();
+            sut.Add("EPIC-1", At(0), new[] { CreateLink("STORY-1", LinkGraph.HierarchyForward) });
+            sut.Add("EPIC-2", At(5), new[] { CreateLink("STORY-1", LinkGraph.HierarchyForward) });
+
+            //Act
+            var replaced = sut.GetReplacedParent("STORY-1", "EPIC-2", At(5).AddMilliseconds(2));
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(replaced, Is.EqualTo("EPIC-1"));
+                Assert.That(sut.GetReplacedParent("STORY-1", "EPIC-1", At(0)), Is.Null);
+                Assert.That(sut.ReplacedParentCount, Is.EqualTo(1));
+            });
+        }
+
+        [Test]
+        public void When_the_child_removes_its_parent_first_Then_no_parent_is_replaced()
+        {
+            //Arrange
+            var sut = new LinkGraph();
+            sut.Add("EPIC-1", At(0), new[] { CreateLink("STORY-1", LinkGraph.HierarchyForward) });
+            sut.Add("STORY-1", At(5), new[]
+            {
+                CreateLink("EPIC-2", LinkGraph.HierarchyReverse),
+                CreateLink("EPIC-1", LinkGraph.HierarchyReverse, ReferenceChangeType.Removed)
+            });
+
+            //Act
+            var replaced = sut.GetReplacedParent("STORY-1", "EPIC-2", At(5));
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(replaced, Is.Null);
+                Assert.That(sut.HierarchyLinkCount, Is.EqualTo(3));
+            });
+        }
+
+        [Test]
+        public void When_items_are_added_Then_the_planned_time_of_their_revisions_is_used()
+        {
+            //Arrange
+            var plan = new[] { new RevisionReference { OriginId = "EPIC-2", RevIndex = 0, Time = At(10) } };
+            var sut = new LinkGraph(plan);
+            sut.Add(new WiItem
+            {
+                OriginId = "EPIC-1",
+                Revisions = new List<WiRevision> { new WiRevision { Index = 0, Time = At(0), Links = new List<WiLink> { CreateLink("STORY-1", LinkGraph.HierarchyForward) } } }
+            });
+            sut.Add(new WiItem
+            {
+                OriginId = "EPIC-2",
+                Revisions = new List<WiRevision> { new WiRevision { Index = 0, Time = At(1), Links = new List<WiLink> { CreateLink("STORY-1", LinkGraph.HierarchyForward) } } }
+            });
+
+            //Act
+            var replacedBeforePlannedTime = sut.GetReplacedParent("STORY-1", "EPIC-2", At(5));
+            var replacedAtPlannedTime = sut.GetReplacedParent("STORY-1", "EPIC-2", At(10));
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(replacedBeforePlannedTime, Is.Null);
+                Assert.That(replacedAtPlannedTime, Is.EqualTo("EPIC-1"));
+            });
+        }
+
+        [Test]
+        public void When_links_are_not_parent_child_links_Then_they_are_not_indexed()
+        {
+            //Arrange
+            var sut = new LinkGraph();
+
+            //Act
+            sut.Add("ITEM-1", At(0), new[] { CreateLink("ITEM-2", "System.LinkTypes.Related") });
+
+            //Assert
+            Assert.That(sut.HierarchyLinkCount, Is.EqualTo(0));
+        }
+    }
+}
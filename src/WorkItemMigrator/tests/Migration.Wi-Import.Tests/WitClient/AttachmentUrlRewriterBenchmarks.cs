@@ -0,0 +1,98 @@
+﻿using Migration.WIContract;
+using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Diagnostics.CodeAnalysis;
+using System.Linq;
+using System.Text;
+using System.Text.RegularExpressions;
+using WorkItemImport;
+
+namespace Migration.Wi_Import.Tests
+{
+    // Not part of the regular test run, execute with: dotnet test --filter TestCategory=Benchmark
+    [TestFixture]
+    [Explicit]
+    [Category("Benchmark")]
+    [ExcludeFromCodeCoverage]
+    public class AttachmentUrlRewriterBenchmarks
+    {
+        private const int AttachmentCount = 200;
+        private const int HtmlLength = 100 * 1024;
+        private const int Iterations = 5;
+
+        private List<WiAttachment> _attachments;
+        private Dictionary<string, string> _urls;
+        private string _html;
+
+        [OneTimeSetUp]
+        public void OneTimeSetup()
+        {
+            _attachments = Enumerable.Range(0, AttachmentCount).Select(i => new WiAttachment
+            {
+                Change = ReferenceChangeType.Added,
+                AttOriginId = (10000 + i).ToString(),
+                FilePath = $"C:\\Temp\\workspace\\Attachments\\{10000 + i}\\screenshot-{i}.png"
+            }).ToList();
+            // The regex replacement also matches a Jira id inside an Azure DevOps URL, the URLs do not contain one
+            _urls = _attachments.ToDictionary(a => a.AttOriginId, a => $"https://dev.azure.com/org/_apis/wit/attachments/{new Guid(int.Parse(a.AttOriginId), 0, 0, new byte[8])}");
+
+            // A rendered Jira description: paragraphs, tables and links with an image of every attachment in between
+            var html = new StringBuilder();
+            var random = new Random(42);
+            while (html.Length < HtmlLength)
+            {
+                var index = random.Next(AttachmentCount);
+                var att = _attachments[index];
+                html.Append("<p>Steps to reproduce, see the <a href=\"https://jira.example.com/browse/PROJ-123\">linked issue</a> and the table.</p>");
+                html.Append("<table class=\"confluenceTable\"><tbody><tr><th class=\"confluenceTh\">Step</th><td class=\"confluenceTd\">Expected!</td></tr></tbody></table>");
+                html.Append($"<p><span class=\"image-wrap\"><img src=\"https://jira.example.com/secure/attachment/{att.AttOriginId}/screenshot-{index}.png\" style=\"border: 0px solid black\" /></span></p>\n");
+            }
+            _html = html.ToString();
+        }
+
+        [Test]
+        public void Measure_rewriting_a_100_KB_description_with_200_attachments()
+        {
+            string singlePass = null, regex = null;
+
+            var singlePassTime = Measure(() =>
+            {
+                var rewriter = new AttachmentUrlRewriter(_attachments, att => _urls[att.AttOriginId]);
+                singlePass = rewriter.Rewrite(_html, out _, out _);
+            });
+            var regexTime = Measure(() => regex = RewriteWithRegex(_html));
+
+            TestContext.WriteLine($"Attachments: {AttachmentCount}, description: {_html.Length / 1024} KB");
+            TestContext.WriteLine($"Single pass:          {singlePassTime.TotalMilliseconds:F1} ms per description");
+            TestContext.WriteLine($"Regex per attachment: {regexTime.TotalMilliseconds:F1} ms per description");
+            Assert.That(singlePass, Is.EqualTo(regex));
+        }
+
+        // The replacement of the earlier import, two Regex passes over the text for every referenced attachment
+        private string RewriteWithRegex(string text)
+        {
+            foreach (var att in _attachments)
+            {
+                string fileName = att.FilePath.Split('\\').Last();
+                if (!text.Contains(fileName))
+                    continue;
+
+                text = Regex.Replace(text, $"src.*?=.*?\"([^\"])(?=.*{att.AttOriginId}).*?\"", $"src=\"{_urls[att.AttOriginId]}\"");
+                text = Regex.Replace(text, $"!{fileName}!", $"<img src=\"{_urls[att.AttOriginId]}\"/>");
+            }
+            return text;
+        }
+
+        private static TimeSpan Measure(Action action)
+        {
+            action();
+            var sw = Stopwatch.StartNew();
+            for (int i = 0; i < Iterations; i++)
+                action();
+            sw.Stop();
+            return sw.Elapsed / Iterations;
+        }
+    }
+}
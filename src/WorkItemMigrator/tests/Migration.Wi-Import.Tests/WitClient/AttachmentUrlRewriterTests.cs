@@ -0,0 +1,110 @@
+﻿using Migration.WIContract;
+using NUnit.Framework;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using WorkItemImport;
+
+namespace Migration.Wi_Import.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class AttachmentUrlRewriterTests
+    {
+        private static WiAttachment CreateAttachment(string attOriginId, string fileName)
+        {
+            return new WiAttachment
+            {
+                Change = ReferenceChangeType.Added,
+                AttOriginId = attOriginId,
+                FilePath = $"C:\\Temp\\workspace\\Attachments\\{attOriginId}\\{fileName}"
+            };
+        }
+
+        private static AttachmentUrlRewriter CreateRewriter(Dictionary<string, string> urls, params WiAttachment[] attachments)
+        {
+            return new AttachmentUrlRewriter(attachments, att => urls.TryGetValue(att.AttOriginId, out string url) ? url : null);
+        }
+
+        [Test]
+        public void When_the_text_references_attachments_Then_all_references_are_replaced_in_one_pass()
+        {
+            //Arrange
+            var urls = new Dictionary<string, string> { ["10001"] = "https://ado/a1", ["10002"] = "https://ado/a2" };
+            var sut = CreateRewriter(urls, CreateAttachment("10001", "image.png"), CreateAttachment("10002", "log (1).txt"));
+            var text = "<p><img src=\"https://jira/secure/attachment/10001/image.png\" alt=\"x\"> and "
+                + "<img src='https://jira/rest/api/2/attachment/content/10002'> and "
+                + "<img src=\"https://jira/secure/thumbnail/10001/_thumb_10001.png\"> and !image.png!</p>";
+
+            //Act
+            var result = sut.Rewrite(text, out bool updated, out WiAttachment missing);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(result, Is.EqualTo("<p><img src=\"https://ado/a1\" alt=\"x\"> and "
+                    + "<img src='https://ado/a2'> and "
+                    + "<img src=\"https://ado/a1\"> and <img src=\"https://ado/a1\"/></p>"));
+                Assert.That(updated, Is.True);
+                Assert.That(missing, Is.Null);
+            });
+        }
+
+        [Test]
+        public void When_the_url_only_contains_the_encoded_file_name_Then_the_attachment_is_found_by_name()
+        {
+            //Arrange
+            var urls = new Dictionary<string, string> { ["10002"] = "https://ado/a2" };
+            var sut = CreateRewriter(urls, CreateAttachment("10002", "log (1).txt"));
+
+            //Act
+            var result = sut.Rewrite("<img src=\"files/log+%281%29.txt?version=1\">", out bool updated, out _);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(result, Is.EqualTo("<img src=\"https://ado/a2\">"));
+                Assert.That(updated, Is.True);
+            });
+        }
+
+        [Test]
+        public void When_a_referenced_attachment_is_not_migrated_Then_it_is_returned_as_missing()
+        {
+            //Arrange
+            var attachment = CreateAttachment("10001", "image.png");
+            var sut = CreateRewriter(new Dictionary<string, string>(), attachment);
+            var text = "<a href=\"https://jira/secure/attachment/10001/image.png\">image.png</a>";
+
+            //Act
+            var result = sut.Rewrite(text, out bool updated, out WiAttachment missing);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(result, Is.EqualTo(text));
+                Assert.That(updated, Is.False);
+                Assert.That(missing, Is.SameAs(attachment));
+            });
+        }
+
+        [Test]
+        public void When_the_text_does_not_reference_attachments_Then_it_is_returned_unchanged()
+        {
+            //Arrange
+            var urls = new Dictionary<string, string> { ["10001"] = "https://ado/a1" };
+            var sut = CreateRewriter(urls, CreateAttachment("10001", "image.png"));
+            var text = "<p>Wow! Such <img data-src=\"10001\" src=\"https://example.com/logo.png\"> text!</p>";
+
+            //Act
+            var result = sut.Rewrite(text, out bool updated, out WiAttachment missing);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(result, Is.SameAs(text));
+                Assert.That(updated, Is.False);
+                Assert.That(missing, Is.Null);
+            });
+        }
+    }
+}
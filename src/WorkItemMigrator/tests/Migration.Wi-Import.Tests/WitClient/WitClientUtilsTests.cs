@@ -13,6 +13,7 @@ using System;
 using System.Collections.Generic;
 using System.Diagnostics.CodeAnalysis;
 using System.Linq;
+using System.Threading.Tasks;
 using WorkItemImport;
 
 namespace Migration.Wi_Import.Tests
@@ -27,6 +28,7 @@ namespace Migration.Wi_Import.Tests
             public Guid projectId = Guid.NewGuid();
             public Guid repositoryId = Guid.NewGuid();
             public Dictionary<int, WorkItem> _wiCache = new Dictionary<int, WorkItem>();
+            public int updateWorkItemCount = 0;
 
             public MockedWitClientWrapper()
             {
@@ -51,6 +53,11 @@ namespace Migration.Wi_Import.Tests
                 return workItem;
             }
 
+            public List<WorkItem> CreateWorkItems(IList<(string WiType, DateTime? CreatedDate, string CreatedBy)> workItems, bool suppressNotifications)
+            {
+                return workItems.Select(w => CreateWorkItem(w.WiType, suppressNotifications, w.CreatedDate, w.CreatedBy)).ToList();
+            }
+
             public WorkItem GetWorkItem(int wiId)
             {
                 return _wiCache[wiId];
@@ -58,6 +65,7 @@ namespace Migration.Wi_Import.Tests
 
             public WorkItem UpdateWorkItem(JsonPatchDocument patchDocument, int workItemId, bool suppressNotifications)
             {
+                updateWorkItemCount++;
                 WorkItem wi = _wiCache[workItemId];
                 foreach (JsonPatchOperation op in patchDocument)
                 {
@@ -160,6 +168,36 @@ namespace Migration.Wi_Import.Tests
                 };
                 return att;
             }
+
+            public Task<WorkItem> CreateWorkItemAsync(string wiType, bool suppressNotifications, DateTime? createdDate = null, string createdBy = "")
+            {
+                return Task.FromResult(CreateWorkItem(wiType, suppressNotifications, createdDate, createdBy));
+            }
+
+            public Task<List<WorkItem>> CreateWorkItemsAsync(IList<(string WiType, DateTime? CreatedDate, string CreatedBy)> workItems, bool suppressNotifications)
+            {
+                return Task.FromResult(CreateWorkItems(workItems, suppressNotifications));
+            }
+
+            public Task<WorkItem> GetWorkItemAsync(int wiId)
+            {
+                return Task.FromResult(GetWorkItem(wiId));
+            }
+
+            public Task<WorkItem> UpdateWorkItemAsync(JsonPatchDocument patchDocument, int workItemId, bool suppressNotifications)
+            {
+                return Task.FromResult(UpdateWorkItem(patchDocument, workItemId, suppressNotifications));
+            }
+
+            public Task<List<WorkItemRelationType>> GetRelationTypesAsync()
+            {
+                return Task.FromResult(GetRelationTypes());
+            }
+
+            public Task<AttachmentReference> CreateAttachmentAsync(WiAttachment wiAttachment)
+            {
+                return Task.FromResult(CreateAttachment(wiAttachment));
+            }
         }
         private bool MockedIsAttachmentMigratedDelegateTrue(string _attOriginId, out string attWiId)
         {
@@ -583,6 +621,28 @@ namespace Migration.Wi_Import.Tests
             });
         }
 
+        [Test]
+        public void When_calling_create_work_items_Then_the_work_items_are_returned_in_order()
+        {
+            MockedWitClientWrapper witClientWrapper = new MockedWitClientWrapper();
+            WitClientUtils wiUtils = new WitClientUtils(witClientWrapper);
+            var createdDate = new DateTime(2023, 1, 1);
+
+            List<WorkItem> createdWIs = wiUtils.CreateWorkItems(new List<(string, DateTime?, string)>
+            {
+                ("User Story", createdDate, "author"),
+                ("Task", null, "")
+            }, false);
+
+            Assert.Multiple(() =>
+            {
+                Assert.That(createdWIs.Select(wi => wi.Id), Is.EqualTo(new int?[] { 1, 2 }));
+                Assert.That(createdWIs[0].Fields[WiFieldReference.WorkItemType], Is.EqualTo("User Story"));
+                Assert.That(createdWIs[0].Fields[WiFieldReference.CreatedDate], Is.EqualTo(createdDate));
+                Assert.That(createdWIs[1].Fields[WiFieldReference.WorkItemType], Is.EqualTo("Task"));
+            });
+        }
+
         [Test]
         public void When_calling_add_link_with_empty_args_Then_an_exception_is_thrown()
         {
@@ -714,6 +774,76 @@ namespace Migration.Wi_Import.Tests
             });
         }
 
+        [Test]
+        public void When_adding_a_child_link_with_a_link_graph_and_the_child_has_another_parent_Then_that_parent_link_is_removed_first()
+        {
+            MockedWitClientWrapper witClientWrapper = new MockedWitClientWrapper();
+            var linkGraph = new LinkGraph();
+            linkGraph.Add("EPIC-1", new DateTime(2023, 1, 1), new[] { new WiLink { Change = ReferenceChangeType.Added, TargetOriginId = "STORY-1", WiType = LinkGraph.HierarchyForward } });
+            linkGraph.Add("EPIC-2", new DateTime(2023, 1, 2), new[] { new WiLink { Change = ReferenceChangeType.Added, TargetOriginId = "STORY-1", WiType = LinkGraph.HierarchyForward } });
+            WitClientUtils wiUtils = new WitClientUtils(witClientWrapper) { LinkGraph = linkGraph };
+
+            WorkItem oldParentWI = wiUtils.CreateWorkItem("Epic", false);
+            WorkItem newParentWI = wiUtils.CreateWorkItem("Epic", false);
+            WorkItem childWI = wiUtils.CreateWorkItem("User Story", false);
+            childWI.Relations.Add(new WorkItemRelation { Rel = LinkGraph.HierarchyReverse, Url = oldParentWI.Url });
+
+            Settings settings = _fixture.Create<Settings>();
+
+            WiLink link = new WiLink
+            {
+                WiType = LinkGraph.HierarchyForward,
+                SourceOriginId = "EPIC-2",
+                SourceWiId = 2,
+                TargetOriginId = "STORY-1",
+                TargetWiId = 3,
+                Change = ReferenceChangeType.Added
+            };
+
+            bool added = wiUtils.AddAndSaveLink(link, newParentWI, settings, "author", new DateTime(2023, 1, 2));
+
+            Assert.Multiple(() =>
+            {
+                Assert.That(added, Is.True);
+                Assert.That(childWI.Relations, Is.Empty);
+                Assert.That(newParentWI.Relations.Single().Url, Is.EqualTo(childWI.Url));
+                Assert.That(witClientWrapper.updateWorkItemCount, Is.EqualTo(2));
+            });
+        }
+
+        [Test]
+        public void When_adding_a_parent_link_with_a_link_graph_and_the_work_item_has_another_parent_Then_the_parent_is_replaced_in_one_update()
+        {
+            MockedWitClientWrapper witClientWrapper = new MockedWitClientWrapper();
+            WitClientUtils wiUtils = new WitClientUtils(witClientWrapper) { LinkGraph = new LinkGraph() };
+
+            WorkItem oldParentWI = wiUtils.CreateWorkItem("Epic", false);
+            WorkItem newParentWI = wiUtils.CreateWorkItem("Epic", false);
+            WorkItem childWI = wiUtils.CreateWorkItem("User Story", false);
+            childWI.Relations.Add(new WorkItemRelation { Rel = LinkGraph.HierarchyReverse, Url = oldParentWI.Url });
+
+            Settings settings = _fixture.Create<Settings>();
+
+            WiLink link = new WiLink
+            {
+                WiType = LinkGraph.HierarchyReverse,
+                SourceOriginId = "STORY-1",
+                SourceWiId = 3,
+                TargetOriginId = "EPIC-2",
+                TargetWiId = 2,
+                Change = ReferenceChangeType.Added
+            };
+
+            bool added = wiUtils.AddAndSaveLink(link, childWI, settings, "author", DateTime.Now);
+
+            Assert.Multiple(() =>
+            {
+                Assert.That(added, Is.True);
+                Assert.That(childWI.Relations.Single().Url, Is.EqualTo(newParentWI.Url));
+                Assert.That(witClientWrapper.updateWorkItemCount, Is.EqualTo(1));
+            });
+        }
+
         [Test]
         public void When_calling_remove_link_with_empty_args_Then_an_exception_is_thrown()
         {
@@ -1271,5 +1401,115 @@ namespace Migration.Wi_Import.Tests
             // Assert
             Assert.AreEqual(expectedEncodedFileName, encodedFileName);
         }
+
+        [Test]
+        public void When_calling_add_link_with_patch_document_Then_the_link_is_added_without_saving()
+        {
+            // Arrange
+            MockedWitClientWrapper witClientWrapper = new MockedWitClientWrapper();
+            WitClientUtils wiUtils = new WitClientUtils(witClientWrapper);
+
+            WorkItem createdWI = wiUtils.CreateWorkItem("User Story", false);
+            WorkItem linkedWI = wiUtils.CreateWorkItem("Task", false);
+
+            WiLink link = new WiLink
+            {
+                WiType = "System.LinkTypes.Hierarchy-Forward",
+                SourceOriginId = "100",
+                SourceWiId = 1,
+                TargetOriginId = "101",
+                TargetWiId = 2,
+                Change = ReferenceChangeType.Added
+            };
+            JsonPatchDocument patchDocument = new JsonPatchDocument();
+
+            // Act
+            bool added = wiUtils.AddLink(link, createdWI, patchDocument);
+
+            // Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(added, Is.True);
+                Assert.That(patchDocument, Has.Count.EqualTo(1));
+                Assert.That(patchDocument[0].Path, Is.EqualTo("/relations/-"));
+                Assert.That(createdWI.Relations.Single().Url, Is.EqualTo(linkedWI.Url));
+                Assert.That(witClientWrapper.updateWorkItemCount, Is.EqualTo(0));
+            });
+        }
+
+        [Test]
+        public void When_calling_add_workitem_attachments_Then_the_attachment_is_uploaded_and_added_without_saving()
+        {
+            // Arrange
+            MockedWitClientWrapper witClientWrapper = new MockedWitClientWrapper();
+            WitClientUtils wiUtils = new WitClientUtils(witClientWrapper);
+
+            WorkItem createdWI = wiUtils.CreateWorkItem("User Story", false);
+
+            WiAttachment att = new WiAttachment
+            {
+                Change = ReferenceChangeType.Added,
+                FilePath = "C:\\Temp\\MyFiles\\my_image.png",
+                AttOriginId = "100",
+                Comment = "My comment"
+            };
+            WiRevision revision = new WiRevision();
+            revision.Attachments.Add(att);
+            wiUtils.ApplyAttachments(revision, createdWI, new Dictionary<string, WiAttachment>(), MockedIsAttachmentMigratedDelegateFalse);
+            JsonPatchDocument patchDocument = new JsonPatchDocument();
+
+            // Act
+            Dictionary<string, WiAttachment> uploaded = wiUtils.AddWorkItemAttachments(revision, createdWI, patchDocument);
+
+            // Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(uploaded.Keys, Is.EquivalentTo(new[] { att.AttOriginId }));
+                Assert.That(patchDocument, Has.Count.EqualTo(1));
+                Assert.That(createdWI.Relations.Single().Url, Is.EqualTo("https://example.com"));
+                Assert.That(createdWI.Relations.Single().Attributes["comment"], Is.EqualTo("My comment, original ID: 100"));
+                Assert.That(witClientWrapper.updateWorkItemCount, Is.EqualTo(0));
+            });
+        }
+
+        [Test]
+        public void When_calling_save_workitem_fields_with_relation_patch_document_Then_relations_and_fields_are_saved_in_one_update()
+        {
+            // Arrange
+            MockedWitClientWrapper witClientWrapper = new MockedWitClientWrapper();
+            WitClientUtils wiUtils = new WitClientUtils(witClientWrapper);
+
+            WorkItem createdWI = wiUtils.CreateWorkItem("User Story", false);
+            WorkItem linkedWI = wiUtils.CreateWorkItem("Task", false);
+            createdWI.Fields[WiFieldReference.ChangedDate] = DateTime.Now;
+            createdWI.Fields[WiFieldReference.Title] = "My work item";
+
+            Settings settings = _fixture.Create<Settings>();
+
+            WiLink link = new WiLink
+            {
+                WiType = "System.LinkTypes.Hierarchy-Forward",
+                SourceOriginId = "100",
+                SourceWiId = 1,
+                TargetOriginId = "101",
+                TargetWiId = 2,
+                Change = ReferenceChangeType.Added
+            };
+            JsonPatchDocument patchDocument = new JsonPatchDocument();
+            wiUtils.AddLink(link, createdWI, patchDocument);
+
+            // Act
+            bool saved = wiUtils.SaveWorkItemFields(createdWI, settings, patchDocument);
+
+            // Assert
+            WorkItem updatedWI = wiUtils.GetWorkItem(createdWI.Id.Value);
+            Assert.Multiple(() =>
+            {
+                Assert.That(saved, Is.True);
+                Assert.That(witClientWrapper.updateWorkItemCount, Is.EqualTo(1));
+                Assert.That(updatedWI.Relations.Single().Url, Is.EqualTo(linkedWI.Url));
+                Assert.That(updatedWI.Fields[WiFieldReference.Title], Is.EqualTo("My work item"));
+            });
+        }
     }
-}
\ No newline at end of file
+}
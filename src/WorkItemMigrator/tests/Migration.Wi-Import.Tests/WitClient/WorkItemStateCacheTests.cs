@@ -0,0 +1,111 @@
+﻿using Microsoft.TeamFoundation.WorkItemTracking.WebApi.Models;
+using Microsoft.VisualStudio.Services.WebApi.Patch;
+using Microsoft.VisualStudio.Services.WebApi.Patch.Json;
+using Migration.WIContract;
+using NUnit.Framework;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using WorkItemImport.WitClient;
+
+namespace Migration.Wi_Import.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class WorkItemStateCacheTests
+    {
+        private static WorkItem CreateWorkItem(int id, params int[] linkedIds)
+        {
+            var wi = new WorkItem
+            {
+                Id = id,
+                Rev = 1,
+                Url = $"https://example/_apis/wit/workItems/{id}",
+                Fields = new Dictionary<string, object> { { WiFieldReference.Title, $"Item {id}" } },
+                Relations = new List<WorkItemRelation>()
+            };
+            foreach (var linkedId in linkedIds)
+                wi.Relations.Add(new WorkItemRelation { Rel = "System.LinkTypes.Related", Url = $"https://example/_apis/wit/workItems/{linkedId}" });
+            return wi;
+        }
+
+        [Test]
+        public void When_a_cached_work_item_is_changed_Then_the_cached_state_is_unchanged()
+        {
+            //Arrange
+            var sut = new WorkItemStateCache(10);
+            sut.Set(CreateWorkItem(1));
+
+            //Act
+            sut.TryGet(1, out WorkItem first);
+            first.Fields[WiFieldReference.Title] = "Changed";
+            first.Relations.Add(new WorkItemRelation { Rel = "AttachedFile" });
+            sut.TryGet(1, out WorkItem second);
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(second.Fields[WiFieldReference.Title], Is.EqualTo("Item 1"));
+                Assert.That(second.Relations, Is.Empty);
+                Assert.That(sut.Hits, Is.EqualTo(2));
+            });
+        }
+
+        [Test]
+        public void When_a_link_is_added_Then_the_linked_work_item_is_removed_from_the_cache()
+        {
+            //Arrange
+            var sut = new WorkItemStateCache(10);
+            sut.Set(CreateWorkItem(1));
+            sut.Set(CreateWorkItem(2));
+            sut.Set(CreateWorkItem(3));
+            var patchDocument = new JsonPatchDocument
+            {
+                new JsonPatchOperation { Operation = Operation.Add, Path = "/relations/-", Value = new { rel = "System.LinkTypes.Related", url = "https://example/_apis/wit/workItems/2" } }
+            };
+
+            //Act
+            sut.Updated(1, patchDocument, CreateWorkItem(1, 2));
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(sut.TryGet(1, out WorkItem updated), Is.True);
+                Assert.That(updated.Relations, Has.Count.EqualTo(1));
+                Assert.That(sut.TryGet(2, out _), Is.False);
+                Assert.That(sut.TryGet(3, out _), Is.True);
+            });
+        }
+
+        [Test]
+        public void When_the_cache_is_full_Then_the_least_recently_used_work_item_is_removed()
+        {
+            //Arrange
+            var sut = new WorkItemStateCache(2);
+            sut.Set(CreateWorkItem(1));
+            sut.Set(CreateWorkItem(2));
+            sut.TryGet(1, out _);
+
+            //Act
+            sut.Set(CreateWorkItem(3));
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(sut.TryGet(1, out _), Is.True);
+                Assert.That(sut.TryGet(2, out _), Is.False);
+                Assert.That(sut.TryGet(3, out _), Is.True);
+            });
+        }
+
+        [Test]
+        public void When_getting_the_id_from_a_work_item_url_Then_the_id_is_returned()
+        {
+            Assert.Multiple(() =>
+            {
+                Assert.That(WorkItemStateCache.GetWorkItemId("https://dev.azure.com/org/_apis/wit/workItems/42"), Is.EqualTo(42));
+                Assert.That(WorkItemStateCache.GetWorkItemId("https://dev.azure.com/org/_apis/wit/attachments/7c8b"), Is.Null);
+                Assert.That(WorkItemStateCache.GetWorkItemId(null), Is.Null);
+            });
+        }
+    }
+}
@@ -0,0 +1,73 @@
+﻿using NUnit.Framework;
+using System;
+using System.Collections.Generic;
+using System.Diagnostics.CodeAnalysis;
+using System.Linq;
+using System.Threading.Tasks;
+using WorkItemImport;
+
+namespace Migration.Wi_Import.Tests
+{
+    [TestFixture]
+    [ExcludeFromCodeCoverage]
+    public class WorkItemBatchCreatorTests
+    {
+        private static List<(string OriginId, string WiType, DateTime CreatedDate, string CreatedBy)> CreateWorkItems(int count)
+        {
+            return Enumerable.Range(1, count)
+                .Select(i => ($"ITEM-{i}", "Task", new DateTime(2024, 1, 1).AddMinutes(i), "user@example.com"))
+                .ToList();
+        }
+
+        [Test]
+        public void When_the_import_reaches_a_work_item_Then_only_the_batches_up_to_it_are_created()
+        {
+            //Arrange
+            var batches = new List<List<string>>();
+            var sut = new WorkItemBatchCreator(CreateWorkItems(5), 2, batch => batches.Add(batch.Select(w => w.OriginId).ToList()));
+
+            //Act
+            var planned = sut.EnsureCreated("ITEM-3");
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(planned, Is.True);
+                Assert.That(batches, Is.EqualTo(new[] { new[] { "ITEM-1", "ITEM-2" }, new[] { "ITEM-3", "ITEM-4" } }));
+            });
+        }
+
+        [Test]
+        public void When_a_work_item_is_not_planned_Then_no_batch_is_created()
+        {
+            //Arrange
+            var batchCount = 0;
+            var sut = new WorkItemBatchCreator(CreateWorkItems(5), 2, batch => batchCount++);
+
+            //Act
+            var planned = sut.EnsureCreated("OTHER-1");
+
+            //Assert
+            Assert.Multiple(() =>
+            {
+                Assert.That(planned, Is.False);
+                Assert.That(batchCount, Is.EqualTo(0));
+            });
+        }
+
+        [Test]
+        public void When_workers_reach_the_work_items_at_the_same_time_Then_every_work_item_is_created_once()
+        {
+            //Arrange
+            var workItems = CreateWorkItems(100);
+            var created = new List<string>();
+            var sut = new WorkItemBatchCreator(workItems, 7, batch => created.AddRange(batch.Select(w => w.OriginId)));
+
+            //Act
+            Parallel.ForEach(workItems, new ParallelOptions { MaxDegreeOfParallelism = 8 }, w => sut.EnsureCreated(w.OriginId));
+
+            //Assert
+            Assert.That(created, Is.EqualTo(workItems.Select(w => w.OriginId)));
+        }
+    }
+}